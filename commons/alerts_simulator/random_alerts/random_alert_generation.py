@@ -24,10 +24,17 @@ from commons.alerts_simulator.generate_alert_lib import \
 from commons.alerts_simulator.random_alerts.constants_random_alert_generation import FaultAlerts
 from commons.alerts_simulator.random_alerts.alert_setup_lib import AlertSetup
 from commons.alerts_simulator.random_alerts.teardown_lib import AlertTearDown
+from commons.helpers.log_tail_helper import LogTailer
+from commons.helpers.node_helper import Node
 from config import CMN_CFG
+from config import RAS_VAL
 
 LOGGER = logging.getLogger(__name__)
 
+# Every sspl alert written to the screen log carries this key
+ALERT_LINE_MARKER = '"alert_type"'
+ALERT_WAIT_TIMEOUT = 30
+
 
 class RandomAlerts:
     """
@@ -50,6 +57,7 @@ class RandomAlerts:
         self.alert_teardown = AlertTearDown(host=host, username=h_user,
                                             password=h_pwd)
         self.alert_api_obj = GenerateAlertLib()
+        self.node_obj = Node(hostname=host, username=h_user, password=h_pwd)
 
     def generate_random_alerts(self, event, ignore_alert: list = None,
                                monitor: bool = True):
@@ -68,6 +76,13 @@ class RandomAlerts:
                 t = eval('FaultAlerts.{}'.format(a)).value["alert_type"]
                 ignore_alert_type.append(t)
 
+        with LogTailer(RAS_VAL["ras_sspl_alert"]["file"]["screen_log"],
+                       node_obj=self.node_obj) as tailer:
+            self._generate_alerts(event, tailer, ignore_alert, ignore_alert_type, monitor)
+
+    # pylint: disable=too-many-arguments
+    def _generate_alerts(self, event, tailer, ignore_alert, ignore_alert_type, monitor):
+        """Generate and resolve random alerts till event is set."""
         while not event.is_set():
             alert = random.choice(list(FaultAlerts))
             alert_dict = alert.value
@@ -102,6 +117,7 @@ class RandomAlerts:
                 ip_params["disk"] = resp[3]
 
             LOGGER.info("Generating alert %s", alert.name)
+            mark = tailer.line_count
             a_t = eval(f"AlertType.{alert.name}")
             resp = self.alert_api_obj.generate_alert(alert_type=a_t,
                                                      host_details=host_details,
@@ -114,7 +130,11 @@ class RandomAlerts:
             else:
                 LOGGER.info("Successfully generated alert %s", alert.name)
 
-            time.sleep(30)
+            # Resolve as soon as the alert shows up instead of always sleeping
+            if not tailer.wait_for_patterns([ALERT_LINE_MARKER], timeout=ALERT_WAIT_TIMEOUT,
+                                            since=mark)[0]:
+                LOGGER.warning("Alert %s not seen in %s seconds", alert.name,
+                               ALERT_WAIT_TIMEOUT)
 
             # Get enum name of the alert to be resolved
             if alert_dict.get('resolve') is not None:
@@ -535,6 +535,8 @@ K8S_HCTL_STATUS = "kubectl exec -it {} -c cortx-hax -- hctl status --json"
 K8S_WORKER_NODES = "kubectl get nodes -l node-role.kubernetes.io/worker=worker | awk '{print $1}'"
 K8S_MASTER_NODE = "kubectl get nodes -l node-role.kubernetes.io/master | awk '{print $1}'"
 K8S_GET_SVC_JSON = "kubectl get svc -o json"
+K8S_GET_TOPOLOGY_JSON = "kubectl get nodes,svc,pods -o json"
+K8S_POD_CAT_FILE_CMD = "kubectl exec {} -- cat {}"
 K8S_POD_INTERACTIVE_CMD = "kubectl exec -it {} -c cortx-hax -- {}"
 K8S_DATA_POD_SERVICE_STATUS = "consul kv get -recurse | grep s3 | grep name"
 K8S_CONSUL_UPDATE_CMD = 'kubectl exec -it {} -c {} -- {}'
@@ -585,6 +587,10 @@ KUBECTL_DESCRIBE_POD_CMD = "kubectl describe pod {}"
 KUBECTL_GET_STATEFULSET = "kubectl get sts | grep '{}'"
 KUBECTL_CREATE_STATEFULSET_REPLICA = "kubectl scale statefulset {} --replicas {}"
 KUBECTL_GET_POD_PORTS = "kubectl get pods {} -o jsonpath='{{.spec.containers[*].ports}}'"
+KUBECTL_LIST_RESOURCE = "kubectl get {} {} -o json"
+KUBECTL_WATCH_RESOURCE = "kubectl get {} {} --watch --output-watch-events -o json"
+TAIL_FOLLOW_CMD = "tail -n {} -F {}"
+SLICE_LOG_CMD = "set -o pipefail; python3 {} --format {} --start {} --end {} {} | gzip -c"
 
 # Fetch logs of a pod/service in a namespace.
 FETCH_LOGS = ""
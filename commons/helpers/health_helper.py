@@ -29,7 +29,9 @@ from commons import commands
 from commons import constants as const
 from commons.helpers.host import Host
 from commons.helpers.pods_helper import LogicalNode
+from commons.helpers.stream_helper import MAX_SSH_CHANNELS
 from commons.utils.assert_utils import assert_true
+from commons.utils.cluster_health_utils import query_pods_health
 from commons.utils.system_utils import check_ping
 from commons.utils.system_utils import run_remote_cmd
 from config import CMN_CFG
@@ -640,11 +642,37 @@ class Health(Host):
                 return False, node_health_failure
 
         elif CMN_CFG.get("product_family") == const.PROD_FAMILY_LC:
-            resp = self.is_motr_online()
-            if not resp:
-                return resp, "cluster health is not good"
+            resp = self.check_pods_hctl_status()
+            if not resp[0]:
+                return False, f"cluster health is not good: {resp[1].summary()}"
         return True, "cluster on {} up and running.".format(self.hostname)
 
+    def check_pods_hctl_status(self, pod_list: list = None, max_parallel: int = MAX_SSH_CHANNELS,
+                               deadline: float = None, timeout: float = 120) -> tuple:
+        """
+        Query hctl status --json on all data and server pods concurrently and merge the
+        outputs so that an unreachable pod or a single failed service is reported precisely.
+        All pods are queried over one SSH connection, one channel per pod.
+        :param pod_list: Pods to be queried, all data and server pods if not given.
+        :param max_parallel: Maximum concurrent kubectl exec calls, capped at MAX_SSH_CHANNELS.
+        :param deadline: Maximum seconds for the whole check.
+        :param timeout: Maximum seconds for a single pod.
+        :return: True if cluster is healthy, ClusterHealth object.
+        """
+        node = LogicalNode(hostname=self.hostname, username=self.username,
+                           password=self.password)
+        try:
+            if pod_list is None:
+                pod_list = node.get_all_pods(pod_prefix=const.POD_NAME_PREFIX) + \
+                    node.get_all_pods(pod_prefix=const.SERVER_POD_NAME_PREFIX)
+            health = query_pods_health(node, pod_list, max_parallel=max_parallel,
+                                       deadline=deadline, timeout=timeout)
+        finally:
+            node.disconnect()
+        if not health.healthy:
+            LOG.error("Cluster health check failed: %s", health.summary())
+        return health.healthy, health
+
     def reboot_node(self):
         """Reboot node
         """
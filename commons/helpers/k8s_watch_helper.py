@@ -0,0 +1,384 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""Watch based cache of kubernetes pod/deployment/node state.
+
+The cache keeps one long lived ``kubectl get <kind> --watch -o json`` stream per resource
+kind and applies every watch event to an in-memory copy of the objects. Every time the watch
+is (re)established the objects of the kind are replaced by a fresh listing first, so objects
+deleted while the watch was down do not linger. Callers block in
+``wait_until`` and are woken up by the event which satisfies their predicate instead of
+sleeping for a fixed interval and re-running ``kubectl`` over SSH.
+
+``shared_cache`` hands the HA, provisioning and DTM libraries one started cache per master
+node for the whole run; they fall back to their polling loops when it returns None because
+the watch stream is unavailable.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from typing import Callable
+from typing import Iterable
+
+from commons import commands
+from commons import constants as const
+from commons.helpers.stream_helper import local_stream
+from commons.helpers.stream_helper import ssh_stream
+
+LOGGER = logging.getLogger(__name__)
+
+WATCH_KINDS = ("pods", "deployments", "nodes")
+# Seconds a shared cache gets for its first listing before callers fall back to polling
+SHARED_SYNC_TIMEOUT = 30
+# (master hostname, kinds) -> started K8sStateCache, or None if its watch was unavailable
+_SHARED_CACHES = {}
+_SHARED_LOCK = threading.Lock()
+
+
+class JSONStreamDecoder:
+    """Incremental decoder for a stream of concatenated (pretty printed) JSON documents."""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+
+    def feed(self, data: str) -> list:
+        """
+        Feed a chunk of text and return all documents completed by it.
+        :param data: Chunk of the stream.
+        :return: list of decoded documents.
+        """
+        self._buffer += data
+        docs = []
+        while True:
+            text = self._buffer.lstrip()
+            if not text:
+                self._buffer = ""
+                break
+            try:
+                doc, end = self._decoder.raw_decode(text)
+            except json.JSONDecodeError:
+                self._buffer = text
+                break
+            docs.append(doc)
+            self._buffer = text[end:]
+        return docs
+
+
+class K8sStateCache:
+    """
+    Event driven cache of kubernetes objects.
+
+    Usage::
+
+        with K8sStateCache(node_obj=master_node) as cache:
+            cache.wait_until(K8sStateCache.pods_ready(const.POD_NAME_PREFIX), timeout=600)
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, node_obj=None, kinds: Iterable[str] = ("pods",),
+                 namespace: str = const.NAMESPACE,
+                 stream_factory: Callable[[str], Iterable[str]] = None,
+                 retry_delay: float = 2):
+        """
+        :param node_obj: Master node object, watch runs over its SSH transport. Local kubectl
+        is used when not given.
+        :param kinds: Resource kinds to be watched, subset of WATCH_KINDS.
+        :param namespace: Namespace of namespaced kinds.
+        :param stream_factory: Callable which takes a command and returns iterable of text
+        chunks; overrides the SSH/local runner.
+        :param retry_delay: Delay before re-establishing a watch which ended.
+        """
+        for kind in kinds:
+            if kind not in WATCH_KINDS:
+                raise ValueError(f"kind must be one of {WATCH_KINDS}")
+        self.kinds = tuple(kinds)
+        self.namespace = namespace
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        if stream_factory is None:
+            if node_obj is None:
+                def stream_factory(cmd):
+                    return local_stream(cmd, stop_event=self._stop)
+            else:
+                def stream_factory(cmd):
+                    return ssh_stream(node_obj, cmd, stop_event=self._stop)
+        self._stream_factory = stream_factory
+        self._objects = {kind: {} for kind in self.kinds}
+        self._synced = set()
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _cmd(self, kind: str, watch: bool = True) -> str:
+        """Return watch (or list) command for the kind."""
+        namespace = "" if kind == "nodes" else f"-n {self.namespace}"
+        cmd = commands.KUBECTL_WATCH_RESOURCE if watch else commands.KUBECTL_LIST_RESOURCE
+        return cmd.format(kind, namespace)
+
+    def start(self):
+        """Start watch threads, one per kind."""
+        self._stop.clear()
+        for kind in self.kinds:
+            thread = threading.Thread(target=self._watch, args=(kind,),
+                                      name=f"k8s-watch-{kind}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = 5):
+        """Stop the watch threads. Threads blocked in a custom stream are left as daemons."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _resync(self, kind: str):
+        """Replace cached objects of the kind with a fresh listing."""
+        with self._cond:
+            self._synced.discard(kind)
+        decoder = JSONStreamDecoder()
+        docs = []
+        for chunk in self._stream_factory(self._cmd(kind, watch=False)):
+            docs.extend(decoder.feed(chunk))
+        if not docs or "items" not in docs[-1]:
+            raise IOError(f"Listing of {kind} returned no items")
+        self._apply(kind, docs[-1])
+
+    def _watch(self, kind: str):
+        """List and then consume watch stream of a kind, re-establishing both till stopped."""
+        while not self._stop.is_set():
+            decoder = JSONStreamDecoder()
+            try:
+                self._resync(kind)
+                for chunk in self._stream_factory(self._cmd(kind)):
+                    for doc in decoder.feed(chunk):
+                        self._apply(kind, doc)
+                    if self._stop.is_set():
+                        return
+            except Exception as error:  # pylint: disable=broad-except
+                LOGGER.warning("Watch on %s broke: %s", kind, error)
+            if not self._stop.wait(self.retry_delay):
+                LOGGER.debug("Re-establishing watch on %s", kind)
+
+    def _apply(self, kind: str, doc: dict):
+        """Apply a listed document or a watch event to the cache."""
+        with self._cond:
+            objects = self._objects[kind]
+            if "items" in doc:
+                objects.clear()
+                for item in doc["items"]:
+                    objects[item["metadata"]["name"]] = item
+                self._synced.add(kind)
+            elif "object" in doc:
+                obj = doc["object"]
+                name = obj["metadata"]["name"]
+                if doc.get("type") == "DELETED":
+                    objects.pop(name, None)
+                else:
+                    objects[name] = obj
+            else:
+                objects[doc["metadata"]["name"]] = doc
+            self._generation += 1
+            self._cond.notify_all()
+
+    @property
+    def generation(self) -> int:
+        """Number of events applied so far."""
+        return self._generation
+
+    def synced(self, kind: str = "pods") -> bool:
+        """True once the listing of the kind made by the current watch has been applied."""
+        return kind in self._synced
+
+    def get(self, kind: str, name: str) -> dict:
+        """Return cached object or None."""
+        with self._cond:
+            return self._objects[kind].get(name)
+
+    def list(self, kind: str = "pods", prefix=None) -> list:
+        """Return cached objects of kind whose name starts with prefix (str or tuple)."""
+        with self._cond:
+            return [obj for name, obj in sorted(self._objects[kind].items())
+                    if prefix is None or name.startswith(prefix)]
+
+    def names(self, kind: str = "pods", prefix=None) -> list:
+        """Return cached object names of kind whose name starts with prefix."""
+        return [obj["metadata"]["name"] for obj in self.list(kind, prefix)]
+
+    def wait_until(self, predicate: Callable[["K8sStateCache"], bool],
+                   timeout: float = 600) -> bool:
+        """
+        Block till predicate holds on the cache. Predicate is evaluated immediately and then
+        once for every applied event.
+        :param predicate: Callable taking the cache and returning bool.
+        :param timeout: Maximum seconds to wait.
+        :return: True if predicate held before the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._evaluate(predicate):
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    return False
+                self._cond.wait(remaining)
+
+    def wait_for_change(self, since: int = None, timeout: float = 60) -> bool:
+        """
+        Block till an event newer than generation ``since`` is applied.
+        :param since: Generation to compare against, current generation if not given.
+        :param timeout: Maximum seconds to wait.
+        :return: True if a new event arrived.
+        """
+        since = self._generation if since is None else since
+        return self.wait_until(lambda cache: cache.generation > since, timeout)
+
+    def _evaluate(self, predicate) -> bool:
+        """Evaluate predicate treating errors on partial objects as not satisfied."""
+        try:
+            return bool(predicate(self))
+        except (KeyError, IndexError, TypeError) as error:
+            LOGGER.debug("Predicate raised %s", error)
+            return False
+
+    @staticmethod
+    def is_pod_ready(pod: dict) -> bool:
+        """Pod is running, not terminating and all its containers are ready."""
+        status = pod.get("status", {})
+        if pod["metadata"].get("deletionTimestamp") or status.get("phase") != "Running":
+            return False
+        containers = status.get("containerStatuses", [])
+        return bool(containers) and all(cnt.get("ready") for cnt in containers)
+
+    @staticmethod
+    def restart_count(pod: dict, container: str):
+        """Return restart count of the container in pod, None if not found."""
+        for cnt in pod.get("status", {}).get("containerStatuses", []):
+            if cnt["name"] == container:
+                return cnt.get("restartCount", 0)
+        return None
+
+    @staticmethod
+    def pods_ready(prefix=None, count: int = None) -> Callable:
+        """
+        Predicate: all pods with prefix are ready (and there are ``count`` of them if given).
+        """
+        def predicate(cache):
+            pods = cache.list("pods", prefix)
+            if not cache.synced("pods") or not pods:
+                return False
+            if count is not None and len(pods) != count:
+                return False
+            return all(K8sStateCache.is_pod_ready(pod) for pod in pods)
+        return predicate
+
+    @staticmethod
+    def pod_deleted(name: str) -> Callable:
+        """Predicate: pod is no more present."""
+        return lambda cache: cache.synced("pods") and cache.get("pods", name) is None
+
+    @staticmethod
+    def container_restarted(pod_name: str, container: str, restart_count: int) -> Callable:
+        """
+        Predicate: container restarted after restart_count and the pod is ready again. An
+        unknown pod/container or restart_count None never counts as restarted.
+        """
+        def predicate(cache):
+            pod = cache.get("pods", pod_name)
+            if pod is None or restart_count is None:
+                return False
+            current = K8sStateCache.restart_count(pod, container)
+            return current is not None and current > restart_count and \
+                K8sStateCache.is_pod_ready(pod)
+        return predicate
+
+    @staticmethod
+    def deployments_available(prefix: str = None) -> Callable:
+        """Predicate: all deployments with prefix have desired number of ready replicas."""
+        def predicate(cache):
+            deploys = cache.list("deployments", prefix)
+            return cache.synced("deployments") and bool(deploys) and all(
+                deploy.get("status", {}).get("readyReplicas", 0) ==
+                deploy.get("spec", {}).get("replicas", 1) for deploy in deploys)
+        return predicate
+
+    @staticmethod
+    def nodes_ready() -> Callable:
+        """Predicate: all nodes report Ready condition."""
+        def predicate(cache):
+            nodes = cache.list("nodes")
+            return cache.synced("nodes") and bool(nodes) and all(
+                any(cond["type"] == "Ready" and cond["status"] == "True"
+                    for cond in node.get("status", {}).get("conditions", []))
+                for node in nodes)
+        return predicate
+
+
+def shared_cache(node_obj, kinds: Iterable[str] = ("pods",),
+                 sync_timeout: float = SHARED_SYNC_TIMEOUT, **kwargs):
+    """
+    Started cache of the cluster of the master node, shared by every caller of the run. The
+    watch runs over its own connection to the master so it never competes with the
+    caller's use of node_obj, and it is stopped at exit.
+    :param node_obj: Master node object, no cache without it.
+    :param kinds: Resource kinds to be watched.
+    :param sync_timeout: Seconds to wait for the first listing.
+    :param kwargs: K8sStateCache arguments.
+    :return: Synced K8sStateCache, None if the watch stream is unavailable.
+    """
+    if node_obj is None:
+        return None
+    key = (node_obj.hostname, tuple(kinds))
+    with _SHARED_LOCK:
+        if key not in _SHARED_CACHES:
+            watch_node = type(node_obj)(node_obj.hostname, node_obj.username,
+                                        node_obj.password)
+            cache = K8sStateCache(watch_node, kinds, **kwargs).start()
+            if cache.wait_until(lambda cache: all(cache.synced(kind) for kind in kinds),
+                                timeout=sync_timeout):
+                _SHARED_CACHES[key] = cache
+            else:
+                LOGGER.warning("Watch of %s on %s unavailable, polling instead", kinds,
+                               node_obj.hostname)
+                cache.stop(timeout=0)
+                _SHARED_CACHES[key] = None
+        return _SHARED_CACHES[key]
+
+
+@atexit.register
+def stop_shared_caches():
+    """Stop the watches of the shared caches."""
+    with _SHARED_LOCK:
+        for cache in _SHARED_CACHES.values():
+            if cache is not None:
+                cache.stop(timeout=1)
+        _SHARED_CACHES.clear()
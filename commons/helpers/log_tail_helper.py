@@ -0,0 +1,172 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""Follow a local or remote log file and wait for a set of patterns to show up."""
+
+import collections
+import logging
+import threading
+import time
+from typing import Callable
+from typing import Iterable
+from typing import Tuple
+
+from commons import commands
+from commons.helpers.stream_helper import iter_lines
+from commons.helpers.stream_helper import local_stream
+from commons.helpers.stream_helper import ssh_stream
+from commons.utils.pattern_utils import MultiPatternMatcher
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LogTailer:
+    """
+    Follow a file with ``tail -F`` (survives rotation and truncation) over a persistent SSH
+    channel of node object, or locally, and buffer the lines in memory.
+
+    Usage::
+
+        with LogTailer("/root/screenlog.0", node_obj=node) as tailer:
+            mark = tailer.line_count
+            ...generate alert...
+            resp = tailer.wait_for_patterns(["enclosure", "fault"], timeout=120, since=mark)
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, path: str, node_obj=None, from_start: bool = False,
+                 stream_factory: Callable[[str], Iterable[str]] = None,
+                 max_lines: int = 200000):
+        """
+        :param path: File to follow.
+        :param node_obj: Host object, file is followed locally if not given.
+        :param from_start: Read existing content of the file first instead of new lines only.
+        :param stream_factory: Callable taking a command and returning iterable of text chunks;
+        overrides the SSH/local runner.
+        :param max_lines: Number of most recent lines kept in memory.
+        """
+        self.path = path
+        self.from_start = from_start
+        self._stop = threading.Event()
+        if stream_factory is None:
+            if node_obj is None:
+                def stream_factory(cmd):
+                    return local_stream(cmd, stop_event=self._stop)
+            else:
+                def stream_factory(cmd):
+                    return ssh_stream(node_obj, cmd, stop_event=self._stop)
+        self._stream_factory = stream_factory
+        self._lines = collections.deque(maxlen=max_lines)
+        self._count = 0
+        self._eof = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def command(self) -> str:
+        """tail command used to follow the file."""
+        return commands.TAIL_FOLLOW_CMD.format("+1" if self.from_start else "0", self.path)
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines read so far, usable as ``since`` marker."""
+        return self._count
+
+    def start(self):
+        """Start following the file in background."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._follow, name="log-tailer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5):
+        """Stop following the file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _follow(self):
+        """Read lines from the tail stream into the buffer."""
+        try:
+            for line in iter_lines(self._stream_factory(self.command)):
+                with self._cond:
+                    self._lines.append(line)
+                    self._count += 1
+                    self._cond.notify_all()
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning("Following %s failed: %s", self.path, error)
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def _lines_since(self, cursor: int) -> Tuple[int, list, bool]:
+        """Return new cursor, lines after cursor and eof flag. Caller holds the lock."""
+        base = self._count - len(self._lines)
+        if cursor < base:
+            LOGGER.warning("%s lines of %s dropped from buffer before matching",
+                           base - cursor, self.path)
+            cursor = base
+        lines = [self._lines[idx - base] for idx in range(cursor, self._count)]
+        return self._count, lines, self._eof
+
+    # pylint: disable=too-many-arguments
+    def wait_for_patterns(self, patterns: list, timeout: float, since: int = 0,
+                          line_filter: str = None, ignore_case: bool = False) -> tuple:
+        """
+        Match incoming lines against all patterns simultaneously till every pattern is seen.
+        :param patterns: Literal strings expected in the file.
+        :param timeout: Maximum seconds to wait.
+        :param since: Only lines after this line_count marker are matched.
+        :param line_filter: Only lines containing this string are matched.
+        :param ignore_case: Case insensitive matching.
+        :return: (True, {pattern: first matching line}) or (False, [missing patterns])
+        """
+        matcher = MultiPatternMatcher(patterns, ignore_case=ignore_case)
+        missing = list(range(len(matcher.patterns)))
+        found = {}
+        deadline = time.monotonic() + timeout
+        cursor = since
+        while True:
+            with self._cond:
+                cursor, lines, eof = self._lines_since(cursor)
+                if not lines and not eof:
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        self._cond.wait(remaining)
+                        cursor, lines, eof = self._lines_since(cursor)
+            for line in lines:
+                if line_filter is not None and line_filter not in line:
+                    continue
+                for idx in matcher.match_line(line, missing):
+                    found[matcher.patterns[idx]] = line
+                    missing.remove(idx)
+                if not missing:
+                    LOGGER.info("All %s patterns found in %s", len(found), self.path)
+                    return True, found
+            if eof or time.monotonic() >= deadline:
+                not_found = [matcher.patterns[idx] for idx in missing]
+                LOGGER.info("Patterns not found in %s: %s", self.path, not_found)
+                return False, not_found
@@ -19,13 +19,22 @@
 
 """ This helper file is used to collect logs from Nodes for the given time stamps """
 
+import gzip
+import os
+import shlex
+import shutil
 from datetime import datetime
+from commons import commands
 from commons.helpers import host
+from commons.helpers import stream_helper
 from commons.utils import config_utils
+from commons.utils import log_slice_utils
 
 fileconf_yaml = config_utils.read_yaml("config/serverlogs_helper.yaml")
 fileconf = fileconf_yaml[1]
 
+SLICER_REMOTE_DIR = "/tmp"
+
 now = datetime.now()
 current_time = now.strftime('%b  %#d %H:%M:%S')
 
@@ -42,112 +51,96 @@ def get_node_details(node_name):
     node_obj.passwd = fileconf['node_password']
     return node_obj
 
-def split_file_for_timestamp(st_time, end_time, filename, filepath, test_id):
+def split_file_for_timestamp(st_time, end_time, filename, filepath, test_id, fmt="syslog"):
     # split file for give time stamps and create new file with test_id
-    # appended to it
+    # appended to it. Window is located by binary search on the mmapped file,
+    # only the lines in the window are read.
     path = "{}/{}".format(filepath, filename)
-    logfile = open(path, 'r')
-
     newname = "{}_{}".format(test_id, filename)
     newpath = "{}/{}".format(fileconf['log_destination'], newname)
-    newfile = open(newpath, 'w')
-
-    # timestamp format ('%b %#d %H:%M:%S') -> "Dec 12 16:06:01"
-    st_t = st_time.split()
-    en_t = end_time.split()
-    start_time = "{} {} {}".format(st_t[0], st_t[1], st_t[2])
-    end_time = "{} {} {}".format(en_t[0], en_t[1], en_t[2])
-
-    for line in logfile:
-        ls = line.split(' ')
-        # PLEASE CHECK TIMESTAMP IN LOG FILES FIRST, For every file it might be
-        # different
-        timestamp = "{} {} {}".format(ls[0], ls[1], ls[2])
-        if timestamp >= start_time and timestamp <= end_time:
-            newfile.write(line)
-
-    newfile.close()  # close it if done writing into it
-    logfile.close()
+    log_slice_utils.slice_file(path, st_time, end_time, newpath, fmt=fmt)
 
     return newpath
 
+def install_slicer(hostobj):
+    # Copy the standard library only slicer module to the node, returns its path
+    script = "{}/{}".format(SLICER_REMOTE_DIR, os.path.basename(log_slice_utils.__file__))
+    hostobj.copy_file_to_remote(log_slice_utils.__file__, script)
+    return script
+
+def slice_remote_log(hostobj, nodepath, st_time, end_time, local_path, fmt="syslog",
+                     script=None):
+    # Slice the window on the node itself and stream it gzip compressed to
+    # local_path, the channel is read while the slicer runs so windows of any
+    # size go through. pipefail makes a failing slicer raise IOError instead
+    # of reporting the exit status of gzip. Returns local_path
+    if script is None:
+        script = install_slicer(hostobj)
+    cmd = commands.SLICE_LOG_CMD.format(
+        script, fmt, shlex.quote(str(st_time)), shlex.quote(str(end_time)),
+        shlex.quote(nodepath))
+    gz_path = "{}.gz".format(local_path)
+    stream_helper.ssh_stream_to_file(hostobj, cmd, gz_path)
+    try:
+        with gzip.open(gz_path, "rb") as window, open(local_path, "wb") as newfile:
+            shutil.copyfileobj(window, newfile)
+    finally:
+        os.remove(gz_path)
+    return local_path
+
 def process_and_copy_file(
         st_time,
         end_time,
         file_name,
         file_path,
-        localpath,
         test_id,
-        sftp):
-    # Copy file from node to test client
+        hostobj,
+        loghostobj,
+        fmt="syslog",
+        script=None):
+    # 1. Fetch only the given time window of the file from node
     nodepath = "{}/{}".format(file_path, file_name)
-    dest_path = "{}/{}".format(fileconf['log_destination'], file_name)
-    # @TODO - check sftp.get(), this call might be wrong
-    sftp.get(remotepath=nodepath, localpath=dest_path)
-
-    # 1. Fetch give file from node and Split file for given time stamp
-    newfilepath = split_file_for_timestamp(
-        st_time,
-        end_time,
-        file_name,
-        fileconf['log_destination'],
-        test_id)
-
-    # 2. Copy file from node to remote server <<< @TODO need new connection
-    # here !! MISSING !!!
-    logserver = fileconf['logserver']
-    lg_uname = fileconf['logserver_username']
-    lg_passwd = fileconf['logserver_password']
-    remote_path = fileconf['logserver_path']
     filename = "{}_{}".format(test_id, file_name)
-    rm_path = "{}/{}".format(remote_path, filename)
+    newfilepath = "{}/{}".format(fileconf['log_destination'], filename)
+    slice_remote_log(hostobj, nodepath, st_time, end_time, newfilepath, fmt, script)
 
-    hostobj = host.Host(
-        hostname=logserver,
-        username=lg_uname,
-        password=lg_passwd)
-    hostobj.connect()
-    sftp = hostobj.host_obj.open_sftp()
-    sftp.put(localpath=newfilepath, remotepath=rm_path)
+    # 2. Copy file to log server
+    rm_path = "{}/{}".format(fileconf['logserver_path'], filename)
+    loghostobj.copy_file_to_remote(newfilepath, rm_path)
+    return newfilepath
 
 def collect_logs(st_time, end_time, file, node, test_id):
     # error = False #@ TODO - error handling to be done, connection retry
-    # 1. Connect to node
+    # 1. Connect to node and log server once for all files
     node_det = get_node_details(node)
     hostobj = host.Host(
         hostname=node_det.ip,
         username=node_det.uname,
         password=node_det.passwd)
-    hostobj.connect()
-    sftp = hostobj.host_obj.open_sftp()
-    localpath = "{}_{}".format(fileconf['log_destination'], test_id)
-
-    if file is "all":
-        for fname in fileconf['file_list']:
-            file_name = "{}{}".format(file, fileconf['file_exention'])
-            file_path = fileconf['file_path_dict'][fname]
-            process_and_copy_file(
-                st_time,
-                end_time,
-                file_name,
-                file_path,
-                localpath,
-                test_id,
-                sftp)
-    else:
-        file_name = "{}{}".format(file, fileconf['file_exention'])
-        file_path = fileconf['file_path_dict'][file]
+    loghostobj = host.Host(
+        hostname=fileconf['logserver'],
+        username=fileconf['logserver_username'],
+        password=fileconf['logserver_password'])
+    script = install_slicer(hostobj)
+
+    files = fileconf['file_list'] if file == "all" else [file]
+    for fname in files:
+        file_name = "{}{}".format(fname, fileconf['file_exention'])
+        file_path = fileconf['file_path_dict'][fname]
         process_and_copy_file(
             st_time,
             end_time,
             file_name,
             file_path,
-            localpath,
             test_id,
-            sftp)
+            hostobj,
+            loghostobj,
+            fmt=fileconf['file_format_dict'].get(fname, "syslog"),
+            script=script)
 
-    # Close connection once all file transfers are done
-    sftp.close
+    # Close connections once all file transfers are done
+    hostobj.disconnect()
+    loghostobj.disconnect()
 
     # @TODO Error handling
 
@@ -159,10 +152,10 @@ def collect_logs_fromserver(
         node='all'):
     # Collect logs for all nodes
 
-    if node is 'all':
+    if node == 'all':
         for node_name in fileconf['node_list']:
             response = collect_logs(
-                st_time, end_time, file_type, node, test_suffix)
+                st_time, end_time, file_type, node_name, test_suffix)
     # collect from one node only
     else:
         response = collect_logs(
@@ -0,0 +1,215 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""Stream stdout of long running commands (watch, tail -F) locally or over SSH."""
+
+import codecs
+import logging
+import os
+import select
+import socket
+import subprocess
+import threading
+from typing import Iterator
+
+LOGGER = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+# sshd MaxSessions (channels per connection) and MaxStartups default to 10.
+MAX_SSH_CHANNELS = 8
+
+
+def local_stream(cmd: str, chunk_size: int = 65536,
+                 stop_event: threading.Event = None) -> Iterator[str]:
+    """
+    Run command on the local host and yield its stdout in chunks.
+    :param cmd: Command to be executed.
+    :param chunk_size: Maximum number of bytes to read at a time.
+    :param stop_event: Stream ends and the command is killed once the event is set.
+    :return: Iterator of decoded stdout chunks.
+    """
+    # nosec: command is built from commands module templates.
+    proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE,  # nosec
+                            stderr=subprocess.DEVNULL)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        while stop_event is None or not stop_event.is_set():
+            if stop_event is not None:
+                ready, _, _ = select.select([proc.stdout], [], [], POLL_INTERVAL)
+                if not ready:
+                    continue
+            data = os.read(proc.stdout.fileno(), chunk_size)
+            if not data:
+                break
+            yield decoder.decode(data)
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def ensure_connected(node_obj):
+    """Connect node object unless its SSH transport is already active."""
+    if node_obj.host_obj is None or node_obj.host_obj.get_transport() is None or \
+            not node_obj.host_obj.get_transport().is_active():
+        node_obj.connect()
+
+
+def _open_channel(node_obj):
+    """New channel on the established SSH transport of node object, connecting if needed."""
+    ensure_connected(node_obj)
+    return node_obj.host_obj.get_transport().open_session()
+
+
+def ssh_stream(node_obj, cmd: str, chunk_size: int = 65536,
+               stop_event: threading.Event = None) -> Iterator[str]:
+    """
+    Run command over the already established SSH transport of node object and yield stdout.
+    A new channel is opened on the existing paramiko transport so no new SSH session or
+    handshake is needed for the stream.
+    :param node_obj: Host/LogicalNode object.
+    :param cmd: Command to be executed.
+    :param chunk_size: Maximum number of bytes to read at a time.
+    :param stop_event: Stream ends and the channel is closed once the event is set.
+    :return: Iterator of decoded stdout chunks.
+    """
+    channel = _open_channel(node_obj)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    if stop_event is not None:
+        channel.settimeout(POLL_INTERVAL)
+    try:
+        channel.exec_command(cmd)  # nosec
+        while stop_event is None or not stop_event.is_set():
+            try:
+                data = channel.recv(chunk_size)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            yield decoder.decode(data)
+    finally:
+        channel.close()
+
+
+def ssh_exec(node_obj, cmd: str, chunk_size: int = 65536, timeout: float = None) -> tuple:
+    """
+    Run command on a new channel of the SSH transport of node object and read stdout while
+    it runs, so large outputs do not fill the channel window. Channels of one transport can
+    be used from several threads, keep at most MAX_SSH_CHANNELS of them open at a time.
+    :param node_obj: Host/LogicalNode object.
+    :param cmd: Command to be executed.
+    :param chunk_size: Maximum number of bytes to read at a time.
+    :param timeout: Seconds without output after which socket.timeout is raised.
+    :return: exit status, stdout bytes, stderr bytes.
+    """
+    channel = _open_channel(node_obj)
+    channel.settimeout(timeout)
+    out = []
+    try:
+        channel.exec_command(cmd)  # nosec
+        while True:
+            data = channel.recv(chunk_size)
+            if not data:
+                break
+            out.append(data)
+        err = []
+        while True:
+            data = channel.recv_stderr(chunk_size)
+            if not data:
+                break
+            err.append(data)
+        return channel.recv_exit_status(), b"".join(out), b"".join(err)
+    finally:
+        channel.close()
+
+
+def ssh_stream_to_file(node_obj, cmd: str, local_path: str, chunk_size: int = 65536) -> int:
+    """
+    Run command over the SSH transport of node object and write its stdout to a local file,
+    e.g. cat of a file inside a pod, without a copy on the remote host.
+    The file is written next to local_path and renamed once the command succeeded.
+    :param node_obj: Host/LogicalNode object.
+    :param cmd: Command to be executed.
+    :param local_path: Local file path.
+    :param chunk_size: Maximum number of bytes to read at a time.
+    :return: Number of bytes written.
+    :raises IOError: When the command exits with non zero status.
+    """
+    channel = _open_channel(node_obj)
+    tmp_path = f"{local_path}.part"
+    size = 0
+    try:
+        channel.exec_command(cmd)  # nosec
+        with open(tmp_path, "wb") as local_file:
+            while True:
+                data = channel.recv(chunk_size)
+                if not data:
+                    break
+                local_file.write(data)
+                size += len(data)
+        status = channel.recv_exit_status()
+        if status != 0:
+            raise IOError(f"{cmd} on {node_obj.hostname} exited with {status}")
+        os.replace(tmp_path, local_path)
+    finally:
+        channel.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return size
+
+
+def ssh_run_logged(node_obj, cmd: str, log_path: str, chunk_size: int = 65536) -> int:
+    """
+    Run a long running command over the SSH transport of node object and append its stdout
+    and stderr to a local log file while it runs, so the remote process never blocks on a
+    full channel window.
+    :param node_obj: Host/LogicalNode object.
+    :param cmd: Command to be executed.
+    :param log_path: Local log file, appended to.
+    :param chunk_size: Maximum number of bytes to read at a time.
+    :return: Exit status of the command.
+    """
+    channel = _open_channel(node_obj)
+    try:
+        channel.set_combine_stderr(True)
+        channel.exec_command(cmd)  # nosec
+        with open(log_path, "ab") as log_file:
+            while True:
+                data = channel.recv(chunk_size)
+                if not data:
+                    break
+                log_file.write(data)
+                log_file.flush()
+        return channel.recv_exit_status()
+    finally:
+        channel.close()
+
+
+def iter_lines(chunks) -> Iterator[str]:
+    """
+    Split a stream of text chunks into lines without the line terminator.
+    A trailing partial line is yielded when the stream ends.
+    """
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    if pending:
+        yield pending
@@ -19,42 +19,96 @@
 #
 """
 Performing the encryption and decryption
+
+Encrypted values are either legacy AES-CBC (base64 of iv and ciphertext, no integrity check)
+or "v2:" AES-GCM (base64 of nonce, ciphertext and tag) which detects tampering. Both keys are
+derived from the KEY secret once per process and decrypted values are memoized, so loading
+many configs with repeated passwords costs one AES operation per distinct value.
+
+Re-encrypt config yamls to v2, or rotate to the key in NEW_KEY environment variable:
+    python -m commons.pswdmanager reencrypt config/*.yaml config/*/*.yaml [--rotate]
 """
-import os
-import json
+import argparse
 import base64
+import glob
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+import yaml
 from Crypto.Cipher import AES
 from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
 from Crypto import Random as CryptoRandom
 
+V2_PREFIX = "v2:"
+GCM_NONCE_SIZE = 12
+GCM_TAG_SIZE = 16
+DECRYPT_KEYS = [
+    "password",
+    'new_password',
+    'current_password',
+    'list_of_passwords',
+    'list_special_invalid_char',
+    'special_char_pwd',
+    'list_special_char_pwd',
+    'invalid_password',
+    'user_password', 'account_password',
+    'root_pwd', 'new_pwd',
+    'test_s3account_password',
+    'test_csmuser_password',
+    's3_acc_passwd',
+    'passwd'
+]
+
 
-def encrypt(secret: str) -> str:
+@lru_cache(maxsize=None)
+def derive_keys(key: str) -> tuple:
     """
-    Encrypt a secret word using AES-CBC mode encryption
+    AES keys of a KEY secret, derived once per process
+    :return: legacy CBC key (SHA256 of KEY), v2 GCM key (HKDF-SHA256 of KEY)
     """
-    key = get_secrets(secret_ids=['KEY'])['KEY']
     key = key.encode("utf8")
-    digest_key = SHA256.new(key).digest()
+    return SHA256.new(key).digest(), HKDF(key, 32, b"", SHA256, context=b"cortx-test-v2")
+
+
+def encrypt(secret: str, key: str = None, version: int = 2) -> str:
+    """
+    Encrypt a secret word using AES-GCM ("v2:" prefix) or legacy AES-CBC mode encryption
+    :param secret: Secret to encrypt
+    :param key: KEY secret, from environment or secrets.json if None
+    :param version: 2 for AES-GCM, 1 for legacy AES-CBC
+    """
+    cbc_key, gcm_key = derive_keys(key or get_secrets(secret_ids=['KEY'])['KEY'])
     secret = secret.encode("utf8")
+    if version == 2:
+        nonce = CryptoRandom.new().read(GCM_NONCE_SIZE)
+        aes = AES.new(gcm_key, AES.MODE_GCM, nonce=nonce)
+        data, tag = aes.encrypt_and_digest(secret)
+        return V2_PREFIX + base64.b64encode(nonce + data + tag).decode()
     init_vec = CryptoRandom.new().read(AES.block_size)
-    aes = AES.new(digest_key, AES.MODE_CBC, init_vec)
+    aes = AES.new(cbc_key, AES.MODE_CBC, init_vec)
     padding = AES.block_size - len(secret) % AES.block_size
     secret += bytes([padding]) * padding
     data = init_vec + aes.encrypt(secret)
     return base64.b64encode(data).decode()
 
 
-def decrypt(enc_secret: str) -> str:
-    """
-    Decrypt encrypted word using AES-CBC mode decryption
-    """
-    key = get_secrets(secret_ids=['KEY'])['KEY']
-    key = key.encode("utf8")
-    digest_key = SHA256.new(key).digest()
-    enc_secret = enc_secret.encode("utf8")
-    enc_secret = base64.b64decode(enc_secret)
+@lru_cache(maxsize=4096)
+def _decrypt(key: str, enc_secret: str) -> str:
+    """Decrypt with KEY secret, memoized per key and encrypted value."""
+    cbc_key, gcm_key = derive_keys(key)
+    if enc_secret.startswith(V2_PREFIX):
+        data = base64.b64decode(enc_secret[len(V2_PREFIX):].encode("utf8"))
+        aes = AES.new(gcm_key, AES.MODE_GCM, nonce=data[:GCM_NONCE_SIZE])
+        # raises ValueError if value was tampered with or encrypted with another key
+        return aes.decrypt_and_verify(data[GCM_NONCE_SIZE:-GCM_TAG_SIZE],
+                                      data[-GCM_TAG_SIZE:]).decode()
+    enc_secret = base64.b64decode(enc_secret.encode("utf8"))
     init_vec = enc_secret[:AES.block_size]
-    aes = AES.new(digest_key, AES.MODE_CBC, init_vec)
+    aes = AES.new(cbc_key, AES.MODE_CBC, init_vec)
     data = aes.decrypt(enc_secret[AES.block_size:])
     padding = data[-1]
     if data[-padding:] != bytes([padding]) * padding:
@@ -62,33 +116,26 @@ def decrypt(enc_secret: str) -> str:
     return data[:-padding].decode()
 
 
+def decrypt(enc_secret: str, key: str = None) -> str:
+    """
+    Decrypt encrypted word, "v2:" AES-GCM or legacy AES-CBC mode
+    :param enc_secret: Encrypted value
+    :param key: KEY secret, from environment or secrets.json if None
+    """
+    return _decrypt(key or get_secrets(secret_ids=['KEY'])['KEY'], enc_secret)
+
+
 def decrypt_all_passwd(data: dict) -> dict:
     """Decrypt all the values with the key "password"
 
     :param data: dictionary of configuration which contains encrypted passwords
     :return [type]: return the decrypted passwords
     """
-    decrypt_list = [
-        "password",
-        'new_password',
-        'current_password',
-        'list_of_passwords',
-        'list_special_invalid_char',
-        'special_char_pwd',
-        'list_special_char_pwd',
-        'invalid_password',
-        'user_password', 'account_password',
-        'root_pwd', 'new_pwd',
-        'test_s3account_password',
-        'test_csmuser_password',
-        's3_acc_passwd',
-        'passwd'
-    ]
     for key, value in data.items():
         if isinstance(value, dict):
             decrypt_all_passwd(value)
         else:
-            if key.lower() in decrypt_list:
+            if key.lower() in DECRYPT_KEYS:
                 if isinstance(value, list):
                     new_val = []
                     for element in value:
@@ -101,6 +148,42 @@ def decrypt_all_passwd(data: dict) -> dict:
                 return data
 
 
+def encrypted_values(data: dict) -> set:
+    """Encrypted values of a configuration, as decrypted by decrypt_all_passwd."""
+    values = set()
+    for key, value in data.items():
+        if isinstance(value, dict):
+            values.update(encrypted_values(value))
+        elif isinstance(key, str) and key.lower() in DECRYPT_KEYS:
+            values.update(value if isinstance(value, list) else [value])
+    return {value for value in values if isinstance(value, str) and value}
+
+
+def reencrypt_file(fpath: str, new_key: str = None, dry_run: bool = False) -> int:
+    """
+    Re-encrypt the passwords of a config yaml as v2, with new_key if given.
+    Values are replaced in the file text, so comments and formatting are kept.
+    :param fpath: configuration file path
+    :param new_key: KEY secret to encrypt with, current KEY if None
+    :param dry_run: Only count the values which would be re-encrypted
+    :return: number of re-encrypted values
+    """
+    with open(fpath) as fin:
+        text = fin.read()
+    data = yaml.safe_load(text)
+    values = encrypted_values(data) if isinstance(data, dict) else set()
+    if not new_key:
+        values = {value for value in values if not value.startswith(V2_PREFIX)}
+    for value in values:
+        new_value = encrypt(decrypt(value), key=new_key)
+        text = re.sub(rf"(?<![A-Za-z0-9+/=:]){re.escape(value)}(?![A-Za-z0-9+/=])",
+                      lambda _, new=new_value: new, text)
+    if values and not dry_run:
+        with open(fpath, "w") as fout:
+            fout.write(text)
+    return len(values)
+
+
 def get_secrets(fpath="secrets.json", secret_ids=None) -> dict:
     """Fetch the secrets from environment or database
 
@@ -111,13 +194,53 @@ def get_secrets(fpath="secrets.json", secret_ids=None) -> dict:
     if secret_ids is None:
         secret_ids = ['KEY', 'DB_USER', 'DB_PASSWORD']
     secrets = {}
+    data = None
     for secret_id in secret_ids:
         secret_id = secret_id.upper()
         try:
             secrets[secret_id] = (os.environ[secret_id])
         except KeyError:
-            with open(fpath) as file_obj:
-                data = json.load(file_obj)
-                secrets[secret_id] = data[secret_id]
-                os.environ[secret_id] = data[secret_id]
+            if data is None:
+                with open(fpath) as file_obj:
+                    data = json.load(file_obj)
+            secrets[secret_id] = data[secret_id]
+            os.environ[secret_id] = data[secret_id]
     return secrets
+
+
+def main(argv=None) -> int:
+    """Command line to encrypt a secret and re-encrypt config yamls."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    enc = sub.add_parser("encrypt", help="print v2 encrypted value of secret read from stdin")
+    enc.add_argument("--legacy", action="store_true", help="AES-CBC instead of v2")
+    reenc = sub.add_parser("reencrypt", help="re-encrypt passwords of config yamls as v2")
+    reenc.add_argument("paths", nargs="+", help="yaml files or glob patterns")
+    reenc.add_argument("--rotate", action="store_true",
+                       help="encrypt with key in NEW_KEY environment variable")
+    reenc.add_argument("--dry_run", action="store_true", help="only report counts")
+    args = parser.parse_args(argv)
+    if args.command == "encrypt":
+        print(encrypt(sys.stdin.readline().rstrip("\n"), version=1 if args.legacy else 2))
+        return 0
+    new_key = None
+    if args.rotate:
+        new_key = os.environ.get("NEW_KEY")
+        if not new_key:
+            parser.error("--rotate needs NEW_KEY environment variable")
+    paths = sorted({path for pattern in args.paths for path in glob.glob(pattern)})
+    total = 0
+    for path in paths:
+        count = reencrypt_file(path, new_key=new_key, dry_run=args.dry_run)
+        if count:
+            print(f"{path}: {count} values re-encrypted")
+        total += count
+    print(f"{total} values in {len(paths)} files")
+    if args.rotate and not args.dry_run:
+        print("Update KEY in secrets.json/environment to the new key")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Common benchmark result model.
+
+s3bench (text report), s3loadgen (json report), hsbench (parse_hsbench_output records),
+locust (json summary of scripts/locust/locust_utils) and perf DB documents are converted to
+BenchResult, one per tool, operation and workload, so that runs of different tools and
+builds can be stored and compared the same way. Throughput is in MB/s and latencies in ms.
+"""
+
+import json
+import logging
+import re
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+
+LOGGER = logging.getLogger(__name__)
+
+OPERATION_ALIASES = {"put": "Write", "write": "Write", "get": "Read", "read": "Read",
+                     "delete": "Delete", "del": "Delete", "head": "Head", "list": "List",
+                     "binit": "BucketInit", "bdel": "BucketDelete"}
+S3BENCH_PERCENTILES = {"Min": "min", "25th %ile": "p25", "50th %ile": "p50",
+                       "75th %ile": "p75", "90th %ile": "p90", "99th %ile": "p99",
+                       "99.9th %ile": "p99.9", "Max": "max"}
+
+
+def operation_name(operation: str) -> str:
+    """Common operation name, Write/Read/Delete/..."""
+    return OPERATION_ALIASES.get(str(operation).lower(), str(operation).capitalize())
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class BenchResult:
+    """Result of one operation of a benchmark run."""
+
+    tool: str
+    operation: str
+    object_size: str = None
+    workload: dict = field(default_factory=dict)
+    build: str = None
+    run_id: str = None
+    throughput: float = None
+    iops: float = None
+    latency: dict = field(default_factory=dict)
+    ttfb: dict = field(default_factory=dict)
+    requests: int = None
+    errors: int = 0
+    duration: float = None
+
+    def key(self) -> tuple:
+        """Identity of the workload, results with equal keys are comparable."""
+        return (self.tool, self.operation, self.object_size,
+                tuple(sorted((name, str(value)) for name, value in self.workload.items())))
+
+    def key_str(self) -> str:
+        """Readable workload identity."""
+        params = " ".join(f"{name}={value}" for name, value in self.key()[3])
+        return " ".join(str(part) for part in (self.tool, self.operation, self.object_size,
+                                               params) if part)
+
+    def metric(self, name: str):
+        """Metric value: throughput, iops, errors or latency/ttfb percentile e.g. latency.p99."""
+        if "." in name:
+            group, stat = name.split(".", 1)
+            return getattr(self, group).get(stat)
+        return getattr(self, name)
+
+    def to_dict(self) -> dict:
+        """Serializable form."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BenchResult":
+        """Restore from to_dict output."""
+        return cls(**data)
+
+
+def _float(text: str) -> float:
+    return float(re.search(r"-?\d+(?:\.\d+)?", text).group())
+
+
+def from_s3bench_text(text: str, object_size: str = None, build: str = None,
+                      run_id: str = None) -> list:
+    """
+    Results of a s3bench/s3loadgen text report (log file content)
+    :param text: Report text
+    :param object_size: Object size of the workload e.g. 4Kb, objectSize parameter if None
+    :param build: Build number
+    :param run_id: Run identifier e.g. log file name
+    :return: BenchResult per operation
+    """
+    params = {}
+    for name, value in re.findall(r"^(numClients|numSamples|objectSize|bucket):\s*(.+)$",
+                                  text, re.MULTILINE):
+        params[name] = value.strip()
+    workload = {"clients": int(params.get("numClients", 0)),
+                "samples": int(params.get("numSamples", 0))}
+    results = []
+    sections = re.split(r"Results Summary for (\w+) Operation\(s\)", text)
+    for operation, section in zip(sections[1::2], sections[2::2]):
+        values = dict(re.findall(r"^([\w /%.]+?):\s+(.+)$", section, re.MULTILINE))
+        duration = _float(values["Total Duration"])
+        latency = {}
+        for label, stat in S3BENCH_PERCENTILES.items():
+            value = values.get(f"{operation} times {label}")
+            if value is not None:
+                latency[stat] = _float(value) * 1000
+        requests = workload["samples"] or None
+        if "Operations/s" in values:
+            iops = _float(values["Operations/s"])
+        else:
+            iops = requests / duration if requests and duration else None
+        results.append(BenchResult(
+            tool="s3bench", operation=operation_name(operation),
+            object_size=object_size or params.get("objectSize"), workload=dict(workload),
+            build=build, run_id=run_id, throughput=_float(values["Total Throughput"]),
+            iops=iops, latency=latency, requests=requests,
+            errors=int(_float(values.get("Number of Errors", "0"))), duration=duration))
+    return results
+
+
+def from_s3loadgen_report(report: dict, object_size: str = None, build: str = None,
+                          run_id: str = None) -> list:
+    """
+    Results of the s3loadgen json report written next to its log
+    :return: BenchResult per operation
+    """
+    params = report.get("Parameters", {})
+    workload = {"clients": params.get("numClients"), "samples": params.get("numSamples")}
+    if params.get("rate"):
+        workload["rate"] = params["rate"]
+    results = []
+    for test in report.get("Tests", []):
+        latency = {stat: value for stat, value in test.get("Latency (ms)", {}).items()
+                   if stat != "count"}
+        if "mean" in latency:
+            latency["avg"] = latency.pop("mean")
+        results.append(BenchResult(
+            tool="s3loadgen", operation=operation_name(test["Operation"]),
+            object_size=object_size or params.get("objectSize"), workload=dict(workload),
+            build=build, run_id=run_id, throughput=test["Total Throughput (MB/s)"],
+            iops=test["Ops/s"], latency=latency, requests=test["Total Requests Count"],
+            errors=test["Errors Count"], duration=test["Total Duration (s)"]))
+    return results
+
+
+# pylint: disable=too-many-arguments
+def from_hsbench(records: list, object_size: str = None, buckets: int = None,
+                 sessions: int = None, build: str = None, run_id: str = None) -> list:
+    """
+    Results of hsbench TOTAL records as returned by hsbench.parse_hsbench_output
+    :return: BenchResult per mode
+    """
+    workload = {"buckets": buckets, "sessions": sessions}
+    return [BenchResult(
+        tool="hsbench", operation=operation_name(record["Mode"]), object_size=object_size,
+        workload=dict(workload), build=build, run_id=run_id, throughput=record["Mbps"],
+        iops=record["Iops"], latency={"min": record["MinLat"], "avg": record["AvgLat"],
+                                      "max": record["MaxLat"]},
+        requests=record["Ops"], duration=record["Seconds"]) for record in records]
+
+
+def from_locust_summary(summary: dict, object_size: str = None, users: int = None,
+                        build: str = None, run_id: str = None) -> list:
+    """
+    Results of the locust json summary, ttfb of the download_object:ttfb phase is merged
+    into the download_object result.
+    :return: BenchResult per request name
+    """
+    entries = {entry["name"]: entry for entry in summary["requests"] + summary.get("phases", [])}
+    results = []
+    for name, entry in entries.items():
+        if ":" in name:
+            continue
+        latency = {"min": entry["min_response_time"], "avg": entry["avg_response_time"],
+                   "max": entry["max_response_time"]}
+        latency.update({stat.replace("response_time_", ""): value
+                        for stat, value in entry.items() if stat.startswith("response_time_p")})
+        ttfb = entries.get(f"{name}:ttfb", {})
+        results.append(BenchResult(
+            tool="locust", operation=name, object_size=object_size, workload={"users": users},
+            build=build, run_id=run_id, throughput=entry["mb_per_sec"],
+            iops=entry["total_rps"], latency=latency,
+            ttfb={stat.replace("response_time_", ""): value for stat, value in ttfb.items()
+                  if stat.startswith("response_time_p")},
+            requests=entry["num_requests"], errors=entry["num_failures"]))
+    return results
+
+
+def from_perf_db(doc: dict) -> BenchResult:
+    """Result of a perf DB document, Latency/TTFB averages are stored in seconds."""
+    latency = doc.get("Latency") or {}
+    ttfb = doc.get("TTFB") or {}
+    return BenchResult(
+        tool=str(doc.get("Name", "")).lower(), operation=operation_name(doc["Operation"]),
+        object_size=doc.get("Object_Size"),
+        workload={"buckets": doc.get("Buckets"), "sessions": doc.get("Sessions")},
+        build=str(doc.get("Build")), run_id=str(doc.get("_id", "")) or None,
+        throughput=doc.get("Throughput"), iops=doc.get("IOPS"),
+        latency={stat.lower(): value * 1000 for stat, value in latency.items()
+                 if isinstance(value, (int, float))},
+        ttfb={stat.lower(): value * 1000 for stat, value in ttfb.items()
+              if isinstance(value, (int, float))},
+        errors=doc.get("Errors", 0))
+
+
+def save_results(results: list, path: str):
+    """Append results as json lines."""
+    with open(path, "a") as results_file:
+        for result in results:
+            results_file.write(json.dumps(result.to_dict()) + "\n")
+
+
+def load_results(path: str) -> list:
+    """Results of a json lines file."""
+    with open(path) as results_file:
+        return [BenchResult.from_dict(json.loads(line)) for line in results_file
+                if line.strip()]
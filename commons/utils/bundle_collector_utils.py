@@ -0,0 +1,291 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Parallel support bundle and crash file collector.
+
+Support bundles are generated on all pods in parallel and every bundle is streamed back as
+a tar stream over its own SSH channel (kubectl exec ... tar -cf -), so no intermediate file
+is written on the master node or copied with sftp. Crash files of all pods are streamed the
+same way, identical files are stored once by content hash and a manifest with sizes and
+checksums of everything collected is written next to the files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shlex
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from commons import commands as cm_cmd
+from commons import constants as cm_const
+
+LOGGER = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+CRASH_DIRS = ("/etc/cortx/",)
+MANIFEST = "manifest.json"
+
+
+class ChannelStream:
+    """Binary stdout stream and exit status of a command running on a paramiko channel."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def read(self, size: int = CHUNK_SIZE) -> bytes:
+        """Read up to size bytes, b'' at end of stream."""
+        return self.channel.recv(size)
+
+    def exit_status(self) -> int:
+        """Wait for command to finish and return its exit status."""
+        return self.channel.recv_exit_status()
+
+    def error(self) -> str:
+        """Pending stderr of the command."""
+        data = b""
+        while self.channel.recv_stderr_ready():
+            data += self.channel.recv_stderr(CHUNK_SIZE)
+        return data.decode(errors="replace").strip()
+
+    def close(self):
+        """Close channel."""
+        self.channel.close()
+
+
+class SSHPodExecutor:
+    """Execute commands in pods with kubectl exec over SSH channels of the master node."""
+
+    def __init__(self, node, namespace: str = cm_const.NAMESPACE):
+        """
+        :param node: LogicalNode object of master node
+        :param namespace: Namespace of the pods
+        """
+        self.node = node
+        self.namespace = namespace
+        self._lock = threading.Lock()
+
+    def open_stream(self, pod: str, container: str, command: str) -> ChannelStream:
+        """Start command in pod on a new channel of the shared SSH transport."""
+        with self._lock:
+            transport = self.node.host_obj.get_transport() if self.node.host_obj else None
+            if not transport or not transport.is_active():
+                self.node.connect()
+                transport = self.node.host_obj.get_transport()
+            channel = transport.open_session()
+        suffix = f"-c {container} -- {command}" if container else f"-- {command}"
+        channel.exec_command(cm_cmd.KUBECTL_CMD.format("exec", pod, self.namespace, suffix))
+        return ChannelStream(channel)
+
+
+def bundle_command(sb_path: str, sb_identifier: str) -> str:
+    """Command writing the tar stream of the support bundle files to stdout."""
+    return f"sh -c {shlex.quote(f'cd {sb_path} && tar -cf - {sb_identifier}*')}"
+
+
+def crash_files_command(crash_dirs=CRASH_DIRS) -> str:
+    """Command writing the tar stream of the crash files (*.gz) to stdout."""
+    dirs = " ".join(shlex.quote(path) for path in crash_dirs)
+    return "sh -c " + shlex.quote(f"find {dirs} -name '*.gz' -print0 | tar --null -T - -cf -")
+
+
+class _HashingReader:
+    """File like wrapper hashing and counting bytes of stream read through it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = CHUNK_SIZE) -> bytes:
+        """Read from stream."""
+        data = self.stream.read(size if size and size > 0 else CHUNK_SIZE)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+
+class SupportBundleCollector:
+    """Collect support bundles and crash files of pods in parallel into a local directory."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, executor, pods: list, local_dir: str, container: str = None,
+                 sb_path: str = cm_const.R2_SUPPORT_BUNDLE_PATH, max_workers: int = 8):
+        """
+        :param executor: Object with open_stream(pod, container, command) e.g. SSHPodExecutor
+        :param pods: Pods to collect from
+        :param local_dir: Local directory for bundles, crash files and manifest
+        :param container: Container to run commands in, default container of pod if None
+        :param sb_path: Support bundle target directory in pods
+        :param max_workers: Pods processed concurrently
+        """
+        self.executor = executor
+        self.pods = pods
+        self.local_dir = local_dir
+        self.container = container
+        self.sb_path = sb_path
+        self.max_workers = max_workers
+        self.crash_dir = os.path.join(local_dir, "crash_files")
+        self._crash_hashes = {}
+        self._lock = threading.Lock()
+
+    def run(self, pod: str, command: str) -> str:
+        """Run command in pod and return its output, raise IOError on failure."""
+        stream = self.executor.open_stream(pod, self.container, command)
+        try:
+            output = b"".join(iter(stream.read, b""))
+            status = stream.exit_status()
+            if status:
+                raise IOError(f"{command} failed in {pod} with {status}: {stream.error()}")
+        finally:
+            stream.close()
+        return output.decode(errors="replace")
+
+    def _parallel(self, func, *args) -> list:
+        """Run func(pod, *args) for all pods, results in pod order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda pod: func(pod, *args), self.pods))
+
+    def generate(self, sb_identifier: str, msg: str = "SB") -> dict:
+        """
+        Generate support bundle in all pods in parallel
+        :return: {pod: error or None}
+        """
+        cmd = cm_cmd.SUPPORT_BUNDLE_LC.format("file://" + self.sb_path, sb_identifier, msg)
+
+        def generate_pod(pod):
+            try:
+                LOGGER.info("Generating support bundle %s in %s", sb_identifier, pod)
+                self.run(pod, cmd)
+                return None
+            except Exception as error:  # pylint: disable=broad-except
+                LOGGER.error("Support bundle generation failed in %s: %s", pod, error)
+                return str(error)
+        return dict(zip(self.pods, self._parallel(generate_pod)))
+
+    def fetch_bundle(self, pod: str, sb_identifier: str) -> dict:
+        """Stream support bundle of pod into <local_dir>/<pod>_<sb_identifier>.tar."""
+        local_path = os.path.join(self.local_dir, f"{pod}_{sb_identifier}.tar")
+        entry = {"pod": pod, "file": os.path.basename(local_path)}
+        stream = self.executor.open_stream(pod, self.container,
+                                           bundle_command(self.sb_path, sb_identifier))
+        try:
+            reader = _HashingReader(stream)
+            with open(local_path, "wb") as bundle:
+                for chunk in iter(reader.read, b""):
+                    bundle.write(chunk)
+            status = stream.exit_status()
+            if status:
+                raise IOError(f"tar failed with {status}: {stream.error()}")
+            entry.update(size=reader.size, sha256=reader.sha256.hexdigest(), status="ok")
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.error("Support bundle transfer from %s failed: %s", pod, error)
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            entry.update(status="failed", error=str(error))
+        finally:
+            stream.close()
+        return entry
+
+    def _store_crash_file(self, pod: str, member: tarfile.TarInfo, fileobj) -> dict:
+        """Store crash file once per content hash."""
+        tmp_path = os.path.join(self.crash_dir, f".{pod}.{threading.get_ident()}.part")
+        sha256 = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as crash_file:
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+                    crash_file.write(chunk)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        digest = sha256.hexdigest()
+        entry = {"pod": pod, "path": "/" + member.name.lstrip("/"), "size": member.size,
+                 "sha256": digest}
+        with self._lock:
+            if digest in self._crash_hashes:
+                os.remove(tmp_path)
+                entry.update(file=self._crash_hashes[digest], duplicate=True)
+            else:
+                name = f"{digest[:12]}_{os.path.basename(member.name)}"
+                os.replace(tmp_path, os.path.join(self.crash_dir, name))
+                self._crash_hashes[digest] = name
+                entry.update(file=name, duplicate=False)
+        return entry
+
+    def fetch_crash_files(self, pod: str, crash_dirs=CRASH_DIRS) -> dict:
+        """Stream crash files of pod and store new contents in <local_dir>/crash_files."""
+        result = {"pod": pod, "files": []}
+        stream = self.executor.open_stream(pod, self.container, crash_files_command(crash_dirs))
+        try:
+            with tarfile.open(fileobj=stream, mode="r|") as tar:
+                for member in tar:
+                    if member.isfile():
+                        result["files"].append(
+                            self._store_crash_file(pod, member, tar.extractfile(member)))
+            status = stream.exit_status()
+            if status:
+                raise IOError(f"tar failed with {status}: {stream.error()}")
+            result["status"] = "ok"
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.error("Crash file transfer from %s failed: %s", pod, error)
+            result.update(status="failed", error=str(error))
+        finally:
+            stream.close()
+        return result
+
+    def collect(self, sb_identifier: str, msg: str = "SB", crash_files: bool = True) -> dict:
+        """
+        Generate, stream and checksum support bundles and crash files of all pods
+        :param sb_identifier: Support bundle identifier
+        :param msg: Comment of support bundle request
+        :param crash_files: Collect crash files as well
+        :return: Manifest, also written to <local_dir>/manifest.json
+        """
+        os.makedirs(self.crash_dir, exist_ok=True)
+        generated = self.generate(sb_identifier, msg)
+
+        def collect_pod(pod):
+            if generated[pod]:
+                bundle = {"pod": pod, "status": "failed", "error": generated[pod]}
+            else:
+                bundle = self.fetch_bundle(pod, sb_identifier)
+            crash = self.fetch_crash_files(pod) if crash_files else None
+            return bundle, crash
+        results = self._parallel(collect_pod)
+        bundles = [bundle for bundle, _ in results]
+        crash = [files for _, files in results if files is not None]
+        manifest = {
+            "sb_identifier": sb_identifier,
+            "bundles": bundles,
+            "crash_files": [entry for pod in crash for entry in pod["files"]],
+            "failed": sorted({entry["pod"] for entry in bundles + crash
+                              if entry["status"] == "failed"}),
+            "errors": {f"{kind}:{entry['pod']}": entry["error"]
+                       for kind, entries in (("bundle", bundles), ("crash", crash))
+                       for entry in entries if entry["status"] == "failed"}}
+        with open(os.path.join(self.local_dir, MANIFEST), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        LOGGER.info("Collected %s support bundles and %s unique crash files into %s, "
+                    "failed pods %s", sum(bundle["status"] == "ok" for bundle in bundles),
+                    len(self._crash_hashes), self.local_dir, manifest["failed"])
+        return manifest
@@ -0,0 +1,151 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""Cluster health model built by merging ``hctl status --json`` outputs of many pods."""
+
+import json
+import logging
+from typing import Union
+
+from commons import commands
+from commons import constants as const
+from commons.helpers.stream_helper import MAX_SSH_CHANNELS
+from commons.helpers.stream_helper import ensure_connected
+from commons.helpers.stream_helper import ssh_exec
+from commons.utils.fanout_utils import FanOutResults
+from commons.utils.fanout_utils import fan_out
+
+LOGGER = logging.getLogger(__name__)
+
+HEALTHY_SVC_STATUS = ("started",)
+
+
+class ClusterHealth:
+    """
+    Merged view of the cluster as reported by every queried pod.
+
+    ``services`` maps hctl node name -> service fid/name -> reporter pod -> status, so a
+    service reported down by only some pods and pods which could not be queried at all are
+    reported precisely instead of failing the whole health check.
+    """
+
+    def __init__(self):
+        self.services = {}
+        self.reporters = {}
+
+    def add_report(self, reporter: str, hctl_json: Union[str, dict]):
+        """
+        Add hctl status json output returned by a pod.
+        :param reporter: Pod which produced the output.
+        :param hctl_json: Output of hctl status --json as string or dict.
+        """
+        try:
+            data = json.loads(hctl_json) if isinstance(hctl_json, (str, bytes)) else hctl_json
+            nodes = data["nodes"]
+        except (ValueError, KeyError, TypeError) as error:
+            self.add_failure(reporter, f"Unparsable hctl status: {error}")
+            return
+        self.reporters[reporter] = "ok"
+        for node in nodes:
+            node_svcs = self.services.setdefault(node["name"], {})
+            if not node["svcs"]:
+                node_svcs.setdefault("<no services>", {})[reporter] = "missing"
+            for svc in node["svcs"]:
+                key = f"{svc['name']}:{svc.get('fid', '')}"
+                node_svcs.setdefault(key, {})[reporter] = svc["status"]
+
+    def add_failure(self, reporter: str, reason: str):
+        """Record that reporter pod could not be queried."""
+        self.reporters[reporter] = str(reason)
+
+    @classmethod
+    def from_fan_out(cls, results: FanOutResults) -> "ClusterHealth":
+        """Build model from fan_out results whose values are hctl json outputs."""
+        health = cls()
+        for target, res in results.items():
+            if res.ok:
+                health.add_report(target, res.value)
+            else:
+                health.add_failure(target, f"{res.status}: {res.error}")
+        return health
+
+    @property
+    def unreachable(self) -> dict:
+        """Pods which could not be queried, pod -> reason."""
+        return {pod: reason for pod, reason in self.reporters.items() if reason != "ok"}
+
+    @property
+    def unhealthy_services(self) -> dict:
+        """
+        Services reported not started by at least one reporter.
+        :return: node -> service -> {reporter: status} for unhealthy services only.
+        """
+        unhealthy = {}
+        for node, svcs in self.services.items():
+            for svc, views in svcs.items():
+                if svc.startswith(const.MOTR_CLIENT):
+                    continue
+                if any(status not in HEALTHY_SVC_STATUS for status in views.values()):
+                    unhealthy.setdefault(node, {})[svc] = views
+        return unhealthy
+
+    @property
+    def healthy(self) -> bool:
+        """True if every pod answered and every service is started."""
+        return bool(self.reporters) and not self.unreachable and not self.unhealthy_services
+
+    def summary(self) -> str:
+        """One line description of the problems, empty when healthy."""
+        problems = [f"pod {pod} not queried ({reason})"
+                    for pod, reason in self.unreachable.items()]
+        for node, svcs in self.unhealthy_services.items():
+            for svc, views in svcs.items():
+                problems.append(f"{svc} on {node} is {sorted(set(views.values()))} "
+                                f"as per {sorted(views)}")
+        return "; ".join(problems)
+
+
+def query_pods_health(node_obj, pod_list: list, max_parallel: int = MAX_SSH_CHANNELS,
+                      deadline: float = None, timeout: float = None) -> ClusterHealth:
+    """
+    Run hctl status --json in every pod concurrently over the single SSH connection of
+    node_obj, one channel per pod, and merge the outputs.
+    Concurrency is capped at MAX_SSH_CHANNELS to stay within sshd session limits. node_obj
+    should be dedicated to the check as its connection is shared by the worker threads.
+    :param node_obj: Master node LogicalNode object.
+    :param pod_list: Pods to be queried.
+    :param max_parallel: Maximum concurrent kubectl exec calls.
+    :param deadline: Maximum seconds for the whole check.
+    :param timeout: Maximum seconds for a single pod.
+    :return: ClusterHealth object.
+    """
+    ensure_connected(node_obj)
+
+    def hctl_status(pod_name):
+        cmd = commands.KUBECTL_CMD.format(
+            "exec", pod_name, const.NAMESPACE,
+            f"-c {const.HAX_CONTAINER_NAME} -- {commands.HCTL_STATUS_CMD_JSON}")
+        status, out, err = ssh_exec(node_obj, cmd, timeout=timeout)
+        if status:
+            raise IOError(err.decode("utf-8", "replace").strip() or f"exited with {status}")
+        return out.decode("utf-8").strip()
+
+    results = fan_out(pod_list, hctl_status, max_parallel=min(max_parallel, MAX_SSH_CHANNELS),
+                      deadline=deadline, timeout=timeout)
+    return ClusterHealth.from_fan_out(results)
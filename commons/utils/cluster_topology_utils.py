@@ -0,0 +1,312 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Discover the topology of a k8s cluster once and share it with the setup steps needing it.
+
+Nodes, services with their node ports and pods are read with a single kubectl json query on
+the master, the data IP of every node is probed over SSH concurrently. The result is kept as
+a versioned json snapshot, so haproxy, /etc/hosts and client config generation reuse it
+instead of querying the cluster again. Files inside pods, e.g. certs, are streamed to the
+client through the SSH channel of the master without a copy on the master.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+
+from commons import commands as cm_cmd
+from commons.helpers.pods_helper import LogicalNode
+from commons.helpers.stream_helper import ssh_stream_to_file
+from commons.utils.fanout_utils import fan_out
+
+LOGGER = logging.getLogger(__name__)
+
+# bumped when the snapshot layout changes, snapshots of other versions are rediscovered
+TOPOLOGY_VERSION = 1
+WORKER_LABEL = "node-role.kubernetes.io/worker"
+
+
+@dataclass
+class ClusterTopology:
+    """
+    Snapshot of cluster nodes, services and pods.
+
+    nodes: {node: {"ip": data IP, "internal_ip", "worker": bool, "ready": bool}}
+    services: {service: {"type", "app", "ports": [{"name", "port", "targetPort", "nodePort"}]}}
+    pods: {pod: {"node", "phase", "ip"}}
+    generation is incremented whenever a rediscovery finds a different cluster.
+    """
+
+    master: str
+    iface: str
+    nodes: dict = field(default_factory=dict)
+    services: dict = field(default_factory=dict)
+    pods: dict = field(default_factory=dict)
+    version: int = TOPOLOGY_VERSION
+    generation: int = 1
+    fingerprint: str = ""
+    created: float = field(default_factory=time.time)
+
+    @property
+    def workers(self) -> list:
+        """Worker node names in kubectl order."""
+        return [name for name, node in self.nodes.items() if node["worker"]]
+
+    def node_ip(self, node: str) -> str:
+        """Data IP of node, the master is probed even when it is not a k8s node."""
+        return self.nodes[node]["ip"]
+
+    def server_pods(self, prefix: str) -> list:
+        """Running pods with name prefix."""
+        return [name for name, pod in self.pods.items()
+                if name.startswith(prefix) and pod["phase"] == "Running"]
+
+    def service_ports(self, service: str, key: str = "targetPort") -> dict:
+        """{str(port key): node port} of service."""
+        return {str(port[key]): port["nodePort"]
+                for port in self.services[service]["ports"] if port.get("nodePort")}
+
+    def load_balancers(self, prefix: str = "cortx-server") -> list:
+        """LoadBalancer services of cortx-server pods in kubectl order."""
+        return [name for name, svc in self.services.items()
+                if svc["type"] == "LoadBalancer" and prefix in name]
+
+    def to_dict(self) -> dict:
+        """Snapshot as json serializable dict."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ClusterTopology":
+        """Snapshot from to_dict output."""
+        return cls(**data)
+
+    def save(self, path: str):
+        """Write snapshot atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as snapshot:
+            json.dump(self.to_dict(), snapshot, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ClusterTopology":
+        """Snapshot from file, None if missing, unreadable or of another version."""
+        try:
+            with open(path) as snapshot:
+                data = json.load(snapshot)
+        except (OSError, ValueError) as error:
+            LOGGER.debug("No topology snapshot at %s: %s", path, error)
+            return None
+        if data.get("version") != TOPOLOGY_VERSION:
+            LOGGER.info("Topology snapshot %s is version %s, expected %s", path,
+                        data.get("version"), TOPOLOGY_VERSION)
+            return None
+        return cls.from_dict(data)
+
+
+def parse_cluster_json(data: dict) -> tuple:
+    """
+    Split the kubectl get nodes,svc,pods -o json list by kind
+    :param data: kubectl json output
+    :return: nodes, services, pods as in ClusterTopology without node data IPs
+    """
+    nodes, services, pods = {}, {}, {}
+    for item in data["items"]:
+        meta, spec, status = item["metadata"], item.get("spec", {}), item.get("status", {})
+        if item["kind"] == "Node":
+            addresses = {addr["type"]: addr["address"] for addr in status.get("addresses", [])}
+            conditions = {cond["type"]: cond["status"] for cond in status.get("conditions", [])}
+            nodes[meta["name"]] = {
+                "ip": None, "internal_ip": addresses.get("InternalIP"),
+                "worker": meta.get("labels", {}).get(WORKER_LABEL) == "worker",
+                "ready": conditions.get("Ready") == "True"}
+        elif item["kind"] == "Service":
+            services[meta["name"]] = {
+                "type": spec.get("type"), "app": (spec.get("selector") or {}).get("app", ""),
+                "ports": [{key: port.get(key) for key in ("name", "port", "targetPort",
+                                                         "nodePort")}
+                          for port in spec.get("ports") or []]}
+        elif item["kind"] == "Pod":
+            pods[meta["name"]] = {"node": spec.get("nodeName"), "phase": status.get("phase"),
+                                  "ip": status.get("podIP")}
+    return nodes, services, pods
+
+
+def _fingerprint(nodes: dict, services: dict, pods: dict) -> str:
+    """Digest of what the cluster looks like, independent of pod phases."""
+    data = {"nodes": nodes, "services": services, "pods": sorted(pods)}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _iface_ip(node_obj, iface: str) -> str:
+    resp = node_obj.execute_cmd(cmd=cm_cmd.CMD_GET_IP_IFACE.format(iface), read_lines=True)
+    return resp[0].strip("\n")
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+def discover_topology(m_node_obj: LogicalNode, username: str, password: str,
+                      iface: str = "eth1", max_parallel: int = 16, timeout: float = 120,
+                      node_factory: Callable[[str], Any] = None) -> ClusterTopology:
+    """
+    Discover cluster topology with one kubectl query and concurrent node IP probes
+    :param m_node_obj: master node object
+    :param username: username for node
+    :param password: password for node
+    :param iface: public data IP interface default is eth1
+    :param max_parallel: nodes probed at the same time
+    :param timeout: seconds a node probe may take
+    :param node_factory: returns node object of a node name, default LogicalNode
+    :return: ClusterTopology
+    """
+    node_factory = node_factory or (lambda host: LogicalNode(hostname=host, username=username,
+                                                             password=password))
+    resp = m_node_obj.execute_cmd(cmd=cm_cmd.K8S_GET_TOPOLOGY_JSON, read_lines=False)
+    nodes, services, pods = parse_cluster_json(json.loads(resp.decode("utf-8")))
+    master = m_node_obj.hostname
+    nodes.setdefault(master, {"ip": None, "internal_ip": None, "worker": False, "ready": True})
+
+    def probe(host):
+        if host == master:
+            return _iface_ip(m_node_obj, iface)
+        node_obj = node_factory(host)
+        try:
+            return _iface_ip(node_obj, iface)
+        finally:
+            node_obj.disconnect()
+
+    start = time.perf_counter()
+    results = fan_out(list(nodes), probe, max_parallel=max_parallel, timeout=timeout)
+    if not results.all_ok:
+        errors = {host: str(results[host].error or "timed out")
+                  for host in results.failed + results.timed_out}
+        raise IOError(f"Failed to get {iface} IP of {errors}")
+    for host, ip_addr in results.values_ok().items():
+        nodes[host]["ip"] = ip_addr
+    LOGGER.info("Topology of %s nodes, %s services, %s pods discovered in %.1fs", len(nodes),
+                len(services), len(pods), time.perf_counter() - start)
+    return ClusterTopology(master=master, iface=iface, nodes=nodes, services=services,
+                           pods=pods, fingerprint=_fingerprint(nodes, services, pods))
+
+
+# pylint: disable=too-many-arguments
+def get_topology(m_node_obj: LogicalNode, username: str, password: str, iface: str = "eth1",
+                 cache_path: str = None, max_age: float = 600, refresh: bool = False,
+                 **kwargs) -> ClusterTopology:
+    """
+    Cached topology snapshot, rediscovered when missing, stale or refresh is requested
+    :param m_node_obj: master node object
+    :param username: username for node
+    :param password: password for node
+    :param iface: public data IP interface default is eth1
+    :param cache_path: snapshot json file, no caching if None
+    :param max_age: seconds a snapshot is reused for
+    :param refresh: rediscover even if the snapshot is fresh
+    :param kwargs: discover_topology arguments
+    :return: ClusterTopology
+    """
+    cached = ClusterTopology.load(cache_path) if cache_path else None
+    if cached and not refresh and cached.master == m_node_obj.hostname and \
+            cached.iface == iface and time.time() - cached.created < max_age:
+        LOGGER.info("Using topology snapshot %s generation %s", cache_path, cached.generation)
+        return cached
+    topology = discover_topology(m_node_obj, username, password, iface, **kwargs)
+    if cached:
+        topology.generation = cached.generation + (cached.fingerprint != topology.fingerprint)
+    if cache_path:
+        topology.save(cache_path)
+        LOGGER.info("Topology snapshot %s generation %s saved", cache_path, topology.generation)
+    return topology
+
+
+def fetch_pod_files(m_node_obj: LogicalNode, pod: str, files: dict) -> dict:
+    """
+    Stream files from a pod to the local host through the SSH channel of the master node
+    :param m_node_obj: master node object
+    :param pod: pod name
+    :param files: {path in pod: local path}
+    :return: {local path: bytes copied}
+    """
+    sizes = {}
+    for remote_path, local_path in files.items():
+        os.makedirs(os.path.dirname(os.path.abspath(local_path)), exist_ok=True)
+        sizes[local_path] = ssh_stream_to_file(
+            m_node_obj, cm_cmd.K8S_POD_CAT_FILE_CMD.format(pod, remote_path), local_path)
+        LOGGER.info("Copied %s:%s to %s (%s bytes)", pod, remote_path, local_path,
+                    sizes[local_path])
+    return sizes
+
+
+def worker_s3_endpoints(topology: ClusterTopology, domain: str = ".colo.seagate.com") -> dict:
+    """
+    Data IP and node ports of the cortx-server service of every worker
+    :param topology: ClusterTopology
+    :param domain: domain of worker names, cortx-server-<worker> services are named after it
+    :return: {worker: {iface: ip, target port: node port}}
+    """
+    ports = {}
+    for name in topology.load_balancers():
+        app = topology.services[name]["app"]
+        if "cortx-server-" in app:
+            ports[app.split("cortx-server-")[1] + domain] = topology.service_ports(name)
+    endpoints = {}
+    for worker in topology.workers:
+        if worker not in ports:
+            raise KeyError(f"Can't find port details for {worker} from {ports}")
+        endpoints[worker] = dict({topology.iface: topology.node_ip(worker)}, **ports[worker])
+    return endpoints
+
+
+def rgw_s3_endpoints(topology: ClusterTopology, shuffle: bool = True) -> dict:
+    """
+    Data IP and node ports of every cortx-server LoadBalancer service, cortx-server-0 is
+    served by the master, the others by the workers in random order
+    :param topology: ClusterTopology
+    :param shuffle: shuffle worker IPs
+    :return: {service: {iface: ip, target port: node port}}
+    """
+    worker_ips = [topology.node_ip(worker) for worker in topology.workers]
+    if shuffle:
+        random.shuffle(worker_ips)
+    endpoints = {}
+    for name in topology.load_balancers("cortx-server-"):
+        ip_addr = topology.node_ip(topology.master) if name == "cortx-server-0" \
+            else worker_ips.pop()
+        endpoints[name] = dict({topology.iface: ip_addr}, **topology.service_ports(name))
+    return endpoints
+
+
+def nodeport_endpoint(topology: ClusterTopology, service: str = "cortx-server-0") -> tuple:
+    """
+    Master data IP with https and http node ports of service
+    :return: boolean, external ip, https port, http port as configure_nodeport_lb
+    """
+    ports = topology.service_ports(service, key="port") if service in topology.services \
+        else {}
+    if "443" not in ports and "80" not in ports:
+        return False, "Did not get expected port numbers."
+    return True, topology.node_ip(topology.master), ports.get("443"), ports.get("80")
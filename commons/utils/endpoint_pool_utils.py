@@ -0,0 +1,288 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Client side S3 endpoint load balancing.
+
+EndpointPool hands out the endpoints of a topology file (ext_lbconfig_utils.export_s3_topology)
+to S3 clients instead of funnelling every request through one haproxy. Endpoints are chosen
+round robin, by least outstanding requests or by power of two choices. Endpoints failing
+consecutive requests, or much slower than the others, are ejected for a while (passive outlier
+ejection) and optional probe thread takes endpoints out while they fail health checks.
+boto3 clients use the pool through attach(), aiohttp clients through acquire()/release().
+"""
+
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+LOGGER = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+POWER_OF_TWO = "p2c"
+POLICIES = (ROUND_ROBIN, LEAST_OUTSTANDING, POWER_OF_TWO)
+
+
+# pylint: disable=too-many-instance-attributes
+class Endpoint:
+    """Endpoint and its request/health state, updated by EndpointPool under its lock."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.netloc = urlsplit(self.url).netloc
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None
+        self.samples = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.probe_failed = False
+
+    def available(self, now: float) -> bool:
+        """Not ejected and not failing health probes."""
+        return not self.probe_failed and now >= self.ejected_until
+
+    def to_dict(self) -> dict:
+        """Endpoint statistics."""
+        return {"url": self.url, "requests": self.requests, "failures": self.failures,
+                "outstanding": self.outstanding, "latency": self.latency,
+                "ejections": self.ejections, "ejected": self.ejected_until > time.time(),
+                "probe_failed": self.probe_failed}
+
+
+class EndpointPool:
+    """Thread safe pool of S3 endpoints with outlier ejection and health probes."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, urls: list, policy: str = POWER_OF_TWO, max_failures: int = 5,
+                 latency_factor: float = 3.0, min_samples: int = 10,
+                 ejection_time: float = 30, max_ejection_percent: int = 50,
+                 ewma_weight: float = 0.2, seed: int = None):
+        """
+        :param urls: Endpoint urls e.g. http://10.0.0.1:30080
+        :param policy: round_robin, least_outstanding or p2c (power of two choices)
+        :param max_failures: Consecutive failures ejecting an endpoint
+        :param latency_factor: Endpoints whose latency average exceeds this many times the
+        median of all endpoints are ejected, None disables latency ejection
+        :param min_samples: Requests needed before latency of an endpoint is judged
+        :param ejection_time: Seconds of first ejection, grows with every ejection
+        :param max_ejection_percent: Endpoints which may be ejected at the same time
+        :param ewma_weight: Weight of newest sample in latency moving average
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy}, use one of {POLICIES}")
+        if not urls:
+            raise ValueError("Endpoint pool needs at least one endpoint")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.policy = policy
+        self.max_failures = max_failures
+        self.latency_factor = latency_factor
+        self.min_samples = min_samples
+        self.ejection_time = ejection_time
+        self.max_ejection_percent = max_ejection_percent
+        self.ewma_weight = ewma_weight
+        self._rand = random.Random(seed)
+        self._next = 0
+        self._lock = threading.Lock()
+        self._probe_stop = threading.Event()
+        self._probe_thread = None
+
+    @classmethod
+    def from_topology(cls, topology, https: bool = False, **kwargs) -> "EndpointPool":
+        """
+        Pool of the endpoints of a topology
+        :param topology: Topology dict or json file path written by export_s3_topology
+        :param https: Use https node ports
+        """
+        if isinstance(topology, str):
+            with open(topology) as topology_file:
+                topology = json.load(topology_file)
+        scheme, port = ("https", "https_port") if https else ("http", "http_port")
+        return cls([f"{scheme}://{endpoint['ip']}:{endpoint[port]}"
+                    for endpoint in topology["endpoints"]], **kwargs)
+
+    def _select(self, candidates: list) -> Endpoint:
+        if self.policy == ROUND_ROBIN:
+            self._next += 1
+            return candidates[self._next % len(candidates)]
+        if self.policy == LEAST_OUTSTANDING:
+            least = min(endpoint.outstanding for endpoint in candidates)
+            return self._rand.choice([endpoint for endpoint in candidates
+                                      if endpoint.outstanding == least])
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = self._rand.sample(candidates, 2)
+        return min((first, second), key=lambda endpoint: (endpoint.outstanding,
+                                                          endpoint.latency or 0))
+
+    def acquire(self) -> Endpoint:
+        """Endpoint for next request, release() it when the request is done."""
+        now = time.time()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.available(now)]
+            if not candidates:
+                # every endpoint is out, spread over all rather than fail the request
+                candidates = self.endpoints
+            endpoint = self._select(candidates)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float, error: bool = False):
+        """
+        Record result of request sent to endpoint
+        :param latency: Request latency in seconds
+        :param error: Request failed with connection error, timeout or 5xx response
+        """
+        now = time.time()
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.max_failures:
+                    self._eject(endpoint, now, f"{endpoint.consecutive_failures} failures")
+                return
+            endpoint.consecutive_failures = 0
+            endpoint.samples += 1
+            endpoint.latency = latency if endpoint.latency is None else \
+                self.ewma_weight * latency + (1 - self.ewma_weight) * endpoint.latency
+            if self.latency_factor and endpoint.samples >= self.min_samples:
+                judged = [other.latency for other in self.endpoints
+                          if other.samples >= self.min_samples]
+                if len(judged) > 1 and \
+                        endpoint.latency > self.latency_factor * statistics.median(judged):
+                    self._eject(endpoint, now, f"latency {endpoint.latency:.3f}s")
+
+    def _eject(self, endpoint: Endpoint, now: float, reason: str):
+        """Eject endpoint unless max_ejection_percent of endpoints are already out."""
+        if now < endpoint.ejected_until:
+            return
+        ejected = sum(not other.available(now) for other in self.endpoints)
+        if (ejected + 1) * 100 > self.max_ejection_percent * len(self.endpoints):
+            return
+        endpoint.ejections += 1
+        endpoint.ejected_until = now + self.ejection_time * endpoint.ejections
+        endpoint.consecutive_failures = 0
+        # judged afresh when back
+        endpoint.samples = 0
+        endpoint.latency = None
+        LOGGER.warning("Ejected %s for %ss: %s", endpoint.url,
+                       self.ejection_time * endpoint.ejections, reason)
+
+    @contextmanager
+    def request(self):
+        """Context yielding endpoint url, exceptions count as failure of the endpoint."""
+        endpoint = self.acquire()
+        start = time.perf_counter()
+        error = True
+        try:
+            yield endpoint.url
+            error = False
+        finally:
+            self.release(endpoint, time.perf_counter() - start, error)
+
+    def probe(self, path: str = "/", timeout: float = 2):
+        """
+        Health check every endpoint once, any response below 500 is healthy.
+        :param path: Request path of probe
+        :param timeout: Probe timeout in seconds
+        """
+        for endpoint in self.endpoints:
+            try:
+                with urllib.request.urlopen(endpoint.url + path,  # nosec
+                                            timeout=timeout) as response:
+                    healthy = response.status < 500
+            except urllib.error.HTTPError as error:
+                healthy = error.code < 500
+            except (OSError, ValueError):
+                healthy = False
+            with self._lock:
+                if endpoint.probe_failed == healthy:
+                    LOGGER.warning("Health probe of %s %s", endpoint.url,
+                                   "passed" if healthy else "failed")
+                endpoint.probe_failed = not healthy
+
+    def start_probes(self, interval: float = 5, path: str = "/", timeout: float = 2):
+        """Probe endpoints from a daemon thread every interval seconds until stop_probes."""
+        def run():
+            while not self._probe_stop.is_set():
+                self.probe(path, timeout)
+                self._probe_stop.wait(interval)
+
+        self._probe_stop.clear()
+        self._probe_thread = threading.Thread(target=run, daemon=True)
+        self._probe_thread.start()
+
+    def stop_probes(self):
+        """Stop probe thread."""
+        self._probe_stop.set()
+        if self._probe_thread is not None:
+            self._probe_thread.join()
+            self._probe_thread = None
+
+    def stats(self) -> list:
+        """Statistics of every endpoint."""
+        with self._lock:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
+
+    def attach(self, client):
+        """
+        Send requests of a boto3 client to pool endpoints, a retried request goes to a newly
+        chosen endpoint. Path style addressing is needed as only the netloc is replaced.
+        :param client: boto3 client
+        """
+        events = client.meta.events
+        events.register("before-sign.s3", self._before_sign)
+        events.register("after-call.s3", self._after_call)
+        events.register("after-call-error.s3", self._after_call_error)
+        return client
+
+    def _before_sign(self, request, **_):
+        context = request.context
+        if "pool_endpoint" in context:
+            # request is retried, previous attempt failed
+            self.release(context["pool_endpoint"], time.perf_counter() - context["pool_start"],
+                         error=True)
+        endpoint = self.acquire()
+        context["pool_endpoint"], context["pool_start"] = endpoint, time.perf_counter()
+        url = urlsplit(request.url)
+        request.url = urlunsplit(url._replace(scheme=urlsplit(endpoint.url).scheme,
+                                              netloc=endpoint.netloc))
+
+    def _after_call(self, http_response, context, **_):
+        endpoint = context.pop("pool_endpoint", None)
+        if endpoint is not None:
+            self.release(endpoint, time.perf_counter() - context.pop("pool_start"),
+                         error=http_response.status_code >= 500)
+
+    def _after_call_error(self, context, **_):
+        endpoint = context.pop("pool_endpoint", None)
+        if endpoint is not None:
+            self.release(endpoint, time.perf_counter() - context.pop("pool_start"), error=True)
@@ -25,12 +25,13 @@ Module to maintain External Load Balancer set utils
 import json
 import logging
 import os
-import random
 from commons import commands as cm_cmd
 from commons import constants as cm_const
 from commons.helpers.pods_helper import LogicalNode
 from commons.utils import assert_utils
+from commons.utils import cluster_topology_utils as topo_utils
 from commons.utils import system_utils as sys_utils
+from commons.utils.cluster_topology_utils import ClusterTopology
 
 # Global Constants
 LOGGER = logging.getLogger(__name__)
@@ -77,133 +78,122 @@ def configure_rsyslog():
     return resp
 
 
-# pylint: disable=too-many-branches
-# pylint: disable=too-many-statements
-# pylint: disable=too-many-locals
-def configure_haproxy_lb(m_node: str, username: str, password: str, ext_ip: str):
+HAPROXY_BINDS = {
+    "# cortx_setup_1": "    bind {}:80\n",
+    "# cortx_setup_https": "    bind {}:443 ssl crt /etc/ssl/stx/stx.pem\n",
+    "# auth_port_9080": "    bind {}:9080\n",
+    "# auth_https_port_9443": "    bind {}:9443 ssl crt /etc/ssl/stx/stx.pem\n"}
+# template marker -> (target port, server line)
+HAPROXY_SERVERS = {
+    "# 80 cortx_setup_1": ("80", "    server ha-s3-{index} {ip}:{port}    #port mapped to 80\n"),
+    "# 443 cortx_setup_https": ("443", "    server ha-s3-ssl-{index} {ip}:{port} "
+                                       "ssl verify none    #port mapped to 443\n"),
+    "# 9080 s3_auth": ("9080", "    server s3authserver-instance{index} {ip}:{port} "
+                               "#port mapped to 9080\n"),
+    "# 9443 s3_auth_https": ("9443", "    server s3authserver-instance-ssl-{index} {ip}:{port} "
+                                     "ssl verify none    #port mapped to 9443\n")}
+RGW_PORT_KEYS = {"80": "rgw-http", "443": "rgw-https"}
+
+
+def render_haproxy_cfg(template_lines: list, ext_ip: str, endpoints: dict, iface: str = "eth1",
+                       port_keys: dict = None) -> list:
     """
-    Implement external Haproxy LB
-    :param m_node: hostname for master node
-    :param username: username for node
-    :param password: password for node
+    Fill haproxy template with frontend binds and a backend server per endpoint
+    :param template_lines: lines of HAPROXY_DUMMY_CONFIG or HAPROXY_DUMMY_RGW_CONFIG
     :param ext_ip: External LB IP from client node setup
+    :param endpoints: {name: {iface: ip, target port: node port}}
+    :param iface: interface key of endpoint IP
+    :param port_keys: endpoint key of the node port of a target port if not the port itself
+    :return: haproxy.cfg lines
     """
-    m_node_obj = LogicalNode(hostname=m_node, username=username, password=password)
-    resp = m_node_obj.execute_cmd(cmd=cm_cmd.K8S_WORKER_NODES, read_lines=True)
-    pods_list = m_node_obj.get_all_pods(pod_prefix=cm_const.SERVER_POD_NAME_PREFIX)
-    worker_node = {resp[index].strip("\n"): dict() for index in range(1, len(resp))}
-    for worker in worker_node.keys():
-        w_node_obj = LogicalNode(hostname=worker, username=username, password=password)
-        resp = w_node_obj.execute_cmd(cmd=cm_cmd.CMD_GET_IP_IFACE.format("eth1"), read_lines=True)
-        worker_node[worker].update({"eth1": resp[0].strip("\n")})
-    resp = m_node_obj.execute_cmd(cmd=cm_cmd.K8S_GET_SVC_JSON, read_lines=False).decode("utf-8")
-    resp = json.loads(resp)
-    get_port_data = dict()
-    for item_data in resp["items"]:
-        if item_data["spec"]["type"] == "LoadBalancer" and \
-                "cortx-server" in item_data["spec"]["selector"]["app"]:
-            worker = item_data["spec"]["selector"]["app"].split("cortx-server-")[1] \
-                     + ".colo.seagate.com"
-            get_port_data[worker] = dict()
-            if item_data["spec"].get("ports") is not None:
-                for port_items in item_data["spec"]["ports"]:
-                    get_port_data[worker].update({f"{port_items['targetPort']}":
-                                                      port_items["nodePort"]})
-            else:
-                LOGGER.info("Failed to get ports details from %s", get_port_data.get(worker))
-    LOGGER.info("Worker node IP PORTs info for haproxy: %s", get_port_data)
-    for worker in worker_node.keys():
-        if get_port_data.get(worker) is not None:
-            worker_node[worker].update(get_port_data[worker])
+    port_keys = port_keys or {}
+    lines = []
+    for line in template_lines:
+        bind = [fmt for marker, fmt in HAPROXY_BINDS.items() if marker in line]
+        server = [value for marker, value in HAPROXY_SERVERS.items() if marker in line]
+        if bind:
+            lines.append(bind[0].format(ext_ip))
+        elif server:
+            port, fmt = server[0]
+            lines.extend(fmt.format(index=index, ip=endpoint[iface],
+                                    port=endpoint[port_keys.get(port, port)])
+                         for index, endpoint in enumerate(endpoints.values(), 1))
         else:
-            assert_utils.assert_true(False, f"Can't find port details for {worker} "
-                                            f"from {get_port_data}")
+            lines.append(line)
+    return lines
 
-    with open(cm_const.HAPROXY_DUMMY_CONFIG, 'r') as f_read:
+
+def write_haproxy_cfg(template_path: str, ext_ip: str, endpoints: dict, iface: str = "eth1",
+                      port_keys: dict = None):
+    """Render haproxy template to the haproxy config file."""
+    with open(template_path, 'r') as f_read:
         haproxy_dummy = f_read.readlines()
     if not os.path.exists("/etc/haproxy"):
         sys_utils.execute_cmd("mkdir -p {}".format("/etc/haproxy"))
     with open(cm_const.const.CFG_FILES[0], "w") as f_write:
-        for line in haproxy_dummy:
-            if "# cortx_setup_1" in line:
-                line = f"    bind {ext_ip}:80\n"
-                f_write.write(line)
-                continue
-            if "# cortx_setup_https" in line:
-                line = f"    bind {ext_ip}:443 ssl crt /etc/ssl/stx/stx.pem\n"
-                f_write.write(line)
-                continue
-            if "# auth_port_9080" in line:
-                line = f"    bind {ext_ip}:9080\n"
-                f_write.write(line)
-                continue
-            if "# auth_https_port_9443" in line:
-                line = f"    bind {ext_ip}:9443 ssl crt /etc/ssl/stx/stx.pem\n"
-                f_write.write(line)
-                continue
-            if "# 80 cortx_setup_1" in line:
-                for index, worker in enumerate(worker_node.keys(), 1):
-                    line = f"    server ha-s3-{index} {worker_node[worker]['eth1']}:" \
-                           f"{worker_node[worker]['80']}    #port mapped to 80\n"
-                    f_write.write(line)
-                continue
-            if "# 443 cortx_setup_https" in line:
-                for index, worker in enumerate(worker_node.keys(), 1):
-                    line = f"    server ha-s3-ssl-{index} {worker_node[worker]['eth1']}:" \
-                           f"{worker_node[worker]['443']} ssl verify none    #port mapped to 443\n"
-                    f_write.write(line)
-                continue
-            if "# 9080 s3_auth" in line:
-                for index, worker in enumerate(worker_node.keys(), 1):
-                    line = f"    server s3authserver-instance{index} " \
-                           f"{worker_node[worker]['eth1']}:{worker_node[worker]['9080']} " \
-                           f"#port mapped to 9080\n"
-                    f_write.write(line)
-                continue
-            if "# 9443 s3_auth_https" in line:
-                for index, worker in enumerate(worker_node.keys(), 1):
-                    line = f"    server s3authserver-instance-ssl-{index} " \
-                           f"{worker_node[worker]['eth1']}:{worker_node[worker]['9443']} " \
-                           f"ssl verify none    #port mapped to 9443\n"
-                    f_write.write(line)
-                continue
-            f_write.write(line)
+        f_write.writelines(render_haproxy_cfg(haproxy_dummy, ext_ip, endpoints, iface,
+                                              port_keys))
+
+
+def write_client_hosts(ext_ip: str, path: str = "/etc/hosts"):
+    """Resolve s3 endpoints to the external LB IP on client."""
+    with open(path, 'w') as file:
+        file.write("127.0.0.1   localhost localhost.localdomain localhost4 "
+                   "localhost4.localdomain4\n")
+        file.write("::1         localhost localhost.localdomain localhost6 "
+                   "localhost6.localdomain6\n")
+        file.write("{} s3.seagate.com sts.seagate.com iam.seagate.com "
+                   "sts.cloud.seagate.com\n".format(ext_ip))
+
+
+def get_worker_s3_endpoints(m_node_obj: LogicalNode, username: str, password: str,
+                            topology: ClusterTopology = None) -> dict:
+    """
+    Discover eth1 IP of every worker and node ports of its cortx-server service
+    :param m_node_obj: master node object
+    :param username: username for node
+    :param password: password for node
+    :param topology: already discovered topology
+    :return: {worker: {"eth1": ip, target port: node port}}
+    """
+    topology = topology or topo_utils.discover_topology(m_node_obj, username, password, "eth1")
+    try:
+        worker_node = topo_utils.worker_s3_endpoints(topology)
+    except KeyError as error:
+        assert_utils.assert_true(False, str(error))
+    LOGGER.info("Worker node IP PORTs info for haproxy: %s", worker_node)
+    return worker_node
+
+
+def configure_haproxy_lb(m_node: str, username: str, password: str, ext_ip: str,
+                         topology_path: str = None):
+    """
+    Implement external Haproxy LB
+    :param m_node: hostname for master node
+    :param username: username for node
+    :param password: password for node
+    :param ext_ip: External LB IP from client node setup
+    :param topology_path: topology snapshot reused by later client setup steps
+    """
+    m_node_obj = LogicalNode(hostname=m_node, username=username, password=password)
+    topology = topo_utils.get_topology(m_node_obj, username, password, "eth1",
+                                       cache_path=topology_path)
+    pods_list = topology.server_pods(cm_const.SERVER_POD_NAME_PREFIX)
+    worker_node = get_worker_s3_endpoints(m_node_obj, username, password, topology)
+    write_haproxy_cfg(cm_const.HAPROXY_DUMMY_CONFIG, ext_ip, worker_node)
     LOGGER.info("Configuring rsyslog to Configure Logging for HAProxy")
     resp = configure_rsyslog()
     LOGGER.debug("Configuring rsyslog response = %s", resp)
-    LOGGER.info("Coping the ca.crt to %s", cm_const.LOCAL_S3_CERT_PATH)
-    if os.path.exists(cm_const.LOCAL_S3_CERT_PATH):
-        sys_utils.execute_cmd("rm -f {}".format(cm_const.LOCAL_S3_CERT_PATH))
-    sys_utils.execute_cmd(cmd="mkdir -p {}".format(
-        os.path.dirname(os.path.abspath(cm_const.LOCAL_S3_CERT_PATH))))
-    cmd = cm_cmd.K8S_CP_PV_FILE_TO_LOCAL_CMD.format(
-        pods_list[0], cm_const.K8S_CRT_PATH, "/root/ca.crt")
-    resp = m_node_obj.execute_cmd(cmd=cmd, read_lines=True)
-    LOGGER.debug("Resp : %s", resp)
-    m_node_obj.copy_file_to_local("/root/ca.crt", cm_const.LOCAL_S3_CERT_PATH)
-    LOGGER.info("Coping the stx.pem to %s", cm_const.LOCAL_PEM_PATH)
-    if os.path.exists(cm_const.LOCAL_PEM_PATH):
-        sys_utils.execute_cmd("rm -f {}".format(cm_const.LOCAL_PEM_PATH))
-    sys_utils.execute_cmd(cmd="mkdir -p {}".format(os.path.dirname(
-        os.path.abspath(cm_const.LOCAL_PEM_PATH))))
-    cmd = cm_cmd.K8S_CP_PV_FILE_TO_LOCAL_CMD.format(
-        pods_list[0], cm_const.K8S_PEM_PATH, "/root/stx.pem")
-    resp = m_node_obj.execute_cmd(cmd=cmd, read_lines=True)
-    LOGGER.debug("Resp : %s", resp)
-    m_node_obj.copy_file_to_local("/root/stx.pem", cm_const.LOCAL_PEM_PATH)
+    LOGGER.info("Coping the ca.crt and stx.pem from %s", pods_list[0])
+    topo_utils.fetch_pod_files(m_node_obj, pods_list[0],
+                               {cm_const.K8S_CRT_PATH: cm_const.LOCAL_S3_CERT_PATH,
+                                cm_const.K8S_PEM_PATH: cm_const.LOCAL_PEM_PATH})
     resp = sys_utils.execute_cmd(cmd=cm_cmd.SYSTEM_CTL_RESTART_CMD.format("haproxy"))
     assert_utils.assert_true(resp[0], resp[1])
     resp = sys_utils.execute_cmd("puppet agent --disable")
     assert_utils.assert_true(resp[0], resp[1])
     LOGGER.info("Setting s3 endpoints of ext LB on client.")
-    sys_utils.execute_cmd(cmd="rm -f /etc/hosts")
-    with open("/etc/hosts", 'w') as file:
-        file.write("127.0.0.1   localhost localhost.localdomain localhost4 "
-                   "localhost4.localdomain4\n")
-        file.write("::1         localhost localhost.localdomain localhost6 "
-                   "localhost6.localdomain6\n")
-        file.write("{} s3.seagate.com sts.seagate.com iam.seagate.com "
-                   "sts.cloud.seagate.com\n".format(ext_ip))
+    write_client_hosts(ext_ip)
 
 def configure_nodeport_lb(node_obj: LogicalNode, iface: str):
     """
@@ -238,7 +228,25 @@ def configure_nodeport_lb(node_obj: LogicalNode, iface: str):
         return False, "Did not get expected port numbers."
 
 
-def configure_haproxy_rgwlb(m_node: str, username: str, password: str, ext_ip: str, iface="eth1"):
+def get_rgw_s3_endpoints(m_node_obj: LogicalNode, username: str, password: str,
+                         iface: str = "eth1", topology: ClusterTopology = None) -> dict:
+    """
+    Discover node IP and node ports of every cortx-server LoadBalancer service
+    :param m_node_obj: master node object
+    :param username: username for node
+    :param password: password for node
+    :param iface: public data IP interface default is eth1
+    :param topology: already discovered topology
+    :return: {service: {iface: ip, target port: node port}}
+    """
+    topology = topology or topo_utils.discover_topology(m_node_obj, username, password, iface)
+    get_iosvc_data = topo_utils.rgw_s3_endpoints(topology)
+    LOGGER.info("io-svc IP PORTs info for haproxy: %s", get_iosvc_data)
+    return get_iosvc_data
+
+
+def configure_haproxy_rgwlb(m_node: str, username: str, password: str, ext_ip: str, iface="eth1",
+                            topology_path: str = None):
     """
     Implement external service set as LoadBalancer for RGW
     :param m_node: hostname for master node
@@ -246,67 +254,14 @@ def configure_haproxy_rgwlb(m_node: str, username: str, password: str, ext_ip: s
     :param password: password for node
     :param ext_ip: External LB IP from client node setup
     :param iface: public data IP interface default is eth1
+    :param topology_path: topology snapshot reused by later client setup steps
     """
     m_node_obj = LogicalNode(hostname=m_node, username=username, password=password)
-    resp = m_node_obj.execute_cmd(cmd=cm_cmd.K8S_WORKER_NODES, read_lines=True)
-    worker_node = {resp[index].strip("\n"): dict() for index in range(1, len(resp))}
-    resp = m_node_obj.execute_cmd(cmd=cm_cmd.CMD_GET_IP_IFACE.format(iface), read_lines=True)
-    master_eth1 = resp[0].strip("\n")
-    LOGGER.info("Data IP from master node: %s", master_eth1)
-    for worker in worker_node.keys():
-        w_node_obj = LogicalNode(hostname=worker, username=username, password=password)
-        resp = w_node_obj.execute_cmd(cmd=cm_cmd.CMD_GET_IP_IFACE.format(iface), read_lines=True)
-        worker_node[worker].update({iface: resp[0].strip("\n")})
-    worker_eth1 = [worker[iface] for worker in worker_node.values() if iface in worker.keys()]
-    print("Worker nodes eth1: ", worker_eth1)
-    random.shuffle(worker_eth1)
-    resp = m_node_obj.execute_cmd(cmd=cm_cmd.K8S_GET_SVC_JSON, read_lines=False).decode("utf-8")
-    resp = json.loads(resp)
-    get_iosvc_data = dict()
-    for item_data in resp["items"]:
-        if item_data["spec"]["type"] == "LoadBalancer" and \
-                "cortx-server-" in item_data["metadata"]["name"]:
-            svc = item_data["metadata"]["name"]
-            get_iosvc_data[svc] = dict()
-            if svc == "cortx-server-0":
-                get_iosvc_data[svc].update({iface: master_eth1})
-            else:
-                get_iosvc_data[svc].update({iface: worker_eth1.pop()})
-            if item_data["spec"].get("ports") is not None:
-                for port_items in item_data["spec"]["ports"]:
-                    get_iosvc_data[svc].update({f"{port_items['targetPort']}":
-                                                    port_items["nodePort"]})
-            else:
-                LOGGER.info("Failed to get ports details from %s", get_iosvc_data.get(svc))
-    LOGGER.info("io-svc IP PORTs info for haproxy: %s", get_iosvc_data)
-    with open(cm_const.HAPROXY_DUMMY_RGW_CONFIG, 'r') as f_read:
-        haproxy_dummy = f_read.readlines()
-    if not os.path.exists("/etc/haproxy"):
-        sys_utils.execute_cmd("mkdir -p {}".format("/etc/haproxy"))
-    with open(cm_const.const.CFG_FILES[0], "w") as f_write:
-        for line in haproxy_dummy:
-            if "# cortx_setup_1" in line:
-                line = f"    bind {ext_ip}:80\n"
-                f_write.write(line)
-                continue
-            if "# cortx_setup_https" in line:
-                line = f"    bind {ext_ip}:443 ssl crt /etc/ssl/stx/stx.pem\n"
-                f_write.write(line)
-                continue
-            if "# 80 cortx_setup_1" in line:
-                for index, svc in enumerate(get_iosvc_data.keys(), 1):
-                    line = f"    server ha-s3-{index} {get_iosvc_data[svc]['eth1']}:" \
-                           f"{get_iosvc_data[svc]['rgw-http']}    #port mapped to 80\n"
-                    f_write.write(line)
-                continue
-            if "# 443 cortx_setup_https" in line:
-                for index, svc in enumerate(get_iosvc_data.keys(), 1):
-                    line = f"    server ha-s3-ssl-{index} {get_iosvc_data[svc]['eth1']}:" \
-                           f"{get_iosvc_data[svc]['rgw-https']} " \
-                           f"ssl verify none    #port mapped to 443\n"
-                    f_write.write(line)
-                continue
-            f_write.write(line)
+    topology = topo_utils.get_topology(m_node_obj, username, password, iface,
+                                       cache_path=topology_path)
+    get_iosvc_data = get_rgw_s3_endpoints(m_node_obj, username, password, iface, topology)
+    write_haproxy_cfg(cm_const.HAPROXY_DUMMY_RGW_CONFIG, ext_ip, get_iosvc_data, iface,
+                      RGW_PORT_KEYS)
     LOGGER.info("Configuring rsyslog to Configure Logging for HAProxy")
     resp = configure_rsyslog()
     LOGGER.debug("Configuring rsyslog response = %s", resp)
@@ -321,3 +276,42 @@ def configure_haproxy_rgwlb(m_node: str, username: str, password: str, ext_ip: s
     assert_utils.assert_true(resp[0], resp[1])
 
     LOGGER.info("External HAProxy is configured.")
+
+
+def s3_topology(endpoints: dict, iface: str = "eth1", http_port: str = "rgw-http",
+                https_port: str = "rgw-https") -> dict:
+    """
+    S3 endpoint topology of discovered endpoints
+    :param endpoints: output of get_rgw_s3_endpoints or get_worker_s3_endpoints
+    :param iface: interface key of endpoint IP
+    :param http_port: target port key of http node port, "80" for worker endpoints
+    :param https_port: target port key of https node port, "443" for worker endpoints
+    :return: {"endpoints": [{"name", "ip", "http_port", "https_port"}]}
+    """
+    return {"endpoints": [{"name": name, "ip": ports[iface], "http_port": ports.get(http_port),
+                           "https_port": ports.get(https_port)}
+                          for name, ports in endpoints.items()]}
+
+
+def export_s3_topology(m_node: str, username: str, password: str, path: str,
+                       iface: str = "eth1", topology_path: str = None) -> dict:
+    """
+    Discover cortx-server endpoints as configure_haproxy_rgwlb does and write them as json
+    topology file to be used by client side load balancing (EndpointPool.from_topology)
+    :param m_node: hostname for master node
+    :param username: username for node
+    :param password: password for node
+    :param path: topology json file path
+    :param iface: public data IP interface default is eth1
+    :param topology_path: cluster topology snapshot, e.g. the one of configure_haproxy_rgwlb
+    :return: topology
+    """
+    m_node_obj = LogicalNode(hostname=m_node, username=username, password=password)
+    cluster = topo_utils.get_topology(m_node_obj, username, password, iface,
+                                      cache_path=topology_path)
+    topology = s3_topology(get_rgw_s3_endpoints(m_node_obj, username, password, iface,
+                                                cluster), iface)
+    with open(path, "w") as topology_file:
+        json.dump(topology, topology_file, indent=2)
+    LOGGER.info("S3 topology of %s endpoints written to %s", len(topology["endpoints"]), path)
+    return topology
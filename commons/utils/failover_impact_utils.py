@@ -0,0 +1,391 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Failover impact analysis: correlate per operation IO timelines with fault events.
+
+IO threads record every operation (start, end, op, key, status) and the test records fault
+events (pod delete, process kill, restart complete) into one compact binary timeline log.
+FailoverImpactAnalyzer then quantifies each fault: time to first error, time to recovery,
+error window, throughput dip and p99 latency inflation.
+"""
+
+import argparse
+import contextlib
+import html
+import json
+import logging
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from collections import namedtuple
+
+from commons.utils.histogram_utils import LatencyHistogram
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"OPTL1\n"
+REC_OP = 1
+REC_EVENT = 2
+# type, op code, start, end, status, key length
+OP_STRUCT = struct.Struct("<BBddHH")
+# type, time, kind length, target length
+EVENT_STRUCT = struct.Struct("<BdHH")
+
+OPERATIONS = ("other", "put", "get", "delete", "head", "list", "copy", "multipart")
+OP_ALIASES = {"write": "put", "read": "get"}
+STATUS_OK = 200
+STATUS_CLIENT_ERROR = 599
+
+RECOVERY_EVENTS = ("restart_complete", "pod_ready", "node_up", "recovered")
+
+OpRecord = namedtuple("OpRecord", "start end op key status")
+FaultEvent = namedtuple("FaultEvent", "time kind target")
+
+
+def is_ok(record: OpRecord) -> bool:
+    """True if the operation succeeded."""
+    return record.status < 400
+
+
+def error_status(error) -> int:
+    """HTTP status of an exception or error string, STATUS_CLIENT_ERROR if there is none."""
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status:
+            return status
+    match = re.search(r"\b([45]\d\d)\b", str(error))
+    return int(match.group(1)) if match else STATUS_CLIENT_ERROR
+
+
+class TimelineRecorder:
+    """
+    Thread safe writer of the binary timeline log.
+
+    Usage::
+
+        with TimelineRecorder("ha_timeline.bin") as timeline:
+            with timeline.timed("put", obj_name):
+                s3_test_obj.put_object(...)
+            timeline.event("pod_delete", pod_name)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, start: float, end: float, op: str, key: str = "", status: int = STATUS_OK):
+        """Record one operation, times in epoch seconds."""
+        op = OP_ALIASES.get(op, op)
+        code = OPERATIONS.index(op) if op in OPERATIONS else 0
+        key = key.encode()[:0xFFFF]
+        with self._lock:
+            self._file.write(OP_STRUCT.pack(REC_OP, code, start, end, status, len(key)) + key)
+
+    def event(self, kind: str, target: str = "", event_time: float = None):
+        """Record a fault or recovery event, now if event_time is not given."""
+        kind, target = kind.encode()[:0xFFFF], target.encode()[:0xFFFF]
+        event_time = time.time() if event_time is None else event_time
+        with self._lock:
+            self._file.write(EVENT_STRUCT.pack(REC_EVENT, event_time, len(kind), len(target)) +
+                             kind + target)
+            self._file.flush()
+
+    @contextlib.contextmanager
+    def timed(self, op: str, key: str = ""):
+        """Record the wrapped operation, failed with its status if it raises."""
+        start = time.time()
+        try:
+            yield
+        except Exception as error:
+            self.record(start, time.time(), op, key, error_status(error))
+            raise
+        self.record(start, time.time(), op, key)
+
+    def on_complete(self, op: str, latency: float, nbytes: int, error: str = None):
+        """on_complete hook for the in-process S3 load generator."""
+        _ = nbytes
+        end = time.time()
+        self.record(end - latency, end, op, "",
+                    STATUS_OK if error is None else error_status(error))
+
+    def close(self):
+        """Flush and close the log."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_timeline(path: str) -> tuple:
+    """
+    Read a timeline log, a truncated last record is ignored.
+    :return: (operations sorted by end, events sorted by time)
+    """
+    ops, events = [], []
+    with open(path, "rb") as log:
+        data = log.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a timeline log")
+    pos = len(MAGIC)
+    while pos < len(data):
+        if data[pos] == REC_OP and pos + OP_STRUCT.size <= len(data):
+            _, code, start, end, status, klen = OP_STRUCT.unpack_from(data, pos)
+            pos += OP_STRUCT.size + klen
+            if pos > len(data):
+                break
+            ops.append(OpRecord(start, end, OPERATIONS[code], data[pos - klen:pos].decode(),
+                                status))
+        elif data[pos] == REC_EVENT and pos + EVENT_STRUCT.size <= len(data):
+            _, event_time, kind_len, target_len = EVENT_STRUCT.unpack_from(data, pos)
+            pos += EVENT_STRUCT.size
+            if pos + kind_len + target_len > len(data):
+                break
+            events.append(FaultEvent(event_time, data[pos:pos + kind_len].decode(),
+                                     data[pos + kind_len:pos + kind_len + target_len].decode()))
+            pos += kind_len + target_len
+        else:
+            break
+    ops.sort(key=lambda rec: rec.end)
+    events.sort(key=lambda evt: evt.time)
+    return ops, events
+
+
+class FailoverImpactAnalyzer:
+    """Quantify the impact of each fault event on the recorded IO."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, ops: list, events: list, bucket: float = 1.0, baseline: float = 30.0,
+                 settle: float = 10.0, error_gap: float = 5.0):
+        """
+        :param ops: OpRecords, see read_timeline.
+        :param events: FaultEvents, recovery kinds are in RECOVERY_EVENTS.
+        :param bucket: Seconds per throughput bucket.
+        :param baseline: Seconds before the fault used as baseline.
+        :param settle: Seconds after recovery still counted as impact window.
+        :param error_gap: Errors further apart than this start a new error window.
+        """
+        self.ops = sorted(ops, key=lambda rec: rec.end)
+        self.events = sorted(events, key=lambda evt: evt.time)
+        self.faults = [evt for evt in self.events if evt.kind not in RECOVERY_EVENTS]
+        self.bucket = bucket
+        self.baseline = baseline
+        self.settle = settle
+        self.error_gap = error_gap
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs):
+        """Analyzer of a timeline log."""
+        ops, events = read_timeline(path)
+        return cls(ops, events, **kwargs)
+
+    def _ops_in(self, start: float, end: float, by: str = "end") -> list:
+        return [rec for rec in self.ops if start <= getattr(rec, by) < end]
+
+    def throughput(self, start: float, end: float) -> list:
+        """Successful operations per second for each bucket in [start, end)."""
+        nbuckets = max(1, int((end - start) / self.bucket + 0.5))
+        counts = [0] * nbuckets
+        for rec in self._ops_in(start, start + nbuckets * self.bucket):
+            if is_ok(rec):
+                counts[min(int((rec.end - start) / self.bucket), nbuckets - 1)] += 1
+        return [count / self.bucket for count in counts]
+
+    @staticmethod
+    def _p99_ms(records: list):
+        hist = LatencyHistogram()
+        for rec in records:
+            if is_ok(rec):
+                hist.record(rec.end - rec.start)
+        return round(hist.percentile(99) * 1e3, 3) if hist.count else None
+
+    def _error_window(self, fault_time: float, horizon: float) -> tuple:
+        """First and last error of the error cluster following the fault."""
+        errors = [rec for rec in self._ops_in(fault_time, horizon) if not is_ok(rec)]
+        if not errors:
+            return None, None, []
+        window = [errors[0]]
+        for rec in errors[1:]:
+            if rec.end - window[-1].end > self.error_gap:
+                break
+            window.append(rec)
+        return window[0], window[-1], window
+
+    # pylint: disable=too-many-locals
+    def analyze_event(self, index: int) -> dict:
+        """Impact metrics of the index'th fault event."""
+        fault = self.faults[index]
+        horizon = self.faults[index + 1].time if index + 1 < len(self.faults) else \
+            (self.ops[-1].end if self.ops else fault.time) + 1e-6
+        first, last, window = self._error_window(fault.time, horizon)
+        recovery = next((evt for evt in self.events if evt.kind in RECOVERY_EVENTS and
+                         fault.time <= evt.time < horizon), None)
+        result = {"time": fault.time, "kind": fault.kind, "target": fault.target,
+                  "time_to_first_error": None, "time_to_recovery": 0.0, "error_window": 0.0,
+                  "errors": len(window), "error_status": {},
+                  "recovery_event": round(recovery.time - fault.time, 3) if recovery else None}
+        recovered_at = fault.time
+        if first is not None:
+            result["time_to_first_error"] = round(first.end - fault.time, 3)
+            result["error_window"] = round(last.end - first.start, 3)
+            result["error_status"] = {str(status): count for status, count in
+                                      Counter(rec.status for rec in window).items()}
+            success = next((rec for rec in self._ops_in(last.end, horizon)
+                            if is_ok(rec) and rec.start >= last.start), None)
+            recovered_at = success.end if success else horizon
+            result["time_to_recovery"] = round(recovered_at - fault.time, 3)
+            result["recovered"] = success is not None
+        if recovery:
+            recovered_at = max(recovered_at, recovery.time)
+        impact_end = min(horizon, recovered_at + self.settle)
+        base_start = max(fault.time - self.baseline, self.ops[0].start if self.ops else 0)
+        base_ops = self._ops_in(base_start, fault.time)
+        base_tput = sum(map(is_ok, base_ops)) / (fault.time - base_start) \
+            if fault.time > base_start else None
+        series = self.throughput(fault.time, impact_end)
+        result["throughput"] = {
+            "baseline": round(base_tput, 3) if base_tput is not None else None,
+            "min": min(series), "mean": round(sum(series) / len(series), 3),
+            "dip_percent": round(100 * (1 - min(series) / base_tput), 1) if base_tput else None}
+        base_p99 = self._p99_ms(self._ops_in(base_start, fault.time, by="start"))
+        impact_p99 = self._p99_ms(self._ops_in(fault.time, impact_end, by="start"))
+        result["p99_ms"] = {"baseline": base_p99, "impact": impact_p99,
+                            "inflation": round(impact_p99 / base_p99, 2)
+                            if base_p99 and impact_p99 else None}
+        return result
+
+    def analyze(self) -> dict:
+        """Impact of all fault events with an overall summary."""
+        events = [self.analyze_event(idx) for idx in range(len(self.faults))]
+        total = len(self.ops)
+        errors = sum(not is_ok(rec) for rec in self.ops)
+        return {"summary": {"ops": total, "errors": errors,
+                            "availability": round(1 - errors / total, 6) if total else None,
+                            "faults": len(self.faults),
+                            "max_error_window": max((evt["error_window"] for evt in events),
+                                                    default=0.0),
+                            "max_time_to_recovery": max((evt["time_to_recovery"]
+                                                         for evt in events), default=0.0)},
+                "events": events}
+
+    def series(self) -> tuple:
+        """Bucket start offsets, successful and failed operations per second over the run."""
+        if not self.ops:
+            return [], [], []
+        start = min(rec.start for rec in self.ops)
+        ok_series = self.throughput(start, self.ops[-1].end + self.bucket)
+        err_series = [0.0] * len(ok_series)
+        for rec in self.ops:
+            if not is_ok(rec):
+                idx = min(int((rec.end - start) / self.bucket), len(err_series) - 1)
+                err_series[idx] += 1 / self.bucket
+        return [idx * self.bucket for idx in range(len(ok_series))], ok_series, err_series
+
+    def plot(self, path: str) -> bool:
+        """
+        Write the throughput/error timeline with fault events marked.
+        Html is self contained svg, other extensions need matplotlib.
+        :return: False if the plot could not be written.
+        """
+        if path.endswith((".html", ".htm")):
+            with open(path, "w") as out:
+                out.write(self._html())
+            return True
+        try:
+            import matplotlib  # pylint: disable=import-outside-toplevel
+            matplotlib.use("Agg")
+            from matplotlib import pyplot  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            LOGGER.warning("matplotlib not installed, skipping plot %s", path)
+            return False
+        times, ok_series, err_series = self.series()
+        start = min(rec.start for rec in self.ops) if self.ops else 0
+        fig, axis = pyplot.subplots(figsize=(12, 4))
+        axis.plot(times, ok_series, label="ok ops/s")
+        axis.plot(times, err_series, label="errors/s", color="red")
+        for evt in self.events:
+            axis.axvline(evt.time - start, linestyle="--",
+                         color="green" if evt.kind in RECOVERY_EVENTS else "black")
+            axis.annotate(evt.kind, (evt.time - start, max(ok_series or [1])), rotation=90,
+                          fontsize=8, va="top")
+        axis.set_xlabel("seconds")
+        axis.legend()
+        fig.savefig(path)
+        pyplot.close(fig)
+        return True
+
+    def _html(self, width: int = 1000, height: int = 300) -> str:
+        """Timeline as an html page with inline svg and the analysis table."""
+        times, ok_series, err_series = self.series()
+        start = min(rec.start for rec in self.ops) if self.ops else 0
+        span = (times[-1] + self.bucket) if times else 1
+        top = max(ok_series + err_series + [1])
+
+        def points(values):
+            return " ".join(f"{t * width / span:.1f},{height - v * height / top:.1f}"
+                            for t, v in zip(times, values))
+
+        marks = "".join(
+            f'<line x1="{(e.time - start) * width / span:.1f}" y1="0" '
+            f'x2="{(e.time - start) * width / span:.1f}" y2="{height}" stroke="'
+            f'{"green" if e.kind in RECOVERY_EVENTS else "black"}" stroke-dasharray="4"/>'
+            f'<text x="{(e.time - start) * width / span + 2:.1f}" y="12" font-size="10">'
+            f'{html.escape(e.kind)} {html.escape(e.target)}</text>' for e in self.events)
+        return (f"<html><head><title>Failover impact</title></head><body>"
+                f'<svg width="{width}" height="{height}" style="border:1px solid #ccc">'
+                f'<polyline fill="none" stroke="blue" points="{points(ok_series)}"/>'
+                f'<polyline fill="none" stroke="red" points="{points(err_series)}"/>{marks}'
+                f"</svg><p>blue: ok ops/s, red: errors/s, max {top:.1f} ops/s, "
+                f"{self.bucket}s buckets</p>"
+                f"<pre>{html.escape(json.dumps(self.analyze(), indent=2))}</pre></body></html>")
+
+
+def main(argv=None):
+    """Analyze a timeline log from the command line."""
+    parser = argparse.ArgumentParser(description="Failover impact of fault events on IO.")
+    parser.add_argument("timeline", help="Binary timeline log")
+    parser.add_argument("--json", help="Write analysis to this file instead of stdout")
+    parser.add_argument("--plot", help="Write timeline plot (.html or .png)")
+    parser.add_argument("--bucket", type=float, default=1.0)
+    parser.add_argument("--baseline", type=float, default=30.0)
+    args = parser.parse_args(argv)
+    analyzer = FailoverImpactAnalyzer.from_file(args.timeline, bucket=args.bucket,
+                                                baseline=args.baseline)
+    result = json.dumps(analyzer.analyze(), indent=2)
+    if args.json:
+        with open(args.json, "w") as out:
+            out.write(result)
+    else:
+        print(result)
+    if args.plot:
+        analyzer.plot(args.plot)
+
+
+if __name__ == "__main__":
+    main()
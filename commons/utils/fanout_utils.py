@@ -0,0 +1,151 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""Run a function against many nodes/pods concurrently with per target timeouts."""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+LOGGER = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMED_OUT = "timed-out"
+
+
+@dataclass
+class FanOutResult:
+    """Outcome of running the function against a single target."""
+
+    target: Any
+    status: str = STATUS_TIMED_OUT
+    value: Any = None
+    error: BaseException = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True if function returned without raising."""
+        return self.status == STATUS_OK
+
+
+class FanOutResults(dict):
+    """Target to FanOutResult mapping with summary helpers."""
+
+    @property
+    def all_ok(self) -> bool:
+        """True if function passed for every target."""
+        return all(res.ok for res in self.values())
+
+    def by_status(self, status: str) -> list:
+        """Return targets with given status."""
+        return [target for target, res in self.items() if res.status == status]
+
+    @property
+    def failed(self) -> list:
+        """Targets for which function raised."""
+        return self.by_status(STATUS_FAILED)
+
+    @property
+    def timed_out(self) -> list:
+        """Targets which did not complete within timeout/deadline."""
+        return self.by_status(STATUS_TIMED_OUT)
+
+    def values_ok(self) -> dict:
+        """Return target to value mapping of successful targets."""
+        return {target: res.value for target, res in self.items() if res.ok}
+
+
+# pylint: disable=too-many-locals
+def fan_out(targets: Iterable, func: Callable[[Any], Any], max_parallel: int = 16,
+            deadline: float = None, timeout: float = None) -> FanOutResults:
+    """
+    Call func(target) for every target using a bounded thread pool.
+    A target which is still running after ``timeout`` seconds of its own run time, or when the
+    overall ``deadline`` (seconds from now) expires, is reported as timed-out and abandoned.
+    Abandoned calls keep running in the background as python threads can not be killed.
+    :param targets: Nodes, pods or any hashable objects.
+    :param func: Callable taking one target.
+    :param max_parallel: Maximum concurrent calls.
+    :param deadline: Maximum seconds for the whole fan out.
+    :param timeout: Maximum seconds for a single target.
+    :return: FanOutResults dict, target -> FanOutResult, in targets order.
+    """
+    targets = list(targets)
+    results = FanOutResults((target, FanOutResult(target)) for target in targets)
+    if not targets:
+        return results
+    started = {}
+    lock = threading.Lock()
+
+    def run(target):
+        with lock:
+            started[target] = time.monotonic()
+        return func(target)
+
+    end = None if deadline is None else time.monotonic() + deadline
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(targets))),
+                                  thread_name_prefix="fan_out")
+    futures = {executor.submit(run, target): target for target in targets}
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            expiries = [] if end is None else [end]
+            if timeout is not None:
+                with lock:
+                    expiries.extend(started[futures[fut]] + timeout for fut in pending
+                                    if futures[fut] in started)
+            wait_for = max(0.0, min(expiries) - now) if expiries else None
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for fut in done:
+                target = futures[fut]
+                res = results[target]
+                res.elapsed = time.monotonic() - started.get(target, now)
+                error = fut.exception()
+                if error is None:
+                    res.status, res.value = STATUS_OK, fut.result()
+                else:
+                    LOGGER.debug("%s failed on %s: %s", func, target, error)
+                    res.status, res.error = STATUS_FAILED, error
+            now = time.monotonic()
+            expired = set()
+            for fut in pending:
+                target = futures[fut]
+                with lock:
+                    begin = started.get(target)
+                if (end is not None and now >= end) or \
+                        (timeout is not None and begin is not None and now - begin >= timeout):
+                    fut.cancel()
+                    results[target].elapsed = 0.0 if begin is None else now - begin
+                    expired.add(fut)
+            if expired:
+                LOGGER.warning("Timed out on %s", [futures[fut] for fut in expired])
+            pending -= expired
+    finally:
+        executor.shutdown(wait=False)
+    return results
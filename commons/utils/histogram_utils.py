@@ -0,0 +1,133 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""HDR style latency histogram with bounded relative error and constant time recording."""
+
+import math
+
+PERCENTILES = (25, 50, 75, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Log-linear bucketed histogram of latencies in the spirit of HdrHistogram.
+
+    Values are recorded as integer microseconds. Values below 2^sub_bits get their own bucket,
+    every further power of two range is split into 2^(sub_bits - 1) linear buckets, so the
+    relative error of any reported value is below 10^-significant_digits.
+    """
+
+    def __init__(self, significant_digits: int = 2):
+        """
+        :param significant_digits: Number of significant decimal digits kept, 1 to 4.
+        """
+        if not 1 <= significant_digits <= 4:
+            raise ValueError("significant_digits must be between 1 and 4")
+        self.significant_digits = significant_digits
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** significant_digits)) + 1
+        self._half = 1 << (self.sub_bits - 1)
+        self._linear = 1 << self.sub_bits
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value: int) -> int:
+        """Bucket index of value."""
+        if value < self._linear:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self._linear + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _value(self, index: int) -> int:
+        """Mid point value of bucket index."""
+        if index < self._linear:
+            return index
+        shift, offset = divmod(index - self._linear, self._half)
+        shift += 1
+        return ((offset + self._half) << shift) + (1 << (shift - 1))
+
+    def record(self, seconds: float, count: int = 1):
+        """Record a latency given in seconds."""
+        value = max(0, int(seconds * 1e6))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the recordings of another histogram with the same precision."""
+        if other.sub_bits != self.sub_bits:
+            raise ValueError("Histograms with different precision can not be merged")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def percentile(self, percent: float) -> float:
+        """Latency in seconds at the given percentile, 0 if nothing was recorded."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max) / 1e6
+        return self.max / 1e6
+
+    @property
+    def mean(self) -> float:
+        """Mean latency in seconds."""
+        return self.total / self.count / 1e6 if self.count else 0.0
+
+    def summary(self, percentiles=PERCENTILES) -> dict:
+        """Summary in milliseconds: count, min, mean, max and the given percentiles."""
+        summary = {"count": self.count,
+                   "min": (self.min or 0) / 1e3,
+                   "mean": self.mean * 1e3,
+                   "max": (self.max or 0) / 1e3}
+        for percent in percentiles:
+            summary[f"p{percent:g}"] = self.percentile(percent) * 1e3
+        return summary
+
+    def to_dict(self) -> dict:
+        """Serializable form, restored by from_dict."""
+        return {"significant_digits": self.significant_digits, "min": self.min,
+                "max": self.max, "total": self.total,
+                "counts": {str(index): count for index, count in self.counts.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        """Restore histogram from to_dict output."""
+        hist = cls(data["significant_digits"])
+        hist.counts = {int(index): count for index, count in data["counts"].items()}
+        hist.count = sum(hist.counts.values())
+        hist.total = data["total"]
+        hist.min = data["min"]
+        hist.max = data["max"]
+        return hist
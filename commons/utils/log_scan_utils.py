@@ -0,0 +1,291 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Scan log files for an error vocabulary in a single streaming pass.
+
+Files, plain or gzip rotated, are read in large binary chunks cut at the last line end, so a
+line is never split between two scans. Literal patterns are searched chunk wide with
+bytes.find on the (lowercased) chunk, which beats an alternation regex for vocabularies of
+tens of patterns; regex patterns use the combined regex of MultiPatternMatcher. Only lines
+with a hit are decoded, and reported with their line number, the matched patterns and lines
+of context before and after. Many files are scanned in parallel processes.
+"""
+
+import argparse
+import collections
+import gzip
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Iterable
+
+from commons.utils.pattern_utils import MultiPatternMatcher
+
+LOGGER = logging.getLogger(__name__)
+
+CHUNK_SIZE = 8 * 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+# s3bench summary line of an operation, e.g. "Errors Count:  0"
+ERRORS_COUNT = "Errors Count:"
+
+
+@dataclass
+class LogHit:
+    """Line matching one or more patterns."""
+
+    path: str
+    line_no: int
+    patterns: list
+    line: str
+    before: list = field(default_factory=list)
+    after: list = field(default_factory=list)
+
+
+@dataclass
+class ScanResult:
+    """Hits and per pattern counts of lines of a file."""
+
+    path: str
+    counts: dict
+    hits: list = field(default_factory=list)
+    lines: int = 0
+    size: int = 0
+    error: str = None
+
+    @property
+    def found(self) -> bool:
+        """True if any pattern occurs in the file."""
+        return any(self.counts.values())
+
+    def hits_of(self, patterns: Iterable[str]) -> list:
+        """Hits of any of the given patterns."""
+        patterns = set(patterns)
+        return [hit for hit in self.hits if patterns.intersection(hit.patterns)]
+
+    def to_dict(self) -> dict:
+        """Result as json serializable dict."""
+        return dict(asdict(self), found=self.found)
+
+
+def open_log(path: str):
+    """Open plain or gzip compressed log file for binary reading."""
+    with open(path, "rb") as log_file:
+        magic = log_file.read(2)
+    return gzip.open(path, "rb") if magic == GZIP_MAGIC else open(path, "rb")
+
+
+def _decode(line: bytes) -> str:
+    return line.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def _first_lines(data: bytes, count: int) -> list:
+    """Up to count complete lines at the start of data."""
+    parts = data.split(b"\n", count)
+    if len(parts) > count:
+        return parts[:count]
+    return parts if parts[-1] else parts[:-1]
+
+
+class LogScanner:
+    """Streaming scanner for a fixed vocabulary of patterns."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = True, regex: bool = False,
+                 context: int = 2, chunk_size: int = CHUNK_SIZE, max_hits: int = 1000):
+        """
+        :param patterns: Patterns to look for, duplicates are dropped.
+        :param ignore_case: Case insensitive matching.
+        :param regex: Patterns are regular expressions instead of literal strings.
+        :param context: Lines of context kept before and after every hit.
+        :param chunk_size: Bytes read at a time.
+        :param max_hits: Hits kept per file, counts include all hits.
+        """
+        self.patterns = list(dict.fromkeys(patterns))
+        if not self.patterns:
+            raise ValueError("At least one pattern is required")
+        self.ignore_case = ignore_case
+        self.regex = regex
+        self.context = context
+        self.chunk_size = chunk_size
+        self.max_hits = max_hits
+        self._matcher = MultiPatternMatcher(self.patterns, ignore_case, regex) if regex \
+            else None
+        # bytes.lower() folds ascii only, so do the needles
+        self._needles = [pat.encode().lower() if ignore_case else pat.encode()
+                         for pat in self.patterns]
+
+    def _block_hits(self, block: bytes) -> dict:
+        """Line start offset -> indexes of the patterns found in that line of block."""
+        hits = {}
+        if self.regex:
+            # surrogateescape keeps text offsets convertible back to byte offsets
+            text = block.decode("utf-8", errors="surrogateescape")
+            for match in self._matcher.finditer(text):
+                start = text.rfind("\n", 0, match.start()) + 1
+                if start not in hits:
+                    end = text.find("\n", match.start())
+                    hits[start] = self._matcher.match_line(text[start:] if end == -1
+                                                           else text[start:end])
+            # drop matches spanning lines, e.g. by \s, which match no single line
+            hits = {start: indexes for start, indexes in hits.items() if indexes}
+            offsets, done, offset = {}, 0, 0
+            for start in sorted(hits):
+                offset += len(text[done:start].encode("utf-8", errors="surrogateescape"))
+                offsets[offset], done = hits[start], start
+            return offsets
+        haystack = block.lower() if self.ignore_case else block
+        for idx, needle in enumerate(self._needles):
+            pos = haystack.find(needle)
+            while pos != -1:
+                hits.setdefault(haystack.rfind(b"\n", 0, pos) + 1, []).append(idx)
+                end = haystack.find(b"\n", pos)
+                if end == -1:
+                    break
+                # next line, a line is counted once per pattern
+                pos = haystack.find(needle, end + 1)
+        return hits
+
+    def scan_file(self, path: str) -> ScanResult:
+        """
+        Scan a plain or gzip compressed file.
+        :param path: Log file path.
+        :return: ScanResult of the file.
+        :raises OSError: When the file can not be read.
+        """
+        result = ScanResult(path, dict.fromkeys(self.patterns, 0))
+        # last lines of previous blocks, hits still waiting for lines after them
+        recent = collections.deque(maxlen=self.context)
+        pending = []
+        carry = b""
+        with open_log(path) as log_file:
+            while True:
+                chunk = log_file.read(self.chunk_size)
+                result.size += len(chunk)
+                buffer = carry + chunk
+                # the block ends with the last complete line, the rest is carried over
+                cut = len(buffer) if not chunk else buffer.rfind(b"\n") + 1
+                block, carry = buffer[:cut], buffer[cut:]
+                if block:
+                    pending = self._scan_block(block, result, recent, pending)
+                if not chunk:
+                    return result
+
+    def _scan_file_safe(self, path: str) -> ScanResult:
+        try:
+            return self.scan_file(path)
+        except (OSError, EOFError) as error:
+            LOGGER.error("Failed to scan %s: %s", path, error)
+            return ScanResult(path, dict.fromkeys(self.patterns, 0), error=str(error))
+
+    def _scan_block(self, block: bytes, result: ScanResult, recent: collections.deque,
+                    pending: list) -> list:
+        """Record hits of block, return hits still missing lines of context after them."""
+        first_line = result.lines + 1
+        result.lines += block.count(b"\n") + (not block.endswith(b"\n"))
+        if pending:
+            lines = [_decode(line) for line in _first_lines(block, self.context)]
+            for hit in pending:
+                hit.after.extend(lines[:self.context - len(hit.after)])
+            pending = [hit for hit in pending if len(hit.after) < self.context]
+        line_no, counted = first_line, 0
+        for start, indexes in sorted(self._block_hits(block).items()):
+            for idx in indexes:
+                result.counts[self.patterns[idx]] += 1
+            if len(result.hits) >= self.max_hits:
+                continue
+            line_no += block.count(b"\n", counted, start)
+            counted = start
+            end = block.find(b"\n", start)
+            end = len(block) if end == -1 else end
+            hit = LogHit(result.path, line_no, [self.patterns[idx] for idx in indexes],
+                         _decode(block[start:end]))
+            if self.context:
+                before = block[max(0, self._line_back(block, start)):start].split(b"\n")[:-1]
+                missing = self.context - len(before)
+                hit.before = (list(recent)[-missing:] if missing > 0 else []) + \
+                    [_decode(line) for line in before]
+                hit.after = [_decode(line) for line in
+                             _first_lines(block[end + 1:], self.context)]
+                if len(hit.after) < self.context:
+                    pending.append(hit)
+            result.hits.append(hit)
+        if self.context:
+            tail = block[self._line_back(block, len(block)):].split(b"\n")[:-1]
+            recent.extend(_decode(line) for line in tail)
+        return pending
+
+    def _line_back(self, block: bytes, pos: int) -> int:
+        """Offset of the line start context lines before the line starting at pos."""
+        for _ in range(self.context):
+            if pos <= 0:
+                return 0
+            pos = block.rfind(b"\n", 0, pos - 1) + 1
+        return pos
+
+    def scan_files(self, paths: Iterable[str], max_workers: int = None) -> dict:
+        """
+        Scan files in parallel processes.
+        :param paths: Log file paths.
+        :param max_workers: Processes, default number of cores.
+        :return: path -> ScanResult in paths order, error is set for unreadable files.
+        """
+        paths = list(paths)
+        workers = min(len(paths), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            return {path: self._scan_file_safe(path) for path in paths}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(paths, executor.map(self._scan_file_safe, paths)))
+
+
+def total_counts(results: Iterable[ScanResult]) -> dict:
+    """Pattern counts summed over scan results."""
+    counts = collections.Counter()
+    for result in results:
+        counts.update(result.counts)
+    return dict(counts)
+
+
+def main(argv=None) -> int:
+    """Scan files and print results as json, exit code 1 if any pattern was found."""
+    parser = argparse.ArgumentParser(description="Scan log files for error patterns")
+    parser.add_argument("paths", nargs="+", help="log files, plain or gzip")
+    parser.add_argument("-p", "--pattern", action="append", required=True,
+                        help="pattern, repeat for more")
+    parser.add_argument("--regex", action="store_true", help="patterns are regexes")
+    parser.add_argument("--case_sensitive", action="store_true")
+    parser.add_argument("--context", type=int, default=2, help="lines of context")
+    parser.add_argument("--workers", type=int, default=None, help="parallel processes")
+    args = parser.parse_args(argv)
+    scanner = LogScanner(args.pattern, ignore_case=not args.case_sensitive, regex=args.regex,
+                         context=args.context)
+    results = scanner.scan_files(args.paths, args.workers)
+    json.dump({"counts": total_counts(results.values()),
+               "files": [result.to_dict() for result in results.values()]},
+              sys.stdout, indent=2)
+    return int(any(result.found for result in results.values()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Slice a time window out of a time ordered log file without reading the whole file.
+
+The window boundaries are found by binary search on byte offsets: seek to the middle, resync
+to the next line start and parse the first timestamped line from there. Lines without a
+timestamp (stack traces, continuation lines) belong to the preceding timestamped line.
+
+The module only depends on the standard library, it is copied to the nodes and run there
+so that only the window is read and transferred::
+
+    python3 log_slice_utils.py --format s3server --start "..." --end "..." <log file>
+"""
+
+import argparse
+import mmap
+import os
+import re
+import sys
+from datetime import datetime
+
+# Year used for formats which do not log the year.
+NO_YEAR = 1900
+CHUNK_SIZE = 1024 * 1024
+
+
+class TimestampFormat:
+    """Timestamp format of a log: regex for the leading stamp and its strptime format."""
+
+    def __init__(self, pattern: str, strp_format: str, has_year: bool = True):
+        """
+        :param pattern: Regex capturing the timestamp, matched at line start. Multiple groups
+        are joined with a space.
+        :param strp_format: strptime format of the captured groups.
+        :param has_year: False if the stamp does not carry the year.
+        """
+        self.regex = re.compile(pattern.encode())
+        self.strp_format = strp_format
+        self.has_year = has_year
+
+    def __call__(self, line: bytes):
+        """Timestamp of line as datetime, None if line does not start with one."""
+        match = self.regex.match(line)
+        if match is None:
+            return None
+        try:
+            stamp = " ".join(group.decode() for group in match.groups())
+            return datetime.strptime(" ".join(stamp.split()), self.strp_format)
+        except ValueError:
+            return None
+
+    def normalize(self, value) -> datetime:
+        """
+        Convert window boundary (datetime or string) to a value comparable with stamps.
+        Strings are isoformat, in the format of the log or syslog "Mon DD HH:MM:SS" as used
+        by the log collection of every format. A syslog boundary of a log stamped with the
+        year gets the latest year not putting it in the future.
+        """
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                parsed = self(value.encode())
+                if parsed is None:
+                    parsed = TIMESTAMP_FORMATS["syslog"](value.encode())
+                    if parsed is None:
+                        raise
+                    if self.has_year:
+                        now = datetime.now()
+                        parsed = parsed.replace(year=now.year)
+                        if parsed > now:
+                            parsed = parsed.replace(year=now.year - 1)
+                value = parsed
+        if not self.has_year:
+            value = value.replace(year=NO_YEAR)
+        return value
+
+
+TIMESTAMP_FORMATS = {
+    # Dec 12 16:06:01 (syslog, rsyslog forwarded haproxy, ras and provisioner logs)
+    "syslog": TimestampFormat(r"([A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2})", "%b %d %H:%M:%S",
+                              has_year=False),
+    # I1212 16:06:01.123456 (glog format of s3server)
+    "s3server": TimestampFormat(r"[IWEF](\d{4} \d{2}:\d{2}:\d{2}\.\d{6})", "%m%d %H:%M:%S.%f",
+                                has_year=False),
+    # motr[123]:  2021-12-12-16:06:01 or 2021-12-12 16:06:01 (m0d and m0trace)
+    "motr": TimestampFormat(r"(?:\S+:\s+)?(\d{4}-\d{2}-\d{2})[- ](\d{2}:\d{2}:\d{2})",
+                            "%Y-%m-%d %H:%M:%S"),
+    # haproxy.log: Dec 12 16:06:01 node haproxy[123]: ...
+    "haproxy": TimestampFormat(r"([A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2})",
+                               "%b %d %H:%M:%S", has_year=False),
+    # 2021-12-12 16:06:01,123 [INFO] ... (hare python logging)
+    "hare": TimestampFormat(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d{3}",
+                            "%Y-%m-%d %H:%M:%S"),
+}
+
+
+def _line_start_after(fobj, pos: int) -> int:
+    """Offset of the first line starting at or after pos."""
+    if pos == 0:
+        return 0
+    fobj.seek(pos - 1)
+    fobj.readline()
+    return fobj.tell()
+
+
+def _next_stamp(fobj, pos: int, size: int, parser) -> tuple:
+    """(offset, stamp) of the first timestamped line starting at or after line start pos."""
+    fobj.seek(pos)
+    while pos < size:
+        line = fobj.readline()
+        stamp = parser(line)
+        if stamp is not None:
+            return pos, stamp
+        pos += len(line)
+    return size, None
+
+
+# pylint: disable=too-many-arguments
+def find_offset(fobj, size: int, target: datetime, parser, strict: bool = False,
+                stats: dict = None) -> int:
+    """
+    Binary search for the first timestamped line with stamp >= target (> target if strict).
+    :param fobj: Binary file object or mmap supporting seek/readline/tell.
+    :param size: Size of the file.
+    :param target: Normalized boundary.
+    :param parser: Callable returning the timestamp of a line or None.
+    :param strict: Search for stamp > target.
+    :param stats: Optional dict, "probes" is incremented per probe.
+    :return: Byte offset of the line, size if there is none.
+    """
+    low, high, result = 0, size, size
+    while low < high:
+        mid = (low + high) // 2
+        if stats is not None:
+            stats["probes"] = stats.get("probes", 0) + 1
+        pos, stamp = _next_stamp(fobj, _line_start_after(fobj, mid), size, parser)
+        if pos >= high:
+            # No timestamped line starts in [mid, high)
+            high = mid
+        elif stamp > target or (stamp == target and not strict):
+            result, high = pos, mid
+        else:
+            low = pos + 1
+    return result
+
+
+# pylint: disable=too-many-arguments
+def window_offsets(fobj, size: int, start, end, fmt: str = "syslog",
+                   stats: dict = None) -> tuple:
+    """
+    Byte range [begin, finish) of the lines logged within [start, end].
+    :param start: Window start, datetime or string (ISO or in the log's own format).
+    :param end: Window end, datetime or string.
+    :param fmt: Key of TIMESTAMP_FORMATS.
+    :return: (begin, finish) offsets.
+    """
+    parser = TIMESTAMP_FORMATS[fmt]
+    begin = find_offset(fobj, size, parser.normalize(start), parser, stats=stats)
+    finish = find_offset(fobj, size, parser.normalize(end), parser, strict=True, stats=stats)
+    return begin, max(begin, finish)
+
+
+def iter_window(path: str, start, end, fmt: str = "syslog", stats: dict = None):
+    """
+    Yield the bytes of the window of a local file in chunks, the file is mmapped.
+    :param path: Log file.
+    """
+    with open(path, "rb") as fobj:
+        size = os.fstat(fobj.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            begin, finish = window_offsets(mapped, size, start, end, fmt, stats)
+            for offset in range(begin, finish, CHUNK_SIZE):
+                yield mapped[offset:min(offset + CHUNK_SIZE, finish)]
+
+
+# pylint: disable=too-many-arguments
+def slice_file(path: str, start, end, out_path: str, fmt: str = "syslog",
+               stats: dict = None) -> int:
+    """
+    Write the window of a local log file to out_path.
+    :return: Number of bytes written.
+    """
+    written = 0
+    with open(out_path, "wb") as out:
+        for chunk in iter_window(path, start, end, fmt, stats):
+            out.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def main(argv=None):
+    """Write the window of the log file to stdout."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--format", default="syslog", choices=sorted(TIMESTAMP_FORMATS))
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+    for chunk in iter_window(args.path, args.start, args.end, args.format):
+        sys.stdout.buffer.write(chunk)
+    sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
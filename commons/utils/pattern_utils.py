@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""Match many patterns against text in a single pass."""
+
+import re
+from typing import Iterable
+
+
+class MultiPatternMatcher:
+    """
+    Matcher for a fixed vocabulary of literal (or regex) patterns.
+
+    All patterns are compiled once into a single alternation regex which rejects the vast
+    majority of lines in one C level scan. Only lines hit by the combined regex are resolved
+    to the individual patterns, so patterns which overlap or share a prefix are all reported.
+    """
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = False,
+                 regex: bool = False):
+        """
+        :param patterns: Patterns to look for, duplicates are dropped.
+        :param ignore_case: Case insensitive matching.
+        :param regex: Patterns are regular expressions instead of literal strings.
+        """
+        self.patterns = list(dict.fromkeys(patterns))
+        if not self.patterns:
+            raise ValueError("At least one pattern is required")
+        # ^ and $ anchor at every line when a whole block of lines is searched
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        sources = self.patterns if regex else [re.escape(pat) for pat in self.patterns]
+        self._combined = re.compile("|".join(f"(?:{src})" for src in
+                                             sorted(sources, key=len, reverse=True)), flags)
+        self._each = [re.compile(src, flags) for src in sources]
+
+    def search(self, text: str) -> bool:
+        """True if any pattern occurs in text."""
+        return self._combined.search(text) is not None
+
+    def match_line(self, line: str, candidates: Iterable[int] = None) -> list:
+        """
+        Return indexes of the patterns found in line.
+        :param line: Text to be matched.
+        :param candidates: Restrict resolution to these pattern indexes, e.g. the ones not yet
+        seen.
+        :return: list of pattern indexes.
+        """
+        if self._combined.search(line) is None:
+            return []
+        indexes = range(len(self.patterns)) if candidates is None else candidates
+        return [idx for idx in indexes if self._each[idx].search(line)]
+
+    def finditer(self, text: str):
+        """Iterate over matches of any pattern in text, e.g. a whole block of lines."""
+        return self._combined.finditer(text)
@@ -0,0 +1,335 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Build over build performance regression detection.
+
+Repeated runs (BenchResult) of a candidate build are compared per workload and metric with
+the runs of a rolling baseline of the previous builds. A one sided Mann-Whitney U test or a
+bootstrap confidence interval of the change of the median decides if a throughput drop or
+latency increase is significant, changes smaller than min_change are ignored as noise. The
+verdict is a json serializable dict and can be written as csv or html diff.
+"""
+
+import argparse
+import csv
+import html
+import json
+import logging
+import math
+import random
+import statistics
+import sys
+from collections import OrderedDict
+
+from commons.utils.bench_result_utils import load_results
+
+LOGGER = logging.getLogger(__name__)
+
+HIGHER_IS_BETTER = 1
+LOWER_IS_BETTER = -1
+# metric: direction
+METRICS = OrderedDict([("throughput", HIGHER_IS_BETTER), ("iops", HIGHER_IS_BETTER),
+                       ("latency.avg", LOWER_IS_BETTER), ("latency.p50", LOWER_IS_BETTER),
+                       ("latency.p99", LOWER_IS_BETTER), ("ttfb.p99", LOWER_IS_BETTER)])
+MANN_WHITNEY = "mannwhitney"
+BOOTSTRAP = "bootstrap"
+EXACT_LIMIT = 20
+CSV_FIELDS = ["workload", "metric", "baseline_n", "candidate_n", "baseline_median",
+              "candidate_median", "change", "p_value", "ci_low", "ci_high", "regression",
+              "improvement"]
+
+
+def _u_distribution(len_a: int, len_b: int) -> list:
+    """Number of rank orderings giving each U value for sample sizes without ties."""
+    # counts[n][u] for samples of size i and n, built up over i
+    table = [[1] + [0] * (len_b * len_a) for _ in range(len_b + 1)]
+    for size_a in range(1, len_a + 1):
+        new = [[0] * (len_b * len_a + 1) for _ in range(len_b + 1)]
+        new[0][0] = 1
+        for size_b in range(1, len_b + 1):
+            for u_val in range(size_a * size_b + 1):
+                # largest value belongs to a (adds size_b to U) or to b
+                new[size_b][u_val] = (table[size_b][u_val - size_b] if u_val >= size_b else 0) \
+                    + new[size_b - 1][u_val]
+        table = new
+    return table[len_b][:len_a * len_b + 1]
+
+
+def mann_whitney_u(sample_a: list, sample_b: list) -> float:
+    """
+    One sided Mann-Whitney U test.
+    :return: p-value of the hypothesis that values of sample_a tend to be greater than
+    values of sample_b, exact for small samples without ties else normal approximation
+    """
+    len_a, len_b = len(sample_a), len(sample_b)
+    values = sorted((value, group) for group, sample in enumerate((sample_a, sample_b))
+                    for value in sample)
+    rank_sum_a = 0.0
+    tie_term = 0
+    index = 0
+    while index < len(values):
+        end = index
+        while end + 1 < len(values) and values[end + 1][0] == values[index][0]:
+            end += 1
+        rank = (index + end) / 2 + 1
+        ties = end - index + 1
+        tie_term += ties ** 3 - ties
+        rank_sum_a += rank * sum(1 for pos in range(index, end + 1) if values[pos][1] == 0)
+        index = end + 1
+    u_a = rank_sum_a - len_a * (len_a + 1) / 2
+    if not tie_term and len_a + len_b <= EXACT_LIMIT:
+        dist = _u_distribution(len_a, len_b)
+        return sum(dist[int(u_a):]) / sum(dist)
+    mean = len_a * len_b / 2
+    total = len_a + len_b
+    var = len_a * len_b / 12 * ((total + 1) - tie_term / (total * (total - 1)))
+    if var <= 0:
+        return 1.0
+    z_val = (u_a - mean - 0.5) / math.sqrt(var)
+    return 0.5 * math.erfc(z_val / math.sqrt(2))
+
+
+def bootstrap_change_ci(baseline: list, candidate: list, confidence: float = 0.95,
+                        samples: int = 2000, seed: int = 0) -> tuple:
+    """
+    Bootstrap confidence interval of the relative change of the median,
+    candidate median / baseline median - 1.
+    :return: (low, high)
+    """
+    rand = random.Random(seed)
+    changes = []
+    for _ in range(samples):
+        base = statistics.median(rand.choices(baseline, k=len(baseline)))
+        cand = statistics.median(rand.choices(candidate, k=len(candidate)))
+        if base:
+            changes.append(cand / base - 1)
+    if not changes:
+        return 0.0, 0.0
+    changes.sort()
+    tail = (1 - confidence) / 2
+    return (changes[int(tail * (len(changes) - 1))],
+            changes[int(math.ceil((1 - tail) * (len(changes) - 1)))])
+
+
+def _order_builds(builds) -> list:
+    """Builds in numeric order if all are numbers else in first seen order."""
+    builds = list(OrderedDict.fromkeys(builds))
+    try:
+        return sorted(builds, key=float)
+    except (TypeError, ValueError):
+        return builds
+
+
+class RegressionDetector:
+    """Compare candidate build runs with a rolling baseline of previous builds."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, baseline_builds: int = 5, test: str = MANN_WHITNEY, alpha: float = 0.05,
+                 min_change: float = 0.05, metrics: dict = None, bootstrap_samples: int = 2000,
+                 seed: int = 0):
+        """
+        :param baseline_builds: Number of previous builds in the baseline
+        :param test: mannwhitney or bootstrap
+        :param alpha: Significance level, bootstrap uses a 1 - 2 * alpha confidence interval
+        so both tests are one sided at alpha
+        :param min_change: Smallest relative change reported, e.g. 0.05 for 5%
+        :param metrics: {metric: direction}, default METRICS
+        :param bootstrap_samples: Bootstrap resamples
+        :param seed: Seed of bootstrap resampling
+        """
+        if test not in (MANN_WHITNEY, BOOTSTRAP):
+            raise ValueError(f"Unknown test {test}")
+        self.baseline_builds = baseline_builds
+        self.test = test
+        self.alpha = alpha
+        self.min_change = min_change
+        self.metrics = metrics or METRICS
+        self.bootstrap_samples = bootstrap_samples
+        self.seed = seed
+
+    def compare(self, baseline: list, candidate: list, direction: int) -> dict:
+        """
+        Compare metric values of baseline and candidate runs.
+        :return: medians, relative change, p_value or ci and regression/improvement flags
+        """
+        base_median = statistics.median(baseline)
+        cand_median = statistics.median(candidate)
+        change = cand_median / base_median - 1 if base_median else 0.0
+        result = {"baseline_n": len(baseline), "candidate_n": len(candidate),
+                  "baseline_median": base_median, "candidate_median": cand_median,
+                  "change": change, "p_value": None, "ci_low": None, "ci_high": None}
+        worse = change * direction <= -self.min_change
+        better = change * direction >= self.min_change
+        if self.test == MANN_WHITNEY:
+            if direction == HIGHER_IS_BETTER:
+                p_worse = mann_whitney_u(baseline, candidate)
+                p_better = mann_whitney_u(candidate, baseline)
+            else:
+                p_worse = mann_whitney_u(candidate, baseline)
+                p_better = mann_whitney_u(baseline, candidate)
+            result["p_value"] = p_worse if change * direction < 0 else p_better
+            worse = worse and p_worse < self.alpha
+            better = better and p_better < self.alpha
+        else:
+            low, high = bootstrap_change_ci(baseline, candidate, 1 - 2 * self.alpha,
+                                            self.bootstrap_samples, self.seed)
+            result.update(ci_low=low, ci_high=high)
+            worse = worse and (high < 0 if direction == HIGHER_IS_BETTER else low > 0)
+            better = better and (low > 0 if direction == HIGHER_IS_BETTER else high < 0)
+        result.update(regression=worse, improvement=better)
+        return result
+
+    def detect(self, history: list, build: str, candidate: list = None) -> dict:
+        """
+        Detect regressions of a build.
+        :param history: BenchResults of previous builds (may include the candidate build)
+        :param build: Candidate build
+        :param candidate: BenchResults of the candidate build, taken from history if None
+        :return: Verdict with status regression/pass/no_baseline and comparisons
+        """
+        if candidate is None:
+            candidate = [res for res in history if res.build == build]
+        ordered = _order_builds([res.build for res in history] + [build])
+        baseline_builds = ordered[:ordered.index(build)][-self.baseline_builds:]
+        baseline = {}
+        for res in history:
+            if res.build in baseline_builds:
+                baseline.setdefault(res.key(), []).append(res)
+        runs = OrderedDict()
+        for res in candidate:
+            runs.setdefault(res.key(), []).append(res)
+        comparisons = []
+        missing = []
+        for key, cand_runs in runs.items():
+            if key not in baseline:
+                missing.append(cand_runs[0].key_str())
+                continue
+            for metric, direction in self.metrics.items():
+                base_values = [value for value in (res.metric(metric) for res in baseline[key])
+                               if value is not None]
+                cand_values = [value for value in (res.metric(metric) for res in cand_runs)
+                               if value is not None]
+                if not base_values or not cand_values:
+                    continue
+                comparison = {"workload": cand_runs[0].key_str(), "metric": metric}
+                comparison.update(self.compare(base_values, cand_values, direction))
+                comparisons.append(comparison)
+            # errors are not expected to vary, more errors than any baseline run regress
+            base_errors = [res.errors or 0 for res in baseline[key]]
+            cand_errors = [res.errors or 0 for res in cand_runs]
+            if statistics.median(cand_errors) > max(base_errors):
+                comparisons.append({
+                    "workload": cand_runs[0].key_str(), "metric": "errors",
+                    "baseline_n": len(base_errors), "candidate_n": len(cand_errors),
+                    "baseline_median": statistics.median(base_errors),
+                    "candidate_median": statistics.median(cand_errors), "change": None,
+                    "p_value": None, "ci_low": None, "ci_high": None, "regression": True,
+                    "improvement": False})
+        regressions = [comp for comp in comparisons if comp["regression"]]
+        if regressions:
+            status = "regression"
+        elif comparisons:
+            status = "pass"
+        else:
+            status = "no_baseline"
+        verdict = {"build": build, "baseline_builds": baseline_builds, "test": self.test,
+                   "alpha": self.alpha, "min_change": self.min_change, "status": status,
+                   "regressions": len(regressions),
+                   "improvements": sum(1 for comp in comparisons if comp["improvement"]),
+                   "missing_baseline": missing, "comparisons": comparisons}
+        LOGGER.info("Build %s against %s: %s, %s regressions", build, baseline_builds, status,
+                    len(regressions))
+        return verdict
+
+
+def write_csv(verdict: dict, path: str):
+    """Write comparisons of a verdict as csv."""
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(verdict["comparisons"])
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return "" if value is None else str(value)
+
+
+def write_html(verdict: dict, path: str):
+    """Write verdict as html table, regressions red and improvements green."""
+    rows = []
+    for comp in verdict["comparisons"]:
+        color = "#f8d0d0" if comp["regression"] else "#d0f0d0" if comp["improvement"] else ""
+        change = "" if comp["change"] is None else f"{comp['change'] * 100:+.1f}%"
+        cells = [comp["workload"], comp["metric"], _fmt(comp["baseline_median"]),
+                 _fmt(comp["candidate_median"]), change, _fmt(comp["p_value"]),
+                 _fmt(comp["ci_low"]), _fmt(comp["ci_high"])]
+        rows.append(f'<tr style="background:{color}">' + "".join(
+            f"<td>{html.escape(cell)}</td>" for cell in cells) + "</tr>")
+    header = "".join(f"<th>{name}</th>" for name in
+                     ["Workload", "Metric", "Baseline median", "Candidate median", "Change",
+                      "p-value", "CI low", "CI high"])
+    with open(path, "w") as html_file:
+        html_file.write(
+            f"<html><head><title>Performance regression {html.escape(verdict['build'])}"
+            f"</title></head><body><h3>Build {html.escape(verdict['build'])}: "
+            f"{verdict['status']} ({verdict['regressions']} regressions) against builds "
+            f"{html.escape(', '.join(verdict['baseline_builds']))}, {verdict['test']} "
+            f"alpha {verdict['alpha']}</h3><table border=\"1\">{header}{''.join(rows)}"
+            f"</table></body></html>")
+
+
+def main(argv=None):
+    """Detect regressions of a build from json lines results."""
+    parser = argparse.ArgumentParser(description="Build over build performance regressions.")
+    parser.add_argument("history", help="Json lines BenchResults of previous builds")
+    parser.add_argument("build", help="Candidate build")
+    parser.add_argument("--candidate", help="Json lines BenchResults of the candidate build, "
+                                            "taken from history if not given")
+    parser.add_argument("--baseline_builds", type=int, default=5)
+    parser.add_argument("--test", choices=[MANN_WHITNEY, BOOTSTRAP], default=MANN_WHITNEY)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--min_change", type=float, default=0.05)
+    parser.add_argument("--verdict", help="Write verdict json to this file instead of stdout")
+    parser.add_argument("--csv", help="Write csv diff")
+    parser.add_argument("--html", help="Write html diff")
+    args = parser.parse_args(argv)
+    history = load_results(args.history)
+    candidate = load_results(args.candidate) if args.candidate else None
+    for res in candidate or []:
+        res.build = args.build
+    detector = RegressionDetector(args.baseline_builds, args.test, args.alpha, args.min_change)
+    verdict = detector.detect(history, args.build, candidate)
+    result = json.dumps(verdict, indent=2)
+    if args.verdict:
+        with open(args.verdict, "w") as out:
+            out.write(result)
+    else:
+        print(result)
+    if args.csv:
+        write_csv(verdict, args.csv)
+    if args.html:
+        write_html(verdict, args.html)
+    return 1 if verdict["status"] == "regression" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
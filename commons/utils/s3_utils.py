@@ -28,6 +28,7 @@ import time
 import urllib
 from hashlib import md5
 from hashlib import sha256
+from random import Random
 from random import randint
 from random import shuffle
 from typing import Any
@@ -40,6 +41,10 @@ from config import S3_CFG
 
 LOGGER = logging.getLogger(__name__)
 
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+# Keys a DeleteObjects request takes at most
+DELETE_BATCH = 1000
+
 
 def utf8_encode(msg):
     """Encode the msg into utf-8."""
@@ -159,6 +164,45 @@ def sign_request_v4(method=None, canonical_uri='/', body='', epoch_t=None, host=
     return authorization_header
 
 
+def get_s3_auth_headers_v4(method, host, canonical_uri, access_key, secret_key, epoch_t=None,
+                           **kwargs) -> dict:
+    """
+    Calculate aws v4 headers of an S3 object/bucket request.
+
+    signed_headers = 'host;x-amz-content-sha256;x-amz-date'
+    :param method: HTTP method.
+    :param host: Host header value (host:port).
+    :param canonical_uri: URI encoded path e.g. /bucket/key.
+    :keyword payload_hash: sha256 hex digest of the body, UNSIGNED-PAYLOAD by default.
+    :keyword query: Canonical query string.
+    :keyword signing_key: Signing key of the date from get_v4_signature_key, saves four HMAC
+    computations per request when signing many requests.
+    :return: dict of Authorization, x-amz-content-sha256 and x-amz-date headers.
+    """
+    service = kwargs.get("service", "s3")
+    region = kwargs.get("region", S3_CFG["region"])
+    payload_hash = kwargs.get("payload_hash", UNSIGNED_PAYLOAD)
+    query = kwargs.get("query", "")
+    epoch_t = epoch_t or datetime.datetime.utcnow()
+    amz_date = get_timestamp(epoch_t)
+    signing_key = kwargs.get("signing_key") or get_v4_signature_key(
+        secret_key, get_date(epoch_t), region, service)
+    signed_headers = 'host;x-amz-content-sha256;x-amz-date'
+    canonical_headers = 'host:' + host + '\n' + 'x-amz-content-sha256:' + payload_hash + '\n' + \
+        'x-amz-date:' + amz_date + '\n'
+    canonical_request = method + '\n' + canonical_uri + '\n' + query + '\n' + \
+        canonical_headers + '\n' + signed_headers + '\n' + payload_hash
+    credential_scope = get_date(epoch_t) + '/' + region + '/' + service + '/' + 'aws4_request'
+    string_to_sign = 'AWS4-HMAC-SHA256' + '\n' + amz_date + '\n' + credential_scope + '\n' + \
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+    signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    return {'Authorization': 'AWS4-HMAC-SHA256' + ' ' + 'Credential=' + access_key + '/' +
+                             credential_scope + ', ' + 'SignedHeaders=' + signed_headers +
+                             ', ' + 'Signature=' + signature,
+            'x-amz-content-sha256': payload_hash,
+            'x-amz-date': amz_date}
+
+
 def get_headers(request=None, endpoint=None, payload=None, **kwargs) -> dict:
     """Get the aws s3 rest headers."""
     # Get host value from url https://iam.seagate.com:9443
@@ -397,3 +441,13 @@ def create_random_file(file_path, min_size, max_size):
     with open(file_path, 'wb') as fout:
         fout.write(os.urandom(randint(const.Sizes.MB * int(min_size),  # nosec
                                       const.Sizes.MB * int(max_size))))
+
+
+def seeded_payload(seed: int, size: int) -> bytes:
+    """
+    Deterministic pseudo random payload of size bytes for seed, the bytes Random.randbytes
+    gives on python 3.9+ but built with getrandbits as python 3.7 has no randbytes.
+    """
+    if size <= 0:
+        return b""
+    return Random(seed).getrandbits(8 * size).to_bytes(size, "little")
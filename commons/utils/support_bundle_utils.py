@@ -29,6 +29,8 @@ from commons.helpers.pods_helper import LogicalNode
 from commons import commands as cm_cmd
 from commons import constants as cm_const
 from commons.utils import assert_utils
+from commons.utils.bundle_collector_utils import SSHPodExecutor
+from commons.utils.bundle_collector_utils import SupportBundleCollector
 from config import CMN_CFG
 
 # Global Constants
@@ -276,6 +278,29 @@ def collect_crash_files_k8s(local_dir_path: str):
         LOGGER.info("No crash files are generated.")
 
 
+def collect_support_bundles_parallel_k8s(local_dir_path: str, sb_identifier: str,
+                                        msg: str = "SB", pod_prefix: str = None,
+                                        crash_files: bool = True):
+    """
+    Generate support bundles on all pods in parallel and stream them and the crash files
+    (deduplicated by content) to client.
+    :param local_dir_path: local dir path on client
+    :param sb_identifier: support bundle identifier
+    :param msg: Relevant comment to link to support bundle request
+    :param pod_prefix: prefix of pods to collect from, default data pods
+    :param crash_files: collect crash files as well
+    :return: manifest dict with sizes and checksums, also written as manifest.json
+    """
+    for node in CMN_CFG["nodes"]:
+        if node["node_type"] == "master":
+            m_node_obj = LogicalNode(hostname=node["hostname"], username=node["username"],
+                                     password=node["password"])
+    pod_list = m_node_obj.get_all_pods(pod_prefix=pod_prefix or cm_const.POD_NAME_PREFIX)
+    collector = SupportBundleCollector(SSHPodExecutor(m_node_obj), pod_list, local_dir_path,
+                                       container=cm_const.HAX_CONTAINER_NAME)
+    return collector.collect(sb_identifier, msg=msg, crash_files=crash_files)
+
+
 def generate_sb_lc(dest_dir: str, sb_identifier: str,
                    pod_name: str = None, msg: str = "SB", container_name: str = None):
     """
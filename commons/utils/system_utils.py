@@ -40,6 +40,8 @@ from paramiko import SSHClient, AutoAddPolicy
 from commons import commands
 from commons import params
 from commons.constants import AWS_CLI_ERROR
+from commons.utils.log_scan_utils import ERRORS_COUNT
+from commons.utils.log_scan_utils import LogScanner
 
 if sys.platform == 'win32':
     try:
@@ -1153,25 +1155,24 @@ def validate_s3bench_parallel_execution(log_dir=None, log_prefix=None, log_path=
     """
     LOGGER.info("S3 parallel ios log validation started...")
     if log_dir and os.path.isdir(log_dir):
-        log_path = [filepath for filepath in sorted(
-            glob.glob(os.path.abspath(log_dir) + '/**'),
-            key=os.path.getctime)
-                    if os.path.basename(filepath).startswith(log_prefix)][-1]
+        log_path = max(glob.glob(os.path.join(os.path.abspath(log_dir), f"{log_prefix}*")),
+                       key=os.path.getctime, default=None)
     LOGGER.info("IO log path: %s", log_path)
-    if not os.path.isfile(log_path):
+    if not log_path or not os.path.isfile(log_path):
         return False, f"failed to generate logs for parallel run: {log_prefix}."
-    lines = open(log_path).readlines()
-    resp_filtered = [
-        line for line in lines if 'Errors Count:' in line and "reportFormat" not in line]
+    error_kws = ["with error ", "panic", "status code", "exit status 2",
+                 "InternalError", "ServiceUnavailable"]
+    result = LogScanner(error_kws + [ERRORS_COUNT], ignore_case=False,
+                        context=0).scan_file(log_path)
+    resp_filtered = [hit.line for hit in result.hits_of([ERRORS_COUNT])
+                     if "reportFormat" not in hit.line]
     LOGGER.info("'Error count' filtered list: %s", resp_filtered)
     for response in resp_filtered:
         if int(response.split(":")[1].strip()) != 0:
             return False, response
     LOGGER.info("Observed no Error count in io log.")
-    error_kws = ["with error ", "panic", "status code", "exit status 2",
-                 "InternalError", "ServiceUnavailable"]
     for error in error_kws:
-        if error in ",".join(lines):
+        if result.counts[error]:
             return False, f"{error} Found in S3Bench Run."
     LOGGER.info("Observed no Error keyword '%s' in io log.", error_kws)
     # remove_file(log_path)  # Keeping logs for FA/Debugging.
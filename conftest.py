@@ -50,6 +50,7 @@ from commons import constants as const
 from commons.helpers.health_helper import Health
 from commons.utils import assert_utils
 from commons.utils import config_utils
+from commons.utils.fanout_utils import fan_out
 from commons.utils import jira_utils
 from commons.utils import system_utils
 from config import CMN_CFG
@@ -779,18 +780,26 @@ def check_cortx_cluster_health():
     """Check the cluster health before each test is picked up for run."""
     LOGGER.info("Check cluster status for all nodes.")
     nodes = CMN_CFG["nodes"]
-    for node in nodes:
-        if CMN_CFG.get("product_family") == const.PROD_FAMILY_LC:
-            if node["node_type"].lower() != "master":
-                continue
-        hostname = node['hostname']
+    if CMN_CFG.get("product_family") == const.PROD_FAMILY_LC:
+        nodes = [node for node in nodes if node["node_type"].lower() == "master"]
+
+    def node_health(hostname):
+        node = next(node for node in nodes if node["hostname"] == hostname)
         health = Health(hostname=hostname,
                         username=node['username'],
                         password=node['password'])
-        result = health.check_node_health()
-        assert_utils.assert_true(result[0],
-                                 f'Cluster Node {hostname} failed in health check. Reason: {result}')
-        health.disconnect()
+        try:
+            return health.check_node_health()
+        finally:
+            health.disconnect()
+
+    results = fan_out([node["hostname"] for node in nodes], node_health, max_parallel=len(nodes))
+    for hostname, result in results.items():
+        if result.error is not None:
+            raise result.error
+        assert_utils.assert_true(result.ok and result.value[0],
+                                 f'Cluster Node {hostname} failed in health check. Reason: '
+                                 f'{result.value if result.ok else result.status}')
     LOGGER.info("Cluster status is healthy.")
 
 
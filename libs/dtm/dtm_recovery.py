@@ -32,6 +32,8 @@ import yaml
 
 from commons import constants as const
 from commons.exceptions import CTException
+from commons.helpers.k8s_watch_helper import K8sStateCache
+from commons.helpers.k8s_watch_helper import shared_cache
 from commons.helpers.pods_helper import LogicalNode
 from commons.params import TEST_DATA_FOLDER
 from commons.utils import system_utils
@@ -229,9 +231,16 @@ class DTMRecoveryTestLib:
         previously restarted process recovers)
         :param proc_restart_delay: Delay in seconds to restart the process after killing it
         :keyword bool specific_pod: True for retrieving containers from specific pod
+        :keyword state_cache: Started K8sStateCache object watching pods, default the shared
+        cache of master node. Waits for the container restart event instead of sleeping for the
+        restart delay while the watch is available.
+        :keyword timeline: TimelineRecorder in which process_kill and restart_complete events
+        are recorded for failover impact analysis
         return : boolean
         """
         specific_pod = kwargs.get("specific_pod", False)
+        state_cache = kwargs.get("state_cache", None) or shared_cache(master_node)
+        timeline = kwargs.get("timeline", None)
         self.log.info("Get process IDs of %s", process)
         resp = self.get_process_ids(health_obj=health_obj, process=process)
         if not resp[0]:
@@ -247,14 +256,31 @@ class DTMRecoveryTestLib:
                                                                               container_prefix)
             self.set_proc_restart_duration(master_node, pod_selected, container, proc_restart_delay)
             try:
+                restart_cnt_before = None
+                if state_cache is not None and state_cache.synced():
+                    restart_cnt_before = K8sStateCache.restart_count(
+                        state_cache.get("pods", pod_selected) or {}, container)
+                    if restart_cnt_before is None:
+                        self.log.warning("%s/%s not in pod cache, falling back to sleep",
+                                         pod_selected, container)
                 self.log.info("Kill %s from %s pod %s container ", process, pod_selected, container)
+                if timeline:
+                    timeline.event("process_kill", f"{pod_selected}/{container}/{process}")
                 resp = master_node.kill_process_in_container(pod_name=pod_selected,
                                                              container_name=container,
                                                              process_name=process)
                 self.log.debug("Resp : %s", resp)
-                self.log.info("Sleep till %s", proc_restart_delay)
                 # added 20 seconds delay for container to restart.
-                time.sleep(proc_restart_delay + 20)
+                if restart_cnt_before is None:
+                    self.log.info("Sleep till %s", proc_restart_delay)
+                    time.sleep(proc_restart_delay + 20)
+                else:
+                    self.log.info("Wait till %s container restarts, max %s sec", container,
+                                  proc_restart_delay + 20)
+                    if not state_cache.wait_until(K8sStateCache.container_restarted(
+                            pod_selected, container, restart_cnt_before),
+                            timeout=proc_restart_delay + 20):
+                        self.log.warning("Restart of %s container not observed", container)
                 self.set_proc_restart_duration(master_node, pod_selected, container, 0)
             except (ValueError, IOError) as ex:
                 self.log.error("Exception Occurred during killing process : %s", ex)
@@ -262,9 +288,12 @@ class DTMRecoveryTestLib:
                 return False
 
             self.log.info("Polling hctl status to check if all services are online")
-            resp = self.ha_obj.poll_cluster_status(pod_obj=master_node, timeout=300)
+            resp = self.ha_obj.poll_cluster_status(pod_obj=master_node, timeout=300,
+                                                   state_cache=state_cache)
             if not resp[0]:
                 return resp[0]
+            if timeline:
+                timeline.event("restart_complete", f"{pod_selected}/{container}/{process}")
 
             if check_proc_state:
                 self.log.info("Check process states")
@@ -23,6 +23,7 @@ HA common utility methods for API tests
 import logging
 import os
 import random
+from contextlib import nullcontext
 
 from commons import constants as common_const
 from commons.exceptions import CTException
@@ -65,8 +66,10 @@ class HAK8sApiLibs:
         :keyword is_unversioned: Set to true if object is uploaded to an unversioned bucket
         Can be used for setting up pre-existing objects before enabling/suspending bucket
         versioning
+        :keyword timeline: TimelineRecorder recording each PUT for failover impact analysis
         :return: Tuple (bool, list)
         """
+        timeline = kwargs.get("timeline")
         chk_null_version = kwargs.get("chk_null_version", False)
         file_path = kwargs.get("file_path")
         count = kwargs.get("count", 1)
@@ -76,8 +79,9 @@ class HAK8sApiLibs:
         fail_put_ver = list()
         for put in range(count):
             try:
-                put_resp = s3_test_obj.put_object(bucket_name=bkt_name, object_name=obj_name,
-                                                  file_path=file_path)
+                with timeline.timed("put", obj_name) if timeline else nullcontext():
+                    put_resp = s3_test_obj.put_object(bucket_name=bkt_name, object_name=obj_name,
+                                                      file_path=file_path)
                 if is_unversioned:
                     version_id = "null"
                 else:
@@ -114,10 +118,12 @@ class HAK8sApiLibs:
         :param ver_etag: Target list of dictionary of uploaded versions to be GET
         :keyword output: Output queue in which results should be put
         :keyword background: Set to true if background function call
+        :keyword timeline: TimelineRecorder recording each GET for failover impact analysis
         :return: Tuple (bool, list)
         """
         background = kwargs.get("background", False)
         output = kwargs.get("output", None)
+        timeline = kwargs.get("timeline")
 
         fail_get_ver = list()
         pass_get_ver = list()
@@ -125,8 +131,9 @@ class HAK8sApiLibs:
             v_id = list(v_etag.keys())[0]
             etag = list(v_etag.values())[0]
             try:
-                get_resp = s3_ver_obj.get_object_version(bucket=bkt_name, key=obj_name,
-                                                         version_id=v_id)
+                with timeline.timed("get", obj_name) if timeline else nullcontext():
+                    get_resp = s3_ver_obj.get_object_version(bucket=bkt_name, key=obj_name,
+                                                             version_id=v_id)
                 if get_resp[1]["VersionId"] != v_id or get_resp[1]["ETag"] != etag:
                     failed = {v_id: [get_resp[1]["VersionId"], get_resp[1]["ETag"]]}
                     fail_get_ver.append(failed)
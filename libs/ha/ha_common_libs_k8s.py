@@ -40,8 +40,11 @@ from commons import constants as common_const
 from commons import pswdmanager
 from commons.constants import Rest as Const
 from commons.exceptions import CTException
+from commons.helpers.k8s_watch_helper import K8sStateCache
+from commons.helpers.k8s_watch_helper import shared_cache
 from commons.helpers.pods_helper import LogicalNode
 from commons.utils import config_utils
+from commons.utils.cluster_health_utils import query_pods_health
 from commons.utils import system_utils
 from commons.utils.system_utils import run_local_cmd
 from config import CMN_CFG
@@ -52,6 +55,7 @@ from config.s3 import S3_CFG
 from libs.csm.rest.csm_rest_core_lib import RestClient
 from libs.csm.rest.csm_rest_system_health import SystemHealth
 from libs.di.di_mgmt_ops import ManagementOPs
+from libs.ha.ha_integrity_engine import IntegrityEngine
 from libs.s3.s3_multipart_test_lib import S3MultipartTestLib
 from libs.s3.s3_restapi_test_lib import S3AccountOperationsRestAPI
 from libs.s3.s3_test_lib import S3TestLib
@@ -718,16 +722,19 @@ class HAK8s:
                 return False, "K8S cluster status has Failures"
         if pod_list is None:
             pod_list = pod_obj.get_all_pods(pod_prefix=common_const.POD_NAME_PREFIX)
-        for pod_name in pod_list:
-            res = pod_obj.send_k8s_cmd(
-                operation="exec", pod=pod_name, namespace=common_const.NAMESPACE,
-                command_suffix=f"-c {common_const.HAX_CONTAINER_NAME} -- "
-                               f"{common_cmd.MOTR_STATUS_CMD}", decode=True)
-            for line in res.split("\n"):
-                if common_const.MOTR_CLIENT not in line:
-                    if "failed" in line or "offline" in line or "unknown" in line:
-                        LOGGER.error("Response for data pod %s's hctl status: %s", pod_name, res)
-                        return False, f"Cortx HCTL status has Failures in pod {pod_name}"
+
+        # Own connection for the check as LogicalNode reconnects on every command.
+        node = LogicalNode(hostname=pod_obj.hostname, username=pod_obj.username,
+                           password=pod_obj.password)
+        try:
+            health = query_pods_health(
+                node, pod_list, max_parallel=HA_CFG["common_params"]["health_max_parallel"],
+                timeout=HA_CFG["common_params"]["90sec_delay"])
+        finally:
+            node.disconnect()
+        if not health.healthy:
+            LOGGER.error("Cortx HCTL status has failures: %s", health.summary())
+            return False, f"Cortx HCTL status has Failures: {health.summary()}"
         return True, "K8s and cortx both cluster up and clean."
 
     @staticmethod
@@ -749,22 +756,38 @@ class HAK8s:
             return md5_list
         return all(md5_list[0] == x for x in md5_list)
 
-    def poll_cluster_status(self, pod_obj, timeout=1200):         # default 20mins timeout
+    def poll_cluster_status(self, pod_obj, timeout=1200, state_cache=None):  # default 20mins
         """
         Helper function to poll the cluster status
         :param pod_obj: Object for master nodes
         :param timeout: Timeout value
+        :param state_cache: Started K8sStateCache object, default the shared cache of the
+        master node. hctl status is checked as soon as all cortx pods are ready and re-checked
+        on every pod event, the checks are 60 seconds apart while the watch is unavailable.
         :return: bool, response
         """
         resp = False
+        if state_cache is None:
+            state_cache = shared_cache(pod_obj)
         LOGGER.info("Polling cluster status")
         start_time = int(time.time())
         while timeout > int(time.time()) - start_time:
-            time.sleep(60)
+            watching = state_cache is not None and state_cache.synced()
+            if not watching:
+                time.sleep(60)
+            else:
+                remaining = timeout - (int(time.time()) - start_time)
+                state_cache.wait_until(K8sStateCache.pods_ready(
+                    (common_const.POD_NAME_PREFIX, common_const.SERVER_POD_NAME_PREFIX)),
+                    timeout=remaining)
+            since = state_cache.generation if watching else None
             resp = self.check_cluster_status(pod_obj)
             if resp[0]:
                 LOGGER.info("Cortx cluster is up")
                 break
+            if watching:
+                state_cache.wait_for_change(since=since,
+                                            timeout=HA_CFG["common_params"]["30sec_delay"])
 
         LOGGER.debug("Time taken by cluster restart is %s seconds", int(time.time()) - start_time)
         return resp
@@ -1008,6 +1031,36 @@ class HAK8s:
             res = (event_del_bkt, fail_del_bkt)
             output.put(res)
 
+    @staticmethod
+    def put_get_delete_concurrent(event, s3_test_obj, test_prefix: str, bkts_to_wr: int,
+                                  objects_per_bkt: int = 1, skipdel: bool = False,
+                                  max_workers: int = 16, seed: int = None):
+        """
+        Concurrent alternative of put_get_delete: objects are generated in memory, uploaded,
+        verified by streaming md5 and deleted in batches with bounded parallelism
+        :param event: Thread event set while failures are expected
+        :param s3_test_obj: s3 test object, its s3_client is used for IOs
+        :param test_prefix: Bucket name prefix
+        :param bkts_to_wr: Number of buckets to be created
+        :param objects_per_bkt: Number of objects per bucket
+        :param skipdel: True if objects are to be kept
+        :param max_workers: Requests in flight
+        :param seed: Seed of the data set, random if None
+        :return: bool, {"put": stats, "get": stats, "delete": stats}
+        """
+        seed = seed if seed is not None else secrets.randbits(32)
+        LOGGER.info("Running concurrent put/get/delete with seed %s", seed)
+        buckets = [f"{test_prefix}-{num}-{perf_counter_ns()}" for num in range(bkts_to_wr)]
+        engine = IntegrityEngine(s3_test_obj.s3_client, max_workers=max_workers, event=event)
+        report = engine.run(buckets, objects_per_bkt,
+                            HA_CFG["s3_bucket_data"]["workload_sizes_mbs"], seed=seed,
+                            skipdel=skipdel)
+        if not skipdel:
+            for bucket in buckets:
+                s3_test_obj.delete_bucket(bucket_name=bucket, force=True)
+        status = not any(stats["failed"] or stats["mismatches"] for stats in report.values())
+        return status, report
+
     @staticmethod
     def get_data_pod_no_ha_control(data_pod_list: list, pod_obj):
         """
@@ -1642,6 +1695,7 @@ class HAK8s:
         :param mnode_obj: Master node object to fetch the resource ID
         :return: bool, response
         """
+        state_cache = shared_cache(mnode_obj)
         if rsc == "node":
             if not isinstance(rsc_info, dict):
                 # Get the node ID and set expected status if only list of pods is passed
@@ -1657,7 +1711,8 @@ class HAK8s:
             for pod in pod_info.keys():
                 LOGGER.info("Get and verify pod %s status is as expected", pod)
                 resp = self.poll_to_get_resource_status(exp_sts=pod_info[pod]['status'], rsc=rsc,
-                                                        rsc_id=pod_info[pod]['id'])
+                                                        rsc_id=pod_info[pod]['id'],
+                                                        state_cache=state_cache)
                 if not resp:
                     return False, f"Failed to get expected status for {pod}"
         elif rsc == "cluster":
@@ -1675,19 +1730,23 @@ class HAK8s:
                         break
             LOGGER.info("Get and verify cluster status is set to %s", exp_sts)
             resp = self.poll_to_get_resource_status(exp_sts=exp_sts, rsc=rsc,
-                                                    rsc_id=data[1]["cluster"]["id"])
+                                                    rsc_id=data[1]["cluster"]["id"],
+                                                    state_cache=state_cache)
             if not resp:
                 return False, "Failed to get expected status for Cluster"
         return True, f"Got expected status for {rsc}"
 
     def poll_to_get_resource_status(self, exp_sts, rsc, rsc_id,
-                                    timeout=HA_CFG["common_params"]["90sec_delay"]):
+                                    timeout=HA_CFG["common_params"]["90sec_delay"],
+                                    state_cache=None):
         """
         Helper function to GET and Poll for expected resource status till timeout
         :param exp_sts: Expected status of resource
         :param rsc_id: Required resource ID to GET the resource status
         :param rsc: resource type (e.g. node, cluster)
         :param timeout: Poll for expected status till timeout
+        :param state_cache: Started K8sStateCache object, status is re-read as soon as a pod
+        event arrives instead of at the end of the back-off sleep while the watch is available
         :return: bool
         """
         resp = self.system_health.get_resource_status(resource_id=rsc_id, resource=rsc)
@@ -1698,7 +1757,10 @@ class HAK8s:
         sleep_time = HA_CFG["common_params"]["2sec_delay"]
         while status != exp_sts and poll > time.time():
             LOGGER.info("Current %s status is %s. Sleeping for %s sec", rsc, status, sleep_time)
-            time.sleep(sleep_time)
+            if state_cache is None or not state_cache.synced():
+                time.sleep(sleep_time)
+            else:
+                state_cache.wait_for_change(timeout=min(sleep_time, poll - time.time()))
             resp = self.system_health.get_resource_status(resource_id=rsc_id, resource=rsc)
             if not resp[0]:
                 return False
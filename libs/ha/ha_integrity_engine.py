@@ -0,0 +1,229 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Concurrent put/get/delete data integrity engine for HA tests.
+
+Payloads are generated in memory from a seed, uploaded with bounded parallelism and their
+md5 is recorded in a manifest (sqlite, in memory by default). Verification streams every
+object back and hashes it incrementally, so no file is written or shelled out to md5sum,
+and objects are deleted with DeleteObjects in batches. Every phase reports its throughput
+and failures, failures seen while the event is set (e.g. pod down) are reported separately
+as expected failures.
+"""
+
+import hashlib
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError
+from botocore.exceptions import ClientError
+
+from commons.utils.s3_utils import DELETE_BATCH
+from commons.utils.s3_utils import seeded_payload
+
+LOGGER = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+CHUNK_SIZE = MB
+
+
+class ObjectManifest:
+    """Expected size, seed and md5 of uploaded objects."""
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        :param path: sqlite database file, in memory if not given
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS objects (bucket TEXT, key TEXT, "
+                           "size INTEGER, seed INTEGER, md5 TEXT, PRIMARY KEY (bucket, key))")
+
+    def record(self, bucket: str, key: str, size: int, seed: int, md5: str):
+        """Add or overwrite expected object."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?)",
+                               (bucket, key, size, seed, md5))
+
+    def remove(self, bucket: str, keys: list):
+        """Remove deleted objects."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM objects WHERE bucket = ? AND key = ?",
+                                   [(bucket, key) for key in keys])
+
+    def entries(self, buckets: list = None) -> list:
+        """[(bucket, key, size, seed, md5)] of all or given buckets."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT bucket, key, size, seed, md5 FROM objects ORDER BY bucket, key")
+            rows = rows.fetchall()
+        return [row for row in rows if buckets is None or row[0] in buckets]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+
+class IntegrityEngine:
+    """Put, verify and delete many objects concurrently against an S3 client."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, s3_client, manifest: ObjectManifest = None, max_workers: int = 16,
+                 chunk_size: int = CHUNK_SIZE, event=None):
+        """
+        :param s3_client: boto3 S3 client
+        :param manifest: Manifest of expected objects, new in memory manifest if None
+        :param max_workers: Requests in flight
+        :param chunk_size: Read size of streamed downloads
+        :param event: threading.Event set while failures are expected
+        """
+        self.s3_client = s3_client
+        self.manifest = manifest if manifest is not None else ObjectManifest()
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.event = event
+
+    def _phase(self, name: str, func, items: list) -> dict:
+        """
+        Run func(item) -> (bytes, mismatch) for items concurrently.
+        :return: Phase stats with throughput and failed, expected failed and mismatched items
+        """
+        stats = {"phase": name, "objects": 0, "bytes": 0, "failed": [], "event_failed": [],
+                 "mismatches": []}
+
+        def run(item):
+            try:
+                size, mismatch = func(item)
+                return item, size, mismatch, None
+            except (BotoCoreError, ClientError, OSError) as error:
+                return item, 0, False, error
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for item, size, mismatch, error in executor.map(run, items):
+                if error is not None:
+                    expected = self.event is not None and self.event.is_set()
+                    LOGGER.log(logging.INFO if expected else logging.ERROR,
+                               "%s of %s failed: %s", name, item, error)
+                    stats["event_failed" if expected else "failed"].append(item)
+                    continue
+                stats["objects"] += 1
+                stats["bytes"] += size
+                if mismatch:
+                    stats["mismatches"].append(item)
+        stats["elapsed"] = time.perf_counter() - start
+        stats["mb_per_sec"] = stats["bytes"] / MB / stats["elapsed"] if stats["elapsed"] else 0
+        LOGGER.info("%s: %s objects, %.2f MB/s, failed %s, expected failures %s, "
+                    "mismatches %s", name, stats["objects"], stats["mb_per_sec"],
+                    len(stats["failed"]), len(stats["event_failed"]), len(stats["mismatches"]))
+        return stats
+
+    def _put_one(self, item):
+        bucket, key, size, seed = item
+        data = seeded_payload(seed, size)
+        self.s3_client.put_object(Bucket=bucket, Key=key, Body=data)
+        self.manifest.record(bucket, key, size, seed, hashlib.md5(data).hexdigest())  # nosec
+        return size, False
+
+    # pylint: disable=too-many-arguments
+    def put(self, buckets: list, objects_per_bucket: int, sizes_mb: list, prefix: str = "obj",
+            seed: int = 0, create_buckets: bool = True) -> dict:
+        """
+        Upload objects_per_bucket objects to each bucket, object sizes are picked from
+        sizes_mb by the seeded generator so a seed always gives the same data set.
+        :return: Put phase stats
+        """
+        if create_buckets:
+            for bucket in buckets:
+                try:
+                    self.s3_client.create_bucket(Bucket=bucket)
+                except ClientError as error:
+                    if error.response["Error"]["Code"] != "BucketAlreadyOwnedByYou":
+                        raise
+        rng = random.Random(seed)
+        items = [(bucket, f"{prefix}-{num}", int(rng.choice(sizes_mb) * MB),
+                  rng.getrandbits(63)) for bucket in buckets for num in
+                 range(objects_per_bucket)]
+        return self._phase("put", self._put_one, items)
+
+    def _verify_one(self, item):
+        bucket, key, size, _, md5 = item
+        body = self.s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+        digest = hashlib.md5()  # nosec
+        received = 0
+        try:
+            for chunk in iter(lambda: body.read(self.chunk_size), b""):
+                digest.update(chunk)
+                received += len(chunk)
+        finally:
+            body.close()
+        return received, received != size or digest.hexdigest() != md5
+
+    def verify(self, buckets: list = None) -> dict:
+        """
+        Download all objects of the manifest (of given buckets) and compare size and md5.
+        :return: Get phase stats, mismatches are (bucket, key, size, seed, md5)
+        """
+        return self._phase("get", self._verify_one, self.manifest.entries(buckets))
+
+    def delete(self, buckets: list = None, batch_size: int = DELETE_BATCH) -> dict:
+        """
+        Delete objects of the manifest with DeleteObjects batches and forget them.
+        :return: Delete phase stats, failed are (bucket, key)
+        """
+        batches = {}
+        for bucket, key, *_ in self.manifest.entries(buckets):
+            batches.setdefault(bucket, []).append(key)
+        items = [(bucket, keys[num:num + batch_size]) for bucket, keys in batches.items()
+                 for num in range(0, len(keys), batch_size)]
+        not_deleted = []
+
+        def delete_batch(item):
+            bucket, keys = item
+            resp = self.s3_client.delete_objects(
+                Bucket=bucket, Delete={"Objects": [{"Key": key} for key in keys],
+                                       "Quiet": True})
+            errors = {error["Key"] for error in resp.get("Errors", [])}
+            self.manifest.remove(bucket, [key for key in keys if key not in errors])
+            not_deleted.extend((bucket, key) for key in sorted(errors))
+            return 0, False
+        stats = self._phase("delete", delete_batch, items)
+        stats["objects"] = sum(len(keys) for _, keys in items) - len(not_deleted)
+        stats["failed"] = [(bucket, key) for bucket, keys in stats["failed"] for key in keys] \
+            + not_deleted
+        stats["event_failed"] = [(bucket, key) for bucket, keys in stats["event_failed"]
+                                 for key in keys]
+        return stats
+
+    def run(self, buckets: list, objects_per_bucket: int, sizes_mb: list, **kwargs) -> dict:
+        """
+        Put, verify and delete objects.
+        :param kwargs: prefix, seed, create_buckets of put, skipdel to keep the objects
+        :return: {"put": stats, "get": stats, "delete": stats}
+        """
+        skipdel = kwargs.pop("skipdel", False)
+        report = {"put": self.put(buckets, objects_per_bucket, sizes_mb, **kwargs),
+                  "get": self.verify(buckets)}
+        if not skipdel:
+            report["delete"] = self.delete(buckets)
+        return report
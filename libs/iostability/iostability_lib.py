@@ -25,18 +25,20 @@ import logging
 import os
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import make_msgid, formatdate, COMMASPACE
 
 from commons.mail_script_utils import Mail
-from commons.utils import system_utils
+from commons.params import LOG_DIR
 from config.s3 import S3_CFG
 from libs.s3 import ACCESS_KEY, SECRET_KEY
+from libs.iostability.workload_scheduler import WorkloadScheduler
 from libs.s3.s3_test_lib import S3TestLib
 from scripts.s3_bench import s3bench
+from scripts.s3_bench import s3loadgen
 
 
 class IOStabilityLib:
@@ -51,64 +53,36 @@ class IOStabilityLib:
         self.max_retries = max_retries
         self.http_client_timeout = timeout
 
+    # pylint: disable=too-many-arguments
     def execute_workload_distribution(self, distribution, clients, total_obj,
-                                      duration_in_days, log_file_prefix, buckets_created=None):
+                                      duration_in_days, log_file_prefix, buckets_created=None,
+                                      in_process=False, checkpoint_file=None, resume=False):
         """Execution given workload distribution.
+        Size classes run concurrently sharing the clients, the loop state is checkpointed
+        and a restarted run resumes from the checkpoint when resume is set.
         :param distribution: Distribution of object size
         :param clients: No of clients
         :param total_obj: total number of objects per iteration
         :param duration_in_days: Duration expected of the test run
         :param log_file_prefix: Log file prefix for s3bench
         :param buckets_created: Buckets already created to be used for IO operations.
+        :param in_process: Use the in-process asyncio load generator instead of s3bench binary.
+        :param checkpoint_file: Loop state file, default <log dir>/<prefix>_workload.json
+        :param resume: Resume the interrupted run saved in the checkpoint file
+        :return: Per size class run and per loop throughput/latency records
         """
-        workloads = [(size, int(total_obj * percent / 100)) for size, percent in
-                     distribution.items()]
-        end_time = datetime.now() + timedelta(days=duration_in_days)
-        loop = 0
-        while datetime.now() < end_time:
-            for size, samples in workloads:
-                bucket_name = f"{log_file_prefix}-bucket-{loop}-{str(int(time.time()))}".lower()
-                skip_cleanup = False
-                if buckets_created is not None:
-                    bucket_name = buckets_created[loop % len(buckets_created)]
-                    skip_cleanup = True
-                if samples == 0:
-                    continue
-                cur_clients = clients
-                if cur_clients > samples:
-                    cur_clients = samples
-                resp = s3bench.s3bench(ACCESS_KEY, SECRET_KEY, bucket=bucket_name,
-                                       num_clients=cur_clients, num_sample=samples,
-                                       obj_name_pref="object-", obj_size=size,
-                                       skip_cleanup=skip_cleanup, duration=None,
-                                       log_file_prefix=str(log_file_prefix).upper(),
-                                       end_point=S3_CFG["s3_url"],
-                                       validate_certs=S3_CFG["validate_certs"],
-                                       max_retries=self.max_retries,
-                                       httpclientimeout=self.http_client_timeout)
-                self.log.info("Loop: %s Workload: %s objects of %s with %s parallel clients.",
-                              loop, samples, size, clients)
-                self.log.info("Log Path %s", resp[1])
-                assert not s3bench.check_log_file_error(resp[1]), \
-                    f"S3bench workload failed in loop {loop}. Please read log file {resp[1]}"
-                # delete file if operation successful.
-                system_utils.remove_file(resp[1])
-                if skip_cleanup:
-                    # delete only objects, to be used for degraded mode.
-                    self.log.info("Delete Created Objects")
-                    resp = self.s3t_obj.object_list(bucket_name=bucket_name)
-                    obj_list = resp[1]
-                    while len(obj_list):
-                        if len(obj_list) > 1000:
-                            self.s3t_obj.delete_multiple_objects(bucket_name,
-                                                                 obj_list=obj_list[0:1000])
-                            obj_list = obj_list[1000:]
-                        else:
-                            self.s3t_obj.delete_multiple_objects(bucket_name=bucket_name,
-                                                                 obj_list=obj_list)
-                            obj_list = []
-                    self.log.info("Objects deletion completed")
-            loop += 1
+        workload_runner = s3loadgen.s3loadgen if in_process else s3bench.s3bench
+        if checkpoint_file is None:
+            checkpoint_file = os.path.join(LOG_DIR, f"{log_file_prefix}_workload.json")
+        scheduler = WorkloadScheduler(
+            workload_runner, self.s3t_obj.s3_client, distribution, clients, total_obj,
+            log_file_prefix, buckets_created=buckets_created, checkpoint_file=checkpoint_file,
+            records_file=os.path.join(LOG_DIR, f"{log_file_prefix}_workload_records.jsonl"),
+            check_log=s3bench.check_log_file_error, access_key=ACCESS_KEY,
+            secret_key=SECRET_KEY, end_point=S3_CFG["s3_url"],
+            validate_certs=S3_CFG["validate_certs"], max_retries=self.max_retries,
+            httpclientimeout=self.http_client_timeout)
+        return scheduler.run(duration_in_days, resume=resume)
 
 
 class MailNotification(threading.Thread):
@@ -0,0 +1,274 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Workload scheduler for IO stability runs.
+
+Size classes of a workload distribution run concurrently under a global client budget,
+objects of a size class are deleted page by page while the bucket is listed, loop state
+is checkpointed so that a multi day run can be resumed after a client restart and every
+size class run and loop emits a throughput/latency record.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+
+from scripts.s3_bench.s3loadgen import size_in_bytes
+
+LOGGER = logging.getLogger(__name__)
+
+# Keys of the s3bench/s3loadgen report kept in records
+REPORT_STATS = ("throughput", "latency", "ttfb", "errors count")
+DELETE_PAGE_SIZE = 1000
+
+
+class ClientBudget:
+    """Global number of S3 clients shared by concurrently running size classes."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.available = total
+        self._cond = threading.Condition()
+
+    def acquire(self, clients: int):
+        """Block till clients are available and take them."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.available >= clients)
+            self.available -= clients
+
+    def release(self, clients: int):
+        """Return clients to budget."""
+        with self._cond:
+            self.available += clients
+            self._cond.notify_all()
+
+
+def allocate_clients(workloads: list, budget: int) -> dict:
+    """
+    Split client budget over size classes in proportion to their samples.
+    :param workloads: [(size, samples)]
+    :param budget: Total clients
+    :return: {size: clients}, every class gets at least one client and at most its samples
+    """
+    total = sum(samples for _, samples in workloads) or 1
+    return {size: max(1, min(samples, budget * samples // total, budget))
+            for size, samples in workloads}
+
+
+# pylint: disable=too-many-instance-attributes
+class WorkloadScheduler:
+    """Run a workload distribution in loops till the end time."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, runner, s3_client, distribution: dict, clients: int, total_obj: int,
+                 log_file_prefix: str, buckets_created: list = None,
+                 checkpoint_file: str = None, records_file: str = None,
+                 check_log=None, clock=time.time, **runner_kwargs):
+        """
+        :param runner: s3bench.s3bench compatible workload runner
+        :param s3_client: boto3 S3 client used for object cleanup
+        :param distribution: Distribution of object size in percent {"4Kb": 50, "1Mb": 50}
+        :param clients: Global client budget
+        :param total_obj: Total number of objects per loop
+        :param log_file_prefix: Log file prefix for runner
+        :param buckets_created: Buckets to be used for IO, objects are deleted after each run
+        :param checkpoint_file: File the loop state is saved to and resumed from
+        :param records_file: Json lines file per run and per loop records are appended to
+        :param check_log: Returns True if runner log has errors
+        :param clock: Time source in seconds
+        :param runner_kwargs: Extra runner arguments e.g. access_key, end_point
+        """
+        self.runner = runner
+        self.s3_client = s3_client
+        self.workloads = [(size, int(total_obj * percent / 100)) for size, percent in
+                          distribution.items()]
+        self.clients = clients
+        self.allocation = allocate_clients(self.workloads, clients)
+        self.budget = ClientBudget(clients)
+        self.log_file_prefix = log_file_prefix
+        self.buckets_created = buckets_created
+        self.checkpoint_file = checkpoint_file
+        self.records_file = records_file
+        self.check_log = check_log
+        self.clock = clock
+        self.runner_kwargs = runner_kwargs
+        self.records = []
+        self._lock = threading.Lock()
+        self.signature = [self.workloads, clients, log_file_prefix, buckets_created]
+
+    def load_checkpoint(self):
+        """Saved state of an interrupted run of the same workload or None."""
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return None
+        with open(self.checkpoint_file) as checkpoint:
+            state = json.load(checkpoint)
+        if state.get("signature") != json.loads(json.dumps(self.signature)):
+            LOGGER.warning("Ignoring checkpoint %s of a different workload",
+                           self.checkpoint_file)
+            return None
+        if state["end_time"] <= self.clock():
+            LOGGER.warning("Ignoring checkpoint %s of a run which ended at %s",
+                           self.checkpoint_file, time.ctime(state["end_time"]))
+            return None
+        LOGGER.info("Resuming workload from loop %s, completed size classes %s",
+                    state["loop"], state["done"])
+        return state
+
+    def save_checkpoint(self, state: dict):
+        """Atomically save loop state."""
+        if not self.checkpoint_file:
+            return
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, "w") as checkpoint:
+            json.dump(dict(state, signature=self.signature), checkpoint)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def emit(self, record: dict):
+        """Keep record and append it to records file."""
+        self.records.append(record)
+        LOGGER.info("Workload record: %s", record)
+        if self.records_file:
+            with open(self.records_file, "a") as records:
+                records.write(json.dumps(record) + "\n")
+
+    def delete_objects(self, bucket: str, prefix: str) -> int:
+        """
+        Delete objects with prefix, each listed page is deleted with DeleteObjects while the
+        next page is listed.
+        :return: Number of deleted objects
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=bucket, Prefix=prefix,
+                                   PaginationConfig={"PageSize": DELETE_PAGE_SIZE})
+        deleted = 0
+        with ThreadPoolExecutor(max_workers=1) as deleter:
+            pending = None
+            for page in pages:
+                keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+                if pending:
+                    deleted += pending.result()
+                    pending = None
+                if keys:
+                    pending = deleter.submit(self._delete_page, bucket, keys)
+            if pending:
+                deleted += pending.result()
+        return deleted
+
+    def _delete_page(self, bucket: str, keys: list) -> int:
+        response = self.s3_client.delete_objects(Bucket=bucket,
+                                                 Delete={"Objects": keys, "Quiet": True})
+        errors = response.get("Errors", [])
+        assert not errors, f"Failed to delete {len(errors)} objects of {bucket}: {errors[:3]}"
+        return len(keys)
+
+    # pylint: disable=too-many-locals
+    def run_size_class(self, loop: int, index: int, size: str, samples: int) -> dict:
+        """Run one size class of a loop and clean up its objects."""
+        prefix = f"object-{size.lower()}-"
+        skip_cleanup = self.buckets_created is not None
+        if skip_cleanup:
+            bucket_name = self.buckets_created[loop % len(self.buckets_created)]
+        else:
+            bucket_name = f"{self.log_file_prefix}-bucket-{loop}-{index}-" \
+                          f"{int(self.clock())}".lower()
+        clients = self.allocation[size]
+        self.budget.acquire(clients)
+        try:
+            start = self.clock()
+            resp = self.runner(bucket=bucket_name, num_clients=clients, num_sample=samples,
+                               obj_name_pref=prefix, obj_size=size,
+                               skip_cleanup=skip_cleanup, duration=None,
+                               log_file_prefix=str(self.log_file_prefix).upper(),
+                               **self.runner_kwargs)
+            elapsed = self.clock() - start
+        finally:
+            self.budget.release(clients)
+        LOGGER.info("Loop: %s Workload: %s objects of %s with %s parallel clients.",
+                    loop, samples, size, clients)
+        LOGGER.info("Log Path %s", resp[1])
+        if self.check_log:
+            assert not self.check_log(resp[1]), \
+                f"S3bench workload failed in loop {loop}. Please read log file {resp[1]}"
+        if os.path.exists(resp[1]):
+            # delete file if operation successful.
+            os.remove(resp[1])
+        deleted = self.delete_objects(bucket_name, prefix) if skip_cleanup else 0
+        return {"loop": loop, "size": size, "samples": samples, "clients": clients,
+                "bucket": bucket_name, "start": start, "elapsed": elapsed, "deleted": deleted,
+                "objects_per_sec": samples / elapsed if elapsed else None,
+                "mb_per_sec": samples * size_in_bytes(size) / 1e6 / elapsed if elapsed
+                else None,
+                "report": [{key: value for key, value in stats.items() if key == "Operation"
+                            or any(word in key.lower() for word in REPORT_STATS)}
+                           for stats in resp[0] or []]}
+
+    def run(self, duration_in_days: float, resume: bool = False) -> list:
+        """
+        Run loops of the workload till duration is over.
+        :param duration_in_days: Duration of a new run
+        :param resume: Resume an interrupted run from the checkpoint, a resumed run keeps
+        the end time of the interrupted run. A checkpoint whose end time has passed is
+        ignored. Without resume any checkpoint is overwritten by the new run.
+        :return: Records of all runs and loops
+        """
+        state = self.load_checkpoint() if resume else None
+        if state is None:
+            state = {"loop": 0, "done": [],
+                     "end_time": self.clock() + duration_in_days * 24 * 3600}
+            self.save_checkpoint(state)
+        while self.clock() < state["end_time"]:
+            loop = state["loop"]
+            pending = [(index, size, samples) for index, (size, samples) in
+                       enumerate(self.workloads) if samples and size not in state["done"]]
+            loop_start = self.clock()
+            errors = []
+            with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+                futures = [executor.submit(self.run_size_class, loop, *workload)
+                           for workload in pending]
+                for future in as_completed(futures):
+                    try:
+                        record = future.result()
+                    except Exception as error:  # pylint: disable=broad-except
+                        errors.append(error)
+                        continue
+                    with self._lock:
+                        self.emit(record)
+                        state["done"].append(record["size"])
+                        self.save_checkpoint(state)
+            if errors:
+                raise errors[0]
+            elapsed = self.clock() - loop_start
+            loop_records = [rec for rec in self.records if rec["loop"] == loop and "size" in rec]
+            objects = sum(rec["samples"] for rec in loop_records)
+            data_mb = sum(rec["samples"] * size_in_bytes(rec["size"]) for rec in
+                          loop_records) / 1e6
+            self.emit({"loop": loop, "elapsed": elapsed, "objects": objects,
+                       "objects_per_sec": objects / elapsed if elapsed else None,
+                       "mb_per_sec": data_mb / elapsed if elapsed else None})
+            state = {"loop": loop + 1, "done": [], "end_time": state["end_time"]}
+            self.save_checkpoint(state)
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        assert any("size" in rec for rec in self.records), \
+            f"No workload was scheduled, end time {time.ctime(state['end_time'])} reached"
+        return self.records
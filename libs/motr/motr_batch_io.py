@@ -0,0 +1,312 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Batched motr IO runner.
+
+The whole dd -> m0cp -> m0cat -> md5sum -> m0unlink matrix is rendered into a single shell
+script which is copied to the client container once and run with a single kubectl exec. The
+script prints one json line per step, prefixed with RESULT_MARKER, carrying return code,
+timings in nanoseconds and checksums.
+"""
+
+import base64
+import json
+import logging
+import os
+import shlex
+import threading
+from random import SystemRandom
+from typing import Callable
+
+from commons import commands as common_cmd
+from commons import constants as common_const
+from commons.helpers.stream_helper import iter_lines
+from commons.helpers.stream_helper import ssh_stream
+from libs.motr import FILE_BLOCK_COUNT
+from libs.motr import TEMP_PATH
+from libs.motr.layouts import BSIZE_LAYOUT_MAP
+
+log = logging.getLogger(__name__)
+
+RESULT_MARKER = "MOTR_IO_RESULT"
+DONE_MARKER = "MOTR_IO_DONE"
+SCRIPT_NAME = "motr_batch_io.sh"
+
+SCRIPT_HEADER = r"""#!/bin/bash
+# Generated by libs/motr/motr_batch_io.py
+set +e
+LOG=$(mktemp)
+trap 'rm -f "$LOG"' EXIT
+
+now() { date +%s%N; }
+
+emit() {
+    # obj step rc start end [extra json members]
+    echo "RESULT_MARKER {\"obj\":\"$1\",\"step\":\"$2\",\"rc\":$3,\"start_ns\":$4,\"end_ns\":$5$6}"
+}
+
+run_step() {
+    local obj=$1 step=$2 start end rc err=""
+    shift 2
+    start=$(now)
+    "$@" > "$LOG" 2>&1
+    rc=$?
+    end=$(now)
+    if [ $rc -eq 0 ] && grep -q ERROR "$LOG"; then
+        rc=1
+    fi
+    if [ $rc -ne 0 ]; then
+        err=",\"err\":\"$(tail -c 512 "$LOG" | base64 | tr -d '\n')\""
+    fi
+    emit "$obj" "$step" $rc $start $end "$err"
+    return $rc
+}
+
+md5_step() {
+    local obj=$1 start end rc=0 md5_in md5_out
+    start=$(now)
+    md5_in=$(md5sum "$2" | cut -d' ' -f1)
+    md5_out=$(md5sum "$3" | cut -d' ' -f1)
+    end=$(now)
+    if [ -z "$md5_in" ] || [ "$md5_in" != "$md5_out" ]; then
+        rc=1
+    fi
+    emit "$obj" md5sum $rc $start $end ",\"md5_in\":\"$md5_in\",\"md5_out\":\"$md5_out\""
+    return $rc
+}
+
+""".replace("RESULT_MARKER", RESULT_MARKER)
+
+
+def _quote(cmd: str) -> str:
+    """Re-quote every token of a formatted command for safe embedding in the script."""
+    return " ".join(shlex.quote(token) for token in shlex.split(cmd))
+
+
+class BatchIOResult:
+    """Parsed per step results of a batch run."""
+
+    def __init__(self, plan: list):
+        self.plan = plan
+        self.steps = {item["obj"]: {} for item in plan}
+        self.complete = False
+        self.unparsed = []
+
+    @classmethod
+    def parse(cls, plan: list, output) -> "BatchIOResult":
+        """
+        Parse script output. Lines without the marker (tool noise) and a truncated trailing
+        line (exec killed mid way) are ignored; such runs are reported incomplete.
+        :param plan: Plan the script was rendered from.
+        :param output: stdout of the script, str or bytes.
+        :return: BatchIOResult
+        """
+        if isinstance(output, bytes):
+            output = output.decode("utf-8", errors="replace")
+        result = cls(plan)
+        for line in output.splitlines():
+            result.add_line(line)
+        return result
+
+    def add_line(self, line: str) -> dict:
+        """
+        Parse one line of script output.
+        :return: Step record if the line carried one, None otherwise.
+        """
+        line = line.strip()
+        if line == DONE_MARKER:
+            self.complete = True
+        elif line.startswith(RESULT_MARKER):
+            try:
+                record = json.loads(line[len(RESULT_MARKER):])
+            except ValueError:
+                self.unparsed.append(line)
+                return None
+            record["elapsed"] = (record["end_ns"] - record["start_ns"]) / 1e9
+            if "err" in record:
+                record["err"] = base64.b64decode(record["err"]).decode(errors="replace")
+            self.steps.setdefault(record["obj"], {})[record["step"]] = record
+            return record
+        return None
+
+    @property
+    def failures(self) -> dict:
+        """Object id -> (step, reason) for failed or missing steps."""
+        failed = {}
+        for item in self.plan:
+            steps = self.steps.get(item["obj"], {})
+            for step in item["steps"]:
+                record = steps.get(step)
+                if record is None:
+                    failed[item["obj"]] = (step, "not run")
+                    break
+                if record["rc"] != 0:
+                    failed[item["obj"]] = (step, record.get("err", f"rc {record['rc']}"))
+                    break
+        return failed
+
+    @property
+    def ok(self) -> bool:
+        """True if the script completed and every step passed."""
+        return self.complete and not self.failures
+
+    def object_dict(self) -> dict:
+        """Object dictionary in the format returned by MotrCoreK8s.run_motr_io."""
+        objects = {}
+        for item in self.plan:
+            steps = self.steps.get(item["obj"], {})
+            entry = {"block_size": item["block_size"], "count": item["count"],
+                     "deleted": steps.get("m0unlink", {}).get("rc") == 0}
+            if "md5sum" in steps:
+                entry["md5sum"] = steps["md5sum"]["md5_out"]
+            objects[item["obj"]] = entry
+        return objects
+
+    def timings(self) -> dict:
+        """Step -> list of elapsed seconds over all objects."""
+        timings = {}
+        for steps in self.steps.values():
+            for step, record in steps.items():
+                timings.setdefault(step, []).append(record["elapsed"])
+        return timings
+
+
+class MotrBatchIO:
+    """Render, ship and run the motr IO matrix on a client pod with a single exec."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, node_obj, pod_name: str, endpoints: dict, profile_fid: str,
+                 client_num: int = 0, container: str = common_const.HAX_CONTAINER_NAME,
+                 work_dir: str = TEMP_PATH):
+        """
+        :param node_obj: LogicalNode object of master node.
+        :param pod_name: Client pod on which IO runs.
+        :param endpoints: Cortx node endpoints as returned by get_cortx_node_endpoints.
+        :param profile_fid: Profile fid of the cluster.
+        :param client_num: Index of motr client endpoint to be used.
+        :param container: Container in which the script runs.
+        :param work_dir: Directory for script and data files on master node and container.
+        """
+        self.node_obj = node_obj
+        self.pod_name = pod_name
+        self.endpoints = endpoints
+        self.profile_fid = profile_fid
+        self.client_num = client_num
+        self.container = container
+        self.work_dir = work_dir
+
+    @staticmethod
+    def plan(bsize_layout_map: dict = None, block_count: list = None, run_m0cat: bool = True,
+             delete_objs: bool = True) -> list:
+        """
+        Expand block sizes x counts x layouts into the list of objects to be written.
+        :return: list of dicts with obj, block_size, layout, count and steps.
+        """
+        bsize_layout_map = BSIZE_LAYOUT_MAP if bsize_layout_map is None else bsize_layout_map
+        block_count = FILE_BLOCK_COUNT if block_count is None else block_count
+        steps = ["dd", "m0cp"]
+        if run_m0cat:
+            steps += ["m0cat", "md5sum"]
+        if delete_objs:
+            steps.append("m0unlink")
+        plan, used = [], set()
+        rand = SystemRandom()
+        for count in block_count:
+            for b_size, layout in bsize_layout_map.items():
+                obj = f"{rand.randint(1, 9999)}:{rand.randint(1, 9999)}"
+                while obj in used:
+                    obj = f"{rand.randint(1, 9999)}:{rand.randint(1, 9999)}"
+                used.add(obj)
+                plan.append({"obj": obj, "block_size": b_size, "layout": layout,
+                             "count": count, "steps": steps})
+        return plan
+
+    def render_script(self, plan: list) -> str:
+        """Render plan into the shell script."""
+        client = self.endpoints[common_const.MOTR_CLIENT][self.client_num]
+        infile = os.path.join(self.work_dir, "input")
+        outfile = os.path.join(self.work_dir, "output")
+        lines = [SCRIPT_HEADER]
+        for item in plan:
+            obj, b_size, count, layout = item["obj"], item["block_size"], item["count"], \
+                item["layout"]
+            cmds = {
+                "dd": common_cmd.CREATE_FILE.format("/dev/urandom", infile, b_size, count),
+                "m0cp": common_cmd.M0CP.format(client["ep"], self.endpoints["hax_ep"],
+                                               client["fid"], self.profile_fid, b_size.lower(),
+                                               count, obj, layout, infile),
+                "m0cat": common_cmd.M0CAT.format(client["ep"], self.endpoints["hax_ep"],
+                                                 client["fid"], self.profile_fid,
+                                                 b_size.lower(), count, obj, layout, outfile),
+                "m0unlink": common_cmd.M0UNLINK.format(client["ep"], self.endpoints["hax_ep"],
+                                                       client["fid"], self.profile_fid, obj,
+                                                       layout)}
+            chain = []
+            for step in item["steps"]:
+                if step == "md5sum":
+                    chain.append(f"md5_step {obj} {shlex.quote(infile)} {shlex.quote(outfile)}")
+                else:
+                    chain.append(f"run_step {obj} {step} {_quote(cmds[step])}")
+            lines.append(" && \\\n    ".join(chain))
+        lines.append(f"echo {DONE_MARKER}\nexit 0\n")
+        return "\n".join(lines)
+
+    # pylint: disable=too-many-arguments
+    def run(self, bsize_layout_map: dict = None, block_count: list = None,
+            run_m0cat: bool = True, delete_objs: bool = True, timeout: int = 3600,
+            on_step: Callable[[dict], None] = None):
+        """
+        Run the whole IO matrix with one script copy and one exec. The exec output is read
+        from the SSH channel while the script runs and parsed step by step.
+        :param timeout: Seconds after which the exec is abandoned, the result is incomplete.
+        :param on_step: Called with every step record as soon as it is received.
+        :return: BatchIOResult
+        """
+        plan = self.plan(bsize_layout_map, block_count, run_m0cat, delete_objs)
+        script = self.render_script(plan)
+        script_path = os.path.join(self.work_dir, SCRIPT_NAME)
+        self.node_obj.write_file(script_path, script)
+        resp = self.node_obj.copy_file_to_container(script_path, self.pod_name, script_path,
+                                                    self.container)
+        if not resp[0]:
+            raise IOError(f"Failed to copy {script_path} to {self.pod_name}: {resp[1]}")
+        cmd = common_cmd.KUBECTL_CMD.format("exec", self.pod_name, common_const.NAMESPACE,
+                                            f"-c {self.container} -- bash {script_path}")
+        result = BatchIOResult(plan)
+        stop = threading.Event()
+        timer = threading.Timer(timeout, stop.set)
+        timer.daemon = True
+        timer.start()
+        try:
+            for line in iter_lines(ssh_stream(self.node_obj, cmd, stop_event=stop)):
+                record = result.add_line(line)
+                if record is None:
+                    continue
+                log.debug("%s %s rc=%s in %.3fs", record["obj"], record["step"], record["rc"],
+                          record["elapsed"])
+                if on_step is not None:
+                    on_step(record)
+        finally:
+            timer.cancel()
+        if stop.is_set():
+            log.error("Batch motr IO on %s timed out after %ss", self.pod_name, timeout)
+        log.info("Batch motr IO of %s objects on %s: complete=%s failures=%s", len(plan),
+                 self.pod_name, result.complete, result.failures)
+        return result
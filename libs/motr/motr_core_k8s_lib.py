@@ -25,12 +25,11 @@ import json
 import logging
 import os
 import time
-from random import SystemRandom
 from string import Template
 
-from libs.motr import TEMP_PATH
 from libs.motr import FILE_BLOCK_COUNT
 from libs.motr.layouts import BSIZE_LAYOUT_MAP
+from libs.motr.motr_batch_io import MotrBatchIO
 from libs.ha.ha_common_libs_k8s import HAK8s
 from libs.dtm.dtm_recovery import DTMRecoveryTestLib
 from config import CMN_CFG
@@ -675,34 +674,37 @@ class MotrCoreK8s():
                 }
         :rtype: dict
         """
-        object_dict = {}
-        infile = TEMP_PATH + '/input'
-        outfile = TEMP_PATH + '/output'
         try:
-            for count in block_count:
-                for b_size in bsize_layout_map.keys():
-                    object_id = str(SystemRandom().randint(1, 9999)) + ":" + \
-                                str(SystemRandom().randint(1, 9999))
-                    object_dict[object_id] = {'block_size': b_size}
-                    object_dict[object_id]['deleted'] = False
-                    object_dict[object_id]['count'] = count
-                    self.dd_cmd(b_size, str(count), infile, node)
-                    self.cp_cmd(b_size, str(count), object_id, bsize_layout_map[b_size],
-                                infile, node)
-                    if run_m0cat:
-                        self.cat_cmd(b_size, str(count), object_id,
-                                     bsize_layout_map[b_size], outfile, node)
-                        md5sum = self.get_md5sum(outfile, node)
-                        object_dict[object_id]['md5sum'] = md5sum
-                        self.md5sum_cmd(infile, outfile, node)
-                    if delete_objs:
-                        self.unlink_cmd(object_id, bsize_layout_map[b_size], node)
-                        object_dict[object_id]['deleted'] = True
-            return object_dict
+            result = self.run_motr_io_batch(node, bsize_layout_map, block_count, run_m0cat,
+                                            delete_objs)
+            assert_utils.assert_true(result.complete, "Batch motr IO did not complete")
+            assert_utils.assert_false(result.failures,
+                                      f"Motr IO failed, (step, reason) by object: "
+                                      f"{result.failures}")
+            return result.object_dict()
         except Exception as exc:
             log.exception("Test has failed with execption: %s", exc)
             raise exc
 
+    def run_motr_io_batch(self, node, bsize_layout_map=BSIZE_LAYOUT_MAP,
+                          block_count=FILE_BLOCK_COUNT, run_m0cat=True, delete_objs=True,
+                          client_num=0):
+        """
+        Run dd, m0cp, m0cat, md5sum and m0unlink for the whole block size x count matrix with
+        a single generated script and a single kubectl exec on the client pod of node.
+        :param: str node: Cortx node on which utilities to be executed
+        :param: dict bsize_layout_map: mapping of block size and layout for IOs to run
+        :param: list block_count: List containing the integer values
+        :param: bool run_m0cat: if True, will also run m0cat and compares the md5sum
+        :param: bool delete_objs: if True, will delete the created objects
+        :param: int client_num: motr client endpoint index
+        :return: BatchIOResult with per step records, timings and checksums
+        """
+        runner = MotrBatchIO(self.node_obj, self.node_pod_dict[node],
+                             self.get_cortx_node_endpoints(node), self.profile_fid,
+                             client_num=client_num)
+        return runner.run(bsize_layout_map, block_count, run_m0cat, delete_objs)
+
     def run_io_in_parallel(self, node, bsize_layout_map=BSIZE_LAYOUT_MAP,
                            block_count=FILE_BLOCK_COUNT, run_m0cat=True, delete_objs=True,
                            return_dict=None):
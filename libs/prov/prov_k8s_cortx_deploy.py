@@ -39,6 +39,8 @@ import yaml
 from commons import commands as common_cmd
 from commons import constants as common_const
 from commons import pswdmanager
+from commons.helpers.k8s_watch_helper import K8sStateCache
+from commons.helpers.k8s_watch_helper import shared_cache
 from commons.helpers.pods_helper import LogicalNode
 from commons.params import LOG_DIR
 from commons.params import LATEST_LOG_FOLDER
@@ -1537,8 +1539,12 @@ class ProvDeployK8sCortxLib:
         """
         Function to check all service status
         param: nodeObj of Master node.
+        keyword state_cache: Started K8sStateCache object, default the shared cache of the
+        master node. hctl status is re-checked on pod events, back to back while the watch is
+        unavailable.
         returns: dict of all pods with service status True/False and time taken
         """
+        state_cache = kwargs.get("state_cache", None) or shared_cache(master_node_obj)
         data_pod_list = []
         deployment_type = kwargs.get("deployment_type", self.deployment_type)
         LOGGER.debug("DEPLOYMENT TYPE IN SERVICE CHECK IS %s", deployment_type)
@@ -1562,7 +1568,13 @@ class ProvDeployK8sCortxLib:
         start_time = int(time.time())
         end_time = start_time + (sleep_val * pod_count * 2)  # max 32 mins timeout
         response = list()
+        if state_cache is not None and state_cache.synced():
+            state_cache.wait_until(K8sStateCache.pods_ready(
+                (common_const.POD_NAME_PREFIX, common_const.SERVER_POD_NAME_PREFIX)),
+                timeout=end_time - start_time)
         while int(time.time()) < end_time:
+            watching = state_cache is not None and state_cache.synced()
+            since = state_cache.generation if watching else None
             resp = self.get_hctl_status(master_node_obj)
             LOGGER.debug("services status is %s, End Time is %s", resp[1], end_time)
             if resp[0]:
@@ -1572,6 +1584,8 @@ class ProvDeployK8sCortxLib:
                 response.append(time_taken)
                 break
             response.extend([False, 'Timeout'])
+            if watching:
+                state_cache.wait_for_change(since=since, timeout=sleep_val)
         LOGGER.info("hctl_status = %s", resp[1])
         return response
 
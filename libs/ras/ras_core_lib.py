@@ -31,6 +31,8 @@ from commons import constants as cmn_cons
 from commons.helpers import node_helper
 from commons.helpers.controller_helper import ControllerLib
 from commons.helpers.health_helper import Health
+from commons.helpers.log_tail_helper import LogTailer
+from commons.utils.pattern_utils import MultiPatternMatcher
 from commons.utils.system_utils import run_remote_cmd
 from config import CMN_CFG
 from config import RAS_VAL
@@ -585,43 +587,38 @@ class RASCoreLib:
             return resp
         LOGGER.info(
             "Verified sspl and kafka services are in running state")
-        time.sleep(common_cfg["sleep_val"])
 
-        LOGGER.info("Fetching sspl alert response")
-        cmd = common_commands.COPY_FILE_CMD.format(
-            common_cfg["file"]["screen_log"],
-            common_cfg["file"]["alert_log_file"])
-
-        self.node_utils.execute_cmd(
-            cmd=cmd, read_nbytes=cmn_cons.BYTES_TO_READ)
-        LOGGER.info("Successfully fetched the alert response")
-
-        LOGGER.debug("Reading the alert log file")
-        read_resp = self.node_utils.read_file(
-            filename=common_cfg["file"]["alert_log_file"],
-            local_path=common_cfg["file"]["temp_txt_file"])
-        LOGGER.debug(
-            "======================================================")
-        LOGGER.debug(read_resp)
-        LOGGER.debug(
-            "======================================================")
-        LOGGER.info(
-            "Checking if alerts are generated on message bus")
-        cmd = common_commands.EXTRACT_LOG_CMD.format(
-            common_cfg["file"]["alert_log_file"], string_list[0],
-            common_cfg["file"]["extracted_alert_file"])
-        LOGGER.debug(cmd)
-        self.node_utils.execute_cmd(cmd=cmd, read_nbytes=cmn_cons.BYTES_TO_READ)
-
-        resp = self.validate_alert_msg(
-            remote_file_path=common_cfg["file"]["extracted_alert_file"],
-            pattern_lst=string_list)
+        resp = self.wait_for_alert_msg(string_list, timeout=common_cfg["sleep_val"])
         if not resp[0]:
             return resp
 
         LOGGER.info("Fetched sspl alerts")
         return True, "Fetched alerts successfully"
 
+    def wait_for_alert_msg(self, pattern_lst: list, timeout: int) -> Tuple[bool, str]:
+        """
+        Follow the sspl screen log and return as soon as alert lines containing every pattern
+        are seen, instead of sleeping for the whole timeout and grepping a copy of the log.
+
+        :param list pattern_lst: Expected strings in alert response, lines are filtered on
+        the first one (resource_type)
+        :param int timeout: Maximum seconds to wait for the alerts
+        :return: True, last matched pattern or False, first missing pattern
+        :rtype: tuple
+        """
+        screen_log = RAS_VAL["ras_sspl_alert"]["file"]["screen_log"]
+        LOGGER.info("Waiting up to %s seconds for alerts in %s", timeout, screen_log)
+        with LogTailer(screen_log, node_obj=self.node_utils, from_start=True) as tailer:
+            resp = tailer.wait_for_patterns(pattern_lst, timeout=timeout,
+                                            line_filter=pattern_lst[0])
+        if not resp[0]:
+            LOGGER.info("Match not found : %s", resp[1])
+            return False, resp[1][0]
+        for pattern, line in resp[1].items():
+            LOGGER.info("Match found : %s", pattern)
+            LOGGER.debug(line)
+        return True, pattern_lst[-1]
+
     def validate_alert_msg(self, remote_file_path: str, pattern_lst: list) ->\
             Tuple[bool, str]:
         """
@@ -640,13 +637,16 @@ class RASCoreLib:
             os.remove(local_path)
         _ = self.node_utils.copy_file_to_local(remote_path=remote_file_path,
                                                local_path=local_path)
-        for pattern in pattern_lst:
-            if pattern in open(local_path, encoding="utf-8").read():
-                response = pattern
-            else:
+        with open(local_path, encoding="utf-8") as alert_file:
+            content = alert_file.read()
+        matcher = MultiPatternMatcher(pattern_lst)
+        found = set(matcher.match_line(content))
+        for idx, pattern in enumerate(matcher.patterns):
+            if idx not in found:
                 LOGGER.info("Match not found : %s", pattern)
                 os.remove(local_path)
                 return False, pattern
+            response = pattern
             LOGGER.info("Match found : %s", pattern)
 
         os.remove(local_path)
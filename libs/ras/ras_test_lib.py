@@ -434,33 +434,8 @@ class RASTestLib(RASCoreLib):
                 return resp
             LOGGER.info(
                 "Verified sspl and kafka services are in running state")
-            time.sleep(common_cfg["sleep_val"])
 
-            LOGGER.info("Fetching sspl alert response")
-            response = self.cp_file(common_cfg["file"]["screen_log"],
-                                    common_cfg["file"]["alert_log_file"])
-            if not response[0]:
-                return response
-            LOGGER.info("Successfully fetched the alert response")
-
-            LOGGER.debug("Reading the alert log file")
-            read_resp = self.node_utils.read_file(
-                common_cfg["file"]["alert_log_file"],
-                common_cfg["file"]["local_path"])
-            LOGGER.debug(
-                "======================================================")
-            LOGGER.debug(read_resp)
-            LOGGER.debug(
-                "======================================================")
-
-            LOGGER.info(
-                "Checking if alerts are generated on message bus")
-            cmd = common_commands.EXTRACT_LOG_CMD.format(
-                common_cfg["file"]["alert_log_file"], string_list[0])
-            self.node_utils.execute_cmd(cmd=cmd,
-                                        read_nbytes=cmn_cons.BYTES_TO_READ)
-            resp = self.validate_alert_msg(
-                common_cfg["file"]["extracted_alert_file"], string_list)
+            resp = self.wait_for_alert_msg(string_list, timeout=common_cfg["sleep_val"])
 
             LOGGER.info(resp)
             return resp
@@ -45,6 +45,7 @@ from libs.s3 import s3_bucket_policy_test_lib
 from libs.s3 import s3_multipart_test_lib
 from libs.s3 import s3_tagging_test_lib
 from libs.s3.iam_policy_test_lib import IamPolicyTestLib
+from libs.s3.s3_io_controller import S3IOController
 from libs.s3.s3_rest_cli_interface_lib import S3AccountOperations
 from libs.s3.s3_restapi_test_lib import S3AccountOperationsRestAPI
 from scripts.s3_bench import s3bench
@@ -523,20 +524,26 @@ class S3BackgroundIO:
 
     def __init__(self,
                  s3_test_lib_obj,
-                 io_bucket_name: str = None) -> None:
+                 io_bucket_name: str = None,
+                 in_process: bool = False) -> None:
         """
         Initialize object and create IO bucket, if not present.
 
         :param s3_test_lib_obj: Instance of S3TestLib.
         :param io_bucket_name: IO bucket name.
+        :param in_process: Use the in-process load generator (S3IOController) which can be
+        stopped, paused and queried for live counters instead of s3bench.
         """
         self.s3_test_lib_obj = s3_test_lib_obj
         self.io_bucket_name = io_bucket_name \
                               if io_bucket_name else f"s3io-bkt-{time.perf_counter_ns()}"
         self.log_prefix = "parallel_io"
         self.parallel_ios = None
-        assert_utils.assert_true(path_exists(s3bench.S3_BENCH_PATH),
-                                 f"S3bench tool is not installed: {s3bench.S3_BENCH_PATH}")
+        self.in_process = in_process
+        self.controller = None
+        if not in_process:
+            assert_utils.assert_true(path_exists(s3bench.S3_BENCH_PATH),
+                                     f"S3bench tool is not installed: {s3bench.S3_BENCH_PATH}")
         try:
             self.bucket_exists, _ = self.s3_test_lib_obj.head_bucket(self.io_bucket_name)
         except CTException as error:
@@ -587,6 +594,8 @@ class S3BackgroundIO:
 
         :return: False if IO process is not running or if not created else True.
         """
+        if self.controller:
+            return self.controller.is_alive()
         if not self.parallel_ios:
             return False
         return self.parallel_ios.is_alive()
@@ -608,6 +617,15 @@ class S3BackgroundIO:
             assert_utils.assert_true(resp[0], resp[1])
             LOG.info("Created IO bucket: %s", self.io_bucket_name)
             self.bucket_exists = True
+        if self.in_process:
+            kwargs.setdefault("num_clients", 2)
+            kwargs.setdefault("validate_certs", S3_CFG["validate_certs"])
+            access_key, secret_key = S3H_OBJ.get_local_keys()
+            self.controller = S3IOController(
+                kwargs.pop("end_point", S3_CFG["s3_url"]), access_key, secret_key,
+                self.io_bucket_name, duration=duration,
+                obj_size=kwargs.pop("obj_size", "24Kb"), **kwargs).start()
+            return
         LOG.info("Check s3 bench tool installed.")
         self.parallel_ios = Process(
             target=self.s3_ios,
@@ -618,8 +636,23 @@ class S3BackgroundIO:
         LOG.info("Parallel IOs started: %s for duration: %s",
                  self.parallel_ios.is_alive(), duration)
 
+    def pause(self) -> bool:
+        """Hold back new IOs till resume, in flight IOs complete. In-process IO only."""
+        return self.controller.pause()
+
+    def resume(self) -> None:
+        """Resume paused IOs. In-process IO only."""
+        self.controller.resume()
+
     def stop(self) -> None:
         """Stop the parallel IO's/Process and validate logs."""
+        if self.controller:
+            report = self.controller.stop()
+            LOG.info("Background IO counters: %s", self.controller.counters())
+            assert_utils.assert_true(report, f"Background IO failed: {self.controller.failure}")
+            if self.log_prefix:
+                self.validate()
+            return
         if self.parallel_ios.is_alive():
             resp = self.s3_test_lib_obj.object_list(self.io_bucket_name)
             LOG.info(resp)
@@ -629,13 +662,20 @@ class S3BackgroundIO:
             self.validate()
 
     def validate(self) -> None:
-        """Validate s3bench execution logs."""
+        """Validate s3bench execution logs or in-process IO errors."""
+        if self.controller:
+            counters = self.controller.counters()
+            assert_utils.assert_equal(counters["errors"], 0,
+                                      f"Background IO errors: {counters['error_classes']}")
+            return
         resp = system_utils.validate_s3bench_parallel_execution(s3bench.LOG_DIR, self.log_prefix)
         assert_utils.assert_true(resp[0], resp[1])
 
     def cleanup(self) -> None:
         """Stop parallel IO process and cleanup IO bucket."""
-        if self.is_alive():
+        if self.controller:
+            self.controller.stop()
+        elif self.is_alive():
             self.parallel_ios.join()
         if self.bucket_exists:
             LOG.info("Deleting IO bucket: %s", self.io_bucket_name)
@@ -0,0 +1,383 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Declarative multi-bucket S3 test fixtures.
+
+A test describes its buckets (object count, size distribution, versioning, tags, ACLs) as
+BucketSpec and S3FixtureBuilder materializes them: buckets are set up concurrently, then
+every object goes through generate -> put -> optional verify in a bounded pool of workers.
+Payloads are generated in memory from a seed, so no file is written and a seed always gives
+the same data set. The returned manifest lists every object version with its size, md5 and
+version id for the test to assert against, every version is recorded as soon as its put
+succeeded. Teardown removes the objects with DeleteObjects batches, then lists the buckets
+and deletes whatever is left in them (e.g. versions of a failed build or objects written by
+the test) before deleting the buckets.
+"""
+
+import hashlib
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from functools import partial
+from typing import Iterator
+from urllib.parse import urlencode
+
+from botocore.exceptions import BotoCoreError
+from botocore.exceptions import ClientError
+
+from commons.utils.s3_utils import DELETE_BATCH
+from commons.utils.s3_utils import seeded_payload
+
+LOGGER = logging.getLogger(__name__)
+
+KB = 1024
+
+
+class S3FixtureError(Exception):
+    """Fixture could not be materialized completely."""
+
+    def __init__(self, message: str, manifest: "FixtureManifest"):
+        super().__init__(message)
+        self.manifest = manifest
+
+
+@dataclass
+class BucketSpec:
+    """
+    Bucket of a fixture.
+
+    sizes is a list of object sizes in bytes picked uniformly, or a {size: weight} dict.
+    With versioning enabled every object gets versions uploads. tags are set on every
+    object, bucket_tags on the bucket; acl and bucket_acl are canned ACLs.
+    """
+
+    name: str
+    objects: int = 0
+    sizes: object = field(default_factory=lambda: [4 * KB])
+    prefix: str = "obj"
+    versioning: bool = False
+    versions: int = 1
+    tags: dict = None
+    bucket_tags: dict = None
+    acl: str = None
+    bucket_acl: str = None
+
+
+@dataclass
+class ObjectVersion:
+    """Uploaded object version."""
+
+    bucket: str
+    key: str
+    size: int
+    md5: str
+    seed: int
+    version_id: str = None
+
+
+class FixtureManifest:
+    """Buckets and object versions of a materialized fixture."""
+
+    def __init__(self, specs: list):
+        self.specs = {spec.name: spec for spec in specs}
+        self.objects = {}
+        self.failed = []
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def add(self, version: ObjectVersion):
+        """Record uploaded object version, versions of a key are kept in upload order."""
+        with self._lock:
+            self.objects.setdefault((version.bucket, version.key), []).append(version)
+
+    def keys(self, bucket: str) -> list:
+        """Sorted object keys of bucket."""
+        return sorted(key for name, key in self.objects if name == bucket)
+
+    def versions(self, bucket: str, key: str) -> list:
+        """Versions of object, latest last."""
+        return self.objects[(bucket, key)]
+
+    def latest(self, bucket: str, key: str) -> ObjectVersion:
+        """Current version of object."""
+        return self.objects[(bucket, key)][-1]
+
+    def entries(self) -> list:
+        """All object versions ordered by bucket and key."""
+        return [version for _, versions in sorted(self.objects.items())
+                for version in versions]
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes uploaded."""
+        return sum(version.size for version in self.entries())
+
+    def __len__(self):
+        return sum(len(versions) for versions in self.objects.values())
+
+
+def pick_size(rng: random.Random, sizes) -> int:
+    """Size from a list (uniform) or {size: weight} distribution."""
+    if isinstance(sizes, dict):
+        return int(rng.choices(list(sizes), weights=list(sizes.values()))[0])
+    return int(rng.choice(sizes))
+
+
+class S3FixtureBuilder:
+    """Materialize and tear down BucketSpec fixtures against an S3 client."""
+
+    def __init__(self, s3_client, max_workers: int = 32, verify: bool = False,
+                 max_pending: int = None):
+        """
+        :param s3_client: boto3 S3 client
+        :param max_workers: Requests in flight
+        :param verify: Read back every object and compare its md5
+        :param max_pending: Objects generated but not yet uploaded, bounds payload memory,
+        default twice max_workers
+        """
+        self.s3_client = s3_client
+        self.max_workers = max_workers
+        self.verify = verify
+        self.max_pending = max_pending or 2 * max_workers
+
+    def _setup_bucket(self, spec: BucketSpec):
+        kwargs = {"ACL": spec.bucket_acl} if spec.bucket_acl else {}
+        try:
+            self.s3_client.create_bucket(Bucket=spec.name, **kwargs)
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "BucketAlreadyOwnedByYou":
+                raise
+        if spec.versioning:
+            self.s3_client.put_bucket_versioning(
+                Bucket=spec.name, VersioningConfiguration={"Status": "Enabled"})
+        if spec.bucket_tags:
+            self.s3_client.put_bucket_tagging(
+                Bucket=spec.name, Tagging={"TagSet": [{"Key": key, "Value": value}
+                                                      for key, value in
+                                                      spec.bucket_tags.items()]})
+
+    @staticmethod
+    def plan(specs: list, seed: int = 0) -> Iterator[tuple]:
+        """
+        Objects of specs as (spec, key, [(size, seed) of every version]), the same seed
+        gives the same plan. Generated lazily so large fixtures are never held in memory.
+        """
+        rng = random.Random(seed)
+        for spec in specs:
+            for num in range(spec.objects):
+                yield spec, f"{spec.prefix}-{num}", [
+                    (pick_size(rng, spec.sizes), rng.getrandbits(63))
+                    for _ in range(spec.versions if spec.versioning else 1)]
+
+    def _materialize(self, item: tuple, manifest: FixtureManifest):
+        """generate -> put -> verify of the versions of an object, oldest first."""
+        spec, key, versions = item
+        for size, seed in versions:
+            self._put_version(spec, key, size, seed, manifest)
+
+    # pylint: disable=too-many-arguments
+    def _put_version(self, spec: BucketSpec, key: str, size: int, seed: int,
+                     manifest: FixtureManifest):
+        """Put object version and record it in manifest before it is verified."""
+        data = seeded_payload(seed, size)
+        md5 = hashlib.md5(data).hexdigest()  # nosec
+        kwargs = {}
+        if spec.tags:
+            kwargs["Tagging"] = urlencode(spec.tags)
+        if spec.acl:
+            kwargs["ACL"] = spec.acl
+        resp = self.s3_client.put_object(Bucket=spec.name, Key=key, Body=data, **kwargs)
+        version = ObjectVersion(spec.name, key, size, md5, seed, resp.get("VersionId"))
+        manifest.add(version)
+        if self.verify:
+            get_kwargs = {"VersionId": version.version_id} if version.version_id else {}
+            body = self.s3_client.get_object(Bucket=spec.name, Key=key, **get_kwargs)["Body"]
+            try:
+                received = hashlib.md5(body.read()).hexdigest()  # nosec
+            finally:
+                body.close()
+            if received != md5:
+                raise IOError(f"md5 mismatch of {spec.name}/{key}: {received} != {md5}")
+
+    def build(self, specs: list, seed: int = 0) -> FixtureManifest:
+        """
+        Create buckets and objects of specs.
+        :param specs: BucketSpec list
+        :param seed: Seed of object sizes and payloads
+        :return: FixtureManifest
+        :raises S3FixtureError: When any bucket or object failed, the manifest of the error
+        has what was created so it can still be torn down
+        """
+        manifest = FixtureManifest(specs)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for spec, error in zip(specs, executor.map(partial(self._try, self._setup_bucket),
+                                                       specs)):
+                if error is not None:
+                    manifest.failed.append((spec.name, None, str(error)))
+            if manifest.failed:
+                raise S3FixtureError(f"Bucket setup failed: {manifest.failed}", manifest)
+            manifest.stats["buckets_elapsed"] = time.perf_counter() - start
+            pending = {}
+            for item in self.plan(specs, seed):
+                if len(pending) >= self.max_pending:
+                    self._collect(pending, manifest, FIRST_COMPLETED)
+                pending[executor.submit(self._materialize, item, manifest)] = item
+            self._collect(pending, manifest)
+        elapsed = time.perf_counter() - start
+        manifest.stats.update(elapsed=elapsed, objects=len(manifest),
+                              bytes=manifest.total_bytes,
+                              objects_per_sec=len(manifest) / elapsed if elapsed else 0)
+        LOGGER.info("Fixture of %s buckets, %s object versions, %s bytes built in %.2fs",
+                    len(specs), len(manifest), manifest.total_bytes, elapsed)
+        if manifest.failed:
+            raise S3FixtureError(f"{len(manifest.failed)} objects failed, first "
+                                 f"{manifest.failed[0]}", manifest)
+        return manifest
+
+    @staticmethod
+    def _try(func, arg):
+        """Call func(arg), return the S3 error raised if any."""
+        try:
+            func(arg)
+            return None
+        except (BotoCoreError, ClientError, OSError) as error:
+            LOGGER.error("%s of %s failed: %s", func.__name__, arg, error)
+            return error
+
+    @staticmethod
+    def _collect(pending: dict, manifest: FixtureManifest, return_when: str = ALL_COMPLETED):
+        """Record failures of finished futures of pending."""
+        done, _ = wait(list(pending), return_when=return_when)
+        for future in done:
+            spec, key, _ = pending.pop(future)
+            try:
+                future.result()
+            except (BotoCoreError, ClientError, OSError) as error:
+                LOGGER.error("Object %s/%s failed: %s", spec.name, key, error)
+                manifest.failed.append((spec.name, key, str(error)))
+
+    def _remaining(self, bucket: str) -> list:
+        """
+        Object versions and delete markers left in bucket as DeleteObjects entries.
+        :return: None if the bucket does not exist
+        """
+        objs, kwargs = [], {}
+        while True:
+            try:
+                resp = self.s3_client.list_object_versions(Bucket=bucket, **kwargs)
+            except ClientError as error:
+                if error.response["Error"]["Code"] == "NoSuchBucket":
+                    return None
+                raise
+            objs.extend({"Key": entry["Key"], "VersionId": entry["VersionId"]}
+                        for entry in resp.get("Versions", []) + resp.get("DeleteMarkers", []))
+            if not resp.get("IsTruncated"):
+                return objs
+            kwargs = {"KeyMarker": resp["NextKeyMarker"],
+                      "VersionIdMarker": resp["NextVersionIdMarker"]}
+
+    def _delete_batch(self, bucket: str, objs: list) -> list:
+        """DeleteObjects request, :return: [(bucket, key, error)] not deleted."""
+        resp = self.s3_client.delete_objects(Bucket=bucket,
+                                             Delete={"Objects": objs, "Quiet": True})
+        return [(bucket, error["Key"], error.get("Code")) for error in resp.get("Errors", [])]
+
+    def teardown(self, manifest: FixtureManifest, delete_buckets: bool = True) -> list:
+        """
+        Delete object versions of manifest with DeleteObjects batches, then list the buckets
+        and delete what is left in them, then the buckets.
+        :return: [(bucket, key, error)] not deleted, key is None for a bucket
+        """
+        batches = {}
+        for version in manifest.entries():
+            obj = {"Key": version.key}
+            if version.version_id:
+                obj["VersionId"] = version.version_id
+            batches.setdefault(version.bucket, []).append(obj)
+        items = [(bucket, objs[num:num + DELETE_BATCH]) for bucket, objs in batches.items()
+                 for num in range(0, len(objs), DELETE_BATCH)]
+        failed = []
+
+        def delete_batch(item):
+            # keys failing here are retried by the sweep, which reports what is left
+            self._delete_batch(*item)
+
+        def sweep(bucket):
+            objs = self._remaining(bucket)
+            if objs is None:
+                return
+            errors = []
+            for num in range(0, len(objs), DELETE_BATCH):
+                errors.extend(self._delete_batch(bucket, objs[num:num + DELETE_BATCH]))
+            if objs:
+                LOGGER.warning("%s object versions left in %s after deleting the manifest, "
+                               "%s of them not deleted", len(objs), bucket, len(errors))
+            failed.extend(errors)
+            if delete_buckets and not errors:
+                self.s3_client.delete_bucket(Bucket=bucket)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(partial(self._try, delete_batch), items))
+            for bucket, error in zip(manifest.specs, executor.map(partial(self._try, sweep),
+                                                                  manifest.specs)):
+                if error is not None:
+                    failed.append((bucket, None, str(error)))
+        LOGGER.info("Fixture torn down in %.2fs with %s batches, %s failures",
+                    time.perf_counter() - start, len(items), len(failed))
+        return failed
+
+
+@contextmanager
+def s3_fixture(s3_client, specs: list, seed: int = 0, **kwargs) -> Iterator[FixtureManifest]:
+    """
+    Build fixture for the duration of the with block and tear it down afterwards.
+    :param kwargs: S3FixtureBuilder arguments
+    :raises S3FixtureError: When the build failed or the teardown left objects or buckets
+    behind, teardown failures after an error of the with block are logged only
+    """
+    builder = S3FixtureBuilder(s3_client, **kwargs)
+    try:
+        manifest = builder.build(specs, seed)
+    except S3FixtureError as error:
+        failed = builder.teardown(error.manifest)
+        if failed:
+            LOGGER.error("Teardown of the failed fixture left %s behind: %s", len(failed),
+                         failed)
+        raise
+    passed = False
+    try:
+        yield manifest
+        passed = True
+    finally:
+        failed = builder.teardown(manifest)
+        if failed:
+            LOGGER.error("Fixture teardown left %s behind: %s", len(failed), failed)
+            if passed:
+                raise S3FixtureError(f"Teardown left {len(failed)} behind, first {failed[0]}",
+                                     manifest)
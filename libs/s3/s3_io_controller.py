@@ -0,0 +1,293 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Stoppable and observable background S3 IO.
+
+The in-process load generator runs in a child process. The child publishes per interval
+deltas (operation counts, bytes, timestamped errors, latency histograms) over a
+multiprocessing queue; the parent folds them into live counters and a timeline which tests
+can query while the IO keeps running.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter
+
+from commons.utils.histogram_utils import LatencyHistogram
+from scripts.s3_bench.s3loadgen import OPERATIONS
+from scripts.s3_bench.s3loadgen import S3LoadEngine
+
+LOGGER = logging.getLogger(__name__)
+
+MSG_INTERVAL = "interval"
+MSG_FINAL = "final"
+MSG_ERROR = "error"
+
+
+class _IntervalPublisher:
+    """Child side: accumulate completions and publish them every interval."""
+
+    def __init__(self, channel, interval: float):
+        self.channel = channel
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._reset()
+
+    def _reset(self):
+        self.ops = Counter()
+        self.bytes = Counter()
+        self.errors = []
+        self.hists = {}
+
+    def record(self, op: str, latency: float, nbytes: int, error: str = None):
+        """on_complete hook of the engine."""
+        with self._lock:
+            self.ops[op] += 1
+            self.hists.setdefault(op, LatencyHistogram()).record(latency)
+            if error is None:
+                self.bytes[op] += nbytes
+            else:
+                self.errors.append((time.time(), op, error.split(":")[0]))
+
+    def flush(self, in_flight: int):
+        """Publish the interval."""
+        with self._lock:
+            now = time.time()
+            self.channel.put({"type": MSG_INTERVAL, "start": self._start, "end": now,
+                              "ops": dict(self.ops), "bytes": dict(self.bytes),
+                              "errors": self.errors, "in_flight": in_flight,
+                              "hists": {op: hist.to_dict() for op, hist in self.hists.items()}})
+            self._start = now
+            self._reset()
+
+
+# pylint: disable=too-many-arguments
+def _io_worker(engine_kwargs: dict, stop_event, pause_event, channel, interval: float):
+    """Child process: run the engine and publish its counters."""
+    publisher = _IntervalPublisher(channel, interval)
+    engine = S3LoadEngine(stop_event=stop_event, pause_event=pause_event,
+                          on_complete=publisher.record, **engine_kwargs)
+    done = threading.Event()
+
+    def flusher():
+        while not done.wait(interval):
+            publisher.flush(engine.in_flight)
+
+    thread = threading.Thread(target=flusher, daemon=True)
+    thread.start()
+    try:
+        report = engine.run()
+        done.set()
+        thread.join()
+        publisher.flush(0)
+        channel.put({"type": MSG_FINAL, "report": report.to_dict(), "text": report.to_text()})
+    except Exception as error:  # pylint: disable=broad-except
+        done.set()
+        channel.put({"type": MSG_ERROR, "error": f"{type(error).__name__}: {error}"})
+
+
+class S3IOController:
+    """
+    Background S3 IO with cooperative stop, pause/resume and live counters.
+
+    Usage::
+
+        io_ctl = S3IOController(S3_CFG["s3_url"], access_key, secret_key, bucket,
+                                mix={"write": 50, "read": 50}, num_clients=4).start()
+        io_ctl.wait_for(ops=100)
+        t_1 = time.time()
+        ...inject fault...
+        io_ctl.failed_between(t_1, time.time())
+        report = io_ctl.stop()
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, end_point: str, access_key: str, secret_key: str, bucket: str,
+                 interval: float = 0.5, **engine_kwargs):
+        """
+        :param interval: Seconds between counter updates from the IO process.
+        :param engine_kwargs: S3LoadEngine arguments (mix, obj_size, num_clients, rate,
+        duration, num_sample ...). A mix without limits runs till stop().
+        """
+        engine_kwargs.setdefault("mix", {"write": 50, "read": 40, "delete": 10})
+        self.engine_kwargs = dict(end_point=end_point, access_key=access_key,
+                                  secret_key=secret_key, bucket=bucket, **engine_kwargs)
+        self.interval = interval
+        self._stop = multiprocessing.Event()
+        self._pause = multiprocessing.Event()
+        self._channel = multiprocessing.Queue()
+        self._cond = threading.Condition()
+        self._process = None
+        self._collector = None
+        self.timeline = []
+        self.ops = Counter()
+        self.bytes = Counter()
+        self.errors = []
+        self.hists = {op: LatencyHistogram() for op in OPERATIONS}
+        self.in_flight = 0
+        self.last_update = None
+        self.report = None
+        self.failure = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Start the IO process."""
+        self._process = multiprocessing.Process(
+            target=_io_worker, args=(self.engine_kwargs, self._stop, self._pause,
+                                     self._channel, self.interval), daemon=True)
+        self._process.start()
+        self._collector = threading.Thread(target=self._collect, name="s3io-collector",
+                                           daemon=True)
+        self._collector.start()
+        LOGGER.info("Background IO started on bucket %s: pid %s", self.engine_kwargs["bucket"],
+                    self._process.pid)
+        return self
+
+    def is_alive(self) -> bool:
+        """True while the IO process runs."""
+        return self._process is not None and self._process.is_alive()
+
+    def _collect(self):
+        """Fold messages from the IO process into the counters."""
+        while True:
+            try:
+                msg = self._channel.get(timeout=self.interval)
+            except queue.Empty:
+                if self._process.is_alive():
+                    continue
+                msg = {"type": MSG_ERROR, "error": f"IO process exited with code "
+                                                   f"{self._process.exitcode}"}
+            with self._cond:
+                if msg["type"] == MSG_INTERVAL:
+                    self._apply(msg)
+                elif msg["type"] == MSG_FINAL:
+                    self.report = msg
+                else:
+                    self.failure = msg["error"]
+                    LOGGER.error("Background IO failed: %s", self.failure)
+                self._cond.notify_all()
+            if msg["type"] != MSG_INTERVAL:
+                return
+
+    def _apply(self, msg: dict):
+        """Apply one interval. Caller holds the lock."""
+        self.ops.update(msg["ops"])
+        self.bytes.update(msg["bytes"])
+        self.errors.extend(msg["errors"])
+        for op, data in msg["hists"].items():
+            self.hists[op].merge(LatencyHistogram.from_dict(data))
+        self.in_flight = msg["in_flight"]
+        self.last_update = msg["end"]
+        self.timeline.append({"start": msg["start"], "end": msg["end"], "ops": msg["ops"],
+                              "errors": len(msg["errors"])})
+
+    @property
+    def finished(self) -> bool:
+        """True once the IO process reported its end."""
+        return self.report is not None or self.failure is not None
+
+    def counters(self) -> dict:
+        """Snapshot of the live counters with latency percentiles in ms."""
+        with self._cond:
+            return {"ops": dict(self.ops), "total_ops": sum(self.ops.values()),
+                    "bytes": dict(self.bytes), "errors": len(self.errors),
+                    "error_classes": dict(Counter(error[2] for error in self.errors)),
+                    "latency_ms": {op: hist.summary() for op, hist in self.hists.items()
+                                   if hist.count},
+                    "in_flight": self.in_flight, "paused": self._pause.is_set(),
+                    "updated": self.last_update}
+
+    def wait_for(self, ops: int = None, errors: int = None, op: str = None,
+                 timeout: float = 60) -> bool:
+        """
+        Block till at least ops operations (of type op if given) or errors failures completed.
+        :return: True if reached, False on timeout or if the IO ended before.
+        """
+        def reached():
+            done = self.ops[op] if op else sum(self.ops.values())
+            return (ops is not None and done >= ops) or \
+                (errors is not None and len(self.errors) >= errors)
+
+        with self._cond:
+            return self._cond.wait_for(lambda: reached() or self.finished, timeout) and \
+                reached()
+
+    def pause(self, wait: bool = True, timeout: float = 60) -> bool:
+        """
+        Hold back new operations, e.g. around fault injection.
+        :param wait: Block till in flight operations completed.
+        :return: True if IO is quiesced (or wait is False).
+        """
+        paused_at = time.time()
+        self._pause.set()
+        LOGGER.info("Background IO paused")
+        if not wait:
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished or (
+                self.last_update is not None and self.last_update > paused_at and
+                not self.in_flight), timeout)
+
+    def resume(self):
+        """Resume IO after pause."""
+        self._pause.clear()
+        LOGGER.info("Background IO resumed")
+
+    def stop(self, timeout: float = 120) -> dict:
+        """
+        Stop IO cooperatively, in flight operations complete.
+        :return: Final json report of the load generator, None if the IO process failed.
+        """
+        if self._process is None:
+            return None
+        self._stop.set()
+        self._pause.clear()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            LOGGER.error("Background IO did not stop in %s seconds, terminating", timeout)
+            self._process.terminate()
+            self._process.join()
+        self._collector.join(timeout)
+        LOGGER.info("Background IO stopped: %s", self.counters())
+        return self.report["report"] if self.report else None
+
+    def errors_between(self, start: float, end: float) -> dict:
+        """Failed operations by error class with completion time in [start, end] (epoch)."""
+        with self._cond:
+            return dict(Counter(error[2] for error in self.errors if start <= error[0] <= end))
+
+    def failed_between(self, start: float, end: float) -> int:
+        """Number of operations failed in [start, end] (epoch seconds)."""
+        return sum(self.errors_between(start, end).values())
+
+    def ops_between(self, start: float, end: float) -> int:
+        """Operations completed in the reporting intervals overlapping [start, end]."""
+        with self._cond:
+            return sum(sum(item["ops"].values()) for item in self.timeline
+                       if item["end"] >= start and item["start"] <= end)
@@ -30,10 +30,12 @@ import os
 
 from commons import commands as com_cmds
 from commons.helpers.pods_helper import LogicalNode
+from commons.utils import cluster_topology_utils as topo_utils
 from commons.utils import ext_lbconfig_utils as extlb_utils
 from commons.utils import system_utils as sysutils
 
 CONF_FILE = 'scripts/cicd_k8s/config.ini'
+TOPOLOGY_FILE = "/root/cluster_topology.json"
 config = configparser.ConfigParser()
 config.read(CONF_FILE)
 LOGGER = logging.getLogger(__name__)
@@ -42,7 +44,8 @@ LOGGER = logging.getLogger(__name__)
 # pylint: disable=too-many-arguments
 # pylint: disable-msg=too-many-locals
 def create_db_entry(m_node, username: str, password: str,
-                    admin_user: str, admin_passwd: str, ext_ip) -> str:
+                    admin_user: str, admin_passwd: str, ext_ip,
+                    topology_path: str = None) -> str:
     """
     Creation of new host entry in database.
     :param str m_node: hostname of master node
@@ -51,6 +54,7 @@ def create_db_entry(m_node, username: str, password: str,
     :param str admin_user: admin user for cortxcli
     :param str admin_passwd: admin password for cortxcli
     :param str ext_ip: external LB IP
+    :param str topology_path: cluster topology snapshot of haproxy configuration
     :return: Target name
     """
     host_list = list()
@@ -58,16 +62,13 @@ def create_db_entry(m_node, username: str, password: str,
     json_file = config['default']['setup_entry_json']
     new_setupname = os.getenv("Target_Node")
     node_obj = LogicalNode(hostname=m_node, username=username, password=password)
-    mgnt_resp = node_obj.execute_cmd(com_cmds.K8S_GET_MGNT, read_lines=True)
-    for line in mgnt_resp:
-        if "cortx-control" in line:
-            mgmt_vip = line.split()[6]
+    topology = topo_utils.get_topology(node_obj, username, password, "eth1",
+                                       cache_path=topology_path)
+    for pod, pod_info in topology.pods.items():
+        if "cortx-control" in pod:
+            mgmt_vip = pod_info["node"]
     print("Cortx control pod running on: ", mgmt_vip)
-    output_node = node_obj.execute_cmd(com_cmds.CMD_GET_NODE, read_lines=True)
-    for line in output_node:
-        if "worker" in line:
-            out = line.split()[0]
-            host_list.append(out)
+    host_list.extend(topology.workers)
     num_nodes = len(host_list) - 1
     print("Total number of nodes in cluster: ", num_nodes)
     print("Creating DB entry for setup: ", new_setupname)
@@ -130,13 +131,15 @@ def main():
     print("Creating haproxy.cfg for {} Node setup".format(args.master_node))
     haproxy_cfg = config['default']['haproxy_config']
     extlb_utils.configure_haproxy_lb(
-        master_node, username=username, password=args.password, ext_ip=ext_ip)
+        master_node, username=username, password=args.password, ext_ip=ext_ip,
+        topology_path=TOPOLOGY_FILE)
     with open(haproxy_cfg, 'r') as f_read:
         print((45*"*" + "haproxy.cfg" + 45*"*" + "\n"))
         print(f_read.read())
         print((100*"*" + "\n"))
     setupname = create_db_entry(master_node, username=username, password=args.password,
-                                admin_user=admin_user, admin_passwd=admin_passwd, ext_ip=ext_ip)
+                                admin_user=admin_user, admin_passwd=admin_passwd, ext_ip=ext_ip,
+                                topology_path=TOPOLOGY_FILE)
     print("target_name: {}".format(setupname))
     sysutils.execute_cmd(cmd="cp /root/secrets.json .")
     with open("/root/secrets.json", 'r') as file:
@@ -28,6 +28,7 @@ import json
 import pandas as pd
 
 from commons.utils.config_utils import read_yaml
+from commons.utils.log_scan_utils import LogScanner
 from commons.utils.system_utils import path_exists, run_local_cmd, make_dirs
 
 LOGGER = logging.getLogger(__name__)
@@ -68,16 +69,11 @@ def check_log_file_error(file_path, errors=None):
     if not errors:
         errors = ["failed ", "panic", "status code",
                   "does not exist", "InternalError", "send request failed"]
-    error_found = False
-    LOGGER.info("Debug: Log File Path %s",file_path)
-    with open(file_path, "r", encoding="utf-8") as hs_log_file:
-        for line in hs_log_file:
-            for error in errors:
-                if error.lower() in line.lower():
-                    error_found = True
-                    LOGGER.error("%s Found in HSBench Run : %s",error, line)
-                    return error_found
-    return error_found
+    LOGGER.info("Debug: Log File Path %s", file_path)
+    result = LogScanner(errors, context=0, max_hits=1).scan_file(file_path)
+    for hit in result.hits:
+        LOGGER.error("%s Found in HSBench Run : %s", hit.patterns, hit.line)
+    return result.found
 
 # pylint: disable-msg=too-many-arguments
 # pylint: disable-msg=too-many-locals
@@ -19,315 +19,342 @@
 
 """
 Script to deploy k8s on VM
+
+Every stage runs on all its hosts at the same time over one SSH connection per host and is
+skipped on hosts where it is applied already, see stage_runner. With --journal progress is
+journaled and a failed deployment is resumed by running the script again with the same
+--journal, the journal is moved aside once the deployment passed.
 """
 from __future__ import absolute_import
 import argparse
-import time
 import json
-import re
 import configparser
+import sys
+
 from commons.helpers.pods_helper import LogicalNode
 from commons import commands as cmn_cmd
+from scripts.k8s_cluster_setup.stage_runner import MASTER
+from scripts.k8s_cluster_setup.stage_runner import WORKERS
+from scripts.k8s_cluster_setup.stage_runner import Stage
+from scripts.k8s_cluster_setup.stage_runner import StageRunner
+from scripts.k8s_cluster_setup.stage_runner import wait_until
 
 # Global Constants
 CONFIG_FILE = 'scripts/k8s_cluster_setup/config.ini'
 CONFIG = configparser.ConfigParser()
 CONFIG.read(CONFIG_FILE)
 REMOTE_HOSTS_ORG = CONFIG['default']['etc_host']
-LOCAL_COPY_HOSTS = CONFIG['default']['etc_host_tmp']
 DAEMON_JSON_FILE = CONFIG['default']['daemon_json_file']
-DAEMON_JSON_FILE_LOCAL = CONFIG['default']['daemon_json_file_tmp']
+DAEMON_JSON = {"exec-opts": ["native.cgroupdriver=systemd"]}
+K8S_REPO = "/etc/yum.repos.d/kubernetes.repo"
+
+
+class SshExecutor:
+    """Commands on a host over a single SSH connection."""
+
+    def __init__(self, host, username, password):
+        self.host = host
+        self.node = LogicalNode(hostname=host, username=username, password=password)
+
+    def run(self, cmd, exc=True):
+        """
+        Execute command
+        :param exc: Raise IOError if command fails
+        :return: Output of command
+        """
+        resp = self.node.execute_cmd(cmd=cmd, read_lines=False, exc=exc)
+        if isinstance(resp, tuple):
+            resp = resp[0]
+        return resp.decode() if isinstance(resp, bytes) else resp
+
+    def check(self, cmd):
+        """True if command exits with 0."""
+        try:
+            self.node.execute_cmd(cmd=cmd, read_lines=False)
+        except IOError:
+            return False
+        return True
+
+
+def host_ip(executor, context):
+    """
+    IP of the host, given by -IP or of eth0
+    """
+    ips = context.get("host_ips") or {}
+    if executor.host in ips:
+        return ips[executor.host]
+    result = executor.run("ifconfig eth0").splitlines()
+    return result[1].split()[1]
 
 
-def install_docker(*hostname, username, password):
+def update_hosts(executor, context):
+    """
+    Add all hosts to /etc/hosts and check they are reachable
+    """
+    for host, node_ip in context["results"]["host_ip"].items():
+        entry = f"{node_ip} {host}"
+        executor.run(f"grep -qxF '{entry}' {REMOTE_HOSTS_ORG} || "
+                     f"echo '{entry}' >> {REMOTE_HOSTS_ORG}")
+        executor.run(cmn_cmd.CMD_PING.format(node_ip))
+
+
+def docker_installed(executor, _):
+    """Check docker is installed and running."""
+    return executor.check("rpm -q docker-ce docker-ce-cli containerd.io && "
+                          "systemctl is-enabled docker && systemctl is-active docker")
+
+
+def install_docker(executor, _):
     """
     Function to install docker
     """
-    for host in hostname:
-        nd_obj = LogicalNode(hostname=host, username=username, password=password)
-        print("Installing docker on host\n", host)
-        cmd = "yum install -y yum-utils && " \
-              "yum-config-manager -y" \
-              " --add-repo https://download.docker.com/linux/centos/docker-ce.repo && " \
-              "yum install -y docker-ce docker-ce-cli containerd.io"
-        resp = nd_obj.execute_cmd(cmd=cmd, read_lines=True, exc=False)
-        if resp:
-            print("docker is Installed on host\n", host)
-            print("enabling docker \n")
-            nd_obj.execute_cmd(cmd="systemctl enable docker", read_lines=True)
-            print("starting docker \n")
-            nd_obj.execute_cmd(cmd="systemctl start docker", read_lines=True)
-
-
-def configure_iptables(*hostname, username, password):
+    print("Installing docker on host\n", executor.host)
+    executor.run("yum install -y yum-utils && "
+                 "yum-config-manager -y"
+                 " --add-repo https://download.docker.com/linux/centos/docker-ce.repo && "
+                 "yum install -y docker-ce docker-ce-cli containerd.io")
+    print("enabling and starting docker on host\n", executor.host)
+    executor.run("systemctl enable docker && systemctl start docker")
+
+
+def iptables_configured(executor, _):
+    """Check bridge netfilter is configured."""
+    return executor.check("grep -qx br_netfilter /etc/modules-load.d/k8s.conf && "
+                          "grep -q 'net.bridge.bridge-nf-call-iptables = 1' "
+                          "/etc/sysctl.d/k8s.conf")
+
+
+def configure_iptables(executor, _):
     """
     Configure iptables
     """
-    for host in hostname:
-        nd_obj = LogicalNode(hostname=host, username=username, password=password)
-        print("Configuring iptables \n")
-        cmd = "cat <<EOF | sudo tee /etc/modules-load.d/k8s.conf\n"\
-              "br_netfilter\n"\
-              "EOF"
-        cmd2 = "cat <<EOF > /etc/sysctl.d/k8s.conf\n"\
-               "net.bridge.bridge-nf-call-ip6tables = 1\n"\
-               "net.bridge.bridge-nf-call-iptables = 1\n"\
-               "EOF"
-        nd_obj.execute_cmd(cmd=cmd, read_lines=False)
-        nd_obj.execute_cmd(cmd=cmd2, read_lines=False)
-
-
-def create_daemon_file(*hostname, username, password):
+    print("Configuring iptables on host\n", executor.host)
+    executor.run("cat <<EOF > /etc/modules-load.d/k8s.conf\n"
+                 "br_netfilter\n"
+                 "EOF")
+    executor.run("cat <<EOF > /etc/sysctl.d/k8s.conf\n"
+                 "net.bridge.bridge-nf-call-ip6tables = 1\n"
+                 "net.bridge.bridge-nf-call-iptables = 1\n"
+                 "EOF")
+
+
+def daemon_file_created(executor, _):
+    """Check docker uses systemd cgroup driver."""
+    return executor.check(f"grep -q native.cgroupdriver=systemd {DAEMON_JSON_FILE}")
+
+
+def create_daemon_file(executor, _):
     """
     Create file etc/docker/daemon.json
     """
-    for host in hostname:
-        nd_obj = LogicalNode(hostname=host, username=username, password=password)
-        print("Creating daemon.json \n")
-
-        daemon_json = {
-            "exec-opts": ["native.cgroupdriver=systemd"]
-        }
-        json_object = json.dumps(daemon_json, indent=1)
-        with open(DAEMON_JSON_FILE_LOCAL, "w") as outfile:
-            outfile.write(json_object)
-        nd_obj.copy_file_to_remote(DAEMON_JSON_FILE_LOCAL, DAEMON_JSON_FILE)
-        print("restarting docker \n")
-        nd_obj.execute_cmd(cmd="systemctl restart docker", read_lines=True)
-
-
-def configure_k8s_repo(*hostname, username, password):
+    print("Creating daemon.json on host\n", executor.host)
+    executor.run(f"mkdir -p $(dirname {DAEMON_JSON_FILE}) && "
+                 f"cat <<EOF > {DAEMON_JSON_FILE}\n{json.dumps(DAEMON_JSON, indent=1)}\nEOF")
+    print("restarting docker \n")
+    executor.run("systemctl restart docker")
+
+
+def k8s_repo_configured(executor, _):
+    """Check kubeadm is installed, kubelet running and swap off."""
+    return executor.check("rpm -q kubelet kubeadm kubectl && systemctl is-enabled kubelet && "
+                          "test -z \"$(swapon --show)\"")
+
+
+def configure_k8s_repo(executor, _):
     """
-    test configure repo
+    Disable selinux, firewall and swap, install kubeadm
     """
-    for host in hostname:
-        nd_obj = LogicalNode(hostname=host, username=username, password=password)
-        print("Disabling SELINUX \n")
-        resp = nd_obj.execute_cmd(cmd="setenforce 0", read_lines=True, exc=False)
-        if resp:
-            print("The selinux is already disabled \n")
-        cmd = "sed -i --follow-symlinks 's/SELINUX=enforcing/SELINUX=disabled/g'" \
-              " /etc/sysconfig/selinux"
-        print("Setting selinux 0 \n")
-        nd_obj.execute_cmd(cmd=cmd, read_lines=False)
-        print("Check firewall status\n")
-        response = nd_obj.execute_cmd(cmd="systemctl status firewalld",
-                                      read_lines=True, exc=False)
-        response = response.decode() if isinstance(response, bytes) else response
-        print("The firewall status is %s", response)
-        if "inactive" in response:
-            print("The Firewall is disabled \n")
-        else:
-            print("Disabling the firewall \n")
-            nd_obj.execute_cmd(cmd="systemctl disable firewalld",
-                               read_lines=True, exc=False)
-        print("Configuring the yum repo for k8s \n")
-        cmd = "cat <<EOF > /etc/yum.repos.d/kubernetes.repo \n"\
-              "[kubernetes]\n"\
-              "name=Kubernetes\n"\
-              "baseurl=https://packages.cloud.google.com/yum/repos/kubernetes-el7-x86_64 \n"\
-              "enabled=1 \n"\
-              "gpgcheck=1 \n"\
-              "repo_gpgcheck=1 \n"\
-              "gpgkey=https://packages.cloud.google.com/yum/doc/yum-key.gpg" \
-              " https://packages.cloud.google.com/yum/doc/rpm-package-key.gpg \n"\
-              "EOF"
-        nd_obj.execute_cmd(cmd=cmd, read_lines=False)
-        print("Installing kubeadm \n")
-        nd_obj.execute_cmd(cmd="yum install -y kubelet kubeadm kubectl", read_lines=True)
-        print("enabling kubelet \n")
-        nd_obj.execute_cmd(cmd="systemctl enable kubelet", read_lines=True)
-        print("starting kubelet \n")
-        nd_obj.execute_cmd(cmd="systemctl start kubelet", read_lines=True)
-        print("Disabling the swap")
-        nd_obj.execute_cmd(cmd="swapoff -a", read_lines=True)
-
-
-def initialize_k8s(host, username, password):
+    print("Disabling SELINUX on host\n", executor.host)
+    executor.run("setenforce 0", exc=False)
+    executor.run("sed -i --follow-symlinks 's/SELINUX=enforcing/SELINUX=disabled/g'"
+                 " /etc/sysconfig/selinux")
+    response = executor.run("systemctl status firewalld", exc=False)
+    if "inactive" in response:
+        print("The Firewall is disabled \n")
+    else:
+        print("Disabling the firewall \n")
+        executor.run("systemctl disable firewalld", exc=False)
+    print("Configuring the yum repo for k8s \n")
+    executor.run(f"cat <<EOF > {K8S_REPO} \n"
+                 "[kubernetes]\n"
+                 "name=Kubernetes\n"
+                 "baseurl=https://packages.cloud.google.com/yum/repos/kubernetes-el7-x86_64 \n"
+                 "enabled=1 \n"
+                 "gpgcheck=1 \n"
+                 "repo_gpgcheck=1 \n"
+                 "gpgkey=https://packages.cloud.google.com/yum/doc/yum-key.gpg"
+                 " https://packages.cloud.google.com/yum/doc/rpm-package-key.gpg \n"
+                 "EOF")
+    print("Installing kubeadm \n")
+    executor.run("yum install -y kubelet kubeadm kubectl")
+    executor.run("systemctl enable kubelet && systemctl start kubelet")
+    print("Disabling the swap")
+    executor.run("swapoff -a")
+
+
+def k8s_initialized(executor, _):
+    """Check kubeadm init was done and kubectl is configured."""
+    return executor.check("test -f /etc/kubernetes/admin.conf && test -f $HOME/.kube/config")
+
+
+def initialize_k8s(executor, _):
     """
-    Test function to initialize the kubeadm
+    Initialize the kubeadm on master
     """
-    nd_obj = LogicalNode(hostname=host, username=username, password=password)
-    cmd = "kubeadm init --pod-network-cidr=192.168.0.0/16"
     print("Initialize the kubeadm\n")
-    result = nd_obj.execute_cmd(cmd=cmd, read_lines=True)
-    out = str("".join(result[-2:]))
-    out_list = "".join(out.split("\\")).split("--")
-    join_cmd = [x.strip() for x in out_list]
-    join_cmd = " --".join(join_cmd)
-    print("The final o/p is %s", join_cmd)
-    print("Creating the dir .kube")
-    nd_obj.execute_cmd(cmd="mkdir -p $HOME/.kube", read_lines=False, exc=False)
-    print("Copying file to the dir .kube")
-    nd_obj.execute_cmd(cmd="\\cp -i /etc/kubernetes/admin.conf $HOME/.kube/config",
-                       read_lines=False, exc=False)
-    nd_obj.execute_cmd(cmd="chown $(id -u):$(id -g) $HOME/.kube/config",
-                       read_lines=False, exc=False)
-    return True, join_cmd
-
-
-def create_network(host, username, password):
+    executor.run("test -f /etc/kubernetes/admin.conf || "
+                 "kubeadm init --pod-network-cidr=192.168.0.0/16")
+    executor.run("mkdir -p $HOME/.kube && \\cp /etc/kubernetes/admin.conf $HOME/.kube/config "
+                 "&& chown $(id -u):$(id -g) $HOME/.kube/config")
+
+
+def network_created(executor, _):
+    """Check calico is deployed."""
+    return executor.check("kubectl get daemonset calico-node -n kube-system")
+
+
+def create_network(executor, _):
     """
-    Test function to create the pod network
+    Create the pod network
     """
-    nd_obj = LogicalNode(hostname=host, username=username, password=password)
-    cmd = "curl https://docs.projectcalico.org/manifests/calico.yaml -O &&"\
-          "kubectl apply -f calico.yaml"
-    resp = nd_obj.execute_cmd(cmd=cmd, read_lines=True, exc=False)
-    print("The o/p of network cmd is %s", resp)
+    resp = executor.run("curl https://docs.projectcalico.org/manifests/calico.yaml -O && "
+                        "kubectl apply -f calico.yaml")
+    print("The o/p of network cmd is", resp)
 
 
-def get_node_status(host, username, password):
+def join_command(executor, _):
     """
-    This function fetches the node status
+    Command joining workers to the cluster, tokens expire so it is not journaled
+    """
+    return executor.run("kubeadm token create --print-join-command").strip()
+
+
+def cluster_joined(executor, _):
+    """Check worker joined the cluster."""
+    return executor.check("test -f /etc/kubernetes/kubelet.conf")
+
+
+def join_cluster(executor, context):
     """
-    nd_obj = LogicalNode(hostname=host, username=username, password=password)
-    count = 1
-    while count <= 6:
-        resp_node = nd_obj.execute_cmd(cmd="kubectl get nodes |cut -d ' ' -f 4",
-                                       read_lines=False,
-                                       exc=False)
-        resp_node = resp_node.decode() if isinstance(resp_node, bytes) else resp_node
-        nodes_status = resp_node.strip().split("\n")
-        print("The output of get nodes is %s", nodes_status)
-        status = all(element == "Ready" for element in nodes_status)
-        if status:
-            return nodes_status
-        count += 1
-        time.sleep(10)
-        if "NotReady" in nodes_status:
-            cmd = "kubectl get pods -n kube-system"
-            result = nd_obj.execute_cmd(cmd=cmd, read_lines=True, exc=True)
-            for res in result:
-                print(res.strip())
-                if re.search(r'ImagePullBackOff', res):
-                    return nodes_status
-
-
-def troubleshoot(*hostname, username, password, status):
+    Join the worker node to master node
     """
-    This Functions troubleshoots the calico issue
+    cmd = context["results"]["join_command"][context["master"]]
+    resp = executor.run(cmd)
+    print("The join cmd o/p is", resp)
+
+
+def troubleshoot(executor, _):
     """
-    if "NotReady" in status:
-        for host in hostname:
-            nd_obj = LogicalNode(hostname=host, username=username, password=password)
-            cmd = "wget https://github.com/projectcalico/calico/releases/" \
-                  "download/v3.20.0/release-v3.20.0.tgz && "\
-                  "tar -xvf release-v3.20.0.tgz && "\
-                  "cd release-v3.20.0/images && "\
-                  "docker load -i calico-node.tar && "\
-                  "docker load -i calico-kube-controllers.tar && "\
-                  "docker load -i calico-cni.tar && "\
-                  "docker load -i calico-pod2daemon-flexvol.tar \n"
-            result = nd_obj.execute_cmd(cmd=cmd, read_lines=True, exc=False)
-            print("The result is", result)
-
-
-def join_cluster(*hostname, username, password, cmd):
+    Load the calico images, pulling them fails at times
     """
-    Test function to join the worker nodes to master node
+    cmd = "wget https://github.com/projectcalico/calico/releases/" \
+          "download/v3.20.0/release-v3.20.0.tgz && "\
+          "tar -xvf release-v3.20.0.tgz && "\
+          "cd release-v3.20.0/images && "\
+          "docker load -i calico-node.tar && "\
+          "docker load -i calico-kube-controllers.tar && "\
+          "docker load -i calico-cni.tar && "\
+          "docker load -i calico-pod2daemon-flexvol.tar \n"
+    print("The result is", executor.run(cmd, exc=False))
+
+
+STAGES = [
+    Stage("host_ip", host_ip),
+    Stage("update_hosts", update_hosts),
+    Stage("install_docker", install_docker, docker_installed),
+    Stage("configure_iptables", configure_iptables, iptables_configured),
+    Stage("create_daemon_file", create_daemon_file, daemon_file_created),
+    Stage("configure_k8s_repo", configure_k8s_repo, k8s_repo_configured),
+    Stage("initialize_k8s", initialize_k8s, k8s_initialized, hosts=MASTER),
+    Stage("create_network", create_network, network_created, hosts=MASTER),
+    Stage("join_command", join_command, hosts=MASTER, journaled=False),
+    Stage("join_cluster", join_cluster, cluster_joined, hosts=WORKERS),
+]
+
+
+def get_node_status(executor):
     """
-    for host in hostname[1:]:
-        nd_obj = LogicalNode(hostname=host, username=username, password=password)
-        resp = nd_obj.execute_cmd(cmd=cmd, read_lines=True)
-        print("The join cmd o/p is %s", resp)
+    This function fetches the node status
+    """
+    resp = executor.run("kubectl get nodes --no-headers", exc=False)
+    return [line.split()[1] for line in resp.strip().splitlines() if len(line.split()) > 1]
+
+
+def wait_nodes_ready(executor, nodes, timeout=300):
+    """
+    Wait until all nodes are Ready, polling with backoff
+    :param nodes: Number of nodes expected
+    :return: Last node status
+    """
+    status = []
 
-# pylint: disable-msg=too-many-locals
+    def ready():
+        status[:] = get_node_status(executor)
+        print("The output of get nodes is", status)
+        return len(status) >= nodes and all(element == "Ready" for element in status)
+
+    wait_until(ready, timeout=timeout)
+    return status
 
 
 def main(args):
     """
     main function to deploy Kubernetes
     """
-    k8s_input = dict()
-    k8s_input['nodes'] = args.nodes
-    k8s_input['hosts_ip'] = args.ip
-    k8s_input['username'] = args.username
-    k8s_input['password'] = args.password
-    host_ip_dict = {}
-
-    if not k8s_input['hosts_ip']:
-        for host in k8s_input['nodes']:
-            nd_obj = LogicalNode(hostname=host, username=k8s_input['username'],
-                          password=k8s_input['password'])
-            result = nd_obj.execute_cmd(cmd="ifconfig eth0", read_lines=True)
-            test_list = result[1].split(" ")
-            test_list = [i for i in test_list if i]
-            host_ip_n = {test_list[1]: host}
-            host_ip_dict.update(host_ip_n)
-
-    else:
-        for node_ip, host in zip(k8s_input['hosts_ip'], k8s_input['nodes']):
-            host_ip_s = {node_ip: host}
-            host_ip_dict.update(host_ip_s)
-        print("The hostname and ip dict is %s", host_ip_dict)
-
-    for host in k8s_input['nodes']:
-        nd_obj = LogicalNode(hostname=host, username=k8s_input['username'],
-                      password=k8s_input['password'])
-        nd_obj.copy_file_to_local(REMOTE_HOSTS_ORG, LOCAL_COPY_HOSTS)
-        with open(LOCAL_COPY_HOSTS, "a") as file:
-            for key, value in host_ip_dict.items():
-                line = " ".join([key, value])
-                file.write(line)
-                file.write("\n")
-                nd_obj.execute_cmd(cmn_cmd.CMD_PING.format(key), read_lines=True)
-        nd_obj.copy_file_to_remote(LOCAL_COPY_HOSTS, REMOTE_HOSTS_ORG)
-    install_docker(*k8s_input['nodes'], username=k8s_input['username'],
-                   password=k8s_input['password'])
-    configure_iptables(*k8s_input['nodes'], username=k8s_input['username'],
-                       password=k8s_input['password'])
-    create_daemon_file(*k8s_input['nodes'], username=k8s_input['username'],
-                       password=k8s_input['password'])
-    configure_k8s_repo(*k8s_input['nodes'], username=k8s_input['username'],
-                       password=k8s_input['password'])
-    result = initialize_k8s(k8s_input['nodes'][0], username=k8s_input['username'],
-                            password=k8s_input['password'])
-    print("The token is ", result[1])
-    create_network(k8s_input['nodes'][0], username=k8s_input['username'],
-                   password=k8s_input['password'])
-    status = get_node_status(k8s_input['nodes'][0], username=k8s_input['username'],
-                             password=k8s_input['password'])
-    print("The stat is ", status)
-    if "Ready" in status:
-        print("Adding the worker node to master node")
-        join_cluster(*k8s_input['nodes'], username=k8s_input['username'],
-                     password=k8s_input['password'], cmd=result[1])
-    else:
-        print("To troubleshoot run cmd: kubectl get pods -n kube-system \n")
-        troubleshoot(*k8s_input['nodes'], username=k8s_input['username'],
-                     password=k8s_input['password'], status=status)
-        join_cluster(*k8s_input['nodes'], username=k8s_input['username'],
-                     password=k8s_input['password'], cmd=result[1])
-
-    status_all = get_node_status(k8s_input['nodes'][0], username=k8s_input['username'],
-                                 password=k8s_input['password'])
-    if "NotReady" in status_all:
-        print("Please check after some time,"
-              "the nodes status is", status_all)
-        troubleshoot(*k8s_input['nodes'], username=k8s_input['username'],
-                     password=k8s_input['password'], status=status_all)
+    nodes = args.nodes
+    runner = StageRunner(nodes, lambda host: SshExecutor(host, args.username, args.password),
+                         journal_path=args.journal, timeout=args.timeout)
+    if args.ip:
+        runner.context["host_ips"] = dict(zip(nodes, args.ip))
+        print("The hostname and ip dict is", runner.context["host_ips"])
+    passed = runner.run(STAGES)
+    if passed:
+        status = wait_nodes_ready(runner.executor(nodes[0]), len(nodes),
+                                  timeout=args.ready_timeout)
+        if "NotReady" in status or len(status) < len(nodes):
+            print("To troubleshoot run cmd: kubectl get pods -n kube-system \n")
+            runner.run([Stage("troubleshoot", troubleshoot, journaled=False)])
+            status = wait_nodes_ready(runner.executor(nodes[0]), len(nodes),
+                                      timeout=args.ready_timeout)
+    print(runner.timing_table())
+    if not passed:
+        if args.journal:
+            print(f"Deployment failed, rerun with --journal {args.journal} to resume")
+        else:
+            print("Deployment failed")
+        return 1
+    if "NotReady" in status:
+        print("Please check after some time, the nodes status is", status)
     print("Successfully deployed the k8s ,"
-          "Please run \"kubectl get nodes cmd\" on ", k8s_input['nodes'][0])
+          "Please run \"kubectl get nodes cmd\" on ", nodes[0])
+    return 0
 
 
-def parse_args():
+def parse_args(argv=None):
     """
     parse user args
     """
     parser = argparse.ArgumentParser(
         description="Multinode server and k8s configuration")
     parser.add_argument("-nodes", "--nodes",
-                        help="hostnames for each node", nargs="+")
+                        help="hostnames for each node, first one is master", nargs="+",
+                        required=True)
     parser.add_argument("-username", "--username", type=str,
                         help="username for nodes", required=True)
     parser.add_argument("-password", "--password", type=str,
                         help="password for nodes", required=True)
     parser.add_argument("-IP", "--ip", help="IP for each node", nargs="+")
+    parser.add_argument("-journal", "--journal", default=None,
+                        help="stage journal file, an existing journal is resumed, "
+                             "not journaled by default")
+    parser.add_argument("-timeout", "--timeout", type=float, default=1800,
+                        help="seconds a stage may take on a node")
+    parser.add_argument("-ready_timeout", "--ready_timeout", type=float, default=300,
+                        help="seconds to wait for nodes to become Ready")
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
     opts = parse_args()
-    main(opts)
+    sys.exit(main(opts))
@@ -0,0 +1,282 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+Idempotent, resumable cluster bootstrap stages run concurrently across hosts.
+
+A stage is applied to all hosts, the master (first host) or the workers at the same time.
+A host is skipped when the journal has the stage done for it or the check predicate of the
+stage already holds on it. Every stage start/finish per host is appended to a json lines
+journal, so a rerun after a failure resumes with the failed or pending hosts only. The
+journal of a run that passed is rotated to <journal>.done, a later run starts afresh.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+
+from commons.utils.fanout_utils import fan_out
+
+LOGGER = logging.getLogger(__name__)
+
+ALL_HOSTS = "all"
+MASTER = "master"
+WORKERS = "workers"
+
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_SKIPPED = "skipped"
+STATE_FAILED = "failed"
+# done in an earlier run according to journal
+STATE_RESUMED = "resumed"
+
+
+class StageError(Exception):
+    """Stage failed on some hosts, run can be resumed from journal."""
+
+
+@dataclass
+class Stage:
+    """
+    Bootstrap stage.
+
+    run(executor, context) applies the stage to a host, its return value is journaled and
+    available to later stages as context["results"][name][host]. check(executor, context)
+    returns True when the stage is already applied on the host. A stage which is not
+    journaled runs again on resume, e.g. one fetching a short lived token.
+    """
+
+    name: str
+    run: Callable[[Any, dict], Any]
+    check: Callable[[Any, dict], bool] = None
+    hosts: str = ALL_HOSTS
+    journaled: bool = True
+
+
+class StageJournal:
+    """Append only json lines journal of stage states per host."""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        self._torn = False
+        if path and os.path.exists(path):
+            with open(path) as journal:
+                for line in journal:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last line of a crashed run
+                        continue
+                    self.records[(record["host"], record["stage"])] = record
+
+    def record(self, **record):
+        """Append record and sync it to disk."""
+        with self._lock:
+            self.records[(record["host"], record["stage"])] = record
+            if not self.path:
+                return
+            with open(self.path, "a") as journal:
+                if self._torn:
+                    # start after the torn line instead of appending to it
+                    journal.write("\n")
+                    self._torn = False
+                journal.write(json.dumps(record) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def rotate(self) -> str:
+        """
+        Move the journal of a finished run aside, so a redeploy of reimaged hosts with the
+        same hostnames does not resume it.
+        :return: Path of the rotated journal or None
+        """
+        with self._lock:
+            if not self.path or not os.path.exists(self.path):
+                return None
+            done_path = f"{self.path}.done"
+            os.replace(self.path, done_path)
+            return done_path
+
+    def state(self, host: str, stage: str) -> str:
+        """Last state of stage on host or None."""
+        return self.records.get((host, stage), {}).get("state")
+
+    def result(self, host: str, stage: str) -> Any:
+        """Result of stage done on host."""
+        return self.records[(host, stage)].get("result")
+
+
+def wait_until(func: Callable[[], Any], timeout: float = 300, interval: float = 2,
+               max_interval: float = 15, backoff: float = 1.5) -> Any:
+    """
+    Poll func until it returns a true value or timeout expires, the poll interval grows by
+    backoff up to max_interval.
+    :param func: Callable without arguments, exceptions count as false
+    :param timeout: Seconds to wait
+    :return: Last value returned by func
+    """
+    end = time.monotonic() + timeout
+    value = None
+    while True:
+        try:
+            value = func()
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.debug("Poll of %s failed: %s", func, error)
+            value = None
+        remaining = end - time.monotonic()
+        if value or remaining <= 0:
+            return value
+        time.sleep(min(interval, remaining))
+        interval = min(max_interval, interval * backoff)
+
+
+# pylint: disable=too-many-instance-attributes
+class StageRunner:
+    """Run stages in order, each one concurrently on its hosts."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, hosts: list, executor_factory: Callable[[str], Any],
+                 journal_path: str = None, max_parallel: int = 16, timeout: float = None):
+        """
+        :param hosts: Host names, first one is the master
+        :param executor_factory: Returns the command executor of a host, called once per host
+        :param journal_path: Journal file, existing journal is resumed
+        :param max_parallel: Hosts running a stage at the same time
+        :param timeout: Seconds a stage may run on a single host
+        """
+        self.hosts = list(hosts)
+        self.executor_factory = executor_factory
+        self.journal = StageJournal(journal_path)
+        self.max_parallel = max_parallel
+        self.timeout = timeout
+        self.context = {"hosts": self.hosts, "master": self.hosts[0],
+                        "workers": self.hosts[1:], "results": {}}
+        # (stage, host) -> (state, seconds), stage -> wall clock seconds
+        self.timings = {}
+        self.stage_times = {}
+        self._executors = {}
+        self._lock = threading.Lock()
+
+    def executor(self, host: str) -> Any:
+        """Executor of host, created on first use and reused by every stage."""
+        with self._lock:
+            if host not in self._executors:
+                self._executors[host] = self.executor_factory(host)
+            return self._executors[host]
+
+    def stage_hosts(self, stage: Stage) -> list:
+        """Hosts stage applies to."""
+        return {ALL_HOSTS: self.hosts, MASTER: self.hosts[:1],
+                WORKERS: self.hosts[1:]}[stage.hosts]
+
+    def _run_host(self, stage: Stage, host: str) -> Any:
+        if stage.journaled and self.journal.state(host, stage.name) in (STATE_DONE,
+                                                                         STATE_SKIPPED):
+            self.timings[(stage.name, host)] = (STATE_RESUMED, 0.0)
+            return self.journal.result(host, stage.name)
+        start = time.perf_counter()
+        executor = self.executor(host)
+        if stage.check and stage.check(executor, self.context):
+            elapsed = time.perf_counter() - start
+            LOGGER.info("%s already applied on %s", stage.name, host)
+            self.timings[(stage.name, host)] = (STATE_SKIPPED, elapsed)
+            self.journal.record(host=host, stage=stage.name, state=STATE_SKIPPED,
+                                elapsed=elapsed)
+            return None
+        self.journal.record(host=host, stage=stage.name, state=STATE_RUNNING, start=time.time())
+        try:
+            result = stage.run(executor, self.context)
+        except Exception as error:
+            elapsed = time.perf_counter() - start
+            self.timings[(stage.name, host)] = (STATE_FAILED, elapsed)
+            self.journal.record(host=host, stage=stage.name, state=STATE_FAILED,
+                                elapsed=elapsed, error=str(error))
+            raise
+        elapsed = time.perf_counter() - start
+        self.timings[(stage.name, host)] = (STATE_DONE, elapsed)
+        self.journal.record(host=host, stage=stage.name, state=STATE_DONE, elapsed=elapsed,
+                            result=result)
+        return result
+
+    def run_stage(self, stage: Stage) -> dict:
+        """
+        Apply stage on its hosts concurrently.
+        :return: host -> stage result
+        :raises StageError: When the stage failed or timed out on any host
+        """
+        hosts = self.stage_hosts(stage)
+        LOGGER.info("Stage %s on %s", stage.name, hosts)
+        start = time.perf_counter()
+        results = fan_out(hosts, lambda host: self._run_host(stage, host),
+                          max_parallel=self.max_parallel, timeout=self.timeout)
+        self.stage_times[stage.name] = time.perf_counter() - start
+        for host in results.timed_out:
+            self.timings[(stage.name, host)] = (STATE_FAILED, results[host].elapsed)
+            self.journal.record(host=host, stage=stage.name, state=STATE_FAILED,
+                                elapsed=results[host].elapsed, error="timed out")
+        self.context["results"][stage.name] = results.values_ok()
+        if not results.all_ok:
+            errors = {host: str(results[host].error or "timed out")
+                      for host in results.failed + results.timed_out}
+            raise StageError(f"Stage {stage.name} failed on {errors}")
+        return self.context["results"][stage.name]
+
+    def run(self, stages: list) -> bool:
+        """
+        Run stages in order, stop at the first stage failing on any host.
+        The journal is rotated once every stage passed.
+        :return: True if every stage passed on every host
+        """
+        for stage in stages:
+            try:
+                self.run_stage(stage)
+            except StageError as error:
+                LOGGER.error("%s, rerun with the same journal to resume", error)
+                return False
+        done_path = self.journal.rotate()
+        if done_path:
+            LOGGER.info("All stages passed, journal moved to %s", done_path)
+        return True
+
+    def timing_table(self) -> str:
+        """Stage x host table of state and seconds taken, with stage wall clock time."""
+        rows = [["stage"] + self.hosts + ["wall"]]
+        for stage in self.stage_times:
+            row = [stage]
+            for host in self.hosts:
+                state, elapsed = self.timings.get((stage, host), (None, 0.0))
+                if state is None:
+                    row.append("-")
+                elif state == STATE_DONE:
+                    row.append(f"{elapsed:.1f}s")
+                else:
+                    row.append(f"{state} {elapsed:.1f}s" if elapsed >= 0.05 else state)
+            row.append(f"{self.stage_times[stage]:.1f}s")
+            rows.append(row)
+        widths = [max(len(row[col]) for row in rows) for col in range(len(rows[0]))]
+        return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths))
+                         .rstrip() for row in rows)
@@ -19,15 +19,36 @@
 #
 """
 Locust runner file
+
+run_locust runs a single locust process. run_locust_distributed runs a locust master and
+workers, local ones (one per core by default) and remote ones over ssh, so the load is not
+capped by one python process. Dead workers are restarted while the master runs and the stats
+reported by every worker are merged into the result.
 """
 import argparse
+import json
 import logging
+import os
+import shlex
+import subprocess  # nosec
+import threading
 import time
+from socket import getfqdn
 
+from commons.helpers.host import Host
+from commons.helpers.stream_helper import ssh_run_logged
+from commons.utils.log_scan_utils import LogScanner
 from commons.utils.system_utils import run_local_cmd
 from scripts.locust import LOCUST_CFG
+from scripts.locust.locust_utils import merge_summaries
 
 LOGGER = logging.getLogger(__name__)
+LOCUST_CMD = "locust"
+MASTER_PORT = 5557
+# environment variables read by locustfile_step_users.StepLoadShape
+STEP_LOAD_ENV = {"step_time": "STEP_TIME", "step_load": "STEP_LOAD",
+                 "spawn_rate": "SPAWN_RATE", "time_limit": "DURATION",
+                 "max_user": "MAX_USERS"}
 
 
 def check_log_file(file_path, errors):
@@ -38,18 +59,31 @@ def check_log_file(file_path, errors):
     :return: errorFound: True (if error is seen) else False
     :rtype: Boolean
     """
-    error_found = False
     LOGGER.info("Debug: Log File Path %s", file_path)
-    with open(file_path, "r") as log_file:
-        for line in log_file:
-            for error in errors:
-                if error.lower() in line.lower():
-                    error_found = True
-                    LOGGER.info("checkLogFileError: Error Found in Locust Run : %s", line)
-                    return error_found
-
+    result = LogScanner(errors, context=0, max_hits=1).scan_file(file_path)
+    for hit in result.hits:
+        LOGGER.info("checkLogFileError: Error Found in Locust Run : %s", hit.line)
+        return True
     LOGGER.info("No Error Found")
-    return error_found
+    return False
+
+
+def check_summary(summary_file: str, max_fail_ratio: float = 0.0) -> tuple:
+    """
+    Function to check the json summary of a locust run for failed requests
+    :param summary_file: json summary written by the locust run
+    :param max_fail_ratio: highest allowed ratio of failed requests
+    :return: True if the failures are within limit else False, summary
+    """
+    with open(summary_file, "r") as summary_fp:
+        summary = json.load(summary_fp)
+    total = summary["total"]
+    LOGGER.info("Locust run: %s requests, %s failures, %.2f MB/s", total["num_requests"],
+                total["num_failures"], total["mb_per_sec"])
+    for error in summary["errors"]:
+        LOGGER.error("%s %s failed %s times: %s", error["method"], error["name"],
+                     error["occurrences"], error["error"])
+    return total["num_requests"] > 0 and total["fail_ratio"] <= max_fail_ratio, summary
 
 
 # pylint: disable=too-many-arguments
@@ -64,32 +98,265 @@ def run_locust(
     :param users: number of concurrent users
     :param hatch_rate: rate at which number of user to be increase per sec
     :param duration: total time for execution
-    :return: tupple resp with over all execution and log and html file path
+    :return: tupple resp with over all execution and log, html, csv and json summary path
     """
     upper_limit_cmd = "ulimit -n 100000"
     log_dir = "log/latest/"
     time_str = str(time.strftime("%Y%m%d-%H%M%S"))
     log_file = f"{log_dir}{test_id}-{LOCUST_CFG['default']['LOGFILE']}-{time_str}.log"
     html_file = f"{log_dir}{test_id}-{LOCUST_CFG['default']['HTMLFILE']}-{time_str}.html"
-    locust_run_cmd = \
-        "locust --host={} -f {} --headless -u {} -r {} --run-time {} --html {} --logfile {}"
+    csv_prefix = f"{log_dir}{test_id}-locust-stats-{time_str}"
+    summary_file = f"{log_dir}{test_id}-locust-summary-{time_str}.json"
+    locust_run_cmd = "LOCUST_SUMMARY_FILE={} locust --host={} -f {} --headless -u {} -r {} " \
+                     "--run-time {} --html {} --csv {} --logfile {}"
     LOGGER.info("Setting ulimit for locust\n")
     locust_run_cmd = locust_run_cmd.format(
+        summary_file,
         host,
         locust_file,
         int(users),
         hatch_rate,
         duration,
         html_file,
+        csv_prefix,
         log_file)
     cmd = "{}; {}\n".format(upper_limit_cmd, locust_run_cmd)
     res = run_local_cmd(cmd)
     LOGGER.info("Locust run completed.")
-    res1 = {"log-file": log_file, "html-file": html_file}
+    res1 = {"log-file": log_file, "html-file": html_file, "csv-prefix": csv_prefix,
+            "summary-file": summary_file}
 
     return res, res1
 
 
+class LocustWorker:
+    """Locust worker process, local or on a remote host over ssh."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, name: str, cmd: str, env: dict = None, log_file: str = None,
+                 remote: dict = None, pattern: str = None):
+        """
+        :param name: Worker name used in logs
+        :param cmd: Worker command
+        :param env: Environment of a local worker
+        :param log_file: Output file of the worker, the output of a remote worker is copied
+        to it while the worker runs
+        :param remote: hostname, username and password of remote host
+        :param pattern: Command line pattern of remote worker, killed if it does not exit
+        """
+        self.name = name
+        self.cmd = cmd
+        self.pattern = pattern
+        self.env = env
+        self.log_file = log_file
+        self.remote = remote
+        self.process = None
+        self.thread = None
+        self.returncode = None
+        self.starts = 0
+
+    def start(self):
+        """Start worker process."""
+        self.starts += 1
+        if self.remote:
+            self.returncode = None
+            self.thread = threading.Thread(target=self._run_remote, daemon=True)
+            self.thread.start()
+        else:
+            with open(self.log_file, "a") as log:
+                self.process = subprocess.Popen(  # nosec
+                    self.cmd, shell=True, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+
+    def _run_remote(self):
+        host = Host(self.remote["hostname"], self.remote["username"], self.remote["password"])
+        try:
+            # output is drained while the worker runs, a worker with a full ssh channel
+            # window would block on its next log line
+            self.returncode = ssh_run_logged(host, self.cmd, self.log_file)
+            if self.returncode:
+                LOGGER.error("Locust %s exited with %s, see %s", self.name, self.returncode,
+                             self.log_file)
+        except (IOError, OSError) as error:
+            LOGGER.error("Locust %s failed: %s", self.name, error)
+            self.returncode = 1
+        finally:
+            host.disconnect()
+
+    def alive(self) -> bool:
+        """True while worker process runs."""
+        if self.remote:
+            return self.thread is not None and self.thread.is_alive()
+        return self.process is not None and self.process.poll() is None
+
+    def crashed(self) -> bool:
+        """
+        True if worker died, workers run with --exit-code-on-error 0 so a worker told to
+        quit by the master exits with 0
+        """
+        if self.alive():
+            return False
+        return (self.returncode if self.remote else self.process.returncode) != 0
+
+    def stop(self, timeout: float = 10):
+        """Wait for worker to exit after the master quit, kill it after timeout."""
+        if self.remote:
+            if self.thread is not None:
+                self.thread.join(timeout)
+            if self.alive():
+                host = Host(self.remote["hostname"], self.remote["username"],
+                            self.remote["password"])
+                host.execute_cmd(f"pkill -f -- {shlex.quote(self.pattern)}", exc=False)
+            return
+        if self.process is not None:
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+# pylint: disable=too-many-instance-attributes
+class LocustCluster:
+    """Locust master with local and remote workers, workers are restarted when they die."""
+
+    # pylint: disable=too-many-arguments, too-many-locals
+    def __init__(self, test_id: str, host: str, locust_file: str, users: int,
+                 hatch_rate: int = 1, duration: str = "3m", workers: int = None,
+                 remote_workers: list = None, step_load: dict = None, max_restarts: int = 3,
+                 master_port: int = MASTER_PORT, master_host: str = None,
+                 locust_cmd: str = LOCUST_CMD, log_dir: str = "log/latest/",
+                 stop_timeout: int = 10):
+        """
+        :param test_id: test number
+        :param host: host FQDN
+        :param locust_file: path to the locust file, relative to the repo root
+        :param users: number of concurrent users
+        :param hatch_rate: rate at which number of user to be increase per sec
+        :param duration: total time for execution
+        :param workers: number of local workers, default number of cores
+        :param remote_workers: dicts with hostname, username, password, path of the repo on
+        the host and workers, the number of workers on the host
+        :param step_load: StepLoadShape parameters step_time, step_load, spawn_rate,
+        time_limit and max_user, the shape replaces users, hatch_rate and duration
+        :param max_restarts: restarts of a worker dying before the master finished
+        :param master_port: port master listens on for workers
+        :param master_host: master address remote workers connect to, default this host
+        :param locust_cmd: locust command
+        :param log_dir: directory of log, html, csv and summary files
+        :param stop_timeout: seconds users get to finish their task when the run stops
+        """
+        time_str = str(time.strftime("%Y%m%d-%H%M%S"))
+        log_dir = os.path.join(log_dir, "")
+        self.files = {
+            "log-file": f"{log_dir}{test_id}-{LOCUST_CFG['default']['LOGFILE']}-{time_str}.log",
+            "html-file":
+                f"{log_dir}{test_id}-{LOCUST_CFG['default']['HTMLFILE']}-{time_str}.html",
+            "csv-prefix": f"{log_dir}{test_id}-locust-stats-{time_str}",
+            "summary-file": f"{log_dir}{test_id}-locust-summary-{time_str}.json",
+            "worker-logs": []}
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        env = dict(os.environ)
+        # only the master writes the summary
+        env.pop("LOCUST_SUMMARY_FILE", None)
+        for key, value in (step_load or {}).items():
+            env[STEP_LOAD_ENV[key]] = str(value)
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        remote_workers = remote_workers or []
+        expect = workers + sum(remote.get("workers", 1) for remote in remote_workers)
+        # users, rate and run time of a load shape run come from the shape
+        load = "" if step_load else f"-u {int(users)} -r {hatch_rate} --run-time {duration} "
+        self.master_cmd = \
+            f"ulimit -n 100000; exec {locust_cmd} -f {locust_file} --master --headless " \
+            f"--expect-workers {expect} {load}--host={host} --master-bind-port {master_port} " \
+            f"--stop-timeout {stop_timeout} --html {self.files['html-file']} " \
+            f"--csv {self.files['csv-prefix']} --logfile {self.files['log-file']}"
+        self.master_env = dict(env, LOCUST_SUMMARY_FILE=self.files["summary-file"])
+        self.master = None
+        self.workers = []
+        worker_cmd = f"{locust_cmd} -f {locust_file} --worker --master-port {master_port} " \
+                     f"--stop-timeout {stop_timeout} --exit-code-on-error 0"
+        for num in range(workers):
+            log_file = f"{log_dir}{test_id}-locust-worker-{num}-{time_str}.log"
+            self.files["worker-logs"].append(log_file)
+            self.workers.append(LocustWorker(
+                f"worker-{num}", f"ulimit -n 100000; exec {worker_cmd} --master-host 127.0.0.1",
+                env, log_file))
+        master_host = master_host or getfqdn()
+        step_env = " ".join(f"{STEP_LOAD_ENV[key]}={value}"
+                            for key, value in (step_load or {}).items())
+        for remote in remote_workers:
+            for num in range(remote.get("workers", 1)):
+                cmd = f"cd {remote['path']} && ulimit -n 100000; {step_env} " \
+                      f"{worker_cmd} --master-host {master_host}"
+                name = f"{remote['hostname']}-{num}"
+                log_file = f"{log_dir}{test_id}-locust-worker-{name}-{time_str}.log"
+                self.files["worker-logs"].append(log_file)
+                self.workers.append(LocustWorker(name, cmd, log_file=log_file, remote=remote,
+                                                 pattern=worker_cmd))
+
+    def start(self):
+        """Start master and workers."""
+        LOGGER.info("Starting locust master: %s", self.master_cmd)
+        with open(f"{self.files['log-file']}.out", "a") as log:
+            self.master = subprocess.Popen(  # nosec
+                self.master_cmd, shell=True, env=self.master_env, stdout=log,
+                stderr=subprocess.STDOUT)
+        for worker in self.workers:
+            worker.start()
+        LOGGER.info("Started %s locust workers", len(self.workers))
+
+    def monitor(self, interval: float = 1):
+        """Restart crashed workers until the master exits."""
+        while self.master.poll() is None:
+            for worker in self.workers:
+                if not worker.crashed() or self.master.poll() is not None:
+                    continue
+                if worker.starts > self.max_restarts:
+                    continue
+                LOGGER.warning("Locust %s died, restarting it", worker.name)
+                self.restarts += 1
+                worker.start()
+            time.sleep(interval)
+
+    def wait(self) -> tuple:
+        """
+        Wait for run to finish
+        :return: True if master exited with 0, summary with the merged worker stats
+        """
+        self.monitor()
+        for worker in self.workers:
+            worker.stop()
+        LOGGER.info("Locust run completed with %s worker restarts.", self.restarts)
+        summary = {}
+        if os.path.exists(self.files["summary-file"]):
+            with open(self.files["summary-file"], "r") as summary_fp:
+                summary = json.load(summary_fp)
+            summary["merged"] = merge_summaries(list(summary.get("workers", {}).values()))
+            if summary["merged"]["total"] and summary["merged"]["total"]["num_requests"] != \
+                    summary["total"]["num_requests"]:
+                LOGGER.error("Requests of workers %s do not add up to the %s of the master",
+                             summary["merged"]["total"]["num_requests"],
+                             summary["total"]["num_requests"])
+        summary["restarts"] = self.restarts
+        return self.master.returncode == 0, summary
+
+
+def run_locust_distributed(test_id: str, host: str, locust_file: str, users: int,
+                           **kwargs) -> tuple:
+    """
+    Function to run locust master with local and remote workers, see LocustCluster.
+    :param test_id: test number
+    :param host: host FQDN
+    :param locust_file: path to the locust file
+    :param users: number of concurrent users
+    :return: tuple of master status and summary, and log, html, csv and json summary path
+    """
+    cluster = LocustCluster(test_id, host, locust_file, users, **kwargs)
+    cluster.start()
+    return cluster.wait(), cluster.files
+
+
 if __name__ == '__main__':
     HOST_URL = LOCUST_CFG['default']['ENDPOINT_URL']
     HATCH_RATE = int(LOCUST_CFG['default']['HATCH_RATE'])
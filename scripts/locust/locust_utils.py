@@ -19,9 +19,22 @@
 #
 """
 Utility methods written for use accross all the locust test scenarios
+
+Objects are uploaded from a pool of in memory payloads with known md5, downloads are hashed
+while they are streamed, so the workload does not touch the local disk. Every request
+reports its real byte count and checksum mismatches are reported as request failures.
+Time to first byte and transfer time of downloads are kept as phase metrics apart from the
+request stats, so they do not count as requests in the totals. The stats of a run are
+written as a json summary when LOCUST_SUMMARY_FILE is set, the summary of a distributed run
+has the stats of every worker as well.
 """
+import hashlib
+import itertools
+import json
 import logging
 import os
+import secrets
+import threading
 import time
 from distutils.util import strtobool
 
@@ -29,17 +42,210 @@ import boto3
 from boto3.exceptions import Boto3Error
 from botocore.client import Config
 from botocore.exceptions import BotoCoreError, ClientError, ConnectionClosedError
+import gevent
+from locust import __version__ as LOCUST_VERSION
 from locust import events
+from locust.runners import WORKER_REPORT_INTERVAL
+from locust.runners import MasterRunner
+from locust.stats import RequestStats, StatsEntry, StatsError
 
-from commons.utils import system_utils
 from core.runner import InMemoryDB
 from scripts.locust import LOCUST_CFG
 
 LOGGER = logging.getLogger(__name__)
 
 OBJ_NAME = LOCUST_CFG['default']['OBJ_NAME']
-GET_OBJ_PATH = LOCUST_CFG['default']['GET_OBJ_PATH']
 OBJECT_CACHE = InMemoryDB(1024*1024)
+CHUNK_SIZE = 1024 * 1024
+PAYLOAD_POOL_SIZE = int(os.getenv('PAYLOAD_POOL_SIZE',
+                                  LOCUST_CFG['default']['PAYLOAD_POOL_SIZE']))
+SUMMARY_PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+S3_ERRORS = (Boto3Error, BotoCoreError, ClientError, ConnectionClosedError)
+# worker id -> RequestStats of the worker, filled on the master of a distributed run
+WORKER_STATS = {}
+# Phases of requests e.g. download_object:ttfb, kept out of the request stats and totals.
+# Workers send theirs to the master with every report.
+PHASE_STATS = RequestStats(use_response_times_cache=False)
+
+
+class ChecksumMismatch(Exception):
+    """Downloaded object does not match the uploaded payload"""
+
+
+class PayloadPool:
+    """
+    Pre generated random payloads with their md5. Object sizes between min and max size are
+    served from count payloads of evenly spread sizes.
+    """
+
+    def __init__(self, min_size: int, max_size: int, count: int = PAYLOAD_POOL_SIZE):
+        """
+        :param min_size: Smallest object size in bytes
+        :param max_size: Largest object size in bytes
+        :param count: Number of payloads
+        """
+        count = max(1, count)
+        self.payloads = []
+        for num in range(count):
+            size = min_size + (max_size - min_size) * num // max(count - 1, 1)
+            data = os.urandom(size)
+            self.payloads.append((data, hashlib.md5(data).hexdigest()))  # nosec
+        self.sizes = sorted({len(data) for data, _ in self.payloads})
+
+    def get(self, object_size: int = None) -> tuple:
+        """
+        Random payload of the pool size nearest to object size
+        :return: payload bytes, md5
+        """
+        if object_size is None:
+            return secrets.choice(self.payloads)
+        size = min(self.sizes, key=lambda pool_size: abs(pool_size - object_size))
+        return secrets.choice([payload for payload in self.payloads if len(payload[0]) == size])
+
+
+def stats_entry_summary(entry) -> dict:
+    """Summary of a locust StatsEntry"""
+    duration = (entry.last_request_timestamp or entry.start_time) - entry.start_time
+    summary = {
+        "method": entry.method, "name": entry.name, "num_requests": entry.num_requests,
+        "num_failures": entry.num_failures, "fail_ratio": entry.fail_ratio,
+        "avg_response_time": entry.avg_response_time,
+        "min_response_time": entry.min_response_time or 0,
+        "max_response_time": entry.max_response_time,
+        "total_content_length": entry.total_content_length,
+        "avg_content_length": entry.avg_content_length, "total_rps": entry.total_rps,
+        "mb_per_sec": entry.total_content_length / 1024 / 1024 / duration if duration else 0}
+    for percentile in SUMMARY_PERCENTILES:
+        summary[f"response_time_p{int(percentile * 100)}"] = \
+            entry.get_response_time_percentile(percentile) if entry.num_requests else 0
+    return summary
+
+
+def stats_summary(stats) -> dict:
+    """Summary of locust RequestStats: every entry, total and errors"""
+    return {
+        "requests": entries_summary(stats),
+        "total": stats_entry_summary(stats.total),
+        "errors": [error.to_dict() for error in stats.errors.values()]}
+
+
+def entries_summary(stats) -> list:
+    """Summary of every entry of locust RequestStats"""
+    return [stats_entry_summary(entry) for entry in
+            sorted(stats.entries.values(), key=lambda item: (item.name, item.method))]
+
+
+def write_summary(stats, summary_file: str, workers: dict = None) -> dict:
+    """
+    Write stats of a run as json
+    :param stats: locust RequestStats of the environment
+    :param summary_file: Path of json summary
+    :param workers: worker id -> RequestStats reported by that worker, distributed runs only
+    :return: summary dict, request phases of the whole run are under phases
+    """
+    summary = stats_summary(stats)
+    summary["phases"] = entries_summary(PHASE_STATS)
+    if workers:
+        summary["workers"] = {worker: stats_summary(worker_stats)
+                              for worker, worker_stats in workers.items()}
+    with open(summary_file, "w") as summary_fp:
+        json.dump(summary, summary_fp, indent=2)
+    LOGGER.info("Locust summary written to %s", summary_file)
+    return summary
+
+
+def merge_summaries(summaries: list) -> dict:
+    """
+    Merge summaries of several workers, counts and throughput are added up, response times
+    are averaged weighted by request count. Percentiles can not be merged and are left out.
+    :param summaries: Summaries as written by write_summary
+    :return: summary with requests, total and errors
+    """
+    def merge(entries):
+        merged = {"method": entries[0]["method"], "name": entries[0]["name"]}
+        for key in ("num_requests", "num_failures", "total_content_length", "total_rps",
+                    "mb_per_sec"):
+            merged[key] = sum(entry[key] for entry in entries)
+        requests = merged["num_requests"]
+        merged["fail_ratio"] = merged["num_failures"] / requests if requests else 0
+        merged["avg_content_length"] = merged["total_content_length"] / requests \
+            if requests else 0
+        merged["avg_response_time"] = sum(entry["avg_response_time"] * entry["num_requests"]
+                                          for entry in entries) / requests if requests else 0
+        merged["min_response_time"] = min((entry["min_response_time"] for entry in entries
+                                           if entry["num_requests"]), default=0)
+        merged["max_response_time"] = max(entry["max_response_time"] for entry in entries)
+        return merged
+
+    requests = {}
+    errors = {}
+    for summary in summaries:
+        for entry in summary["requests"]:
+            requests.setdefault((entry["name"], entry["method"]), []).append(entry)
+        for error in summary["errors"]:
+            key = (error["method"], error["name"], error["error"])
+            errors[key] = errors.get(key, 0) + error["occurrences"]
+    return {
+        "requests": [merge(requests[key]) for key in sorted(requests)],
+        "total": merge([summary["total"] for summary in summaries]) if summaries else {},
+        "errors": [{"method": method, "name": name, "error": error, "occurrences": count}
+                   for (method, name, error), count in errors.items()]}
+
+
+def is_master(environment) -> bool:
+    """True on the master of a distributed run, which runs no users and needs no buckets"""
+    return isinstance(getattr(environment, "runner", None), MasterRunner)
+
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data):
+    """Keep the stats reported by every worker on the master, as locust only keeps the sum"""
+    stats = WORKER_STATS.get(client_id)
+    if stats is None:
+        stats = WORKER_STATS[client_id] = RequestStats(use_response_times_cache=False)
+    for stats_data in data["stats"]:
+        entry = StatsEntry.unserialize(stats_data)
+        stats.get(entry.name, entry.method).extend(entry)
+    for error_key, error in data["errors"].items():
+        if error_key not in stats.errors:
+            stats.errors[error_key] = StatsError.from_dict(error)
+        else:
+            stats.errors[error_key].occurrences += error["occurrences"]
+    stats.total.extend(StatsEntry.unserialize(data["stats_total"]))
+    for stats_data in data.get("phases", []):
+        entry = StatsEntry.unserialize(stats_data)
+        PHASE_STATS.get(entry.name, entry.method).extend(entry)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    """
+    On the master wait for the workers to stop their users and send the report of their last
+    requests. Locust 1.4.3 quits right after telling the workers to stop and drops the final
+    reports arriving once the first worker quit, locust 2 waits for the workers itself.
+    """
+    runner = getattr(environment, "runner", None)
+    if not isinstance(runner, MasterRunner) or int(LOCUST_VERSION.split(".")[0]) >= 2:
+        return
+    deadline = time.monotonic() + (environment.stop_timeout or 0) + WORKER_REPORT_INTERVAL
+    while (runner.clients.running or runner.clients.spawning) and time.monotonic() < deadline:
+        gevent.sleep(0.1)
+    # workers keep reporting every WORKER_REPORT_INTERVAL until they quit
+    gevent.sleep(WORKER_REPORT_INTERVAL + 0.5)
+
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data):
+    """Send the request phases measured since the last report to the master"""
+    data["phases"] = PHASE_STATS.serialize_stats()
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    """Write json summary of the run"""
+    summary_file = os.getenv('LOCUST_SUMMARY_FILE')
+    if summary_file:
+        write_summary(environment.stats, summary_file, WORKER_STATS)
 
 
 class LocustUtils:
@@ -67,6 +273,9 @@ class LocustUtils:
             LOCUST_CFG['default']['MAX_POOL_CONNECTIONS'])
         self.bucket_list = list()
         self.empty_buckets = list()
+        self.payload_pool = None
+        self.object_ids = itertools.count()
+        self._setup_lock = threading.Lock()
 
         self.s3_client = session.client(
             service_name="s3",
@@ -111,33 +320,61 @@ class LocustUtils:
         object_name = bucket_object.split("/")[1]
         return bucket, object_name, crc
 
-    @staticmethod
-    def create_file(object_size: int):
+    def init_payload_pool(self, min_size: int, max_size: int,
+                          count: int = PAYLOAD_POOL_SIZE):
         """
-        Creates file of random size from the given range
-        :param object_size: object file size
+        Generate the in memory payloads objects are uploaded from
+        :param min_size: Smallest object size in bytes
+        :param max_size: Largest object size in bytes
+        :param count: Number of payloads
         """
-        new_obj = GET_OBJ_PATH + str(time.time())
-        with open(new_obj, 'wb') as fout:
-            fout.write(os.urandom(object_size))
-        return new_obj
+        self.payload_pool = PayloadPool(min_size, max_size, count)
+        LOGGER.info("Payload pool of %s objects with sizes %s", count, self.payload_pool.sizes)
 
-    @staticmethod
-    def delete_local_obj(object_path: str):
-        if system_utils.path_exists(object_path):
-            try:
-                system_utils.remove_file(object_path)
-            except OSError as error:
-                LOGGER.error(error)
+    def setup_once(self, min_size: int, max_size: int, bucket_count: int):
+        """
+        Payload pool and buckets of this process, set up by the first user started in it.
+        Locust 1.4.3 fires test_start on the master or a local runner only, so workers
+        could not set up from there.
+        :param min_size: Smallest object size in bytes
+        :param max_size: Largest object size in bytes
+        :param bucket_count: number of buckets to be created
+        """
+        with self._setup_lock:
+            if self.payload_pool is not None:
+                return
+            LOGGER.info("Starting test setup")
+            self.init_payload_pool(min_size, max_size)
+            self.create_buckets(bucket_count)
 
     @staticmethod
     def total_time(start_time: float) -> float:
         """
         Method to calculate total time for a request to be completed
-        :param start_time: Time when request was initialized
-        :return: Total time take by request
+        :param start_time: time.perf_counter() when request was initialized
+        :return: Total time take by request in milliseconds
         """
-        return int((time.time() - start_time) * 1000)
+        return (time.perf_counter() - start_time) * 1000
+
+    def fire_success(self, request_type: str, name: str, start_time: float,
+                     response_length: int = 0):
+        """Report successful request with its byte count"""
+        events.request_success.fire(request_type=request_type, name=name,
+                                    response_time=self.total_time(start_time),
+                                    response_length=response_length)
+
+    @staticmethod
+    def log_phase(request_type: str, name: str, start_time: float, response_length: int = 0):
+        """Record a phase of a request, phases are not reported as requests"""
+        PHASE_STATS.log_request(request_type, name, LocustUtils.total_time(start_time),
+                                response_length)
+
+    def fire_failure(self, request_type: str, name: str, start_time: float, error: Exception,
+                     response_length: int = 0):
+        """Report failed request"""
+        events.request_failure.fire(request_type=request_type, name=name,
+                                    response_time=self.total_time(start_time),
+                                    response_length=response_length, exception=error)
 
     def create_buckets(self, bucket_count: int):
         """
@@ -146,19 +383,15 @@ class LocustUtils:
         """
         for _ in range(bucket_count):
             bucket_name = "locust-bucket{}".format(str(time.time()))
-            start_time = time.time()
+            start_time = time.perf_counter()
             LOGGER.info("Creating bucket: %s", bucket_name)
             try:
                 self.s3_client.create_bucket(Bucket=bucket_name)
                 self.bucket_list.append(bucket_name)
-                events.request_success.fire(request_type="put", name="create_bucket",
-                                            response_time=self.total_time(start_time),
-                                            response_length=10)
-            except (Boto3Error, BotoCoreError, ClientError, ConnectionClosedError) as error:
+                self.fire_success("put", "create_bucket", start_time)
+            except S3_ERRORS as error:
                 LOGGER.error("Bucket creation %s failed: %s", bucket_name, error)
-                events.request_failure.fire(request_type="put", name="create_bucket",
-                                            response_time=self.total_time(start_time),
-                                            response_length=10, exception=error)
+                self.fire_failure("put", "create_bucket", start_time, error)
         LOGGER.info("Buckets Created: %s", self.bucket_list)
 
     def delete_buckets(self, bucket_list: list):
@@ -167,49 +400,42 @@ class LocustUtils:
         :param bucket_list: list of buckets to be deleted forcefully
         """
         LOGGER.info("Bucket list: %s", bucket_list)
-        for bucket in bucket_list:
-            start_time = time.time()
+        for bucket_name in list(bucket_list):
+            start_time = time.perf_counter()
             try:
-                bucket = self.s3_resource.Bucket(bucket)
+                bucket = self.s3_resource.Bucket(bucket_name)
                 bucket.objects.all().delete()
                 bucket.delete()
-            except (Boto3Error, BotoCoreError, ClientError, ConnectionClosedError) as error:
-                LOGGER.error("Bucket deletion %s failed: %s", bucket, error)
-                events.request_failure.fire(request_type="delete", name="delete_bucket",
-                                            response_time=self.total_time(start_time),
-                                            response_length=10, exception=error)
+            except S3_ERRORS as error:
+                LOGGER.error("Bucket deletion %s failed: %s", bucket_name, error)
+                self.fire_failure("delete", "delete_bucket", start_time, error)
             else:
-                if bucket in self.bucket_list:
-                    self.bucket_list.pop(bucket)
-                LOGGER.info("Deleted bucket : %s", bucket)
-                events.request_success.fire(request_type="delete", name="delete_bucket",
-                                            response_time=self.total_time(start_time),
-                                            response_length=10)
-
-    def put_object(self, bucket_name: str, object_size: int):
+                if bucket_name in self.bucket_list:
+                    self.bucket_list.remove(bucket_name)
+                LOGGER.info("Deleted bucket : %s", bucket_name)
+                self.fire_success("delete", "delete_bucket", start_time)
+
+    def put_object(self, bucket_name: str, object_size: int = None):
         """
         Method to put object of given size into given bucket
         :param bucket_name: Name of the bucket
-        :param object_size: Size of the object
+        :param object_size: Size of the object, served from the payload pool size nearest to it
         """
-        object_name = self.create_file(object_size)
-        checksum = system_utils.calculate_checksum(object_name)[1]
+        if self.payload_pool is None:
+            self.init_payload_pool(object_size, object_size)
+        data, checksum = self.payload_pool.get(object_size)
+        object_name = f"{OBJ_NAME}-{time.time_ns()}-{next(self.object_ids)}"
         log_prefix = f"{bucket_name}/{object_name}"
         LOGGER.info("Uploading %s checksum %s", log_prefix, checksum)
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            self.s3_client.upload_file(object_name, bucket_name, object_name)
-        except (Boto3Error, BotoCoreError, ClientError, ConnectionClosedError) as error:
+            self.s3_client.put_object(Bucket=bucket_name, Key=object_name, Body=data)
+        except S3_ERRORS as error:
             LOGGER.error("Upload object %s failed: %s", log_prefix, error)
-            events.request_failure.fire(request_type="put", name="put_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10, exception=error)
+            self.fire_failure("put", "put_object", start_time, error)
         else:
-            events.request_success.fire(request_type="put", name="put_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10)
+            self.fire_success("put", "put_object", start_time, len(data))
             self.store_checksum(bucket_name, object_name, checksum)
-        self.delete_local_obj(object_name)
 
     def head_object(self):
         """Method to head random object"""
@@ -219,61 +445,64 @@ class LocustUtils:
             LOGGER.info("Nothing to head")
             return
         LOGGER.info("Starting head object %s", log_prefix)
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
             self.s3_client.head_object(Bucket=bucket_name, Key=object_name)
-        except (Boto3Error, BotoCoreError, ClientError, ConnectionClosedError) as error:
+        except S3_ERRORS as error:
             LOGGER.error("Head object %s failed: %s", log_prefix, error)
-            events.request_failure.fire(request_type="head", name="head_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10, exception=error)
+            self.fire_failure("head", "head_object", start_time, error)
         else:
-            events.request_success.fire(request_type="head", name="head_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10)
+            self.fire_success("head", "head_object", start_time)
             self.store_checksum(bucket_name, object_name, checksum_original)
 
     def download_object(self):
         """
-        Method to download any random object from the given bucket
+        Method to download any random object and verify its checksum while it is streamed.
+        download_object reports the whole request, the phases download_object:ttfb the time
+        till the response headers and download_object:transfer the time to read the body.
         """
-        start_time = time.time()
-        download_path = GET_OBJ_PATH + str(start_time)
-        self.delete_local_obj(download_path)
         bucket_name, object_name, checksum_original = self.pop_one_random()
         log_prefix = f"{bucket_name}/{object_name}"
         if not bucket_name or not object_name or not checksum_original:
             LOGGER.info("Nothing to download")
             return
+        LOGGER.info("Starting object download %s", log_prefix)
+        start_time = time.perf_counter()
+        received = 0
         try:
-            LOGGER.info("Starting object download %s", log_prefix)
-            bucket = self.s3_resource.Bucket(bucket_name)
-            bucket.download_file(object_name, download_path)
-        except (Boto3Error, BotoCoreError, ClientError, ConnectionClosedError) as error:
+            body = self.s3_client.get_object(Bucket=bucket_name, Key=object_name)["Body"]
+            self.log_phase("get", "download_object:ttfb", start_time)
+            transfer_start = time.perf_counter()
+            md5 = hashlib.md5()  # nosec
+            try:
+                for chunk in iter(lambda: body.read(CHUNK_SIZE), b""):
+                    md5.update(chunk)
+                    received += len(chunk)
+            finally:
+                body.close()
+            self.log_phase("get", "download_object:transfer", transfer_start, received)
+            checksum = md5.hexdigest()
+            if checksum_original != checksum:
+                raise ChecksumMismatch(f"Checksum does not matched for {log_prefix}. Stored "
+                                       f"Checksum {checksum_original} Calculated Checksum "
+                                       f"{checksum}")
+        except S3_ERRORS as error:
             LOGGER.error("Download object %s failed: %s", log_prefix, error)
-            events.request_failure.fire(request_type="get", name="download_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10, exception=error)
+            self.fire_failure("get", "download_object", start_time, error, received)
+        except ChecksumMismatch as error:
+            LOGGER.error(error)
+            self.fire_failure("get", "download_object", start_time, error, received)
         else:
             self.store_checksum(bucket_name, object_name, checksum_original)
-            LOGGER.info("Downloaded successfully object %s at %s", log_prefix, download_path)
-            events.request_success.fire(request_type="get", name="download_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10)
-            checksum = system_utils.calculate_checksum(download_path)[1]
-            if checksum_original != checksum:
-                LOGGER.error("Checksum does not matched for %s. Stored Checksum %s "
-                             "Calculated Checksum %s", log_prefix, checksum_original, checksum)
-            else:
-                LOGGER.info("Checksum matched for %s. Stored Checksum %s Calculated Checksum %s",
-                            log_prefix, checksum_original, checksum)
-            self.delete_local_obj(download_path)
+            LOGGER.info("Downloaded successfully object %s, checksum matched %s", log_prefix,
+                        checksum)
+            self.fire_success("get", "download_object", start_time, received)
 
     def delete_object(self):
         """
         Method to delete any random object from given bucket
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         bucket_name, object_name, checksum_original = self.pop_one_random()
         if not bucket_name or not object_name or not checksum_original:
             LOGGER.info("Nothing to delete")
@@ -282,15 +511,11 @@ class LocustUtils:
         LOGGER.info("Deleting object %s", log_prefix)
         try:
             self.s3_resource.Object(bucket_name, object_name).delete()
-        except (Boto3Error, BotoCoreError, ClientError, ConnectionClosedError) as error:
+        except S3_ERRORS as error:
             LOGGER.error("Deletion object %s failed: %s", log_prefix, error)
-            events.request_failure.fire(request_type="delete", name="delete_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10, exception=error)
+            self.fire_failure("delete", "delete_object", start_time, error)
             self.store_checksum(bucket_name, object_name, checksum_original)
         else:
-            events.request_success.fire(request_type="delete", name="delete_object",
-                                        response_time=self.total_time(start_time),
-                                        response_length=10)
+            self.fire_success("delete", "delete_object", start_time)
             LOGGER.info("Deleted successfully %s", log_prefix)
             self.delete_checksum(bucket_name, object_name)
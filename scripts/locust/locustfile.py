@@ -20,7 +20,6 @@
 """
 Locust tasks set for put object, get object and delete object from bucket
 """
-import glob
 import logging
 import os
 import secrets
@@ -57,10 +56,8 @@ class LocustUser(HttpUser):
     utils = UTILS_OBJ
     secure_range = secrets.SystemRandom()
 
-    @events.test_start.add_listener
-    def on_test_start(**kwargs):
-        LOGGER.info("Starting test setup")
-        UTILS_OBJ.create_buckets(BUCKET_COUNT)
+    def on_start(self):
+        self.utils.setup_once(MIN_OBJECT_SIZE, MAX_OBJECT_SIZE, BUCKET_COUNT)
 
     @task(2)
     def put_object(self):
@@ -82,8 +79,13 @@ class LocustUser(HttpUser):
 
     @events.test_stop.add_listener
     def on_test_stop(**kwargs):
+        if locust_utils.is_master(kwargs.get("environment")):
+            return
+        UTILS_OBJ.delete_buckets(BUCKET_LIST)
+
+    @events.quitting.add_listener
+    def on_quitting(**kwargs):
+        # workers of locust 1.4.3 get no test_stop, buckets deleted already are skipped
+        if locust_utils.is_master(kwargs.get("environment")):
+            return
         UTILS_OBJ.delete_buckets(BUCKET_LIST)
-        for object_files in glob.glob(f"{locust_utils.OBJ_NAME}*"):
-            UTILS_OBJ.delete_local_obj(object_files)
-        for object_files in glob.glob(f"{locust_utils.GET_OBJ_PATH}*"):
-            UTILS_OBJ.delete_local_obj(object_files)
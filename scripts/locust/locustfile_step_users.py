@@ -21,7 +21,6 @@
 Locust tasks set for put object, get object and delete object from bucket
 with step users and constant object size
 """
-import glob
 import os
 import math
 import logging
@@ -52,10 +51,8 @@ class LocustUser(HttpUser):
     wait_time = constant(1)
     utils = UTILS_OBJ
 
-    @events.test_start.add_listener
-    def on_test_start(**kwargs):
-        LOGGER.info("Starting test setup with %s %s", kwargs.get('--u'), kwargs.get('--t'))
-        UTILS_OBJ.create_buckets(BUCKET_COUNT)
+    def on_start(self):
+        self.utils.setup_once(OBJECT_SIZE, OBJECT_SIZE, BUCKET_COUNT)
 
     @task(2)
     def put_object(self):
@@ -72,15 +69,20 @@ class LocustUser(HttpUser):
 
     @events.test_stop.add_listener
     def on_test_stop(**kwargs):
+        if locust_utils.is_master(kwargs.get("environment")):
+            return
         LOGGER.info("Starting test cleanup.")
         UTILS_OBJ.delete_buckets(BUCKET_LIST)
-        for object_files in glob.glob(f"{locust_utils.OBJ_NAME}*"):
-            UTILS_OBJ.delete_local_obj(object_files)
-        for object_files in glob.glob(f"{locust_utils.GET_OBJ_PATH}*"):
-            UTILS_OBJ.delete_local_obj(object_files)
         LOGGER.info("Log path: %s", kwargs.get('--logfile'))
         LOGGER.info("HTML path: %s", kwargs.get('--html'))
 
+    @events.quitting.add_listener
+    def on_quitting(**kwargs):
+        # workers of locust 1.4.3 get no test_stop, buckets deleted already are skipped
+        if locust_utils.is_master(kwargs.get("environment")):
+            return
+        UTILS_OBJ.delete_buckets(BUCKET_LIST)
+
 
 class StepLoadShape(LoadTestShape):
     """
@@ -0,0 +1,173 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+In memory S3 stub server for load generator development and unit tests.
+
+Supports bucket create/delete and object PUT/GET/HEAD/DELETE with SigV4 style authorization
+header check. Latency and 503 SlowDown errors can be injected at runtime.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+
+from aiohttp import web
+
+LOGGER = logging.getLogger(__name__)
+
+ERROR_XML = "<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{}</Code>" \
+            "<Message>{}</Message></Error>"
+
+
+class S3Stub:
+    """In memory S3 server running on its own event loop thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, seed: int = None):
+        """
+        :param host: Address to listen on.
+        :param port: Port to listen on, any free port if 0.
+        :param latency: Seconds added to every request.
+        :param error_rate: Fraction of object requests answered with 503 SlowDown.
+        :param seed: Seed for error injection.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.buckets = {}
+        self.requests = {}
+        self._rand = random.Random(seed)
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def endpoint(self) -> str:
+        """http endpoint of the stub."""
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @staticmethod
+    def _error(status: int, code: str, message: str) -> web.Response:
+        return web.Response(status=status, text=ERROR_XML.format(code, message),
+                            content_type="application/xml")
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        """Dispatch bucket and object requests."""
+        self.requests[request.method] = self.requests.get(request.method, 0) + 1
+        if not request.headers.get("Authorization", "").startswith("AWS4-HMAC-SHA256 "):
+            return self._error(403, "AccessDenied", "Missing SigV4 authorization")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        bucket, key = request.match_info["bucket"], request.match_info.get("key")
+        if key is None:
+            return await self._bucket(request, bucket)
+        if self.error_rate and self._rand.random() < self.error_rate:
+            await request.read()
+            return self._error(503, "SlowDown", "Please reduce your request rate.")
+        objects = self.buckets.get(bucket)
+        if objects is None:
+            return self._error(404, "NoSuchBucket", bucket)
+        if request.method == "PUT":
+            body = await request.read()
+            objects[key] = body
+            return web.Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})  # nosec
+        if key not in objects:
+            return self._error(404, "NoSuchKey", key)
+        if request.method == "GET":
+            return web.Response(body=objects[key], content_type="binary/octet-stream")
+        if request.method == "HEAD":
+            return web.Response(headers={"Content-Length": str(len(objects[key]))})
+        objects.pop(key)
+        return web.Response(status=204)
+
+    async def _bucket(self, request: web.Request, bucket: str) -> web.Response:
+        """Create, delete or check a bucket."""
+        if request.method == "PUT":
+            self.buckets.setdefault(bucket, {})
+            return web.Response()
+        if bucket not in self.buckets:
+            return self._error(404, "NoSuchBucket", bucket)
+        if request.method == "DELETE":
+            if self.buckets[bucket]:
+                return self._error(409, "BucketNotEmpty", bucket)
+            self.buckets.pop(bucket)
+            return web.Response(status=204)
+        return web.Response()
+
+    async def _serve(self):
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_route("*", "/{bucket}", self._handle)
+        app.router.add_route("*", "/{bucket}/{key:.+}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="s3-stub", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        LOGGER.debug("S3 stub listening on %s", self.endpoint)
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def stop(self):
+        """Stop serving."""
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description="Run in memory S3 stub server.")
+    PARSER.add_argument("--host", default="127.0.0.1")
+    PARSER.add_argument("--port", type=int, default=8000)
+    PARSER.add_argument("--latency", type=float, default=0.0)
+    PARSER.add_argument("--error-rate", type=float, default=0.0)
+    ARGS = PARSER.parse_args()
+    STUB = S3Stub(ARGS.host, ARGS.port, ARGS.latency, ARGS.error_rate)
+    STUB.start()
+    print(f"Listening on {STUB.endpoint}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        STUB.stop()
@@ -28,6 +28,8 @@ from datetime import datetime, timedelta
 
 from commons.utils import assert_utils
 from commons.utils.config_utils import read_yaml
+from commons.utils.log_scan_utils import ERRORS_COUNT
+from commons.utils.log_scan_utils import LogScanner
 from commons.utils.system_utils import path_exists, run_local_cmd, make_dirs, run_remote_cmd
 from commons.utils.system_utils import execute_cmd, make_remote_dirs
 from libs.s3 import ACCESS_KEY, SECRET_KEY
@@ -147,25 +149,18 @@ def check_log_file_error(file_path, errors=None):
     if not errors:
         errors = ["with error ", "panic", "status code",
                   "flag provided but not defined", "InternalError", "ServiceUnavailable"]
-    error_found = False
     LOGGER.info("Debug: Log File Path %s", file_path)
-    resp_filtered = []
-    with open(file_path, "r") as s3blog_obj:
-        for line in s3blog_obj:
-            for error in errors:
-                if error.lower() in line.lower():
-                    error_found = True
-                    LOGGER.error("%s Found in S3Bench Run: %s", error, line)
-                    return error_found
-            if 'Errors Count:' in line and "reportFormat" not in line:
-                resp_filtered.append(line)
+    result = LogScanner(list(errors) + [ERRORS_COUNT], context=0).scan_file(file_path)
+    if any(result.counts[error] for error in errors):
+        for hit in result.hits_of(errors)[:1]:
+            LOGGER.error("%s Found in S3Bench Run: %s", hit.patterns, hit.line)
+        return True
+    resp_filtered = [hit.line for hit in result.hits_of([ERRORS_COUNT])
+                     if ERRORS_COUNT in hit.line and "reportFormat" not in hit.line]
     LOGGER.info("'Error count' filtered list: %s", resp_filtered)
-    for response in resp_filtered:
-        error_found = int(response.split(":")[1].strip()) != 0
     if not resp_filtered:
-        error_found = True
-
-    return error_found
+        return True
+    return any(int(response.split(":")[1].strip()) != 0 for response in resp_filtered)
 
 
 # pylint: disable=too-many-arguments
@@ -0,0 +1,561 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+"""
+In-process asyncio S3 load generator.
+
+Drop in alternative to the s3bench binary: same arguments, same log file and json response
+(via s3bench.create_log / create_json_reps) so check_log_file_error keeps working, plus
+per operation latency histograms, object size distributions, read/write/delete mixes,
+open loop rate control and early stop.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable
+from urllib.parse import quote
+from urllib.parse import urlparse
+
+import aiohttp
+
+from commons.utils import s3_utils
+from commons.utils.histogram_utils import LatencyHistogram
+from scripts.s3_bench import s3bench
+
+LOGGER = logging.getLogger(__name__)
+
+WRITE, READ, DELETE = "write", "read", "delete"
+OPERATIONS = (WRITE, READ, DELETE)
+METHODS = {WRITE: "PUT", READ: "GET", DELETE: "DELETE"}
+# Percentile lines of the s3bench report: label, percentile
+REPORT_PERCENTILES = (("99.9th %ile", 99.9), ("99th %ile", 99), ("90th %ile", 90),
+                      ("75th %ile", 75), ("50th %ile", 50), ("25th %ile", 25))
+SIZE_UNITS = {"": 1, "b": 1, "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+              "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4}
+MAX_PAYLOAD = 64 * 1024 ** 2
+PAUSE_POLL = 0.05
+
+
+def size_in_bytes(size) -> int:
+    """
+    Convert s3bench style size ("4Kb", "1.5Mb", "2GiB") or int to bytes.
+    Kb/Mb/Gb are decimal units as in s3bench.
+    """
+    if isinstance(size, int):
+        return size
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", str(size))
+    if not match or match.group(2).lower() not in SIZE_UNITS:
+        raise ValueError(f"Invalid object size: {size}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+def duration_in_seconds(duration) -> float:
+    """Convert s3bench style duration ("1h24m10s", "0h1m") or number to seconds."""
+    if duration is None or isinstance(duration, (int, float)):
+        return duration
+    match = re.fullmatch(r"(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?", duration.lower())
+    if not match or not any(match.groups()):
+        raise ValueError(f"Invalid duration: {duration}")
+    hours, mins, secs = (int(val or 0) for val in match.groups())
+    return hours * 3600 + mins * 60 + secs
+
+
+class SizeDistribution:
+    """Object size distribution: fixed size, weighted sizes or uniform range."""
+
+    def __init__(self, sizes):
+        """
+        :param sizes: Size ("4Kb" or bytes), dict of size to weight ({"4Kb": 70, "1Mb": 30})
+        or (min, max) tuple for a uniform range.
+        """
+        self.uniform = None
+        if isinstance(sizes, dict):
+            self.sizes = [size_in_bytes(size) for size in sizes]
+            self.weights = list(sizes.values())
+        elif isinstance(sizes, tuple):
+            self.uniform = (size_in_bytes(sizes[0]), size_in_bytes(sizes[1]))
+            self.sizes = list(self.uniform)
+            self.weights = None
+        else:
+            self.sizes = [size_in_bytes(sizes)]
+            self.weights = None
+
+    @property
+    def max_size(self) -> int:
+        """Largest size of the distribution."""
+        return max(self.sizes)
+
+    @property
+    def mean_size(self) -> float:
+        """Mean object size."""
+        if self.uniform:
+            return sum(self.uniform) / 2
+        if self.weights:
+            return sum(size * weight for size, weight in zip(self.sizes, self.weights)) / \
+                sum(self.weights)
+        return self.sizes[0]
+
+    def sample(self, rand: random.Random) -> int:
+        """Draw an object size."""
+        if self.uniform:
+            return rand.randint(*self.uniform)
+        if self.weights:
+            return rand.choices(self.sizes, self.weights)[0]
+        return self.sizes[0]
+
+
+class OpStats:
+    """Counters and latency histogram of one operation type."""
+
+    def __init__(self):
+        self.hist = LatencyHistogram()
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.error_classes = Counter()
+        self.first_error = None
+        self.started = None
+        self.finished = None
+
+    def record(self, latency: float, nbytes: int, error: str = None):
+        """Record one finished operation."""
+        now = time.monotonic()
+        self.started = self.started if self.started is not None else now - latency
+        self.finished = now
+        self.count += 1
+        self.hist.record(latency)
+        if error is None:
+            self.bytes += nbytes
+            return
+        self.errors += 1
+        self.error_classes[error.split(":")[0]] += 1
+        if self.first_error is None:
+            self.first_error = error
+
+    @property
+    def duration(self) -> float:
+        """Seconds between first operation start and last operation end."""
+        if self.started is None:
+            return 0.0
+        return self.finished - self.started
+
+    def to_dict(self) -> dict:
+        """s3bench like json summary."""
+        duration = self.duration or 1e-9
+        return {"Total Requests Count": self.count,
+                "Errors Count": self.errors,
+                "Total Transferred (MB)": self.bytes / 1024 ** 2,
+                "Total Throughput (MB/s)": self.bytes / 1024 ** 2 / duration,
+                "Total Duration (s)": self.duration,
+                "Ops/s": self.count / duration,
+                "Latency (ms)": self.hist.summary(),
+                "Error Classes": dict(self.error_classes),
+                "First Error": self.first_error}
+
+
+class S3LoadEngine:
+    """
+    asyncio load engine, one client core drives num_clients concurrent requests.
+
+    Without mix the s3bench sequence is run: write num_sample objects, read them back and
+    delete them. With mix, operations are drawn from the weights till num_sample operations
+    or duration are done. With rate, operations are issued open loop at that many per second
+    and latency is measured from the scheduled start, so queueing delay is not hidden.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes,too-many-locals
+    def __init__(self, end_point: str, access_key: str, secret_key: str, bucket: str,
+                 obj_size="4Kb", num_clients: int = 8, num_sample: int = None,
+                 duration=None, mix: dict = None, rate: float = None,
+                 obj_name_pref: str = "loadgen_test_", region: str = "us-east-1",
+                 validate_certs: bool = True, timeout: float = 60, seed: int = None,
+                 **kwargs):
+        """
+        :param obj_size: Size, {size: weight} or (min, max), see SizeDistribution.
+        :param num_clients: Concurrent requests in flight.
+        :param num_sample: Objects per phase, or total operations with mix.
+        :param duration: Run time limit in seconds or s3bench format "0h5m".
+        :param mix: Operation weights e.g. {"write": 50, "read": 40, "delete": 10}.
+        :param rate: Operations per second issued open loop, closed loop if None.
+        :keyword skip_write/skip_read/skip_cleanup: Skip s3bench phases.
+        :keyword validate: Compare read data with written data.
+        :keyword on_complete: Callable(op, latency, nbytes, error) run after each operation.
+        :keyword stop_event: Event (threading or multiprocessing) which stops the run when set.
+        :keyword pause_event: Event which holds back new operations while set.
+        :keyword endpoint_pool: EndpointPool spreading requests over endpoints instead of
+        end_point (commons.utils.endpoint_pool_utils).
+        """
+        url = urlparse(end_point)
+        self.end_point = end_point.rstrip("/")
+        self.host = url.netloc
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.bucket = bucket
+        self.sizes = SizeDistribution(obj_size)
+        self.num_clients = num_clients
+        self.num_sample = num_sample
+        self.duration = duration_in_seconds(duration)
+        self.mix = mix
+        self.rate = rate
+        self.obj_name_pref = obj_name_pref
+        self.region = region
+        self.timeout = timeout
+        self.ssl = None if url.scheme != "https" or validate_certs else False
+        self.skip_write = kwargs.get("skip_write", False)
+        self.skip_read = kwargs.get("skip_read", False)
+        self.skip_cleanup = kwargs.get("skip_cleanup", False)
+        self.validate = kwargs.get("validate", False)
+        self.on_complete: Callable = kwargs.get("on_complete")
+        self.endpoint_pool = kwargs.get("endpoint_pool")
+        self.rand = random.Random(seed)
+        self.stats = {op: OpStats() for op in OPERATIONS}
+        self.keys = []
+        self.sizes_written = {}
+        self._payload = os.urandom(min(self.sizes.max_size, MAX_PAYLOAD))
+        self._key_seq = 0
+        self._signing_key = None
+        self._signing_date = None
+        self._stop = kwargs.get("stop_event") or threading.Event()
+        self._pause = kwargs.get("pause_event") or threading.Event()
+        self.in_flight = 0
+        self._loop = None
+        self.started = None
+        self.finished = None
+
+    def stop(self):
+        """Stop issuing operations, in flight operations are completed. Thread safe."""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        """True once stop was requested."""
+        return self._stop.is_set()
+
+    def pause(self):
+        """Hold back new operations, in flight operations are completed. Thread safe."""
+        self._pause.set()
+
+    def resume(self):
+        """Resume issuing operations."""
+        self._pause.clear()
+
+    @property
+    def paused(self) -> bool:
+        """True while paused."""
+        return self._pause.is_set()
+
+    def _headers(self, method: str, path: str, host: str = None) -> dict:
+        """SigV4 headers, signing key is derived once per day."""
+        now = datetime.datetime.utcnow()
+        date = s3_utils.get_date(now)
+        if date != self._signing_date:
+            self._signing_key = s3_utils.get_v4_signature_key(self.secret_key, date,
+                                                              self.region, "s3")
+            self._signing_date = date
+        return s3_utils.get_s3_auth_headers_v4(method, host or self.host, path, self.access_key,
+                                               self.secret_key, now, region=self.region,
+                                               signing_key=self._signing_key)
+
+    def _data(self, size: int) -> memoryview:
+        """Payload of size bytes, pattern repeats beyond MAX_PAYLOAD."""
+        if size <= len(self._payload):
+            return memoryview(self._payload)[:size]
+        repeat = -(-size // len(self._payload))
+        return memoryview(self._payload * repeat)[:size]
+
+    def _new_key(self) -> str:
+        self._key_seq += 1
+        return f"{self.obj_name_pref}{self._key_seq}"
+
+    def _take_key(self, remove: bool):
+        """Random existing key, removed from the pool for deletes. None if pool is empty."""
+        if not self.keys:
+            return None
+        idx = self.rand.randrange(len(self.keys))
+        if not remove:
+            return self.keys[idx]
+        self.keys[idx], self.keys[-1] = self.keys[-1], self.keys[idx]
+        return self.keys.pop()
+
+    def _next_mixed(self):
+        """Draw next operation from the mix."""
+        weights = [self.mix.get(op, 0) for op in OPERATIONS]
+        op = self.rand.choices(OPERATIONS, weights)[0]
+        key = self._take_key(op == DELETE) if op != WRITE else None
+        if key is None:
+            return WRITE, self._new_key(), self.sizes.sample(self.rand)
+        return op, key, self.sizes_written.get(key, 0)
+
+    async def _execute(self, session: aiohttp.ClientSession, op: str, key: str, size: int,
+                       scheduled: float):
+        """Run one operation and record it."""
+        path = f"/{self.bucket}/{quote(key)}"
+        data = self._data(size) if op == WRITE else None
+        error, nbytes = None, 0
+        endpoint = self.endpoint_pool.acquire() if self.endpoint_pool else None
+        end_point, host = (endpoint.url, endpoint.netloc) if endpoint else \
+            (self.end_point, self.host)
+        endpoint_failed = True
+        try:
+            async with session.request(METHODS[op], end_point + path, data=data,
+                                       headers=self._headers(METHODS[op], path, host),
+                                       ssl=self.ssl) as resp:
+                body = await resp.read()
+                endpoint_failed = resp.status >= 500
+                if resp.status >= 300:
+                    error = f"status code {resp.status}: {body[:200]!r}"
+                elif op == READ:
+                    nbytes = len(body)
+                    if self.validate and body != self._data(size):
+                        error = f"checksum mismatch: {key}"
+                else:
+                    nbytes = size
+        except asyncio.TimeoutError:
+            error = f"timeout: request exceeded {self.timeout}s"
+        except aiohttp.ClientError as err:
+            error = f"{type(err).__name__}: {err}"
+        latency = self._loop.time() - scheduled
+        if endpoint is not None:
+            self.endpoint_pool.release(endpoint, latency, endpoint_failed)
+        if error is None and op == WRITE:
+            self.keys.append(key)
+            self.sizes_written[key] = size
+        elif op == DELETE:
+            self.sizes_written.pop(key, None)
+        if error is not None:
+            LOGGER.debug("%s %s failed with error %s", op, key, error)
+        self.stats[op].record(latency, nbytes, error)
+        if self.on_complete is not None:
+            self.on_complete(op, latency, nbytes, error)
+
+    async def _create_bucket(self, session: aiohttp.ClientSession):
+        """Create the bucket as s3bench does, an existing bucket is fine."""
+        path = f"/{self.bucket}"
+        async with session.put(self.end_point + path, headers=self._headers("PUT", path),
+                               ssl=self.ssl) as resp:
+            body = await resp.read()
+            if resp.status >= 300 and b"BucketAlreadyOwnedByYou" not in body:
+                LOGGER.warning("Create bucket %s returned %s: %s", self.bucket, resp.status,
+                               body[:200])
+
+    def _done_callback(self, slots: asyncio.Semaphore, tasks: set) -> Callable:
+        """Callback releasing the client slot of a finished operation."""
+        def done(task):
+            self.in_flight -= 1
+            slots.release()
+            tasks.discard(task)
+        return done
+
+    async def _drive(self, session: aiohttp.ClientSession, next_op: Callable,
+                     total: int = None, deadline: float = None):
+        """Issue operations from next_op with num_clients in flight."""
+        slots = asyncio.Semaphore(self.num_clients)
+        tasks = set()
+        issued = 0
+        start = self._loop.time()
+        while not self.stopped and (total is None or issued < total) and \
+                (deadline is None or self._loop.time() < deadline):
+            if self.paused:
+                while self.paused and not self.stopped:
+                    await asyncio.sleep(PAUSE_POLL)
+                # Open loop schedule restarts after the pause instead of bursting
+                start = self._loop.time() - (issued / self.rate if self.rate else 0)
+                continue
+            scheduled = None
+            if self.rate:
+                scheduled = start + issued / self.rate
+                delay = scheduled - self._loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await slots.acquire()
+            operation = next_op()
+            if operation is None:
+                slots.release()
+                break
+            task = asyncio.ensure_future(self._execute(
+                session, *operation, scheduled if scheduled is not None else self._loop.time()))
+            tasks.add(task)
+            self.in_flight += 1
+            task.add_done_callback(self._done_callback(slots, tasks))
+            issued += 1
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def run_async(self):
+        """Run the workload on the current event loop."""
+        self._loop = asyncio.get_running_loop()
+        deadline = self._loop.time() + self.duration if self.duration else None
+        connector = aiohttp.TCPConnector(limit=self.num_clients)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        self.started = time.time()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         auto_decompress=False) as session:
+            await self._create_bucket(session)
+            if self.mix:
+                await self._drive(session, self._next_mixed, self.num_sample, deadline)
+            else:
+                if not self.skip_write:
+                    await self._drive(session, lambda: (
+                        WRITE, self._new_key(), self.sizes.sample(self.rand)),
+                        self.num_sample, deadline)
+                if not self.skip_read:
+                    pending = iter(list(self.keys))
+                    await self._drive(session, lambda: next(
+                        ((READ, key, self.sizes_written[key]) for key in pending), None))
+                if not self.skip_cleanup:
+                    await self._drive(session, lambda: (
+                        (DELETE, self._take_key(True), 0) if self.keys else None))
+        self.finished = time.time()
+        return self.report()
+
+    def run(self):
+        """Run the workload on a new event loop, returns LoadReport."""
+        return asyncio.run(self.run_async())
+
+    def report(self):
+        """LoadReport of the recorded operations."""
+        return LoadReport(self)
+
+
+class LoadReport:
+    """Result of a load run, as s3bench compatible text and as json."""
+
+    def __init__(self, engine: S3LoadEngine):
+        self.engine = engine
+        self.stats = {op: stat for op, stat in engine.stats.items() if stat.count}
+
+    @property
+    def errors(self) -> int:
+        """Total failed operations."""
+        return sum(stat.errors for stat in self.stats.values())
+
+    @property
+    def parameters(self) -> dict:
+        """Test parameters with s3bench names."""
+        engine = self.engine
+        return {"endpoint(s)": f"[{engine.end_point}]",
+                "bucket": engine.bucket,
+                "objectNamePrefix": engine.obj_name_pref,
+                "objectSize": f"{engine.sizes.mean_size / 1024 ** 2:.4f} MB",
+                "numClients": engine.num_clients,
+                "numSamples": engine.num_sample,
+                "rate": engine.rate,
+                "mix": engine.mix}
+
+    def to_dict(self) -> dict:
+        """Full json report with latency percentiles per operation."""
+        return {"Parameters": self.parameters,
+                "Start": self.engine.started,
+                "End": self.engine.finished,
+                "Stopped": self.engine.stopped,
+                "Tests": [dict(Operation=op.capitalize(), **stat.to_dict())
+                          for op, stat in self.stats.items()]}
+
+    def to_text(self) -> str:
+        """Report in the text format printed by s3bench."""
+        lines = ["Test parameters"]
+        for name, value in self.parameters.items():
+            if value is not None:
+                lines.append(f"{name + ':':<18}{value}")
+        lines.append("\n")
+        for op, stat in self.stats.items():
+            label = op.capitalize()
+            lines += [f"Results Summary for {label} Operation(s)",
+                      f"Total Transferred: {stat.bytes / 1024 ** 2:.3f} MB",
+                      f"Total Throughput:  {stat.bytes / 1024 ** 2 / (stat.duration or 1e-9):.2f}"
+                      f" MB/s",
+                      f"Total Duration:    {stat.duration:.3f} s",
+                      f"Number of Errors:  {stat.errors}",
+                      f"Errors Count:  {stat.errors}",
+                      f"Operations/s:  {stat.count / (stat.duration or 1e-9):.1f}",
+                      "------------------------------------",
+                      f"{label} times Max:       {(stat.hist.max or 0) / 1e6:.3f} s"]
+            for name, percent in REPORT_PERCENTILES:
+                lines.append(f"{label} times {name}: {stat.hist.percentile(percent):.3f} s")
+            lines += [f"{label} times Min:       {(stat.hist.min or 0) / 1e6:.3f} s", "\n"]
+            if stat.first_error:
+                lines.append(f"{label} failed {stat.errors} times, first with error "
+                             f"{stat.first_error}\n")
+        return "\n".join(lines)
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def s3loadgen(access_key, secret_key, bucket="bucketname", end_point="https://s3.seagate.com",
+              num_clients=40, num_sample=200, obj_name_pref="loadgen_test_", obj_size="4Kb",
+              skip_write=False, skip_cleanup=False, skip_read=False, validate=True,
+              duration=None, region="us-east-1", log_file_prefix="", validate_certs=True,
+              **kwargs):
+    """
+    Run the in-process load engine with s3bench arguments.
+    :keyword mix: Operation weights, see S3LoadEngine.
+    :keyword rate: Open loop operations per second.
+    :keyword httpclientimeout: Request timeout in ms as for s3bench.
+    :keyword engine_callback: Callable receiving the engine before it runs, e.g. to stop it.
+    :keyword endpoint_pool: EndpointPool used instead of end_point.
+    :return: tuple with json response (as s3bench.create_json_reps) and log path. The json
+    report with latency histograms is written next to the log with .json extension.
+    """
+    timeout = kwargs.get("httpclientimeout") or 60000
+    engine = S3LoadEngine(end_point, access_key, secret_key, bucket, obj_size=obj_size,
+                          num_clients=num_clients, num_sample=num_sample, duration=duration,
+                          mix=kwargs.get("mix"), rate=kwargs.get("rate"),
+                          obj_name_pref=obj_name_pref, region=region,
+                          validate_certs=validate_certs, timeout=timeout / 1000,
+                          skip_write=skip_write, skip_read=skip_read,
+                          skip_cleanup=skip_cleanup, validate=validate,
+                          endpoint_pool=kwargs.get("endpoint_pool"))
+    if kwargs.get("engine_callback"):
+        kwargs["engine_callback"](engine)
+    LOGGER.info("Running in-process load generator")
+    report = engine.run()
+    text = report.to_text()
+    log_path = s3bench.create_log([text], log_file_prefix, num_clients, num_sample, obj_size)
+    with open(os.path.splitext(log_path)[0] + ".json", "w") as json_file:
+        json.dump(report.to_dict(), json_file, indent=2)
+    LOGGER.info("Workload execution completed, errors: %s", report.errors)
+    return s3bench.create_json_reps([text]), log_path
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description="Run in-process S3 load generator.")
+    PARSER.add_argument("--a", dest="access_key", required=True, help="the S3 access key")
+    PARSER.add_argument("--s", dest="secret_key", required=True, help="the S3 access secret")
+    PARSER.add_argument("--b", dest="bucket", required=True, help="the bucket to use")
+    PARSER.add_argument("--e", dest="end_point", default="https://s3.seagate.com")
+    PARSER.add_argument("--w", dest="num_clients", type=int, default=40)
+    PARSER.add_argument("--n", dest="num_sample", type=int, default=200)
+    PARSER.add_argument("--o", dest="obj_size", default="4Kb")
+    PARSER.add_argument("--d", dest="duration", default=None, help="e.g. 0h5m")
+    PARSER.add_argument("--rate", type=float, default=None, help="open loop ops/s")
+    PARSER.add_argument("--mix", type=json.loads, default=None,
+                        help='e.g. {"write": 50, "read": 50}')
+    PARSER.add_argument("--region", default="us-east-1")
+    ARGS = PARSER.parse_args()
+    RESP = s3loadgen(**vars(ARGS))
+    print(json.dumps(RESP[0], indent=2))
+    print(f"Log file: {RESP[1]}")
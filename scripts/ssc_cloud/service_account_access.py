@@ -36,16 +36,20 @@ def main(args):
     vm_state = VmStateManagement(COLLECTION)
     if args.action == "get_setup":
         nodes = int(args.nodes)
-        lock_acquired, setup_info = vm_state.get_available_system(nodes)
+        lock_acquired, setup_info = vm_state.get_available_system(
+            nodes, timeout=args.timeout, priority=args.priority, lease_ttl=args.lease_ttl)
         if lock_acquired:
             with open(os.path.join(os.getcwd(), AVAILABLE_VM_CSV), 'w', newline='') as vm_info_csv:
                 writer = csv.writer(vm_info_csv)
                 writer.writerow([setup_info["setup_name"], setup_info["client"],
                                  setup_info["hostnames"], setup_info["data_ip"],
-                                 setup_info['m_vip'], setup_info['nodes']])
+                                 setup_info['m_vip'], setup_info['nodes'],
+                                 setup_info['lease_id']])
             return lock_acquired
+    elif args.action == "heartbeat":
+        return vm_state.heartbeat(args.setupname, args.lease_id, args.lease_ttl)
     elif args.action == "mark_setup_free":
-        lock_released = vm_state.unlock_system(args.setupname)
+        lock_released = vm_state.unlock_system(args.setupname, args.lease_id)
         return lock_released
 
 
@@ -54,7 +58,8 @@ def parse_args():
     parse user args
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument("-a", "--action", choices=['get_setup', 'mark_setup_free'], required=True,
+    parser.add_argument("-a", "--action", choices=['get_setup', 'heartbeat', 'mark_setup_free'],
+                        required=True,
                         help="action to be performed")
     parser.add_argument("-s", "--setupname", type=str,
                         help="set up name")
@@ -64,6 +69,15 @@ def parse_args():
                         help="client hostname")
     parser.add_argument("-v", "--vm_names", nargs='+', type=str,
                         help="hostnames")
+    parser.add_argument("-l", "--lease_id", type=str,
+                        help="lease id of allocated set up")
+    parser.add_argument("-t", "--timeout", type=int, default=0,
+                        help="seconds to wait in queue for a free set up")
+    parser.add_argument("-p", "--priority", type=int, default=0,
+                        help="queue priority, higher is served first")
+    parser.add_argument("--lease_ttl", type=int,
+                        help="seconds until the set up is reclaimed without heartbeat, "
+                             "held till mark_setup_free if not given")
     return parser.parse_args()
 
 
@@ -20,6 +20,9 @@ Utility Class for VM management using DB
 #
 # -*- coding: utf-8 -*-
 import json
+import threading
+import time
+import uuid
 from http import HTTPStatus
 import requests
 import logging
@@ -43,66 +46,84 @@ class VmStateManagement:
         self.headers = {
             'content-type': "application/json",
         }
+        # seconds one allocate request waits on the server
+        self.poll_wait = 30
 
-    def get_available_system(self, nodes):
+    def _post(self, endpoint, payload, timeout=None):
         """
-           Get available VMs
-       """
-        lock_acquired = False
-        is_ok_response = False
-        setup_info = dict()
-        payload = {
-            "query": {"is_setup_free": {"$eq": "yes"},
-                      "nodes": nodes
-                      }
-        }
-
-        payload.update({"projection": {"hostnames": True, "client": True, "setupname": True,
-                                       "m_vip": True, "data_ip": True}})
-
-        payload.update(
-            {"db_username": self.db_username,
-             "db_password": self.db_password})
+            POST payload with db credentials to pool endpoint, None on request failure
+        """
+        payload = dict(payload, db_username=self.db_username, db_password=self.db_password)
         try:
-            response = requests.request("GET", self.host + self.db_collection + "search",
-                                        headers=self.headers, data=json.dumps(payload))
-            if response.status_code == HTTPStatus.OK:
-                is_ok_response = True
+            return requests.request("POST", self.host + self.db_collection + endpoint,
+                                    headers=self.headers, data=json.dumps(payload),
+                                    timeout=timeout)
         except requests.exceptions.RequestException as fault:
             LOGGER.exception(str(fault))
-            LOGGER.error("Failed to do get request on db")
+            LOGGER.error("Failed to do %s request on db", endpoint)
+            return None
+
+    # pylint: disable=too-many-arguments
+    def get_available_system(self, nodes, timeout=0, priority=0, lease_ttl=None,
+                             requester="auto"):
+        """
+            Allocate a free setup of given node count from the VM pool service.
+            Waits up to timeout seconds in the pool queue, requests of higher priority are
+            served first. The lease of the setup expires after lease_ttl seconds unless
+            extended with heartbeat, without lease_ttl it is held till released.
+            Returns lock_acquired and setup info including lease_id
+        """
+        setup_info = dict()
+        payload = {"nodes": nodes, "priority": priority, "requester": requester,
+                   "request_id": uuid.uuid4().hex}
+        if lease_ttl:
+            payload["lease_ttl"] = lease_ttl
+        deadline = time.time() + timeout
+        while True:
+            payload["wait"] = max(0, min(self.poll_wait, deadline - time.time()))
+            response = self._post("allocate", payload, timeout=payload["wait"] + 60)
+            if response is not None and response.status_code == HTTPStatus.OK:
+                setup = json.loads(response.text)["result"]
+                setup_info["setup_name"] = setup["setupname"]
+                for key in ["hostnames", "client", "m_vip", "nodes", "data_ip", "lease_id",
+                            "lease_expiry"]:
+                    setup_info[key] = setup.get(key)
+                return True, setup_info
+            if response is None or response.status_code != HTTPStatus.ACCEPTED \
+                    or time.time() >= deadline:
+                break
+            LOGGER.info("Waiting for %s node setup, %s requests ahead", nodes,
+                        json.loads(response.text)["position"])
+        if response is not None and response.status_code != HTTPStatus.ACCEPTED:
+            LOGGER.error("Allocate failed: %s %s", response.status_code, response.text)
+        self._post("cancel", {"request_id": payload["request_id"]})
+        return False, setup_info
+
+    def heartbeat(self, setupname, lease_id, lease_ttl=None):
+        """
+            Extend lease of allocated setup, False if the lease is lost
+        """
+        payload = {"setupname": setupname, "lease_id": lease_id}
+        if lease_ttl:
+            payload["lease_ttl"] = lease_ttl
+        response = self._post("heartbeat", payload)
+        return response is not None and response.status_code == HTTPStatus.OK
+
+    def start_heartbeat(self, setupname, lease_id, interval=300, lease_ttl=None):
+        """
+            Send heartbeats from a daemon thread until the returned event is set
+            or the lease is lost
+        """
+        stop = threading.Event()
 
-        if is_ok_response:
-            json_response = json.loads(response.text)
-            if len(json_response["result"]) > 0:
-                setup_name = json_response["result"][0]["setupname"]
-                hostnames = json_response["result"][0]["hostnames"]
-                client = json_response["result"][0]["client"]
-                m_vip = json_response["result"][0]["m_vip"]
-                data_ip = json_response["result"][0]["data_ip"]
-                payload = {
-                        "filter": {"setupname": setup_name},
-                        "update": {"$set": {"is_setup_free": "no", "setup_in_useby": "auto"}}
-                    }
-                payload.update(
-                    {"db_username": self.db_username,
-                     "db_password": self.db_password})
-                try:
-                    response = requests.request("PATCH", self.host + self.db_collection + "update",
-                                                headers=self.headers, data=json.dumps(payload))
-                    if response.status_code == HTTPStatus.OK:
-                        lock_acquired = True
-                        setup_info["setup_name"] = setup_name
-                        setup_info["hostnames"] = hostnames
-                        setup_info["client"] = client
-                        setup_info["m_vip"] = m_vip
-                        setup_info["nodes"] = nodes
-                        setup_info["data_ip"] = data_ip
-                except requests.exceptions.RequestException as fault:
-                    LOGGER.exception(str(fault))
-                    LOGGER.error("Failed to do patch request on db")
-
-        return lock_acquired, setup_info
+        def beat():
+            while not stop.wait(interval):
+                if not self.heartbeat(setupname, lease_id, lease_ttl):
+                    LOGGER.error("Lease %s of %s lost", lease_id, setupname)
+                    break
+
+        threading.Thread(target=beat, daemon=True).start()
+        return stop
 
     def add_systems(self, nodes, setupname, hostnames, client):
         """
@@ -152,45 +173,12 @@ class VmStateManagement:
             LOGGER.error("Failed to do get request on db")
         return target_found
 
-    def unlock_system(self, setupname):
+    def unlock_system(self, setupname, lease_id=None):
         """
-            Release lock on given target
+            Release lock on given target, only if still held with lease_id when given
         """
-        lock_released = False
-        payload = {
-            "query": {"is_setup_free": {"$eq": 'no'},
-                      "setupname": setupname,
-                      },
-            "projection": {"setupname": True},
-            "db_username": self.db_username,
-            "db_password": self.db_password
-        }
-        is_ok_response = False
-        try:
-            response = requests.request("GET", self.host + self.db_collection + "search",
-                                        headers=self.headers, data=json.dumps(payload))
-            if response.status_code == HTTPStatus.OK:
-                is_ok_response = True
-        except requests.exceptions.RequestException as fault:
-            LOGGER.exception(str(fault))
-            LOGGER.error("Failed to do get request on db")
-
-        if is_ok_response:
-            payload = {
-                "filter": {"setupname": setupname},
-                "update": {"$set": {"is_setup_free": "yes", "setup_in_useby": ""}}
-            }
-
-            payload.update(
-                {"db_username": self.db_username,
-                 "db_password": self.db_password})
-            try:
-                response = requests.request("PATCH", self.host + self.db_collection
-                                            + "update", headers=self.headers,
-                                            data=json.dumps(payload))
-                if response.status_code == HTTPStatus.OK:
-                    lock_released = True
-            except requests.exceptions.RequestException as fault:
-                LOGGER.exception(str(fault))
-                LOGGER.error("Failed to do patch request on db")
-            return lock_released
+        payload = {"setupname": setupname}
+        if lease_id:
+            payload["lease_id"] = lease_id
+        response = self._post("release", payload)
+        return response is not None and response.status_code == HTTPStatus.OK
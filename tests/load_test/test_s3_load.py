@@ -101,8 +101,13 @@ class TestS3Load:
         self.log.info("ENDED: Teardown operations.")
 
     @staticmethod
-    def check_errors(log_file):
-        """Check errors in logfile"""
+    def check_errors(run_files):
+        """Check failed requests in json summary and errors in logfile"""
+        summary_file = run_files["summary-file"]
+        if os.path.exists(summary_file):
+            res = locust_runner.check_summary(summary_file)
+            assert_utils.assert_true(res[0], "Few IO failed due to some reason")
+        log_file = run_files["log-file"]
         if os.path.exists(log_file):
             res = locust_runner.check_log_file(log_file, error_strings)
             assert_utils.assert_false(res, "Few IO failed due to some reason")
@@ -124,8 +129,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -145,8 +149,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -166,8 +169,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -191,8 +193,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -217,8 +218,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -240,8 +240,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -262,8 +261,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -285,8 +283,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -312,8 +309,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -339,8 +335,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -362,8 +357,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -385,8 +379,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -407,8 +400,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -429,8 +421,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -451,8 +442,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -473,8 +463,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -495,8 +484,7 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
 
     @pytest.mark.s3_io_load
@@ -518,6 +506,5 @@ class TestS3Load:
         self.log.info(res)
         self.log.info("Successfully executed locust run.")
         self.log.info("Checking locust log file.")
-        log_file = res[1]["log-file"]
-        self.check_errors(log_file)
+        self.check_errors(res[1])
         self.log.info("Validated locust log file.")
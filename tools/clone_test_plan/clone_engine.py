@@ -0,0 +1,444 @@
+"""Journaled, resumable test plan clone engine."""
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+# -*- coding: utf-8 -*-
+#
+# A clone is planned upfront (all JIRA reads, one bulk JQL validation of the tests) and
+# written to a journal as a list of steps:
+#     create_tp                  create new test plan
+#     create_te:<TE>             create new test execution for source TE
+#     add_tests:<TE>:<chunk>     add chunk of tests to new TE and new TP
+#     link_te:<TE>               add new TE to new TP
+#     comment                    comment on given JIRA
+# Steps are executed in waves (creates, then adds/links, then comment) with bounded
+# concurrency and retried with jittered exponential backoff. Every step start/finish is
+# appended to the journal, so an interrupted clone is finished with --resume instead of
+# leaving half a test plan behind. Xray add calls are idempotent; an issue create which
+# may have been applied is recovered by a JQL search for the issue before it is retried.
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+
+import requests
+
+JIRA_URL = "https://jts.seagate.com/"
+RETRY_STATUSES = (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.INTERNAL_SERVER_ERROR,
+                  HTTPStatus.BAD_GATEWAY, HTTPStatus.SERVICE_UNAVAILABLE,
+                  HTTPStatus.GATEWAY_TIMEOUT)
+VALIDATION_FIELDS = ["customfield_22982", "environment", "customfield_21085"]
+SEARCH_PAGE_SIZE = 500
+
+
+class CloneError(Exception):
+    """Clone step failed, clone can be resumed from journal."""
+
+
+class RetryableError(CloneError):
+    """JIRA request failed with a status or error worth retrying."""
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """Full jitter exponential backoff delay in seconds for given retry attempt (0 based)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))  # nosec
+
+
+def is_valid_test(fields, tp_info):
+    """
+    Check environment, core category and platform of test case against test plan.
+
+    :param fields: JIRA fields of test (customfield_22982, environment, customfield_21085)
+    :param tp_info: Test plan info with env, platform, nodes and core_category
+    :return: True if test should be added to test plan
+    """
+    tp_platform = tp_info['platform'].lower().strip()
+    if 'vm' in tp_platform and 'hw' in tp_platform:
+        is_valid_platform = True
+    else:
+        platform_field = fields.get('customfield_22982')
+        is_valid_platform = not platform_field or \
+            tp_platform in platform_field[0].lower().strip()
+    env_field = (fields.get('environment') or '').lower().strip()
+    if tp_info['nodes'] == '' or not env_field:
+        is_valid_env = True
+    else:
+        is_valid_env = env_field == "multinode" or \
+            (env_field == "1node" and str(tp_info['nodes']) == '1') or \
+            tp_info['env'].lower().strip() == env_field
+    category = fields.get('customfield_21085')
+    if tp_info['core_category'] == 'NA' or not category:
+        is_valid_category = True
+    else:
+        is_valid_category = tp_info['core_category'].lower().strip() in \
+            category['value'].lower()
+    return is_valid_platform and is_valid_env and is_valid_category
+
+
+def test_plan_fields(source, tp_info):
+    """New test plan fields from source test plan fields."""
+    env_field = str(tp_info['nodes']) + 'Node'
+    default_version = tp_info['fix_version'] if tp_info['product_family'] == 'LR' \
+        else 'CORTX-R2'
+    fix_versions = [{'name': ver['name']} for ver in source.get('fixVersions') or []] or \
+        [{'name': default_version}]
+    default_version = tp_info['affect_version'] if tp_info['product_family'] == 'LR' \
+        else 'CORTX-R2'
+    affect_ver = [{'name': ver['name']} for ver in source.get('versions') or []] or \
+        [{'name': default_version}]
+    prefix = "TP LR2 " if tp_info['product_family'] == 'LR' else "TP K8 CORTX-R2 "
+    # TP {Environment}_{Platform Type}_{Branch}_{Build}
+    summary = f"{prefix}{env_field}_{tp_info['platform']}_{tp_info['build_branch']}_" \
+              f"{tp_info['build']}"
+    return {'project': {'key': 'TEST'},
+            'summary': summary,
+            'description': f"Test Plan for Build : {tp_info['build']}, Build Branch: "
+                           f"{tp_info['build_branch']}, Setup type: {tp_info['setup_type']}, "
+                           f"Nodes: {tp_info['nodes']}, Cloned from: {tp_info['source_tp']}",
+            'issuetype': {'name': 'Test Plan'},
+            'components': [{'name': comp['name']} for comp in source.get('components') or []],
+            'labels': [tp_info['setup_type']] + list(tp_info.get('tp_labels') or []),
+            'environment': env_field,
+            'fixVersions': fix_versions,
+            'versions': affect_ver,
+            'customfield_22980': [tp_info['build']],
+            'customfield_22981': [tp_info['build_branch']],
+            'customfield_22982': [tp_info['platform']],
+            'customfield_22983': [tp_info['server_type']],
+            'customfield_22984': [tp_info['enclosure_type']]}
+
+
+def test_execution_fields(te_key, source, tp_info):
+    """New test execution fields from source test execution fields."""
+    return {'project': {'key': 'TEST'},
+            'summary': source['summary'],
+            'description': f"Test Execution for Build : {tp_info['build']}, Build Branch: "
+                           f"{tp_info['build_branch']}, Setup type: {tp_info['setup_type']}, "
+                           f"Cloned from: {te_key}",
+            'issuetype': {'name': 'Test Execution'},
+            'components': [{'name': comp['name']} for comp in source.get('components') or []],
+            'labels': source.get('labels') or [],
+            'versions': [{'name': 'LR-R2' if tp_info['product_family'] == 'LR'
+                          else 'CORTX-R2'}],
+            'environment': tp_info['build_branch'] + "_" + tp_info['build'],
+            'customfield_21006': source.get('customfield_21006')}
+
+
+class Journal:
+    """Append only json lines journal of clone plan and step states."""
+
+    def __init__(self, path):
+        self.path = path
+        self.plan = None
+        self.steps = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last line of a crashed run
+                        continue
+                    if "plan" in record:
+                        self.plan = record["plan"]
+                    else:
+                        self.steps[record["step"]] = record
+
+    def record(self, **record):
+        """Append record and sync it to disk."""
+        with self._lock:
+            if "step" in record:
+                self.steps[record["step"]] = record
+            else:
+                self.plan = record["plan"]
+            with open(self.path, "a") as journal:
+                journal.write(json.dumps(record) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def state(self, step_id):
+        """Last state of step or None."""
+        return self.steps.get(step_id, {}).get("state")
+
+    def result(self, step_id):
+        """Result of finished step."""
+        return self.steps[step_id].get("result")
+
+
+# pylint: disable=too-many-instance-attributes
+class CloneEngine:
+    """Plan and execute test plan clone steps against JIRA REST/Xray APIs."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, journal_path, auth, jira_url=JIRA_URL, max_workers=8, chunk_size=100,
+                 retries=5, base_delay=1.0, max_delay=60.0, timeout=180):
+        """
+        :param journal_path: Journal file, existing journal is resumed
+        :param auth: JIRA (username, password)
+        :param jira_url: JIRA server
+        :param max_workers: Concurrent JIRA requests
+        :param chunk_size: Tests added per Xray request
+        :param retries: Retries of a failed step
+        :param base_delay: Backoff base delay in seconds
+        :param max_delay: Backoff max delay in seconds
+        :param timeout: JIRA request timeout in seconds
+        """
+        self.journal = Journal(journal_path)
+        self.auth = auth
+        self.jira_url = jira_url
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Session of calling thread."""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+            self._local.session.auth = self.auth
+        return self._local.session
+
+    def request(self, method, path, **kwargs):
+        """JIRA request, raises RetryableError on connection errors or retryable statuses."""
+        try:
+            response = self.session.request(method, self.jira_url + path,
+                                            timeout=self.timeout, **kwargs)
+        except requests.exceptions.RequestException as error:
+            raise RetryableError(f"{method} {path}: {error}") from error
+        if response.status_code in RETRY_STATUSES:
+            raise RetryableError(f"{method} {path}: {response.status_code} {response.text}")
+        if response.status_code not in (HTTPStatus.OK, HTTPStatus.CREATED,
+                                        HTTPStatus.NO_CONTENT):
+            raise CloneError(f"{method} {path}: {response.status_code} {response.text}")
+        return response.json() if response.content else None
+
+    def with_backoff(self, func, on_retry=None):
+        """
+        Call func, retrying RetryableError with jittered exponential backoff
+
+        :param func: Function without arguments
+        :param on_retry: Called before each retry, its result is returned if not None
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return func()
+            except RetryableError as error:
+                if attempt == self.retries:
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                print(f"{error}, retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+                recovered = on_retry() if on_retry else None
+                if recovered is not None:
+                    return recovered
+        return None
+
+    def get(self, path, params=None):
+        """JIRA GET with retries."""
+        return self.with_backoff(lambda: self.request("GET", path, params=params))
+
+    def post(self, path, body):
+        """JIRA POST of idempotent request with retries."""
+        return self.with_backoff(lambda: self.request("POST", path, json=body))
+
+    def search(self, jql, fields):
+        """All issues matching JQL, fetched in pages."""
+        issues, start = [], 0
+        while True:
+            body = {"jql": jql, "startAt": start, "maxResults": SEARCH_PAGE_SIZE,
+                    "fields": fields}
+            page = self.post("rest/api/2/search", body)
+            issues.extend(page["issues"])
+            start += len(page["issues"])
+            if not page["issues"] or start >= page["total"]:
+                return issues
+
+    def test_ids(self, te_key):
+        """Tests of test execution."""
+        tests, page = [], 1
+        while True:
+            data = self.get(f"rest/raven/1.0/api/testexec/{te_key}/test",
+                            {"page": page, "limit": 100})
+            tests.extend(test["key"] for test in data)
+            if len(data) < 100:
+                return tests
+            page += 1
+
+    def valid_tests(self, tests, tp_info):
+        """Tests valid for test plan, checked with one bulk JQL search per page of keys."""
+        fields = {}
+        for i in range(0, len(tests), SEARCH_PAGE_SIZE):
+            keys = tests[i:i + SEARCH_PAGE_SIZE]
+            for issue in self.search(f"key in ({','.join(keys)})", VALIDATION_FIELDS):
+                fields[issue["key"]] = issue["fields"]
+        valid = set()
+        for test in tests:
+            if test in fields and is_valid_test(fields[test], tp_info):
+                valid.add(test)
+            else:
+                print(f"{test} is not valid for this test plan")
+        return valid
+
+    # pylint: disable=too-many-locals
+    def plan(self, source_tp, tp_info, te_keys, skip_tes=(), comment_jira=None):
+        """
+        Read source test plan and write clone steps to journal
+
+        :param source_tp: Test plan to clone
+        :param tp_info: New test plan info (build, build_branch, setup_type, platform, nodes ...)
+        :param te_keys: Test executions of source test plan to clone
+        :param skip_tes: Test executions cloned but not listed in cloned test plan csv
+        :param comment_jira: JIRA to comment on with the new test plan
+        :return: Planned steps
+        """
+        tp_info = dict(tp_info, source_tp=source_tp, env=str(tp_info['nodes']) + 'Node')
+        fields = ",".join(["summary", "components", "labels", "fixVersions", "versions",
+                           "customfield_21006"])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            tp_source = executor.submit(self.get, f"rest/api/2/issue/{source_tp}",
+                                        {"fields": fields})
+            te_sources = {te: executor.submit(self.get, f"rest/api/2/issue/{te}",
+                                              {"fields": fields}) for te in te_keys}
+            te_tests = {te: executor.submit(self.test_ids, te) for te in te_keys}
+            te_tests = {te: future.result() for te, future in te_tests.items()}
+            all_tests = sorted({test for tests in te_tests.values() for test in tests})
+            valid = self.valid_tests(all_tests, tp_info)
+            steps = [{"id": "create_tp",
+                      "fields": test_plan_fields(tp_source.result()["fields"], tp_info)}]
+            for te_key in te_keys:
+                tests = [test for test in te_tests[te_key] if test in valid]
+                if not tests:
+                    print(f"Skipping {te_key} as it has no tests valid for this test plan")
+                    continue
+                steps.append({"id": f"create_te:{te_key}", "te": te_key,
+                              "fields": test_execution_fields(
+                                  te_key, te_sources[te_key].result()["fields"], tp_info)})
+                for num, i in enumerate(range(0, len(tests), self.chunk_size)):
+                    steps.append({"id": f"add_tests:{te_key}:{num}", "te": te_key,
+                                  "tests": tests[i:i + self.chunk_size]})
+                steps.append({"id": f"link_te:{te_key}", "te": te_key})
+        if comment_jira:
+            steps.append({"id": "comment", "jira": comment_jira,
+                          "build": tp_info['build'], "setup_type": tp_info['setup_type']})
+        self.journal.record(plan={"source_tp": source_tp, "skip_tes": list(skip_tes),
+                                  "created": time.time(), "steps": steps})
+        return steps
+
+    def _claimed(self):
+        """Issue keys already recorded as created by journal."""
+        return {step["result"] for step in self.journal.steps.values()
+                if step["step"].startswith("create_") and step.get("result")}
+
+    def find_created(self, step):
+        """
+        Find issue created by a create step whose response was lost
+
+        :return: Issue key or None
+        """
+        fields = step["fields"]
+        started = self.journal.steps[step["id"]]["time"]
+        minutes = int((time.time() - started) / 60) + 2
+        jql = f'project = TEST AND issuetype = "{fields["issuetype"]["name"]}" AND ' \
+              f'reporter = currentUser() AND created >= -{minutes}m ORDER BY created DESC'
+        with self._claim_lock:
+            claimed = self._claimed()
+            for issue in self.search(jql, ["summary", "description"]):
+                if issue["key"] not in claimed and \
+                        issue["fields"]["summary"] == fields["summary"] and \
+                        issue["fields"]["description"] == fields["description"]:
+                    print(f"Found {issue['key']} created by {step['id']}")
+                    return issue["key"]
+        return None
+
+    def create(self, step):
+        """Create issue of step, recovering an issue created by an earlier attempt."""
+        if self.journal.state(step["id"]) == "started":
+            key = self.find_created(step)
+            if key:
+                return key
+        self.journal.record(step=step["id"], state="started", time=time.time())
+        return self.with_backoff(
+            lambda: self.request("POST", "rest/api/2/issue", json={"fields": step["fields"]})
+            ["key"], on_retry=lambda: self.find_created(step))
+
+    def execute(self, step):
+        """Execute one step and journal its result."""
+        new_tp = self.journal.result("create_tp") if step["id"] != "create_tp" else None
+        if step["id"].startswith("create_"):
+            result = self.create(step)
+        elif step["id"].startswith("add_tests:"):
+            new_te = self.journal.result(f"create_te:{step['te']}")
+            for path in [f"testexec/{new_te}/test", f"testplan/{new_tp}/test"]:
+                self.post(f"rest/raven/1.0/api/{path}", {"add": step["tests"]})
+            result = len(step["tests"])
+        elif step["id"].startswith("link_te:"):
+            new_te = self.journal.result(f"create_te:{step['te']}")
+            self.post(f"rest/raven/1.0/api/testplan/{new_tp}/testexecution", {"add": [new_te]})
+            result = new_te
+        else:
+            new_tes = [self.journal.result(step_id) for step_id in self.journal.steps
+                       if step_id.startswith("create_te:")]
+            current_time_ms = datetime.utcnow().strftime('%Y-%m-%d_%H:%M:%S.%f')
+            comment = f" Build: {step['build']}, Setup: {step['setup_type']}, Test Plan: " \
+                      f"{new_tp}, Test Executions: {new_tes} created on {current_time_ms}"
+            self.post(f"rest/api/2/issue/{step['jira']}/comment", {"body": comment})
+            result = step["jira"]
+        self.journal.record(step=step["id"], state="done", result=result, time=time.time())
+        return result
+
+    def run(self):
+        """
+        Execute pending steps of journal
+
+        :return: New test plan key and [(new TE, source TE)] excluding skipped TEs
+        """
+        if not self.journal.plan:
+            raise CloneError(f"No clone plan in journal {self.journal.path}")
+        steps = [step for step in self.journal.plan["steps"]
+                 if self.journal.state(step["id"]) != "done"]
+        waves = [[step for step in steps if step["id"] == "create_tp"],
+                 [step for step in steps if step["id"].startswith("create_te:")],
+                 [step for step in steps if step["id"].startswith(("add_tests:", "link_te:"))],
+                 [step for step in steps if step["id"] == "comment"]]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for wave in waves:
+                futures = {step["id"]: executor.submit(self.execute, step) for step in wave}
+                failed = {}
+                for step_id, future in futures.items():
+                    try:
+                        future.result()
+                    except CloneError as error:
+                        failed[step_id] = str(error)
+                if failed:
+                    raise CloneError(f"Clone steps failed {failed}, resume with "
+                                     f"--resume {self.journal.path}")
+        new_tp = self.journal.result("create_tp")
+        cloned = [(self.journal.result(step["id"]), step["te"])
+                  for step in self.journal.plan["steps"] if step["id"].startswith("create_te:")
+                  and step["te"] not in self.journal.plan["skip_tes"]]
+        return new_tp, cloned
@@ -25,14 +25,13 @@ import sys
 import argparse
 import csv
 from datetime import datetime
-from jira_api import JiraTask
-from multiprocessing import Process, Manager
+
+from clone_engine import CloneError, CloneEngine
+from jira_api import get_username_password
 
 # cloned test plan csv name
 CLONED_TP_CSV = 'cloned_tp_info.csv'
 
-jira_task = JiraTask()
-
 # te's to skip for ova
 ova_skip_tes = ['TEST-21365', 'TEST-21133', 'TEST-19721', 'TEST-19720', 'TEST-19719', 'TEST-19717',
                 'TEST-19716', 'TEST-19709', 'TEST-19708', 'TEST-19707', 'TEST-19704', 'TEST-19701']
@@ -40,37 +39,9 @@ ova_skip_tes = ['TEST-21365', 'TEST-21133', 'TEST-19721', 'TEST-19720', 'TEST-19
 vm_hw_skip_tes = ['TEST-19713']
 
 
-def process_te(te, tp_info, skip_tes, new_tp_key, new_skipped_te, new_te_keys, old_tes,
-               product_family):
-    """
-    Process existing te and create new te
-    """
-    # create new te
-    jt = JiraTask()
-    new_te_id, is_te_skipped, test_list = jt.create_new_test_exe(te, tp_info, skip_tes,
-                                                                 product_family)
-    if new_te_id != '':
-        print("New TE created, now add tests to te and tp")
-        response = jt.add_tests_to_te_tp(new_te_id, new_tp_key, tp_info, test_list)
-        if response:
-            print("Tests added to TE {} and TP {}".format(new_te_id, new_tp_key))
-            new_te_keys.append(new_te_id)
-            old_tes.append(te)
-            if is_te_skipped:
-                new_skipped_te.append(new_te_id)
-            response_add = jt.add_te_to_tp([new_te_id], new_tp_key)
-            if response_add:
-                print("TEs are added to TP")
-            else:
-                print("Error while adding TEs to TP")
-        else:
-            print("Error while adding tests to TE {} and TP {}".format(new_te_id, new_tp_key))
-
-
-# pylint: disable-msg=too-many-branches
-def main(args):
+def plan_clone(cloner, args):
     """
-    main function to clone test plan
+    Plan clone of test plan into cloner journal
     """
     test_plan = args.test_plan
 
@@ -88,72 +59,48 @@ def main(args):
     tp_info['core_category'] = args.core_category
     tp_info['tp_labels'] = args.tp_labels
 
-    new_tp_key, env_field = jira_task.create_new_test_plan(test_plan, tp_info)
-    if new_tp_key == '':
-        sys.exit('New test plan creation failed')
-    else:
-        print("New test plan {} created".format(new_tp_key))
-        tp_info['env'] = env_field
-
-    test_executions = jira_task.get_test_executions_from_test_plan(test_plan)
+    test_executions = cloner.get(f"rest/raven/1.0/api/testplan/{test_plan}/testexecution")
     te_keys_all = [te["key"] for te in test_executions]
-    platform = args.platform
-    if platform.lower() == 'ova':
-        te_keys = [te for te in te_keys_all if te not in ova_skip_tes]
+    if args.platform.lower() == 'ova':
+        skip = set(ova_skip_tes)
         tp_info['platform'] = 'VM'
     else:
-        te_keys = [te for te in te_keys_all if te not in vm_hw_skip_tes]
-
+        skip = set(vm_hw_skip_tes)
     if args.skip_te_clone:
-        te_keys = [te for te in te_keys if te not in args.skip_te_clone]
+        skip.update(args.skip_te_clone)
+    te_keys = [te for te in te_keys_all if te not in skip]
 
-    if args.tes_to_clone:
-        if args.tes_to_clone[0] != "optional":
-            new_te_keys = [te for te in te_keys if te in args.tes_to_clone]
-            te_keys = new_te_keys
+    if args.tes_to_clone and args.tes_to_clone[0] != "optional":
+        tes_to_clone = set(args.tes_to_clone)
+        te_keys = [te for te in te_keys if te in tes_to_clone]
 
     print("test executions of existing test plan {}".format(te_keys))
+    skip_tes = [ele.strip() for ele in args.skip_te] if args.skip_te else []
+    steps = cloner.plan(test_plan, tp_info, te_keys, skip_tes, args.comment_jira)
+    print("Planned {} clone steps in journal {}".format(len(steps), cloner.journal.path))
+
 
-    skip_tes = []
-
-    if args.skip_te:
-        try:
-            skip_te_arg = args.skip_te
-            skip_tes = [ele.strip() for ele in skip_te_arg]
-        except Exception as e:
-            print(f"Exception {e} in getting processing skip tes")
-
-    prcs = []
-    with Manager() as manager:
-        new_skipped_te = manager.list()
-        new_te_keys = manager.list()
-        old_tes = manager.list()
-        for te in te_keys:
-            p = Process(target=process_te, args=(te, tp_info, skip_tes, new_tp_key,
-                                                 new_skipped_te, new_te_keys, old_tes,
-                                                 args.product_family))
-            p.start()
-            prcs.append(p)
-
-        for prc in prcs:
-            prc.join()
-
-        new_skipped_te = list(new_skipped_te)
-        new_te_keys = list(new_te_keys)
-        old_tes = list(old_tes)
-        print("New Test Plan: {}".format(new_tp_key))
-        with open(os.path.join(os.getcwd(), CLONED_TP_CSV), 'w', newline='') as tp_info_csv:
-            writer = csv.writer(tp_info_csv)
-            for i, te in enumerate(new_te_keys):
-                old_te = old_tes[i]
-                if te not in new_skipped_te:
-                    writer.writerow([new_tp_key.strip(), te.strip(), old_te.strip()])
-
-        if args.comment_jira:
-            current_time_ms = datetime.utcnow().strftime('%Y-%m-%d_%H:%M:%S.%f')
-            comment = ' Build: {}, Setup: {}, Test Plan: {}, Test Executions: {} created on {}'. \
-                format(args.build, args.setup_type, new_tp_key, new_te_keys, current_time_ms)
-            jira_task.add_comment(args.comment_jira, comment)
+def main(args):
+    """
+    main function to clone test plan
+    """
+    if args.resume:
+        journal = args.resume
+    else:
+        journal = args.journal or os.path.join(os.getcwd(), "clone_{}_{}.journal".format(
+            args.test_plan, datetime.utcnow().strftime('%Y%m%d%H%M%S')))
+    cloner = CloneEngine(journal, get_username_password(), max_workers=args.max_workers)
+    try:
+        if not args.resume:
+            plan_clone(cloner, args)
+        new_tp_key, cloned = cloner.run()
+    except CloneError as error:
+        sys.exit(str(error))
+    print("New Test Plan: {}".format(new_tp_key))
+    with open(os.path.join(os.getcwd(), CLONED_TP_CSV), 'w', newline='') as tp_info_csv:
+        writer = csv.writer(tp_info_csv)
+        for new_te, old_te in cloned:
+            writer.writerow([new_tp_key.strip(), new_te.strip(), old_te.strip()])
 
 
 def parse_args():
@@ -162,13 +109,13 @@ def parse_args():
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("-tp", "--test_plan", type=str,
-                        help="jira xray test plan id", required=True)
+                        help="jira xray test plan id, required unless resuming")
     parser.add_argument("-b", "--build", type=str,
-                        help="Build number", required=True)
+                        help="Build number")
     parser.add_argument("-br", "--build_branch", type=str, default='stable',
-                        help="Build branch (stable/main)", required=True)
+                        help="Build branch (stable/main)")
     parser.add_argument("-s", "--setup_type", type=str, default='default',
-                        help="Setup type (default/nearfull/isolated)", required=True)
+                        help="Setup type (default/nearfull/isolated)")
     parser.add_argument("-c", "--comment_jira", type=str,
                         help="Test id where comments to be added")
     parser.add_argument("-st", "--skip_te", nargs='+', type=str,
@@ -176,11 +123,11 @@ def parse_args():
     parser.add_argument("-p", "--platform", type=str, default='VM_HW',
                         help="For which environment test plan needs to be created: VM/HW/OVA")
     parser.add_argument("-n", "--nodes", type=str,
-                        help="Number of nodes in target: 1/3/N", default='', required=True)
+                        help="Number of nodes in target: 1/3/N", default='')
     parser.add_argument("-sr", "--server_type", type=str,
-                        help="Server type: HPC/DELL/SMC", required=True)
+                        help="Server type: HPC/DELL/SMC")
     parser.add_argument("-e", "--enclosure_type", type=str, default='5U84',
-                        help="Enclosure type: 5U84/PODS/JBOD", required=True)
+                        help="Enclosure type: 5U84/PODS/JBOD")
     parser.add_argument("-a", "--affect_version", type=str, default='LR-R2',
                         help="Affects Versions: LR-R2 or LR1.0 or LR1.0.1​")
     parser.add_argument("-f", "--fix_version", type=str, default='LR-R2',
@@ -194,7 +141,19 @@ def parse_args():
                         help="Space separated labels for test plan")
     parser.add_argument("-cc", "--core_category", type=str, default='NA',
                         help="gold/silver")
-    return parser.parse_args()
+    parser.add_argument("-j", "--journal", type=str,
+                        help="Clone journal file, default clone_<tp>_<time>.journal")
+    parser.add_argument("-r", "--resume", type=str,
+                        help="Resume interrupted clone from journal file")
+    parser.add_argument("-w", "--max_workers", type=int, default=8,
+                        help="Concurrent JIRA requests")
+    args = parser.parse_args()
+    if not args.resume:
+        missing = [opt for opt in ["test_plan", "build", "server_type"]
+                   if getattr(args, opt) is None]
+        if missing:
+            parser.error("the following arguments are required: {}".format(missing))
+    return args
 
 
 if __name__ == '__main__':
@@ -29,7 +29,22 @@ import requests
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
+from clone_engine import SEARCH_PAGE_SIZE, VALIDATION_FIELDS, backoff_delay, is_valid_test
+
 DEFAULT_TIMEOUT = 180  # seconds
+RETRIES = 5
+MAX_RETRY_DELAY = 60  # seconds
+
+
+def get_username_password():
+    """Get username and password from JIRA."""
+    try:
+        username = os.environ["JIRA_ID"]
+        password = os.environ["JIRA_PASSWORD"]
+    except KeyError:
+        username = input("JIRA username: ")
+        password = getpass.getpass("JIRA password: ")
+    return username, password
 
 
 class TimeoutHTTPAdapter(HTTPAdapter):
@@ -60,12 +75,7 @@ class JiraTask:
     """
 
     def __init__(self):
-        try:
-            self.jira_id = os.environ["JIRA_ID"]
-            self.jira_password = os.environ["JIRA_PASSWORD"]
-        except KeyError:
-            self.jira_id = input("JIRA username: ")
-            self.jira_password = getpass.getpass("JIRA password: ")
+        self.jira_id, self.jira_password = get_username_password()
 
         self.jira_url = "https://jts.seagate.com/"
         self.options = {'server': self.jira_url}
@@ -89,55 +99,19 @@ class JiraTask:
     def check_test_environment_platform(self, tests, tp_info):
         """
         Check environment, core category and platform of test case and test plan.
-        If it matches then add test to test plan.
+        If it matches then add test to test plan. Fields of all tests are fetched with
+        bulk JQL searches.
         """
         valid_tests = []
-        tp_env = tp_info['env']
-        tp_platform = tp_info['platform']
-        num_nodes = tp_info['nodes']
-        core_category = tp_info['core_category']
+        fields = {}
+        for i in range(0, len(tests), SEARCH_PAGE_SIZE):
+            jql = "key in ({})".format(",".join(tests[i:i + SEARCH_PAGE_SIZE]))
+            result = self.auth_jira.search_issues(jql, fields=VALIDATION_FIELDS,
+                                                  maxResults=False, json_result=True)
+            for issue in result["issues"]:
+                fields[issue["key"]] = issue["fields"]
         for test_id in tests:
-            is_valid_platform = False
-            is_valid_env = False
-            is_valid_category = False
-            details = self.get_issue_details(test_id)
-            if details:
-                tp_platform = tp_platform.lower()
-                if ('vm' in tp_platform) and ('hw' in tp_platform):
-                    is_valid_platform = True
-                else:
-                    platform_field = details.fields.customfield_22982
-                    if platform_field:
-                        platform_field = platform_field[0].lower()
-                        if tp_platform.strip() in platform_field.strip():
-                            is_valid_platform = True
-                    else:
-                        is_valid_platform = True
-                env_field = details.fields.environment
-                if num_nodes == '':
-                    is_valid_env = True
-                else:
-                    if env_field:
-                        env_field = env_field.lower()
-                        tp_env = tp_env.lower()
-                        if env_field.strip() == "multinode":
-                            is_valid_env = True
-                        elif env_field.strip() == "1node" and num_nodes == 1:
-                            is_valid_env = True
-                        elif tp_env.strip() == env_field.strip():
-                            is_valid_env = True
-                    else:
-                        is_valid_env = True
-                if core_category == 'NA':
-                    is_valid_category = True
-                else:
-                    if details.fields.customfield_21085:
-                        test_category = details.fields.customfield_21085.value
-                        if core_category.lower().strip() in test_category.lower():
-                            is_valid_category = True
-                    else:
-                        is_valid_category = True
-            if is_valid_platform and is_valid_env and is_valid_category:
+            if test_id in fields and is_valid_test(fields[test_id], tp_info):
                 valid_tests.append(test_id)
             else:
                 print("{} is not valid for this test plan".format(test_id))
@@ -276,8 +250,7 @@ class JiraTask:
         """
         create the issue based on dict provided
         """
-        retries_cnt = 5
-        incremental_timeout_sec = 60
+        retries_cnt = RETRIES
         retry_attempt = 0
         new_issue_created = ''
         while retries_cnt:
@@ -287,8 +260,8 @@ class JiraTask:
             except Exception as e:
                 print(e)
                 retries_cnt = retries_cnt - 1
+                time.sleep(backoff_delay(retry_attempt, max_delay=MAX_RETRY_DELAY))
                 retry_attempt = retry_attempt + 1
-                time.sleep(incremental_timeout_sec * retry_attempt)
             else:
                 print("Issue created Successfully {}".format(new_issue))
                 return new_issue_created
@@ -469,8 +442,7 @@ class JiraTask:
                     },
             }
         """
-        retries_cnt = 5
-        incremental_timeout_sec = 60
+        retries_cnt = RETRIES
         retry_attempt = 0
         issue_details = ''
         while retries_cnt:
@@ -487,8 +459,8 @@ class JiraTask:
             except Exception as e:
                 print(e)
                 retries_cnt = retries_cnt - 1
+                time.sleep(backoff_delay(retry_attempt, max_delay=MAX_RETRY_DELAY))
                 retry_attempt = retry_attempt + 1
-                time.sleep(incremental_timeout_sec * retry_attempt)
             else:
                 return issue_details
         return issue_details
@@ -497,8 +469,7 @@ class JiraTask:
         """
         Add comment to test jira
         """
-        retries_cnt = 5
-        incremental_timeout_sec = 60
+        retries_cnt = RETRIES
         retry_attempt = 0
         comment_added = False
         while (not comment_added) and retries_cnt:
@@ -507,8 +478,8 @@ class JiraTask:
             except Exception as e:
                 print(e)
                 retries_cnt = retries_cnt - 1
+                time.sleep(backoff_delay(retry_attempt, max_delay=MAX_RETRY_DELAY))
                 retry_attempt = retry_attempt + 1
-                time.sleep(incremental_timeout_sec * retry_attempt)
             else:
                 print("Comment Added to jira {}".format(test_id))
                 comment_added = True
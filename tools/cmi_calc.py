@@ -21,12 +21,14 @@
 import argparse
 import configparser
 import json
+import os
+import re
 import sys
+from collections import Counter
 from collections import defaultdict
 from http import HTTPStatus
 
 import requests
-from jira import JIRA
 
 from report import jira_api
 
@@ -56,6 +58,13 @@ features_weights = {
     "Scalability": 10,
 }
 
+JIRA_URL = "https://jts.seagate.com/"
+TEST_DOMAIN_FIELD = "customfield_21087"
+SCORED_STATUS = ["PASS", "BLOCKED", "ABORTED"]
+SEARCH_PAGE_SIZE = 1000
+DEFECT_BATCH_SIZE = 100
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cortx-test", "cmi")
+
 bug_priority_weights = {
     "Blocker": 5,
     "Critical": 4,
@@ -65,81 +74,132 @@ bug_priority_weights = {
 }
 
 
-def get_selective_tests_for_feature(tp_id: str, feature: str, status: str, username: str,
-                                    password: str):
-    """Search tests in given test plan, feature and test status"""
-    jira_url = "https://jts.seagate.com/"
-    options = {'server': jira_url}
-    jira = JIRA(options, basic_auth=(username, password))
-    if status:
-        query = f'issue in testPlanTests(\'{tp_id}\',\'{status}\') AND "Test Domain" = "{feature}"'
-    else:
-        query = f'issue in testPlanTests(\'{tp_id}\') AND "Test Domain" = "{feature}"'
-    issues = jira.search_issues(query, maxResults=300)
-    return issues
+def search_issues(session, jql: str, fields: list) -> list:
+    """Return all issues matching JQL with given fields, SEARCH_PAGE_SIZE issues per request"""
+    issues = []
+    while True:
+        body = {"jql": jql, "startAt": len(issues), "maxResults": SEARCH_PAGE_SIZE,
+                "fields": fields}
+        response = session.post(f"{JIRA_URL}rest/api/2/search", json=body)
+        if response.status_code != HTTPStatus.OK:
+            print(f'Search for {jql} failed')
+            print(f'RESPONSE={response.text}')
+            sys.exit(1)
+        result = response.json()
+        issues.extend(result["issues"])
+        if not result["issues"] or len(issues) >= result["total"]:
+            return issues
+
 
+def get_raven_list(session, path: str, params: dict = None) -> list:
+    """GET Xray list, paged if params has limit"""
+    results = []
+    while True:
+        response = session.get(f"{JIRA_URL}rest/raven/1.0/api/{path}", params=params)
+        if response.status_code != HTTPStatus.OK:
+            print(f'GET on {path} failed')
+            print(f'RESPONSE={response.text}')
+            sys.exit(1)
+        results.extend(response.json())
+        if not params or len(response.json()) < params["limit"]:
+            return results
+        params = dict(params, page=params["page"] + 1)
 
-def get_failed_tests_details(tp_id: str, username: str, password: str):
-    """Return all failed tests with/without mapped Bug ID"""
-    test_executions = jira_api.get_test_executions_from_test_plan(tp_id, username, password)
+
+def get_failed_tests_details(tp_id: str, session) -> list:
+    """Return all failed tests with/without mapped Bug ID from test executions of test plan"""
     tests = []
-    for test_execution in test_executions:
-        tests.extend(jira_api.get_test_from_test_execution(test_execution["key"],
-                                                           username, password))
-    tests = [test for test in tests if test["status"] == "FAIL"]
-    return tests
-
-
-def get_bug_priority_count(total_failed_tests, feature_tests, username, password) -> defaultdict:
-    """Return count of Blocker/Critical/Major.. and not mapped failures in given feature"""
-    feature_tests = [str(test) for test in feature_tests]
-    count = defaultdict(int)
-    count["Unmapped"] = 0
-    for failed_test in total_failed_tests:
-        if failed_test["key"] in feature_tests and "defects" not in failed_test:
-            count["unmapped"] += 1
-        elif failed_test["key"] in feature_tests and "defects" in failed_test:
-            defects = [jira_api.get_issue_details(defect["key"], username, password)
-                       for defect in failed_test["defects"]]
-            for defect in defects:
-                count[defect.fields.priority.name] += 1
-    return count
-
-
-def calculate_cmi(tp_id: str, username, password) -> float:
+    for test_execution in get_raven_list(session, f"testplan/{tp_id}/testexecution"):
+        tests.extend(get_raven_list(session, f"testexec/{test_execution['key']}/test",
+                                    {'detailed': "true", 'limit': 100, 'page': 1}))
+    return [test for test in tests if test["status"] == "FAIL"]
+
+
+def fetch_test_plan_data(tp_id: str, session) -> dict:
+    """
+    Fetch everything CMI needs with bulk searches
+
+    Returns:
+        {"features": {test key: Test Domain}, "status": {status: [test keys]},
+         "failed": [{"key": test key, "defects": [defect keys]}],
+         "priorities": {defect key: priority}}
     """
-    Summary: Calculate CMI for given test plan ID
+    features = {}
+    for issue in search_issues(session, f"issue in testPlanTests('{tp_id}')",
+                               [TEST_DOMAIN_FIELD]):
+        domain = issue["fields"].get(TEST_DOMAIN_FIELD)
+        features[issue["key"]] = domain["value"] if domain else None
+    status = {}
+    for test_status in SCORED_STATUS:
+        status[test_status] = [issue["key"] for issue in search_issues(
+            session, f"issue in testPlanTests('{tp_id}','{test_status}')", ["key"])]
+    failed = []
+    for test in get_failed_tests_details(tp_id, session):
+        failed_test = {"key": test["key"]}
+        if "defects" in test:
+            failed_test["defects"] = [defect["key"] for defect in test["defects"]]
+        failed.append(failed_test)
+    defects = sorted({defect for test in failed for defect in test.get("defects", [])})
+    priorities = {}
+    for i in range(0, len(defects), DEFECT_BATCH_SIZE):
+        batch = defects[i:i + DEFECT_BATCH_SIZE]
+        for issue in search_issues(session, f"key in ({','.join(batch)})", ["priority"]):
+            priority = issue["fields"].get("priority")
+            priorities[issue["key"]] = priority["name"] if priority else None
+    return {"features": features, "status": status, "failed": failed,
+            "priorities": priorities}
+
+
+def load_test_plan_data(tp_id: str, updated: str, session, cache_dir: str = CACHE_DIR,
+                        refresh: bool = False) -> dict:
+    """Return test plan data from disk cache keyed by test plan and its updated time"""
+    cache_file = os.path.join(cache_dir, f"{tp_id}_{re.sub(r'[^0-9A-Za-z]', '_', updated)}.json")
+    if not refresh and os.path.exists(cache_file):
+        with open(cache_file) as cache:
+            return json.load(cache)
+    plan_data = fetch_test_plan_data(tp_id, session)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file, "w") as cache:
+        json.dump(plan_data, cache)
+    return plan_data
+
+
+def get_bug_priority_count(plan_data: dict) -> dict:
+    """Return count of Blocker/Critical/Major.. of failed tests per feature"""
+    counts = defaultdict(Counter)
+    for failed_test in plan_data["failed"]:
+        feature = plan_data["features"].get(failed_test["key"])
+        # Failures without mapped defect do not add to the weighted failures
+        for defect in failed_test.get("defects", []):
+            counts[feature][plan_data["priorities"].get(defect)] += 1
+    return counts
+
+
+def calculate_cmi(plan_data: dict) -> float:
+    """
+    Summary: Calculate CMI for given test plan data, see fetch_test_plan_data
 
     Description:
         features_cmi = Σ over feature [
             (feature_weight/total_tests_in_feature) *
             (pass_tests - failed_tests - blocked_tests - aborted_tests)
         ]
-        where, failed_tests = fail_tests_without_bugs +
-                             Σ over bug_priority ( bug_priority_weight * fail_test_with_priority)
+        where, failed_tests = Σ over bug_priority ( bug_priority_weight * fail_test_with_priority)
     """
-    # Total failed test for given build
-    total_failed_tests = get_failed_tests_details(tp_id, username, password)
+    features = plan_data["features"]
+    total_tests = Counter(features.values())
+    status_tests = {status: Counter(features.get(key) for key in keys)
+                    for status, keys in plan_data["status"].items()}
+    priority_count = get_bug_priority_count(plan_data)
     features_cmi = 0
     for feature, feature_weight in features_weights.items():
-        total_tests = get_selective_tests_for_feature(tp_id, feature, "", username, password)
-        pass_tests = get_selective_tests_for_feature(tp_id, feature, "PASS", username, password)
-        blocked_tests = get_selective_tests_for_feature(tp_id, feature, "BLOCKED", username,
-                                                        password)
-        aborted_tests = get_selective_tests_for_feature(tp_id, feature, "ABORTED", username,
-                                                        password)
-        count = get_bug_priority_count(total_failed_tests, total_tests, username, password)
-        scaled_failures = + (
-                count["Blocker"] * bug_priority_weights["Blocker"] +
-                count["Critical"] * bug_priority_weights["Critical"] +
-                count["Major"] * bug_priority_weights["Major"] +
-                count["Minor"] * bug_priority_weights["Minor"] +
-                count["Trivial"] * bug_priority_weights["Trivial"]
-        )
-        failed_tests = count["Unmapped"] + scaled_failures
-        scaled_tests = len(pass_tests) - failed_tests - len(blocked_tests) - len(aborted_tests)
-        if total_tests:
-            features_cmi += (feature_weight / len(total_tests)) * scaled_tests
+        if not total_tests[feature]:
+            continue
+        failed_tests = sum(count * bug_priority_weights.get(priority, 0)
+                           for priority, count in priority_count[feature].items())
+        scaled_tests = status_tests["PASS"][feature] - failed_tests - \
+            status_tests["BLOCKED"][feature] - status_tests["ABORTED"][feature]
+        features_cmi += (feature_weight / total_tests[feature]) * scaled_tests
     return features_cmi
 
 
@@ -173,17 +233,25 @@ def main():
     """Calculate CMI for given build."""
     parser = argparse.ArgumentParser()
     parser.add_argument('tp', help='Testplan for current build')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore cached test plan data')
 
     test_plans = parser.parse_args()
     tp_id = test_plans.tp
-    username, password = jira_api.get_username_password()
-    test_plan = jira_api.get_issue_details(tp_id, username, password)
-    test_plan_label = test_plan.fields.labels[0]
-    if "_" in test_plan.fields.environment:
-        build_type = test_plan.fields.environment.split("_")[0]
-        build_no = test_plan.fields.environment.split("_")[1]
+    session = requests.Session()
+    session.auth = jira_api.get_username_password()
+    response = session.get(f"{JIRA_URL}rest/api/2/issue/{tp_id}",
+                           params={"fields": "labels,environment,updated"})
+    if response.status_code != HTTPStatus.OK:
+        print(f'GET on test plan {tp_id} failed')
+        sys.exit(1)
+    fields = response.json()["fields"]
+    test_plan_label = fields["labels"][0]
+    if "_" in fields["environment"]:
+        build_type = fields["environment"].split("_")[0]
+        build_no = fields["environment"].split("_")[1]
     else:
-        build_no = test_plan.fields.environment
+        build_no = fields["environment"]
         build_type = ""
     if not all((test_plan_label, build_no)):
         print(f"Test Plan Label: {test_plan_label}, "
@@ -191,7 +259,9 @@ def main():
               f"Test Plan Label/Environment is empty for this test plan")
     deploy = 1
     box_index = 1
-    raw_cmi = calculate_cmi(tp_id, username, password)
+    plan_data = load_test_plan_data(tp_id, fields["updated"], session,
+                                    refresh=test_plans.refresh)
+    raw_cmi = calculate_cmi(plan_data)
     scaled_cmi = raw_cmi * 100 / sum(features_weights.values())
     cmi = deploy * box_index * scaled_cmi
     save_cmi_in_database(cmi, test_plan_label, build_type, build_no)
@@ -18,19 +18,7 @@
 # For any questions about this software or licensing,
 # please email opensource@seagate.com or cortx-questions@seagate.com.
 
-# Basic algorithm
-# for each TE:
-#     for each Test in TE:
-#         if test status is TODO
-#             Continue
-#         result = Search DB by ('buildNo', 'testExecutionID', 'testID', 'valid': True)
-#         if no entries in DB :
-#             Create one entry in DB
-#         else :
-#             Patch all present entries to add valid key as false
-#             Insert new entry with latest data from JIRA
-#         if test status if FAIL:
-#             Get bug from JIRA an update in DB
+# Test executions are synced incrementally by te_sync.TestExecutionSync, see algorithm there.
 
 import argparse
 import configparser
@@ -42,6 +30,7 @@ from http import HTTPStatus
 
 import requests
 
+import te_sync
 from report import jira_api
 
 headers = {
@@ -76,75 +65,6 @@ except KeyError:
     sys.exit(1)
 
 
-def patch_db_request(payload: dict) -> None:
-    """
-    Description: Make a patch request to database using REST API
-
-    Args:
-        payload (dict): Payload data
-    """
-    request = "PATCH"
-    endpoint = "update"
-
-    payload["db_username"] = DB_USERNAME
-    payload["db_password"] = DB_PASSWORD
-
-    response = requests.request(request, HOSTNAME + endpoint, headers=headers,
-                                data=json.dumps(payload))
-    if response.status_code != HTTPStatus.OK:
-        logger.error('%s on %s failed\nHEADERS=%s\nBODY=%s\nRESPONSE=%s', request, HOSTNAME +
-                     endpoint, response.request.headers, response.request.body, response.text)
-        sys.exit(1)
-
-
-def create_db_request(payload: dict) -> None:
-    """
-    Description: Make a create request to database using REST API
-
-    Args:
-        payload (dict): Payload data
-    """
-    request = "POST"
-    endpoint = "create"
-
-    payload["db_username"] = DB_USERNAME
-    payload["db_password"] = DB_PASSWORD
-
-    response = requests.request(request, HOSTNAME + endpoint, headers=headers,
-                                data=json.dumps(payload))
-    if response.status_code != HTTPStatus.OK:
-        logger.error('%s on %s failed\nHEADERS=%s\nBODY=%s\nRESPONSE=%s', request, HOSTNAME +
-                     endpoint, response.request.headers, response.request.body, response.text)
-        sys.exit(1)
-
-
-def search_db_request(payload: dict):
-    """
-    Description: Make a search request to database using REST API
-
-    Args:
-        payload (dict): Payload data
-
-    Returns:
-        Search result
-    """
-    request = "GET"
-    endpoint = "search"
-
-    payload["db_username"] = DB_USERNAME
-    payload["db_password"] = DB_PASSWORD
-
-    response = requests.request(request, HOSTNAME + endpoint, headers=headers,
-                                data=json.dumps(payload))
-    if response.status_code == HTTPStatus.OK:
-        return response.json()["result"]
-    if response.status_code == HTTPStatus.NOT_FOUND and "No results" in response.text:
-        return None
-    logger.error('%s on %s failed\nHEADERS=%s\nBODY=%s\nRESPONSE=%s', request, HOSTNAME +
-                 endpoint, response.request.headers, response.request.body, response.text)
-    sys.exit(1)
-
-
 def get_latest_test_plans_from_db() -> list:
     """Get latest 5 test plans from DB"""
     endpoint = "aggregate"
@@ -172,6 +92,8 @@ def parse_argument():
                     "\nFor syncing latest 5 test plans, no options are needed",
         formatter_class=RawDescriptionHelpFormatter
     )
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore last sync state and compare every test with DB')
     subparsers = parser.add_subparsers(dest='subcommand')
 
     # sub-parser for only
@@ -181,184 +103,26 @@ def parse_argument():
     args = parser.parse_args()
     if args.subcommand:
         logger.info("Will sync %s test plan from JIRA to DB", args.tp)
-        return [args.tp]
+        return [args.tp], args.full
     logger.info("No options passed. Will sync last 5 test plans.")
-    return None
+    return None, args.full
 
 
-# pylint: disable-msg=too-many-locals
-# pylint: disable-msg=too-many-nested-blocks
-# pylint: disable-msg=too-many-statements
-# pylint: disable-msg=too-many-branches
 def main():
     """Update test executions from JIRA to MongoDB."""
-    args = parse_argument()
-    if args:
-        tp_keys = args
-    else:
+    tp_keys, full = parse_argument()
+    if not tp_keys:
         tp_keys = get_latest_test_plans_from_db()
 
+    jira_auth = jira_api.get_username_password()
+    sync = te_sync.TestExecutionSync(jira_auth, HOSTNAME, DB_USERNAME, DB_PASSWORD)
     for tp_key in tp_keys:
-        logger.info("JIRA DB Sync for Test Plan ID = %s", tp_key)
-        username, password = jira_api.get_username_password()
-        tp_details = jira_api.get_details_from_test_plan(tp_key, username, password)
-        test_executions = jira_api.get_test_executions_from_test_plan(tp_key,
-                                                                      username, password)
-        test_plan_issue = jira_api.get_issue_details(tp_key, username, password)
-        test_plan_label = test_plan_issue.fields.labels[0] if \
-            test_plan_issue.fields.labels else "None"
-
-        # for each TE:
-        for test_execution in test_executions:
-            logger.info("-Test Execution %s", test_execution["key"])
-            test_execution_issue = jira_api.get_issue_details(test_execution["key"],
-                                                              username, password)
-            test_execution_label = test_execution_issue.fields.labels[0] if \
-                test_execution_issue.fields.labels else "None"
-            test_team = test_execution_issue.fields.components[0].name if \
-                test_execution_issue.fields.components else "CortxQA"
-
-            tests = jira_api.get_test_from_test_execution(test_execution["key"],
-                                                          username, password)
-            # for each Test in TE:
-            for test in tests:
-                logger.info("-Test Key %s", test["key"])
-                if test["status"] == "TODO":
-                    continue
-                query_payload = {
-                    "query": {
-                        "buildNo": tp_details["buildNo"],
-                        "testExecutionID": test_execution["key"],
-                        "testID": test["key"],
-                        "latest": True
-                    },
-                }
-
-                test_issue = jira_api.get_issue_details(test["key"], username, password)
-                feature = test_issue.fields.customfield_21087.value if \
-                    test_issue.fields.customfield_21087 else "None"
-                feature_id = test_issue.fields.customfield_22881 if \
-                    test_issue.fields.customfield_22881 else ["None"]
-                dr_id = test_issue.fields.customfield_22882 if \
-                    test_issue.fields.customfield_22882 else ["None"]
-                log_path = test["comment"] if "comment" in test else "None"
-
-                results = search_db_request(query_payload)
-
-                if not results:
-                    logger.debug("DB entry does not exist for build %s TE %s Test %s",
-                                 tp_details["buildNo"], test_execution["key"], test["key"])
-                    # add one entry
-                    payload = {
-                        # Framework/Unknown data
-                        "clientHostname": "",
-                        "noOfNodes": 0,
-                        "OSVersion": "",
-                        "nodesHostname": [""],
-                        "testTags": [""],
-                        "testType": "",
-                        "testExecutionTime": 0,
-                        "healthCheckResult": "",
-                        # Data from JIRA
-                        "testStartTime": test["startedOn"],
-                        "logPath": log_path,
-                        "testResult": test["status"],
-                        "platformType": tp_details["platformType"],
-                        "serverType": tp_details["serverType"],
-                        "enclosureType": tp_details["enclosureType"],
-                        "testName": test_issue.fields.summary,
-                        "testID": test["key"],
-                        "testIDLabels": test_issue.fields.labels,
-                        "testPlanID": tp_key,
-                        "testExecutionID": test_execution["key"],
-                        "testPlanLabel": test_plan_label,
-                        "testExecutionLabel": test_execution_label,
-                        "testTeam": test_team,
-                        "buildType": tp_details["branch"],
-                        "buildNo": tp_details["buildNo"],
-                        "executionType": test_issue.fields.customfield_20981.value,
-                        "feature": feature,
-                        "latest": True,
-                        "drID": dr_id,
-                        "featureID": feature_id
-                    }
-                    create_db_request(payload)
-                    logger.debug("Created an entry in DB.")
-                else:
-                    # if test status in db != in JIRA or no entry in db
-                    if results[0]["testResult"].lower() != test["status"].lower():
-                        logger.debug("Test Result from DB & JIRA are not matching for Test %s",
-                                     test["key"])
-                        feature_id = test_issue.fields.customfield_22881 if \
-                            test_issue.fields.customfield_22881 else ["None"]
-                        dr_id = test_issue.fields.customfield_22882 if \
-                            test_issue.fields.customfield_22882 else ["None"]
-                        # Add valid key in entry false
-                        patch_payload = {
-                            "filter": query_payload["query"],
-                            "update": {
-                                "$set": {"latest": False}
-                            }
-                        }
-                        patch_db_request(patch_payload)
-                        logger.debug("Patched old entries with latest false.")
-                        # Insert new entry with latest data from JIRA
-                        payload = {
-                            # Unknown data
-                            "clientHostname": "",
-                            "noOfNodes": 0,
-                            "OSVersion": "",
-                            "nodesHostname": [""],
-                            "testExecutionTime": 0,
-                            "healthCheckResult": "",
-                            # Data from JIRA
-                            "testStartTime": test["startedOn"],
-                            "logPath": log_path,
-                            "testResult": test["status"],
-                            "platformType": tp_details["platformType"],
-                            "serverType": tp_details["serverType"],
-                            "enclosureType": tp_details["enclosureType"],
-                            "drID": dr_id,
-                            "featureID": feature_id,
-                            # Data from previous database entry
-                            "testTags": results[0]["testTags"],
-                            "testType": results[0]["testType"],
-                            "testName": results[0]["testName"],
-                            "testID": results[0]["testID"],
-                            "testIDLabels": results[0]["testIDLabels"],
-                            "testPlanID": results[0]["testPlanID"],
-                            "testExecutionID": results[0]["testExecutionID"],
-                            "testPlanLabel": results[0]["testPlanLabel"],
-                            "testExecutionLabel": results[0]["testExecutionLabel"],
-                            "testTeam": results[0]["testTeam"],
-                            "buildType": results[0]["buildType"],
-                            "buildNo": tp_details["buildNo"],
-                            "executionType": results[0]["executionType"],
-                            "feature": results[0]["feature"],
-                            "latest": True,
-                        }
-                        create_db_request(payload)
-                        logger.debug("Created new entry with results from JIRA.")
-
-                if "fail" in test["status"].lower():
-                    logger.debug("TEST status is FAIL in JIRA.")
-                    # Get BUG ID from JIRA
-                    if len(test["defects"]) == 0:
-                        logger.warning("Failure is not mapped to any BUG in JIRA TEST - %s, Test "
-                                       "Execution - %s, Test Plan = %s",
-                                       test["key"], test_execution["key"], tp_key)
-                    else:
-                        defects = [defect["key"] for defect in test["defects"]]
-                        if defects:
-                            # PATCH issue in db entry
-                            patch_payload = {
-                                "filter": query_payload["query"],
-                                "update": {
-                                    "$set": {"issueIDs": defects}
-                                }
-                            }
-                            patch_db_request(patch_payload)
-                            logger.debug("Added defects linked in JIRA into DB.")
+        try:
+            stats = sync.sync_test_plan(tp_key, full=full)
+        except te_sync.SyncError as error:
+            logger.error("JIRA DB Sync failed for Test Plan ID = %s: %s", tp_key, error)
+            sys.exit(1)
+        logger.info("Test Plan %s synced: %s", tp_key, stats)
 
 
 if __name__ == '__main__':
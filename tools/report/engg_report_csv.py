@@ -20,16 +20,11 @@
 
 import csv
 from collections import defaultdict
-from copy import deepcopy
 
 import common
 import jira_api
 import mongodb_api
-
-OPERATIONS = ["write", "read"]
-STATS = ["Throughput", "Latency", "IOPS"]
-CONFIG = [[1, 100], [10, 100], [50, 100]]
-OBJECTS_SIZES = ["4Kb", "256Kb", "100Kb", "1Mb", "5Mb", "16Mb", "36Mb", "64Mb", "128Mb", "256Mb"]
+from report_data import PerfReportData
 
 
 def get_component_issue_summary_from_testplan(test_plan: str, username: str, password: str) -> dict:
@@ -78,121 +73,19 @@ def get_component_issue_summary(test_plans: list, username: str, password: str):
     return data
 
 
-# pylint: disable-msg=too-many-locals
 def get_single_bucket_perf_stats(build, branch, uri, db_name, db_collection):
     """Get single bucket performance data for engineering report"""
-    row_2 = deepcopy(OBJECTS_SIZES)
-    row_2.insert(0, "Statistics")
-    data = [["Single Bucket Performance Statistics (Average) using S3Bench"], row_2]
-    operations = ["Write", "Read"]
-    stats = ["Throughput", "Latency", "IOPS", "TTFB"]
-    for operation in operations:
-        for stat in stats:
-            if stat in ["Latency", "TTFB"]:
-                temp_data = [f"{operation} {stat} (ms)"]
-            elif stat in ["Throughput"]:
-                temp_data = [f"{operation} {stat} (MBps)"]
-            else:
-                temp_data = [f"{operation} {stat}"]
-            for obj_size in OBJECTS_SIZES:
-                query = {'Branch': branch, 'Build': build, 'Operation': operation,
-                         'Object_Size': obj_size}
-                count = mongodb_api.count_documents(query=query, uri=uri, db_name=db_name,
-                                                    collection=db_collection)
-                db_data = mongodb_api.find_documents(query=query, uri=uri, db_name=db_name,
-                                                     collection=db_collection)
-                if stat in ["Latency", "TTFB"]:
-                    if count > 0 and common.keys_exists(db_data[0], stat, "Avg"):
-                        temp_data.append(common.round_off(db_data[0][stat]["Avg"] * 1000))
-                    else:
-                        temp_data.append("-")
-                else:
-                    if count > 0 and common.keys_exists(db_data[0], stat) \
-                            and "Count_of_Servers" in db_data[0]:
-                        temp_data.append(
-                            common.round_off(db_data[0][stat] / db_data[0]["Count_of_Servers"]))
-                    else:
-                        temp_data.append("-")
-            data.extend([temp_data])
-    return data
-
-
-def get_tool_data(build, db_data, tool):
-    """Get data for given tool."""
-    temp_data = []
-    for configs in CONFIG:
-        row_num = 0
-        for operation in OPERATIONS:
-            for stat in STATS:
-                row_num += 1
-                head = ""
-                if row_num == 2:
-                    head = tool
-                elif row_num == 3:
-                    head = f"{configs[0]} Buckets"
-                elif row_num == 4:
-                    head = f"{configs[1]} Sessions"
-                temp_data = [head, f"{operation.capitalize()} {stat}"]
-                for obj_size in OBJECTS_SIZES:
-                    query = {'Build': build, 'Name': tool, 'Operation': operation,
-                             'Object_Size': obj_size, 'Buckets': configs[0],
-                             'Sessions': configs[1], "Branch": db_data['branch']}
-                    count = mongodb_api.count_documents(query=query, uri=db_data['uri'],
-                                                        db_name=db_data['db_name'],
-                                                        collection=db_data['db_collection'])
-                    db_data = mongodb_api.find_documents(query=query, uri=db_data['uri'],
-                                                         db_name=db_data['db_name'],
-                                                         collection=db_data['db_collection'])
-
-                    if count > 0 and stat == "Throughput" and common.keys_exists(db_data[0],
-                                                                                 stat):
-                        temp_data.append(
-                            common.round_off(db_data[0][stat] / db_data[0]["Count_of_Servers"]))
-                    elif count > 0 and common.keys_exists(db_data[0], stat):
-                        temp_data.append(common.round_off(db_data[0][stat]))
-                    else:
-                        temp_data.append("-")
-    return temp_data
-
-
-def get_bench_data(build, uri, db_name, db_collection, branch):
-    """Read Hsbench data from DB"""
-    data = []
-    db_data = {'uri': uri, 'db_name': db_name, 'db_collection': db_collection, 'branch': branch}
-    for tool in ["Hsbench", "Cosbench"]:
-        data.append(get_tool_data(build, db_data, tool))
-    return data
+    return PerfReportData(uri, db_name, db_collection).single_bucket_perf_stats(build, branch)
 
 
 def get_multiple_bucket_perf_stats(build, branch, uri, db_name, db_collection):
     """Get multiple bucket performance data"""
-    row_2 = deepcopy(OBJECTS_SIZES)
-    row_2.insert(0, "Statistics")
-    row_2.insert(0, "Tool")
-    data = [["Multiple Buckets Performance Statistics (Average) using HSBench and COSBench"],
-            row_2]
-
-    data.extend(get_bench_data(build, uri, db_name, db_collection, branch))
-    return data
+    return PerfReportData(uri, db_name, db_collection).multiple_bucket_perf_stats(build, branch)
 
 
 def get_metadata_latencies(build, uri, db_name, db_collection):
     """Get metadata latency table data."""
-    operations = ["PutObjTag", "GetObjTag", "HeadObj"]
-    heading = ["Add / Edit Object Tags", "Read Object Tags", "Read Object Metadata"]
-    data = [["Metadata Latencies (captured with 1KB object)"],
-            ["Operation Latency (ms)", "Response Time"]]
-    for ops, head in zip(operations, heading):
-        query = {'Name': 'S3bench', 'Build': build, 'Object_Size': '1Kb', 'Operation': ops}
-        count = mongodb_api.count_documents(query=query, uri=uri, db_name=db_name,
-                                            collection=db_collection)
-        db_data = mongodb_api.find_documents(query=query, uri=uri, db_name=db_name,
-                                             collection=db_collection)
-        if count > 0 and common.keys_exists(db_data[0], "Latency", "Avg"):
-            data.append([head, db_data[0]['Latency']['Avg'] * 1000])
-        else:
-            data.append([head, "-"])
-    return data
+    return PerfReportData(uri, db_name, db_collection).metadata_latencies(build)
 
 
 def get_test_ids_from_linked_issues(linked_issues):
@@ -273,6 +166,7 @@ def main():
     data.extend([""])
     data.extend(get_metadata_latencies(builds[0], uri, db_name, db_collection))
     data.extend([""])
+    mongodb_api.close_clients()
     data.extend(common.get_timing_summary(test_plans, builds, rest, db_username, db_password))
     data.extend([""])
     data.extend(get_detailed_reported_bugs(test_plans[0], username, password))
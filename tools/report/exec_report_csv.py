@@ -27,6 +27,7 @@ from jira import JIRA
 import common
 import jira_api
 import mongodb_api
+from report_data import PerfReportData
 
 
 def get_feature_breakdown_summary_table_data(test_plan: str, username: str, password: str):
@@ -96,38 +97,7 @@ def get_code_maturity_data(test_plan: str, test_plan1: str, test_plan2: str,
 
 def get_single_bucket_perf_data(build, uri, db_name, db_collection):
     """Get Single Bucket performance data for executive report"""
-    data = [["Single Bucket Performance Statistics (Average) using S3Bench - in a Nutshell"],
-            ["Statistics", "4 KB Object", "256 MB Object"]]
-    operations = ["Write", "Read"]
-    stats = ["Throughput", "Latency"]
-    objects_sizes = ["4Kb", "256Mb"]
-    for operation in operations:
-        for stat in stats:
-            if stat == "Latency":
-                temp_data = [f"{operation} {stat} (MBps)"]
-            else:
-                temp_data = [f"{operation} {stat} (ms)"]
-            for objects_size in objects_sizes:
-                query = {'Build': build, 'Name': 'S3bench', 'Object_Size': objects_size,
-                         'Operation': operation}
-                count = mongodb_api.count_documents(query=query, uri=uri, db_name=db_name,
-                                                    collection=db_collection)
-                db_data = mongodb_api.find_documents(query=query, uri=uri, db_name=db_name,
-                                                     collection=db_collection)
-                if stat == "Latency":
-                    if count > 0 and common.keys_exists(db_data[0], stat, "Avg"):
-                        temp_data.append(common.round_off(db_data[0][stat]["Avg"] * 1000))
-                    else:
-                        temp_data.append("-")
-                elif stat == "Throughput":
-                    if count > 0 and common.keys_exists(db_data[0], stat):
-                        temp_data.append(common.round_off(db_data[0][stat]))
-                    else:
-                        temp_data.append("-")
-                else:
-                    temp_data.append("-")
-            data.extend([temp_data])
-    return data
+    return PerfReportData(uri, db_name, db_collection).single_bucket_perf_data(build)
 
 
 def main():
@@ -156,6 +126,7 @@ def main():
     data.extend([""])
     data.extend(get_single_bucket_perf_data(builds[0], uri, db_name, db_collection))
     data.extend([""])
+    mongodb_api.close_clients()
     data.extend(common.get_timing_summary(test_plans, builds, rest, db_username, db_password))
     data.extend([""])
     with open(f"Exec_Report_{builds[0]}.csv", "w+", newline='') as csv_file:
@@ -23,6 +23,9 @@ from pymongo import MongoClient
 from pymongo.errors import PyMongoError
 from pymongo.errors import ServerSelectionTimeoutError, OperationFailure
 
+# One pooled client per URI for the whole report run
+_CLIENTS = {}
+
 
 def pymongo_exception(func):
     """Decorator for pymongo exceptions"""
@@ -50,6 +53,27 @@ def pymongo_exception(func):
     return new_func
 
 
+def get_client(uri: str) -> MongoClient:
+    """
+    Return pooled MongoClient for URI, created on first use
+
+    Args:
+        uri: URI of MongoDB database
+
+    Returns:
+        MongoClient shared by all calls with this URI
+    """
+    if uri not in _CLIENTS:
+        _CLIENTS[uri] = MongoClient(uri)
+    return _CLIENTS[uri]
+
+
+def close_clients():
+    """Close all pooled clients"""
+    while _CLIENTS:
+        _CLIENTS.popitem()[1].close()
+
+
 @pymongo_exception
 def count_documents(query: dict,
                     uri: str,
@@ -68,11 +92,8 @@ def count_documents(query: dict,
     Returns:
         On success returns number of documents
     """
-    with MongoClient(uri) as client:
-        pymongo_db = client[db_name]
-        tests = pymongo_db[collection]
-        result = tests.count_documents(query)
-        return result
+    tests = get_client(uri)[db_name][collection]
+    return tests.count_documents(query)
 
 
 @pymongo_exception
@@ -93,8 +114,27 @@ def find_documents(query: dict,
     Returns:
         On success returns documents
     """
-    with MongoClient(uri) as client:
-        pymongo_db = client[db_name]
-        tests = pymongo_db[collection]
-        result = tests.find(query)
-        return result
+    tests = get_client(uri)[db_name][collection]
+    return tests.find(query)
+
+
+@pymongo_exception
+def aggregate(pipeline: list,
+              uri: str,
+              db_name: str,
+              collection: str
+              ) -> list:
+    """
+    Run aggregation pipeline on MongoDB database
+
+    Args:
+        pipeline: Aggregation pipeline stages
+        uri: URI of MongoDB database
+        db_name: Database name
+        collection: Collection name in database
+
+    Returns:
+        On success returns list of result documents
+    """
+    tests = get_client(uri)[db_name][collection]
+    return list(tests.aggregate(pipeline))
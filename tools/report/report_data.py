@@ -0,0 +1,177 @@
+"""Performance report data layer: one aggregation per report table."""
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+# -*- coding: utf-8 -*-
+import common
+import mongodb_api
+
+OBJECTS_SIZES = ["4Kb", "256Kb", "100Kb", "1Mb", "5Mb", "16Mb", "36Mb", "64Mb", "128Mb", "256Mb"]
+BENCH_TOOLS = ["Hsbench", "Cosbench"]
+BENCH_OPERATIONS = ["write", "read"]
+BENCH_STATS = ["Throughput", "Latency", "IOPS"]
+BENCH_CONFIG = [[1, 100], [10, 100], [50, 100]]
+METADATA_OPERATIONS = ["PutObjTag", "GetObjTag", "HeadObj"]
+# Fields read by the report tables, everything else is not transferred
+STAT_FIELDS = ["Throughput", "Latency", "IOPS", "TTFB", "Count_of_Servers"]
+
+
+class PerfReportData:
+    """
+    Fetch report tables from the performance DB.
+
+    Every table is fetched with a single $match/$group aggregation which keeps the first
+    matching document per table cell, same as find_documents(query)[0] per cell did, and is
+    pivoted in memory into the csv/pdf table shape.
+    """
+
+    def __init__(self, uri: str, db_name: str, db_collection: str):
+        self.uri = uri
+        self.db_name = db_name
+        self.db_collection = db_collection
+        self.round_trips = 0
+
+    def first_documents(self, match: dict, keys: list) -> dict:
+        """
+        Return first document matching match for each distinct value of keys
+
+        Args:
+            match: Query for $match stage
+            keys: Fields identifying a table cell
+
+        Returns:
+            {(key1 value, key2 value ...): document}
+        """
+        pipeline = [
+            {"$match": match},
+            {"$project": {field: 1 for field in keys + STAT_FIELDS}},
+            {"$group": {"_id": {key: f"${key}" for key in keys}, "doc": {"$first": "$$ROOT"}}},
+        ]
+        self.round_trips += 1
+        rows = mongodb_api.aggregate(pipeline, uri=self.uri, db_name=self.db_name,
+                                     collection=self.db_collection)
+        return {tuple(row["_id"].get(key) for key in keys): row["doc"] for row in rows}
+
+    @staticmethod
+    def latency_ms(doc, stat="Latency"):
+        """Average latency in ms or '-'."""
+        if doc and common.keys_exists(doc, stat, "Avg"):
+            return common.round_off(doc[stat]["Avg"] * 1000)
+        return "-"
+
+    @staticmethod
+    def per_server(doc, stat):
+        """Stat divided by count of servers or '-'."""
+        if doc and common.keys_exists(doc, stat) and "Count_of_Servers" in doc:
+            return common.round_off(doc[stat] / doc["Count_of_Servers"])
+        return "-"
+
+    def single_bucket_perf_data(self, build):
+        """Single bucket performance table of executive report."""
+        operations = ["Write", "Read"]
+        objects_sizes = ["4Kb", "256Mb"]
+        docs = self.first_documents({"Build": build, "Name": "S3bench",
+                                     "Object_Size": {"$in": objects_sizes},
+                                     "Operation": {"$in": operations}},
+                                    ["Operation", "Object_Size"])
+        data = [["Single Bucket Performance Statistics (Average) using S3Bench - in a Nutshell"],
+                ["Statistics", "4 KB Object", "256 MB Object"]]
+        for operation in operations:
+            for stat in ["Throughput", "Latency"]:
+                if stat == "Latency":
+                    temp_data = [f"{operation} {stat} (MBps)"]
+                else:
+                    temp_data = [f"{operation} {stat} (ms)"]
+                for objects_size in objects_sizes:
+                    doc = docs.get((operation, objects_size))
+                    if stat == "Latency":
+                        temp_data.append(self.latency_ms(doc))
+                    elif doc and common.keys_exists(doc, stat):
+                        temp_data.append(common.round_off(doc[stat]))
+                    else:
+                        temp_data.append("-")
+                data.append(temp_data)
+        return data
+
+    def single_bucket_perf_stats(self, build, branch):
+        """Single bucket performance table of engineering report."""
+        operations = ["Write", "Read"]
+        docs = self.first_documents({"Branch": branch, "Build": build,
+                                     "Operation": {"$in": operations},
+                                     "Object_Size": {"$in": OBJECTS_SIZES}},
+                                    ["Operation", "Object_Size"])
+        data = [["Single Bucket Performance Statistics (Average) using S3Bench"],
+                ["Statistics"] + OBJECTS_SIZES]
+        for operation in operations:
+            for stat in ["Throughput", "Latency", "IOPS", "TTFB"]:
+                if stat in ["Latency", "TTFB"]:
+                    temp_data = [f"{operation} {stat} (ms)"]
+                elif stat in ["Throughput"]:
+                    temp_data = [f"{operation} {stat} (MBps)"]
+                else:
+                    temp_data = [f"{operation} {stat}"]
+                for obj_size in OBJECTS_SIZES:
+                    doc = docs.get((operation, obj_size))
+                    if stat in ["Latency", "TTFB"]:
+                        temp_data.append(self.latency_ms(doc, stat))
+                    else:
+                        temp_data.append(self.per_server(doc, stat))
+                data.append(temp_data)
+        return data
+
+    def multiple_bucket_perf_stats(self, build, branch):
+        """Multiple buckets performance table (tool x buckets x sessions) of engineering report."""
+        keys = ["Name", "Buckets", "Sessions", "Operation", "Object_Size"]
+        docs = self.first_documents(
+            {"Build": build, "Branch": branch, "Name": {"$in": BENCH_TOOLS},
+             "Operation": {"$in": BENCH_OPERATIONS}, "Object_Size": {"$in": OBJECTS_SIZES},
+             "Buckets": {"$in": sorted({cfg[0] for cfg in BENCH_CONFIG})},
+             "Sessions": {"$in": sorted({cfg[1] for cfg in BENCH_CONFIG})}}, keys)
+        data = [["Multiple Buckets Performance Statistics (Average) using HSBench and COSBench"],
+                ["Tool", "Statistics"] + OBJECTS_SIZES]
+        for tool in BENCH_TOOLS:
+            for buckets, sessions in BENCH_CONFIG:
+                heads = ["", tool, f"{buckets} Buckets", f"{sessions} Sessions"]
+                for row_num, (operation, stat) in enumerate(
+                        (op, stat) for op in BENCH_OPERATIONS for stat in BENCH_STATS):
+                    temp_data = [heads[row_num] if row_num < len(heads) else "",
+                                 f"{operation.capitalize()} {stat}"]
+                    for obj_size in OBJECTS_SIZES:
+                        doc = docs.get((tool, buckets, sessions, operation, obj_size))
+                        if stat == "Throughput":
+                            temp_data.append(self.per_server(doc, stat))
+                        elif doc and common.keys_exists(doc, stat):
+                            temp_data.append(common.round_off(doc[stat]))
+                        else:
+                            temp_data.append("-")
+                    data.append(temp_data)
+        return data
+
+    def metadata_latencies(self, build):
+        """Metadata latency table of engineering report."""
+        heading = ["Add / Edit Object Tags", "Read Object Tags", "Read Object Metadata"]
+        docs = self.first_documents({"Name": "S3bench", "Build": build, "Object_Size": "1Kb",
+                                     "Operation": {"$in": METADATA_OPERATIONS}}, ["Operation"])
+        data = [["Metadata Latencies (captured with 1KB object)"],
+                ["Operation Latency (ms)", "Response Time"]]
+        for ops, head in zip(METADATA_OPERATIONS, heading):
+            doc = docs.get((ops,))
+            if doc and common.keys_exists(doc, "Latency", "Avg"):
+                data.append([head, doc["Latency"]["Avg"] * 1000])
+            else:
+                data.append([head, "-"])
+        return data
@@ -19,7 +19,7 @@
 
 from http import HTTPStatus
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 from pymongo.errors import PyMongoError
 from pymongo.errors import ServerSelectionTimeoutError, OperationFailure
 
@@ -188,6 +188,123 @@ def update_document(query: dict,
         return True, result
 
 
+# pylint: disable=too-many-arguments
+@pymongo_exception
+def find_and_modify(query: dict,
+                    data: dict,
+                    uri: str,
+                    db_name: str,
+                    collection: str,
+                    sort: list = None,
+                    upsert: bool = False
+                    ) -> (bool, dict):
+    """
+    Atomically update first document found in query and return it as updated
+
+    Args:
+        query: Query to be searched
+        data: Update to be applied
+        uri: URI of MongoDB database
+        db_name: Database name
+        collection: Collection name in database
+        sort: Order deciding which document is updated when query matches many
+        upsert: Create entry if not present
+
+    Returns:
+        On failure returns http status code and message
+        On success returns updated document, None if no document matched
+    """
+    with MongoClient(uri) as client:
+        pymongo_db = client[db_name]
+        tests = pymongo_db[collection]
+        result = tests.find_one_and_update(query, data, sort=sort, upsert=upsert,
+                                           return_document=ReturnDocument.AFTER)
+        return True, result
+
+
+# pylint: disable=too-many-arguments
+@pymongo_exception
+def find_list(query: dict,
+              projection: dict,
+              uri: str,
+              db_name: str,
+              collection: str,
+              sort: list = None
+              ) -> (bool, list):
+    """
+    Return all search results for query, read before the client is closed
+
+    Args:
+        query: Query to be searched in MongoDB
+        projection: Fields to be returned
+        uri: URI of MongoDB database
+        db_name: Database name
+        collection: Collection name in database
+        sort: Sort order of results
+
+    Returns:
+        On failure returns http status code and message
+        On success returns list of documents
+    """
+    with MongoClient(uri) as client:
+        pymongo_db = client[db_name]
+        tests = pymongo_db[collection]
+        result = list(tests.find(query, projection, sort=sort))
+        return True, result
+
+
+@pymongo_exception
+def delete_documents(query: dict,
+                     uri: str,
+                     db_name: str,
+                     collection: str
+                     ) -> (bool, int):
+    """
+    Delete all documents found in query
+
+    Args:
+        query: Query to be searched
+        uri: URI of MongoDB database
+        db_name: Database name
+        collection: Collection name in database
+
+    Returns:
+        On failure returns http status code and message
+        On success returns number of deleted documents
+    """
+    with MongoClient(uri) as client:
+        pymongo_db = client[db_name]
+        tests = pymongo_db[collection]
+        result = tests.delete_many(query)
+        return True, result.deleted_count
+
+
+@pymongo_exception
+def bulk_write(operations: list,
+               uri: str,
+               db_name: str,
+               collection: str
+               ) -> (bool, str):
+    """
+    Apply insert/update operations in one ordered bulk write
+
+    Args:
+        operations: pymongo write operations (InsertOne, UpdateMany ...)
+        uri: URI of MongoDB database
+        db_name: Database name
+        collection: Collection name in database
+
+    Returns:
+        On failure returns http status code and message
+        On success returns BulkWriteResult
+    """
+    with MongoClient(uri) as client:
+        pymongo_db = client[db_name]
+        tests = pymongo_db[collection]
+        result = tests.bulk_write(operations, ordered=True)
+        return True, result
+
+
 @pymongo_exception
 def distinct_fields(field: str,
                     query: dict,
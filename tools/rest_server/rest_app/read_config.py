@@ -32,6 +32,8 @@ try:
     system_collection = config["MongoDB"]["system_info_collection"]
     timing_collection = config["MongoDB"]["timing_collection"]
     vm_pool_collection = config["MongoDB"]["pool_vm_collection"]
+    vm_pool_queue_collection = config["MongoDB"]["pool_vm_queue_collection"]
+    vm_pool_history_collection = config["MongoDB"]["pool_vm_history_collection"]
 except KeyError:
     print("Could not start REST server. Please verify config.ini file")
     sys.exit(1)
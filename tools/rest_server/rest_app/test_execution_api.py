@@ -22,6 +22,7 @@ from urllib.parse import quote_plus
 
 import flask
 from flask_restx import Resource, Namespace
+from pymongo import InsertOne, UpdateMany
 
 from . import mongodbapi, read_config, validations
 
@@ -206,6 +207,59 @@ class Update(Resource):
         return flask.Response(status=update_result[1][0], response=update_result[1][1])
 
 
+@api.route("/bulk", doc={"description": "Create and update test execution entries in one "
+                                        "request"})
+@api.response(200, "Success")
+@api.response(400, "Bad Request: Missing parameters. Do not retry.")
+@api.response(401, "Unauthorized: Wrong db_username/db_password.")
+@api.response(403, "Forbidden: User does not have permission for operation.")
+@api.response(503, "Service Unavailable: Unable to connect to mongoDB.")
+class Bulk(Resource):
+    """Bulk endpoint"""
+
+    @staticmethod
+    def post():
+        """
+        Create entries as /create does (older latest entries get latest false) and apply
+        updates as /update does, in one ordered bulk write.
+        Body: {"create": [entry, ...], "update": [{"filter": {}, "update": {}}, ...]}
+        """
+        json_data = flask.request.get_json()
+        if not json_data:
+            return flask.Response(status=HTTPStatus.BAD_REQUEST,
+                                  response="Body is empty")
+        if not validations.check_user_pass(json_data):
+            return flask.Response(status=HTTPStatus.BAD_REQUEST,
+                                  response="db_username/db_password missing in request body")
+        validate_result = validations.validate_bulk_request(json_data)
+        if not validate_result[0]:
+            return flask.Response(status=validate_result[1][0],
+                                  response=validate_result[1][1])
+
+        uri = read_config.MONGODB_URI.format(quote_plus(json_data["db_username"]),
+                                             quote_plus(json_data["db_password"]),
+                                             read_config.db_hostname)
+        operations = []
+        for entry in json_data.get("create", []):
+            entry["testStartTime"] = validations.validate_mandatory_db_fields(entry)[1]
+            filter_fields = {each: entry[each] for each in
+                             ["testPlanID", "testExecutionID", "testID"]}
+            filter_fields["latest"] = True
+            operations.append(UpdateMany(filter_fields, {"$set": {"latest": False}}))
+            operations.append(InsertOne(entry))
+        for entry in json_data.get("update", []):
+            operations.append(UpdateMany(entry["filter"], entry["update"]))
+        if not operations:
+            return flask.jsonify({"inserted": 0, "modified": 0})
+
+        bulk_result = mongodbapi.bulk_write(operations, uri, read_config.db_name,
+                                            read_config.results_collection)
+        if bulk_result[0]:
+            return flask.jsonify({"inserted": bulk_result[1].inserted_count,
+                                  "modified": bulk_result[1].modified_count})
+        return flask.Response(status=bulk_result[1][0], response=bulk_result[1][1])
+
+
 @api.route("/distinct", doc={"description": "Get distinct values for given key"})
 @api.response(200, "Success")
 @api.response(400, "Bad Request: Missing parameters. Do not retry.")
@@ -252,6 +252,41 @@ def validate_extra_db_fields(json_data: dict) -> (bool, tuple):
     return True, None
 
 
+def validate_bulk_request(json_data: dict) -> (bool, tuple):
+    """
+    Validate format of fields in bulk request
+
+    Args:
+        json_data: Data from request
+
+    Returns:
+        On failure returns http status code and message
+        On success returns True
+    """
+    for key in ["create", "update"]:
+        if key in json_data and not isinstance(json_data[key], list):
+            return False, (HTTPStatus.BAD_REQUEST, f"{key} should be list")
+    for entry in json_data.get("create", []):
+        if not isinstance(entry, dict):
+            return False, (HTTPStatus.BAD_REQUEST, "create entries should be dictionary")
+        response = check_db_keys(entry)
+        if not response[0]:
+            return False, (HTTPStatus.BAD_REQUEST,
+                           f"Unknown fields given or mandatory fields missing {response[1]}")
+        validate_result = validate_mandatory_db_fields(entry)
+        if not validate_result[0]:
+            return validate_result
+        valid_result = validate_extra_db_fields(entry)
+        if not valid_result[0]:
+            return valid_result
+    for entry in json_data.get("update", []):
+        validate_result = validate_update_request(entry) if isinstance(entry, dict) else \
+            (False, (HTTPStatus.BAD_REQUEST, "update entries should be dictionary"))
+        if not validate_result[0]:
+            return validate_result
+    return True, None
+
+
 def validate_update_request(json_data: dict) -> (bool, tuple):
     """
     Validate format of fields in update request
@@ -312,3 +347,28 @@ def validate_add_cmi_request_fields(json_data: dict):
         if not isinstance(json_data[key], str):
             return False, (HTTPStatus.BAD_REQUEST, f"{key} should be string")
     return True, None
+
+
+def validate_vm_pool_request(json_data: dict, mandatory: list) -> (bool, tuple):
+    """
+    Validate fields of VM pool allocate/heartbeat/release requests
+
+    Args:
+        json_data: Data from request
+        mandatory: Fields which must be present
+
+    Returns:
+        On failure returns http status code and message
+        On success returns True
+    """
+    for key in mandatory:
+        if key not in json_data:
+            return False, (HTTPStatus.BAD_REQUEST, f"{key} missing in request body")
+    for key in ["nodes", "priority", "lease_ttl", "wait"]:
+        if key in json_data and (isinstance(json_data[key], bool) or
+                                 not isinstance(json_data[key], (int, float))):
+            return False, (HTTPStatus.BAD_REQUEST, f"{key} should be number")
+    for key in ["setupname", "lease_id", "request_id", "requester"]:
+        if key in json_data and not isinstance(json_data[key], str):
+            return False, (HTTPStatus.BAD_REQUEST, f"{key} should be string")
+    return True, None
@@ -17,6 +17,9 @@
 # For any questions about this software or licensing,
 # please email opensource@seagate.com or cortx-questions@seagate.com.
 
+import time
+import uuid
+from datetime import datetime, timedelta
 from http import HTTPStatus
 from urllib.parse import quote_plus
 
@@ -27,6 +30,166 @@ from . import mongodbapi, read_config, validations
 
 api = Namespace('VM_Pool', path="/r2_vm_pool", description='VM Pool operations')
 
+# Leases expire only when the allocate request has a lease_ttl (seconds), heartbeats extend
+# them by that ttl. Leases without ttl are held till released.
+# Longest time an allocate request is held open while waiting in the queue
+MAX_WAIT = 60
+POLL_INTERVAL = 0.5
+# Queued requests not polled for this long are dropped from the queue
+QUEUE_STALE = 30
+SETUP_PROJECTION = {"_id": False, "setupname": True, "hostnames": True, "client": True,
+                    "m_vip": True, "data_ip": True, "nodes": True, "setup_in_useby": True,
+                    "lease_id": True, "lease_expiry": True}
+FREE_SETUP = {"$set": {"is_setup_free": "yes", "setup_in_useby": ""},
+              "$unset": {"lease_id": "", "lease_expiry": "", "lease_ttl": ""}}
+
+
+class PoolError(Exception):
+    """MongoDB failure of a VM pool operation, carries http status and message."""
+
+    def __init__(self, error: tuple):
+        super().__init__(error[1])
+        self.status, self.message = error
+
+
+def _db(result: tuple):
+    """Value of a mongodbapi result, PoolError on failure."""
+    if not result[0]:
+        raise PoolError(result[1])
+    return result[1]
+
+
+def _request_data(mandatory: list) -> (dict, flask.Response):
+    """
+    Json body of request with db credentials replaced by MongoDB URI
+
+    Returns:
+        Body and uri, or None and error response
+    """
+    json_data = flask.request.get_json()
+    if not json_data:
+        return None, flask.Response(status=HTTPStatus.BAD_REQUEST, response="Body is empty")
+    if not validations.check_user_pass(json_data):
+        return None, flask.Response(status=HTTPStatus.BAD_REQUEST,
+                                    response="db_username/db_password missing in request body")
+    validate_result = validations.validate_vm_pool_request(json_data, mandatory)
+    if not validate_result[0]:
+        return None, flask.Response(status=validate_result[1][0],
+                                    response=validate_result[1][1])
+    json_data["uri"] = read_config.MONGODB_URI.format(quote_plus(json_data.pop("db_username")),
+                                                      quote_plus(json_data.pop("db_password")),
+                                                      read_config.db_hostname)
+    return json_data, None
+
+
+def _setup_info(setup: dict) -> dict:
+    """Allocated setup as returned to clients."""
+    setup = dict(setup)
+    if setup.get("lease_expiry"):
+        setup["lease_expiry"] = setup["lease_expiry"].isoformat()
+    return setup
+
+
+def _lease_expiry(now: datetime, lease_ttl) -> datetime:
+    """Expiry of a lease with ttl seconds, None for a lease which does not expire."""
+    return now + timedelta(seconds=lease_ttl) if lease_ttl else None
+
+
+def _close_history(uri: str, lease_id: str, reason: str, now: datetime):
+    """Mark allocation history entry of lease as ended."""
+    _db(mongodbapi.find_and_modify({"lease_id": lease_id, "released_at": None},
+                                   {"$set": {"released_at": now, "release_reason": reason}},
+                                   uri, read_config.db_name,
+                                   read_config.vm_pool_history_collection))
+
+
+def reclaim_expired(uri: str) -> list:
+    """
+    Free setups whose lease with ttl expired without heartbeat
+
+    Args:
+        uri: URI of MongoDB database
+
+    Returns:
+        Names of reclaimed setups
+    """
+    now = datetime.utcnow()
+    expired = _db(mongodbapi.find_list({"is_setup_free": "no", "lease_expiry": {"$lt": now}},
+                                       {"setupname": True, "lease_id": True}, uri,
+                                       read_config.db_name, read_config.vm_pool_collection))
+    reclaimed = []
+    for setup in expired:
+        # lease may have been renewed or released since it was listed
+        if _db(mongodbapi.find_and_modify({"setupname": setup["setupname"],
+                                           "lease_id": setup["lease_id"],
+                                           "lease_expiry": {"$lt": now}}, FREE_SETUP, uri,
+                                          read_config.db_name,
+                                          read_config.vm_pool_collection)):
+            _close_history(uri, setup["lease_id"], "reclaimed", now)
+            reclaimed.append(setup["setupname"])
+    return reclaimed
+
+
+def try_allocate(request: dict) -> (dict, int):
+    """
+    One allocation attempt of a queued request.
+
+    The request is queued (or its queue entry refreshed) and claims a free setup only when
+    fewer requests for the same node count are ahead of it (higher priority, then earlier)
+    than there are free setups. The claim is a single document find_one_and_update, so
+    concurrent requests can never get the same setup.
+
+    Args:
+        request: Validated allocate request
+
+    Returns:
+        Allocated setup or None, number of queued requests ahead
+    """
+    uri, nodes, request_id = request["uri"], request["nodes"], request["request_id"]
+    now = datetime.utcnow()
+    # a retried poll whose previous attempt allocated returns the same setup
+    owned = _db(mongodbapi.find_list({"lease_id": request_id}, SETUP_PROJECTION, uri,
+                                     read_config.db_name, read_config.vm_pool_collection))
+    if owned:
+        return owned[0], 0
+    queue = read_config.vm_pool_queue_collection
+    entry = _db(mongodbapi.find_and_modify(
+        {"_id": request_id}, {"$set": {"seen_at": now},
+                              "$setOnInsert": {"nodes": nodes,
+                                               "priority": request.get("priority", 0),
+                                               "requester": request.get("requester", "auto"),
+                                               "enqueued_at": now}},
+        uri, read_config.db_name, queue, upsert=True))
+    _db(mongodbapi.delete_documents({"seen_at": {"$lt": now - timedelta(seconds=QUEUE_STALE)}},
+                                    uri, read_config.db_name, queue))
+    ahead = _db(mongodbapi.count_documents(
+        {"nodes": nodes, "$or": [{"priority": {"$gt": entry["priority"]}},
+                                 {"priority": entry["priority"],
+                                  "enqueued_at": {"$lt": entry["enqueued_at"]}}]},
+        uri, read_config.db_name, queue))
+    free = _db(mongodbapi.count_documents({"is_setup_free": "yes", "nodes": nodes}, uri,
+                                          read_config.db_name, read_config.vm_pool_collection))
+    if ahead >= free:
+        return None, ahead
+    setup = _db(mongodbapi.find_and_modify(
+        {"is_setup_free": "yes", "nodes": nodes},
+        {"$set": {"is_setup_free": "no", "setup_in_useby": entry["requester"],
+                  "lease_id": request_id, "lease_ttl": request.get("lease_ttl"),
+                  "lease_expiry": _lease_expiry(now, request.get("lease_ttl"))}},
+        uri, read_config.db_name, read_config.vm_pool_collection, sort=[("setupname", 1)]))
+    if not setup:
+        return None, ahead
+    _db(mongodbapi.delete_documents({"_id": request_id}, uri, read_config.db_name, queue))
+    _db(mongodbapi.add_document({"lease_id": request_id, "setupname": setup["setupname"],
+                                 "nodes": nodes, "requester": entry["requester"],
+                                 "priority": entry["priority"],
+                                 "requested_at": entry["enqueued_at"], "allocated_at": now,
+                                 "wait_seconds": (now - entry["enqueued_at"]).total_seconds(),
+                                 "released_at": None, "release_reason": None},
+                                uri, read_config.db_name,
+                                read_config.vm_pool_history_collection))
+    return {key: setup.get(key) for key in SETUP_PROJECTION if key != "_id"}, 0
+
 
 @api.route("/search", doc={"description": "Search for vm entries in MongoDB"})
 @api.response(200, "Success")
@@ -182,3 +345,214 @@ class UpdatePoolSystems(Resource):
 
     def __str__(self):
         return self.__class__.__name__
+
+
+@api.route("/allocate", doc={"description": "Allocate a free setup, waiting in a queue"})
+@api.response(200, "Success: setup allocated, lease_id to be used for heartbeat/release.")
+@api.response(202, "Accepted: request queued, poll again with the returned request_id.")
+@api.response(400, "Bad Request: Missing parameters. Do not retry.")
+@api.response(401, "Unauthorized: Wrong db_username/db_password.")
+@api.response(403, "Forbidden: User does not have permission for operation.")
+@api.response(503, "Service Unavailable: Unable to connect to mongoDB.")
+class AllocatePoolSystem(Resource):
+    """
+         Rest API: allocate
+         Endpoint: /r2_vm_pool/allocate
+         Body: {"nodes": 1, "requester": "job", "priority": 0, "lease_ttl": seconds,
+                "wait": seconds, "request_id": id of queued request}
+         Long polls for up to wait seconds. Requests are served by priority, then in
+         arrival order, per node count. Without lease_ttl the lease never expires.
+      """
+
+    @staticmethod
+    def post():
+        """Post for allocate"""
+        json_data, error = _request_data(["nodes"])
+        if error:
+            return error
+        json_data.setdefault("request_id", uuid.uuid4().hex)
+        deadline = time.time() + min(json_data.get("wait", 0), MAX_WAIT)
+        try:
+            while True:
+                reclaim_expired(json_data["uri"])
+                setup, ahead = try_allocate(json_data)
+                if setup:
+                    return flask.jsonify({"result": _setup_info(setup)})
+                if time.time() + POLL_INTERVAL > deadline:
+                    break
+                time.sleep(POLL_INTERVAL)
+        except PoolError as fault:
+            return flask.Response(status=fault.status, response=fault.message)
+        response = flask.jsonify({"request_id": json_data["request_id"], "position": ahead})
+        response.status_code = HTTPStatus.ACCEPTED
+        return response
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+@api.route("/cancel", doc={"description": "Remove a queued allocate request"})
+@api.response(200, "Success")
+@api.response(400, "Bad Request: Missing parameters. Do not retry.")
+@api.response(503, "Service Unavailable: Unable to connect to mongoDB.")
+class CancelPoolRequest(Resource):
+    """
+         Rest API: cancel
+         Endpoint: /r2_vm_pool/cancel
+         Body: {"request_id": id}
+      """
+
+    @staticmethod
+    def post():
+        """Post for cancel"""
+        json_data, error = _request_data(["request_id"])
+        if error:
+            return error
+        delete_result = mongodbapi.delete_documents({"_id": json_data["request_id"]},
+                                                    json_data["uri"], read_config.db_name,
+                                                    read_config.vm_pool_queue_collection)
+        if delete_result[0]:
+            return flask.Response(status=HTTPStatus.OK, response="Request removed.")
+        return flask.Response(status=delete_result[1][0], response=delete_result[1][1])
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+@api.route("/heartbeat", doc={"description": "Extend lease of an allocated setup"})
+@api.response(200, "Success")
+@api.response(400, "Bad Request: Missing parameters. Do not retry.")
+@api.response(404, "Not Found: Lease expired or released, setup must not be used.")
+@api.response(503, "Service Unavailable: Unable to connect to mongoDB.")
+class HeartbeatPoolSystem(Resource):
+    """
+         Rest API: heartbeat
+         Endpoint: /r2_vm_pool/heartbeat
+         Body: {"setupname": name, "lease_id": id, "lease_ttl": seconds}
+         Extends the lease by lease_ttl, by the ttl given at allocation if not given.
+      """
+
+    @staticmethod
+    def post():
+        """Post for heartbeat"""
+        json_data, error = _request_data(["setupname", "lease_id"])
+        if error:
+            return error
+        now = datetime.utcnow()
+        active = {"setupname": json_data["setupname"], "lease_id": json_data["lease_id"],
+                  "$or": [{"lease_expiry": None}, {"lease_expiry": {"$gte": now}}]}
+        try:
+            lease_ttl = json_data.get("lease_ttl")
+            if not lease_ttl:
+                leases = _db(mongodbapi.find_list(active, {"lease_ttl": True}, json_data["uri"],
+                                                  read_config.db_name,
+                                                  read_config.vm_pool_collection))
+                lease_ttl = leases[0].get("lease_ttl") if leases else None
+            lease_expiry = _lease_expiry(now, lease_ttl)
+            lease = _db(mongodbapi.find_and_modify(
+                active, {"$set": {"lease_expiry": lease_expiry, "lease_ttl": lease_ttl}},
+                json_data["uri"], read_config.db_name, read_config.vm_pool_collection))
+        except PoolError as fault:
+            return flask.Response(status=fault.status, response=fault.message)
+        if not lease:
+            return flask.Response(status=HTTPStatus.NOT_FOUND,
+                                  response=f"No active lease {json_data['lease_id']}")
+        return flask.jsonify({"lease_expiry": lease_expiry.isoformat() if lease_expiry
+                              else None})
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+@api.route("/release", doc={"description": "Free an allocated setup"})
+@api.response(200, "Success")
+@api.response(400, "Bad Request: Missing parameters. Do not retry.")
+@api.response(404, "Not Found: Setup is not allocated (with that lease).")
+@api.response(503, "Service Unavailable: Unable to connect to mongoDB.")
+class ReleasePoolSystem(Resource):
+    """
+         Rest API: release
+         Endpoint: /r2_vm_pool/release
+         Body: {"setupname": name, "lease_id": id}, without lease_id any allocation of
+         the setup is released.
+      """
+
+    @staticmethod
+    def post():
+        """Post for release"""
+        json_data, error = _request_data(["setupname"])
+        if error:
+            return error
+        query = {"setupname": json_data["setupname"], "is_setup_free": "no"}
+        if "lease_id" in json_data:
+            query["lease_id"] = json_data["lease_id"]
+        try:
+            previous = _db(mongodbapi.find_list(query, {"lease_id": True}, json_data["uri"],
+                                                read_config.db_name,
+                                                read_config.vm_pool_collection))
+            if not previous or not _db(mongodbapi.find_and_modify(
+                    query, FREE_SETUP, json_data["uri"], read_config.db_name,
+                    read_config.vm_pool_collection)):
+                return flask.Response(status=HTTPStatus.NOT_FOUND,
+                                      response=f"{json_data['setupname']} is not allocated")
+            if previous[0].get("lease_id"):
+                _close_history(json_data["uri"], previous[0]["lease_id"], "released",
+                               datetime.utcnow())
+        except PoolError as fault:
+            return flask.Response(status=fault.status, response=fault.message)
+        return flask.Response(status=HTTPStatus.OK, response="Setup released.")
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+@api.route("/utilisation", doc={"description": "Allocation statistics per setup"})
+@api.response(200, "Success")
+@api.response(400, "Bad Request: Missing parameters. Do not retry.")
+@api.response(503, "Service Unavailable: Unable to connect to mongoDB.")
+class PoolUtilisation(Resource):
+    """
+         Rest API: utilisation
+         Endpoint: /r2_vm_pool/utilisation
+         Body: {"start": iso time, "end": iso time}, default last 7 days.
+      """
+
+    @staticmethod
+    def get():
+        """Get for utilisation"""
+        json_data, error = _request_data([])
+        if error:
+            return error
+        try:
+            end = datetime.fromisoformat(json_data["end"]) if "end" in json_data \
+                else datetime.utcnow()
+            start = datetime.fromisoformat(json_data["start"]) if "start" in json_data \
+                else end - timedelta(days=7)
+        except (TypeError, ValueError):
+            return flask.Response(status=HTTPStatus.BAD_REQUEST,
+                                  response="start/end should be ISO format time")
+        history = mongodbapi.find_list(
+            {"allocated_at": {"$lt": end},
+             "$or": [{"released_at": None}, {"released_at": {"$gt": start}}]},
+            {"_id": False}, json_data["uri"], read_config.db_name,
+            read_config.vm_pool_history_collection)
+        if not history[0]:
+            return flask.Response(status=history[1][0], response=history[1][1])
+        setups = {}
+        for entry in history[1]:
+            stats = setups.setdefault(entry["setupname"], {
+                "allocations": 0, "busy_seconds": 0.0, "wait_seconds": 0.0, "reclaimed": 0})
+            released = min(entry["released_at"] or end, end)
+            stats["allocations"] += 1
+            stats["busy_seconds"] += (released - max(entry["allocated_at"], start)).total_seconds()
+            stats["wait_seconds"] += entry["wait_seconds"]
+            stats["reclaimed"] += entry["release_reason"] == "reclaimed"
+        window = (end - start).total_seconds()
+        for stats in setups.values():
+            stats["utilisation"] = stats["busy_seconds"] / window if window > 0 else 0.0
+            stats["avg_wait_seconds"] = stats.pop("wait_seconds") / stats["allocations"]
+        return flask.jsonify({"start": start.isoformat(), "end": end.isoformat(),
+                              "setups": setups})
+
+    def __str__(self):
+        return self.__class__.__name__
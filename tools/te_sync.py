@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+# !/usr/bin/python
+"""Incremental sync of test execution results from JIRA into the reports database."""
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+
+# Algorithm
+# for each TE (bounded concurrency):
+#     Get TE tests from JIRA, digest (status, defects, start time, log) per test
+#     Changed tests = tests whose digest differs from the high-water mark of last sync
+#     if no changed tests:
+#         Continue
+#     Search DB once for latest entries of TE
+#     Create entries for tests missing in DB or with changed status, fields of these tests
+#     are fetched with one paged JQL search
+#     Update issueIDs of failed tests with changed defects
+#     Send creates and updates in one bulk request, then save the high-water mark
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import requests
+
+JIRA_URL = "https://jts.seagate.com/"
+SEARCH_PAGE_SIZE = 500
+STATE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "cortx-test",
+                          "db_update_state.json")
+TEST_FIELDS = ["summary", "labels", "customfield_21087", "customfield_22881",
+               "customfield_22882", "customfield_20981"]
+TP_FIELDS = {"platformType": "customfield_22982", "serverType": "customfield_22983",
+             "enclosureType": "customfield_22984", "branch": "customfield_22981",
+             "buildNo": "customfield_22980"}
+
+logger = logging.getLogger('db_update')
+
+
+class SyncError(Exception):
+    """JIRA or DB request failed."""
+
+
+def test_digest(test: dict) -> str:
+    """Digest of the JIRA test run fields stored in DB."""
+    data = [test["status"], sorted(defect["key"] for defect in test.get("defects", [])),
+            test.get("startedOn"), test.get("comment")]
+    return hashlib.sha1(json.dumps(data).encode()).hexdigest()  # nosec
+
+
+# pylint: disable=too-many-instance-attributes
+class TestExecutionSync:
+    """Sync test plans from JIRA to DB, only writing what changed since the last sync."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, jira_auth: tuple, db_url: str, db_username: str, db_password: str,
+                 jira_url: str = JIRA_URL, state_file: str = STATE_FILE, max_workers: int = 4):
+        """
+        Args:
+            jira_auth: JIRA (username, password)
+            db_url: Reports DB REST endpoint e.g. http://host:5000/reportsdb/
+            db_username: DB username
+            db_password: DB password
+            jira_url: JIRA server
+            state_file: High-water marks of the previous syncs
+            max_workers: Test executions synced concurrently
+        """
+        self.jira_auth = jira_auth
+        self.db_url = db_url
+        self.db_creds = {"db_username": db_username, "db_password": db_password}
+        self.jira_url = jira_url
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.state = {}
+        self.stats = {"requests": 0, "created": 0, "updated": 0, "skipped": 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if os.path.exists(state_file):
+            with open(state_file) as state:
+                self.state = json.load(state)
+
+    @property
+    def session(self) -> requests.Session:
+        """Session of the calling thread."""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+            self._local.session.auth = self.jira_auth
+        return self._local.session
+
+    def _request(self, method: str, url: str, ok_statuses=(HTTPStatus.OK,), **kwargs):
+        with self._lock:
+            self.stats["requests"] += 1
+        response = self.session.request(method, url, **kwargs)
+        if response.status_code not in ok_statuses:
+            raise SyncError(f"{method} on {url} failed: {response.status_code} {response.text}")
+        return response
+
+    def _jira_get(self, path: str, params: dict = None):
+        return self._request("GET", self.jira_url + path, params=params).json()
+
+    def _raven_list(self, path: str, params: dict = None) -> list:
+        """Xray list, all pages if params has limit."""
+        results = []
+        while True:
+            page = self._jira_get(f"rest/raven/1.0/api/{path}", params)
+            results.extend(page)
+            if not params or len(page) < params["limit"]:
+                return results
+            params = dict(params, page=params["page"] + 1)
+
+    def search_issues(self, keys: list, fields: list) -> dict:
+        """Fields of issues by key with paged JQL searches."""
+        issues = {}
+        for i in range(0, len(keys), SEARCH_PAGE_SIZE):
+            body = {"jql": f"key in ({','.join(keys[i:i + SEARCH_PAGE_SIZE])})",
+                    "startAt": 0, "maxResults": SEARCH_PAGE_SIZE, "fields": fields}
+            result = self._request("POST", self.jira_url + "rest/api/2/search",
+                                   json=body).json()
+            issues.update({issue["key"]: issue["fields"] for issue in result["issues"]})
+        return issues
+
+    def _db(self, method: str, endpoint: str, payload: dict):
+        payload = dict(payload, **self.db_creds)
+        response = self._request(method, self.db_url + endpoint,
+                                 ok_statuses=(HTTPStatus.OK, HTTPStatus.NOT_FOUND),
+                                 data=json.dumps(payload),
+                                 headers={'Content-Type': 'application/json'})
+        if response.status_code == HTTPStatus.NOT_FOUND:
+            if "No results" in response.text:
+                return None
+            raise SyncError(f"{method} on {endpoint} failed: {response.text}")
+        return response.json()
+
+    def test_plan_details(self, tp_key: str) -> dict:
+        """Build details and label of test plan."""
+        fields = self._jira_get(f"rest/api/2/issue/{tp_key}",
+                                {"fields": ",".join(["labels"] + list(TP_FIELDS.values()))}
+                                )["fields"]
+        details = {}
+        for key, field in TP_FIELDS.items():
+            if not fields.get(field):
+                raise SyncError(f"Test Plan {tp_key} has {key} field empty.")
+            details[key] = fields[field][0]
+        details["testPlanID"] = tp_key
+        details["testPlanLabel"] = fields["labels"][0] if fields.get("labels") else "None"
+        return details
+
+    def sync_test_plan(self, tp_key: str, full: bool = False) -> dict:
+        """
+        Sync all test executions of test plan
+
+        Args:
+            tp_key: Test plan key
+            full: Ignore high-water marks and compare every test with DB
+
+        Returns:
+            stats: requests, created, updated, skipped (unchanged) test executions
+        """
+        logger.info("JIRA DB Sync for Test Plan ID = %s", tp_key)
+        tp_details = self.test_plan_details(tp_key)
+        executions = self._raven_list(f"testplan/{tp_key}/testexecution")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for future in [executor.submit(self.sync_test_execution, tp_details, te["key"], full)
+                           for te in executions]:
+                future.result()
+        self.save_state()
+        return self.stats
+
+    # pylint: disable=too-many-locals
+    def sync_test_execution(self, tp_details: dict, te_key: str, full: bool = False):
+        """Sync changed tests of one test execution."""
+        state_key = f"{tp_details['buildNo']}:{te_key}"
+        marks = {} if full else self.state.get(state_key, {})
+        tests = self._raven_list(f"testexec/{te_key}/test",
+                                 {'detailed': "true", 'limit': 100, 'page': 1})
+        digests = {test["key"]: test_digest(test) for test in tests}
+        changed = [test for test in tests if test["status"] != "TODO" and
+                   marks.get(test["key"]) != digests[test["key"]]]
+        if not changed:
+            logger.info("-Test Execution %s unchanged", te_key)
+            with self._lock:
+                self.stats["skipped"] += 1
+                self.state[state_key] = digests
+            return
+        logger.info("-Test Execution %s: %s changed tests", te_key, len(changed))
+        results = self._db("GET", "search", {"query": {"buildNo": tp_details["buildNo"],
+                                                       "testExecutionID": te_key,
+                                                       "latest": True}})
+        db_entries = {entry["testID"]: entry for entry in results["result"]} if results else {}
+        to_create = [test for test in changed if test["key"] not in db_entries or
+                     db_entries[test["key"]]["testResult"].lower() != test["status"].lower()]
+        creates, updates = [], []
+        if to_create:
+            te_fields = self._jira_get(f"rest/api/2/issue/{te_key}",
+                                       {"fields": "labels,components"})["fields"]
+            test_fields = self.search_issues([test["key"] for test in to_create], TEST_FIELDS)
+            for test in to_create:
+                creates.append(self.db_entry(tp_details, te_key, te_fields, test,
+                                             test_fields[test["key"]],
+                                             db_entries.get(test["key"])))
+        created = {entry["testID"] for entry in creates}
+        for test in changed:
+            defects = [defect["key"] for defect in test.get("defects", [])]
+            if "fail" not in test["status"].lower() or test["key"] in created:
+                continue
+            if not defects:
+                logger.warning("Failure is not mapped to any BUG in JIRA TEST - %s, Test "
+                               "Execution - %s, Test Plan = %s", test["key"], te_key,
+                               tp_details["testPlanID"])
+            elif db_entries[test["key"]].get("issueIDs") != defects:
+                updates.append({"filter": {"buildNo": tp_details["buildNo"],
+                                           "testExecutionID": te_key, "testID": test["key"],
+                                           "latest": True},
+                                "update": {"$set": {"issueIDs": defects}}})
+        if creates or updates:
+            self._db("POST", "bulk", {"create": creates, "update": updates})
+        with self._lock:
+            self.stats["created"] += len(creates)
+            self.stats["updated"] += len(updates)
+            self.state[state_key] = digests
+
+    # pylint: disable=too-many-arguments
+    @staticmethod
+    def db_entry(tp_details: dict, te_key: str, te_fields: dict, test: dict, fields: dict,
+                 previous: dict = None) -> dict:
+        """DB entry for test run, descriptive fields from previous entry if there is one."""
+        entry = {
+            # Framework/Unknown data
+            "clientHostname": "",
+            "noOfNodes": 0,
+            "OSVersion": "",
+            "nodesHostname": [""],
+            "testTags": [""],
+            "testType": "",
+            "testExecutionTime": 0,
+            "healthCheckResult": "",
+            # Data from JIRA
+            "testStartTime": test["startedOn"],
+            "logPath": test.get("comment", "None"),
+            "testResult": test["status"],
+            "platformType": tp_details["platformType"],
+            "serverType": tp_details["serverType"],
+            "enclosureType": tp_details["enclosureType"],
+            "testName": fields["summary"],
+            "testID": test["key"],
+            "testIDLabels": fields["labels"],
+            "testPlanID": tp_details["testPlanID"],
+            "testExecutionID": te_key,
+            "testPlanLabel": tp_details["testPlanLabel"],
+            "testExecutionLabel": te_fields["labels"][0] if te_fields.get("labels") else "None",
+            "testTeam": te_fields["components"][0]["name"] if te_fields.get("components")
+            else "CortxQA",
+            "buildType": tp_details["branch"],
+            "buildNo": tp_details["buildNo"],
+            "executionType": (fields.get("customfield_20981") or {}).get("value", "None"),
+            "feature": fields["customfield_21087"]["value"] if fields.get("customfield_21087")
+            else "None",
+            "latest": True,
+            "drID": fields.get("customfield_22882") or ["None"],
+            "featureID": fields.get("customfield_22881") or ["None"],
+        }
+        if previous:
+            for key in ["testTags", "testType", "testName", "testIDLabels", "testPlanLabel",
+                        "testExecutionLabel", "testTeam", "buildType", "executionType",
+                        "feature"]:
+                entry[key] = previous[key]
+        defects = [defect["key"] for defect in test.get("defects", [])]
+        if "fail" in test["status"].lower() and defects:
+            entry["issueIDs"] = defects
+        return entry
+
+    def save_state(self):
+        """Persist high-water marks."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        with self._lock:
+            with open(self.state_file, "w") as state:
+                json.dump(self.state, state)
@@ -0,0 +1,200 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""In memory S3 shared by the unit tests of the S3, HA and IO stability libraries."""
+
+import io
+import itertools
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qsl
+
+from botocore.exceptions import ClientError
+
+
+def client_error(code, operation):
+    """ClientError as raised by boto3."""
+    return ClientError({"Error": {"Code": code}}, operation)
+
+
+class ListObjectsV2Paginator:
+    """list_objects_v2 paginator, pages are listed lazily after the previous page."""
+
+    def __init__(self, list_objects_v2):
+        self.list_objects_v2 = list_objects_v2
+
+    def paginate(self, PaginationConfig=None, **kwargs):  # pylint: disable=invalid-name
+        """Yield pages till the listing is not truncated."""
+        kwargs["MaxKeys"] = (PaginationConfig or {}).get("PageSize", 1000)
+        while True:
+            resp = self.list_objects_v2(**kwargs)
+            yield resp
+            if not resp["IsTruncated"]:
+                return
+            kwargs["ContinuationToken"] = resp["NextContinuationToken"]
+
+
+# pylint: disable=invalid-name
+class FakeS3:
+    """
+    boto3 S3 client subset with versioning, tags and ACLs, latency per request.
+    buckets map keys to the list of their versions, one version in unversioned buckets.
+    failing has keys failing every request or (operation, key) failing one operation only,
+    corrupt has keys read back with their first byte flipped.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.buckets = {}
+        self.bucket_meta = {}
+        self.failing = set()
+        self.corrupt = set()
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.version_ids = itertools.count(1)
+
+    def _request(self, operation, key=None):
+        time.sleep(self.latency)
+        with self.lock:
+            self.requests[operation] += 1
+        if key in self.failing or (operation, key) in self.failing:
+            raise client_error("ServiceUnavailable", operation)
+
+    def _bucket(self, bucket, operation):
+        if bucket not in self.buckets:
+            raise client_error("NoSuchBucket", operation)
+        return self.buckets[bucket]
+
+    def create_bucket(self, Bucket, ACL=None):
+        """Create bucket."""
+        self._request("CreateBucket", Bucket)
+        with self.lock:
+            if Bucket in self.buckets:
+                raise client_error("BucketAlreadyOwnedByYou", "CreateBucket")
+            self.buckets[Bucket] = {}
+            self.bucket_meta[Bucket] = {"acl": ACL, "versioning": False, "tags": None}
+
+    def put_bucket_versioning(self, Bucket, VersioningConfiguration):
+        """Enable versioning."""
+        self._request("PutBucketVersioning")
+        self.bucket_meta[Bucket]["versioning"] = VersioningConfiguration["Status"] == "Enabled"
+
+    def put_bucket_tagging(self, Bucket, Tagging):
+        """Set bucket tags."""
+        self._request("PutBucketTagging")
+        self.bucket_meta[Bucket]["tags"] = {tag["Key"]: tag["Value"]
+                                            for tag in Tagging["TagSet"]}
+
+    def put_object(self, Bucket, Key, Body, Tagging=None, ACL=None):
+        """Store object version, versions are kept only in versioned buckets."""
+        self._request("PutObject", Key)
+        obj = {"data": bytes(Body), "tags": dict(parse_qsl(Tagging or "")), "acl": ACL}
+        with self.lock:
+            objects = self._bucket(Bucket, "PutObject")
+            if self.bucket_meta[Bucket]["versioning"]:
+                obj["version"] = str(next(self.version_ids))
+                objects.setdefault(Key, []).append(obj)
+                return {"VersionId": obj["version"]}
+            obj["version"] = None
+            objects[Key] = [obj]
+        return {}
+
+    def get_object(self, Bucket, Key, VersionId=None):
+        """Object (version) with streaming body."""
+        self._request("GetObject", Key)
+        with self.lock:
+            versions = self._bucket(Bucket, "GetObject").get(Key)
+            if not versions:
+                raise client_error("NoSuchKey", "GetObject")
+            obj = versions[-1] if VersionId is None else \
+                [obj for obj in versions if obj["version"] == VersionId][0]
+        data = obj["data"]
+        if Key in self.corrupt:
+            data = bytes([data[0] ^ 0xff]) + data[1:]
+        return {"Body": io.BytesIO(data), "ContentLength": len(data),
+                "VersionId": obj["version"]}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=""):
+        """Page of latest object versions with the key prefix."""
+        self._request("ListObjectsV2")
+        with self.lock:
+            objects = self._bucket(Bucket, "ListObjectsV2")
+            keys = sorted(key for key in objects
+                          if key.startswith(Prefix) and key > ContinuationToken)
+            page = [{"Key": key, "Size": len(objects[key][-1]["data"])}
+                    for key in keys[:MaxKeys]]
+        resp = {"KeyCount": len(page), "IsTruncated": len(keys) > MaxKeys}
+        if page:
+            resp["Contents"] = page
+        if resp["IsTruncated"]:
+            resp["NextContinuationToken"] = page[-1]["Key"]
+        return resp
+
+    def get_paginator(self, name):
+        """Paginator of list_objects_v2."""
+        assert name == "list_objects_v2"
+        return ListObjectsV2Paginator(self.list_objects_v2)
+
+    def list_object_versions(self, Bucket, KeyMarker="", VersionIdMarker="", MaxKeys=1000):
+        """Page of object versions, version id "null" in unversioned buckets."""
+        self._request("ListObjectVersions")
+        with self.lock:
+            entries = [(key, num, obj["version"] or "null")
+                       for key, versions in sorted(self._bucket(
+                           Bucket, "ListObjectVersions").items())
+                       for num, obj in enumerate(versions)]
+        if KeyMarker:
+            marker = [num for num, entry in enumerate(entries)
+                      if entry[0] == KeyMarker and entry[2] == VersionIdMarker][0]
+            entries = entries[marker + 1:]
+        page = entries[:MaxKeys]
+        resp = {"Versions": [{"Key": key, "VersionId": version} for key, _, version in page],
+                "IsTruncated": len(entries) > MaxKeys}
+        if resp["IsTruncated"]:
+            resp.update(NextKeyMarker=page[-1][0], NextVersionIdMarker=page[-1][2])
+        return resp
+
+    def delete_objects(self, Bucket, Delete):
+        """Delete keys or key versions, failing keys are reported in Errors."""
+        self._request("DeleteObjects")
+        assert len(Delete["Objects"]) <= 1000
+        errors = []
+        with self.lock:
+            objects = self._bucket(Bucket, "DeleteObjects")
+            for obj in Delete["Objects"]:
+                if obj["Key"] in self.failing or ("DeleteObjects", obj["Key"]) in self.failing:
+                    errors.append({"Key": obj["Key"], "Code": "InternalError"})
+                    continue
+                versions = objects.get(obj["Key"], [])
+                versions[:] = [ver for ver in versions if obj.get("VersionId") not in
+                               (None, ver["version"] or "null")]
+                if not versions:
+                    objects.pop(obj["Key"], None)
+        return {"Errors": errors}
+
+    def delete_bucket(self, Bucket):
+        """Delete empty bucket."""
+        self._request("DeleteBucket")
+        with self.lock:
+            if self._bucket(Bucket, "DeleteBucket"):
+                raise client_error("BucketNotEmpty", "DeleteBucket")
+            del self.buckets[Bucket]
+            del self.bucket_meta[Bucket]
@@ -0,0 +1,230 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for watch based kubernetes state cache."""
+
+import json
+import queue
+import threading
+import time
+
+from commons.helpers.k8s_watch_helper import JSONStreamDecoder
+from commons.helpers.k8s_watch_helper import K8sStateCache
+from commons.helpers.k8s_watch_helper import shared_cache
+from commons.helpers.k8s_watch_helper import stop_shared_caches
+
+
+def pod(name, phase="Running", ready=True, restarts=0, container="cortx-motr-io"):
+    """Build a minimal pod object."""
+    return {"metadata": {"name": name},
+            "status": {"phase": phase,
+                       "containerStatuses": [{"name": container, "ready": ready,
+                                              "restartCount": restarts}]}}
+
+
+def event(ev_type, obj):
+    """Render a watch event the way kubectl prints it (pretty printed json)."""
+    return json.dumps({"type": ev_type, "object": obj}, indent=4) + "\n"
+
+
+class FakeWatch:
+    """Recorded/fake watch stream fed by the test, list commands return items."""
+
+    def __init__(self, items=()):
+        self.chunks = queue.Queue()
+        self.commands = []
+        self.items = list(items)
+        self.listed = threading.Event()
+        self.listed.set()
+
+    def __call__(self, cmd):
+        self.commands.append(cmd)
+        if "--watch" not in cmd:
+            self.listed.wait()
+            yield json.dumps({"kind": "List", "items": self.items}, indent=4)
+            return
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def push(self, text, split=7):
+        """Push text split into small chunks to exercise the incremental decoder."""
+        for i in range(0, len(text), split):
+            self.chunks.put(text[i:i + split])
+
+    def close(self):
+        """End the stream."""
+        self.chunks.put(None)
+
+
+class TestK8sStateCache:
+    """Test K8sStateCache with a fake watch event stream."""
+
+    def setup_method(self):
+        """Start cache on a fake stream with an initial pod listing."""
+        self.watch = FakeWatch([pod("cortx-data-0"),
+                                pod("cortx-data-1", phase="Pending", ready=False)])
+        self.cache = K8sStateCache(stream_factory=self.watch, retry_delay=0.01)
+        self.watch.push(event("ADDED", pod("cortx-data-0")))
+        self.watch.push(event("ADDED", pod("cortx-data-1", phase="Pending", ready=False)))
+        self.cache.start()
+
+    def teardown_method(self):
+        """Stop the cache and end the stream it is blocked on."""
+        self.cache.stop(timeout=0)
+        self.watch.close()
+
+    def test_decoder_handles_split_documents(self):
+        """Documents split at arbitrary boundaries are decoded once complete."""
+        decoder = JSONStreamDecoder()
+        text = event("ADDED", pod("a")) + event("DELETED", pod("b"))
+        docs = []
+        for char in text:
+            docs.extend(decoder.feed(char))
+        assert [doc["type"] for doc in docs] == ["ADDED", "DELETED"]
+
+    def test_watch_command(self):
+        """Pods are listed, then watched with json watch events in the cortx namespace."""
+        self.cache.wait_until(lambda cache: cache.synced(), timeout=2)
+        assert self.watch.commands[:2] == \
+            ["kubectl get pods -n cortx -o json",
+             "kubectl get pods -n cortx --watch --output-watch-events -o json"]
+
+    def test_wait_resolves_on_event(self):
+        """Waiter wakes up within milliseconds of the event, not at a sleep boundary."""
+        predicate = K8sStateCache.pods_ready("cortx-data", count=2)
+        assert not self.cache.wait_until(predicate, timeout=0.2)
+        woke = {}
+
+        def waiter():
+            woke["res"] = self.cache.wait_until(predicate, timeout=10)
+            woke["at"] = time.monotonic()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.2)
+        sent = time.monotonic()
+        self.watch.push(event("MODIFIED", pod("cortx-data-1")), split=4096)
+        thread.join(10)
+        assert woke["res"]
+        assert woke["at"] - sent < 0.1
+
+    def test_pod_deleted_and_restart(self):
+        """Delete and container restart events satisfy their predicates."""
+        self.cache.wait_until(lambda cache: len(cache.names()) == 2, timeout=2)
+        self.watch.push(event("DELETED", pod("cortx-data-0")))
+        assert self.cache.wait_until(K8sStateCache.pod_deleted("cortx-data-0"), timeout=2)
+        self.watch.push(event("MODIFIED", pod("cortx-data-1", restarts=1)))
+        assert self.cache.wait_until(
+            K8sStateCache.container_restarted("cortx-data-1", "cortx-motr-io", 0), timeout=2)
+        assert self.cache.names() == ["cortx-data-1"]
+
+    def test_wait_for_change_timeout(self):
+        """wait_for_change times out without events and returns early with one."""
+        self.cache.wait_until(lambda cache: len(cache.names()) == 2, timeout=2)
+        start = time.monotonic()
+        assert not self.cache.wait_for_change(timeout=0.1)
+        assert time.monotonic() - start >= 0.1
+        since = self.cache.generation
+        self.watch.push(event("MODIFIED", pod("cortx-data-0")))
+        assert self.cache.wait_for_change(since=since, timeout=2)
+
+    def test_watch_reestablished(self):
+        """Stream end re-lists and re-establishes the watch, pods deleted meanwhile go."""
+        self.cache.wait_until(lambda cache: len(cache.names()) == 2, timeout=2)
+        self.watch.items = [pod("cortx-server-0")]
+        self.watch.close()
+        self.watch.push(event("ADDED", pod("cortx-server-0")))
+        assert self.cache.wait_until(K8sStateCache.pods_ready("cortx-server"), timeout=2)
+        assert self.cache.names() == ["cortx-server-0"]
+        assert len(self.watch.commands) == 4
+
+    def test_synced_after_listing(self):
+        """Cache is synced only once the listing is applied."""
+        self.cache.stop(timeout=0)
+        self.watch.close()
+        self.watch = FakeWatch([pod("cortx-data-0"), pod("cortx-data-1", ready=False)])
+        self.watch.listed.clear()
+        self.cache = K8sStateCache(stream_factory=self.watch, retry_delay=0.01).start()
+        assert not self.cache.wait_until(K8sStateCache.pods_ready("cortx-data"), timeout=0.2)
+        assert not self.cache.synced()
+        self.watch.listed.set()
+        assert self.cache.wait_until(lambda cache: cache.synced(), timeout=2)
+        assert not self.cache.wait_until(K8sStateCache.pods_ready("cortx-data"), timeout=0.1)
+
+    def test_unknown_container_not_restarted(self):
+        """Unknown pods and containers have no restart count and never count as restarted."""
+        self.cache.wait_until(lambda cache: len(cache.names()) == 2, timeout=2)
+        assert K8sStateCache.restart_count({}, "cortx-motr-io") is None
+        assert K8sStateCache.restart_count(pod("cortx-data-0"), "cortx-hax") is None
+        for name, container in (("cortx-data-9", "cortx-motr-io"), ("cortx-data-0", "cortx-hax")):
+            assert not self.cache.wait_until(
+                K8sStateCache.container_restarted(name, container, 0), timeout=0.05)
+        assert not self.cache.wait_until(
+            K8sStateCache.container_restarted("cortx-data-0", "cortx-motr-io", None),
+            timeout=0.05)
+
+
+class FakeNode:
+    """Master node object recording the connections made to it."""
+
+    connections = []
+
+    def __init__(self, hostname, username, password):
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        FakeNode.connections.append(self)
+
+
+class TestSharedCache:
+    """Test the shared cache started for the callers waiting on cluster state."""
+
+    def setup_method(self):
+        """Fake stream with one listed pod."""
+        FakeNode.connections = []
+        self.watch = FakeWatch([pod("cortx-data-0")])
+
+    def teardown_method(self):
+        """Stop the shared caches and end the stream."""
+        stop_shared_caches()
+        self.watch.close()
+
+    def test_one_cache_per_master(self):
+        """Callers of one master share a synced cache watching over its own connection."""
+        node = FakeNode("master", "root", "pass")
+        cache = shared_cache(node, stream_factory=self.watch, retry_delay=0.01)
+        assert cache.synced()
+        assert cache.names() == ["cortx-data-0"]
+        assert shared_cache(node, stream_factory=self.watch) is cache
+        assert len(FakeNode.connections) == 2
+        assert FakeNode.connections[1] is not node
+        assert shared_cache(None) is None
+
+    def test_unavailable_watch(self):
+        """Watch which never lists gives no cache so callers poll, and is not retried."""
+        self.watch.listed.clear()
+        node = FakeNode("master", "root", "pass")
+        assert shared_cache(node, sync_timeout=0.2, stream_factory=self.watch) is None
+        assert shared_cache(node, stream_factory=self.watch) is None
+        assert len(self.watch.commands) == 1
+        self.watch.listed.set()
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for streaming log tailer and multi pattern matcher."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from commons.helpers.log_tail_helper import LogTailer
+from commons.helpers.stream_helper import iter_lines
+from commons.utils.pattern_utils import MultiPatternMatcher
+
+
+def append(path, text):
+    """Append text to file."""
+    with open(path, "a") as fobj:
+        fobj.write(text)
+
+
+def test_matcher_overlapping_patterns():
+    """Overlapping and case insensitive patterns are all resolved."""
+    matcher = MultiPatternMatcher(["enclosure", "enclosure:fru", "Fault", "fault"],
+                                  ignore_case=True)
+    assert matcher.patterns == ["enclosure", "enclosure:fru", "Fault", "fault"]
+    assert matcher.match_line('"resource_type": "enclosure:fru:psu" FAULT') == [0, 1, 2, 3]
+    assert matcher.match_line("enclosure:fru", candidates=[1]) == [1]
+    assert not matcher.search("node:os:cpu")
+    with pytest.raises(ValueError):
+        MultiPatternMatcher([])
+
+
+def test_iter_lines_partial_chunks():
+    """Lines split across chunks are joined and trailing partial line is kept."""
+    assert list(iter_lines(["ab", "c\r\nde", "f\n\ngh"])) == ["abc", "def", "", "gh"]
+
+
+def test_wait_returns_on_last_pattern(tmp_path):
+    """Wait returns as soon as all patterns are seen, not at the timeout."""
+    log = str(tmp_path / "screenlog.0")
+    append(log, "old enclosure fault line\n")
+    with LogTailer(log) as tailer:
+        time.sleep(0.3)
+        mark = tailer.line_count
+        timer = threading.Timer(0.3, append, (log, "noise\nenclosure: fault\n"))
+        timer.start()
+        start = time.monotonic()
+        resp = tailer.wait_for_patterns(["enclosure", "fault"], timeout=20, since=mark,
+                                        line_filter="enclosure")
+        elapsed = time.monotonic() - start
+    assert resp == (True, {"enclosure": "enclosure: fault", "fault": "enclosure: fault"})
+    assert elapsed < 5
+
+
+def test_from_start_and_missing(tmp_path):
+    """Existing content is read with from_start and missing patterns are reported."""
+    log = str(tmp_path / "screenlog.0")
+    append(log, "enclosure fault\n")
+    with LogTailer(log, from_start=True) as tailer:
+        resp = tailer.wait_for_patterns(["fault", "resolved", "psu"], timeout=1)
+    assert resp == (False, ["resolved", "psu"])
+
+
+def test_rotation_and_truncation(tmp_path):
+    """Lines written after rotation and truncation of the file are still seen."""
+    log = str(tmp_path / "screenlog.0")
+    append(log, "")
+    with LogTailer(log) as tailer:
+        time.sleep(0.3)
+        append(log, "first alert\n")
+        assert tailer.wait_for_patterns(["first"], timeout=10)[0]
+        os.rename(log, log + ".1")
+        append(log, "second alert\n")
+        assert tailer.wait_for_patterns(["second"], timeout=10)[0]
+        with open(log, "w") as fobj:
+            fobj.write("")
+        time.sleep(0.3)
+        append(log, "third alert\n")
+        assert tailer.wait_for_patterns(["third"], timeout=10)[0]
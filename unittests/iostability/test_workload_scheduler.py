@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""IO stability workload scheduler tests with a fake S3 backend and a simulated clock."""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from botocore.exceptions import ClientError
+
+from libs.iostability.workload_scheduler import WorkloadScheduler
+from libs.iostability.workload_scheduler import allocate_clients
+from unittests.fake_s3 import FakeS3
+
+DISTRIBUTION = {"4Kb": 50, "1Mb": 30, "16Mb": 20}
+HOUR = 3600
+
+
+class FakeClock:
+    """Simulated clock advanced by the fake runner."""
+
+    def __init__(self):
+        self.now = 1650000000.0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """Move time forward."""
+        with self.lock:
+            self.now += seconds
+
+
+class RecordingS3(FakeS3):
+    """FakeS3 recording listed pages and deletes, deletes take delete_delay seconds."""
+
+    def __init__(self, delete_delay=0.0):
+        super().__init__()
+        self.events = []
+        self.delete_delay = delete_delay
+
+    def list_objects_v2(self, **kwargs):  # pylint: disable=arguments-differ
+        """Record size of the listed page."""
+        resp = super().list_objects_v2(**kwargs)
+        self.events.append(("list", resp["KeyCount"]))
+        return resp
+
+    def delete_objects(self, Bucket, Delete):  # pylint: disable=invalid-name
+        """Record start and end of the delete."""
+        self.events.append(("delete_start", len(Delete["Objects"])))
+        time.sleep(self.delete_delay)
+        resp = super().delete_objects(Bucket=Bucket, Delete=Delete)
+        self.events.append(("delete_end", len(Delete["Objects"])))
+        return resp
+
+
+def put_objects(s3_client, bucket, keys):
+    """Create bucket unless it exists and write empty objects, as s3bench does."""
+    try:
+        s3_client.create_bucket(Bucket=bucket)
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "BucketAlreadyOwnedByYou":
+            raise
+    for key in keys:
+        s3_client.put_object(Bucket=bucket, Key=key, Body=b"")
+
+
+class FakeRunner:
+    """s3bench compatible runner writing objects to the fake S3 and advancing the clock."""
+
+    def __init__(self, s3_client, clock, tmp_path, fail_on=None):
+        self.s3_client = s3_client
+        self.clock = clock
+        self.tmp_path = tmp_path
+        self.fail_on = fail_on
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.max_classes = 0
+        self.classes = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self.lock:
+            self.calls.append(kwargs)
+            if self.fail_on and len(self.calls) == self.fail_on:
+                raise RuntimeError("client restarted")
+            self.in_flight += kwargs["num_clients"]
+            self.classes += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.max_classes = max(self.max_classes, self.classes)
+        time.sleep(0.02)
+        if kwargs["skip_cleanup"]:
+            put_objects(self.s3_client, kwargs["bucket"],
+                        [f"{kwargs['obj_name_pref']}{num}" for num in range(kwargs["num_sample"])])
+        self.clock.advance(HOUR)
+        log = self.tmp_path / f"{kwargs['bucket']}-{kwargs['obj_size']}.log"
+        log.write_text("Errors Count:  0\n")
+        with self.lock:
+            self.in_flight -= kwargs["num_clients"]
+            self.classes -= 1
+        return [{"Operation": "Write", "Total Throughput (MB/s)": "12.5",
+                 "Total Duration (s)": "3600"}], str(log)
+
+
+def scheduler(runner, s3_client, clock, tmp_path, **kwargs):
+    """Scheduler for 1000 objects per loop with 8 clients."""
+    return WorkloadScheduler(runner, s3_client, DISTRIBUTION, 8, 1000, "test-1",
+                             checkpoint_file=str(tmp_path / "checkpoint.json"),
+                             records_file=str(tmp_path / "records.jsonl"), clock=clock,
+                             check_log=lambda path: "panic" in Path(path).read_text(),
+                             **kwargs)
+
+
+def test_allocate_clients():
+    """Budget is split by samples with at least one client per class."""
+    assert allocate_clients([("4Kb", 500), ("1Mb", 300), ("16Mb", 200)], 8) == \
+        {"4Kb": 4, "1Mb": 2, "16Mb": 1}
+    assert allocate_clients([("4Kb", 3), ("1Gb", 1)], 100) == {"4Kb": 3, "1Gb": 1}
+
+
+def test_concurrent_loops_and_records(tmp_path):
+    """Size classes overlap within the budget, loops run till the simulated end time."""
+    clock, s3_client = FakeClock(), RecordingS3()
+    runner = FakeRunner(s3_client, clock, tmp_path)
+    records = scheduler(runner, s3_client, clock, tmp_path).run(duration_in_days=0.5)
+    # each loop advances the clock 3 hours (one hour per size class)
+    assert len(runner.calls) == 4 * 3
+    assert runner.max_classes > 1 and runner.max_in_flight <= 8
+    loops = [rec for rec in records if "size" not in rec]
+    assert [rec["loop"] for rec in loops] == [0, 1, 2, 3]
+    assert loops[0]["objects"] == 1000 and loops[0]["mb_per_sec"] > 0
+    runs = [rec for rec in records if "size" in rec]
+    assert runs[0]["report"][0]["Total Throughput (MB/s)"] == "12.5"
+    with open(tmp_path / "records.jsonl") as records_file:
+        assert len(records_file.readlines()) == len(records)
+    assert not (tmp_path / "checkpoint.json").exists()
+    assert not list(tmp_path.glob("*.log"))
+
+
+def test_streaming_cleanup(tmp_path):
+    """Objects of every run are deleted page by page, listing overlaps the deletes."""
+    clock, s3_client = FakeClock(), RecordingS3(delete_delay=0.05)
+    put_objects(s3_client, "bkt", [f"other-{num}" for num in range(10)])
+    runner = FakeRunner(s3_client, clock, tmp_path)
+    sched = WorkloadScheduler(runner, s3_client, {"4Kb": 100}, 8, 2500, "test-2",
+                              buckets_created=["bkt"], clock=clock)
+    records = sched.run(duration_in_days=1 / 24)
+    assert records[0]["deleted"] == 2500
+    assert set(s3_client.buckets["bkt"]) == {f"other-{num}" for num in range(10)}
+    deletes = [event for event in s3_client.events if event[0] == "delete_start"]
+    assert [count for _, count in deletes] == [1000, 1000, 500]
+    # second page is listed before the first delete finishes
+    assert s3_client.events.index(("list", 1000), 1) < s3_client.events.index(
+        ("delete_end", 1000))
+
+
+def test_resume_from_checkpoint(tmp_path):
+    """A run crashing mid loop resumes the pending size classes and keeps its end time."""
+    clock, s3_client = FakeClock(), RecordingS3()
+    start = clock()
+    runner = FakeRunner(s3_client, clock, tmp_path, fail_on=5)
+    with pytest.raises(RuntimeError):
+        scheduler(runner, s3_client, clock, tmp_path).run(duration_in_days=0.5)
+    with open(tmp_path / "checkpoint.json") as checkpoint:
+        state = json.load(checkpoint)
+    assert state["loop"] == 1 and len(state["done"]) == 2
+    assert state["end_time"] == start + 12 * HOUR
+
+    resumed = FakeRunner(s3_client, clock, tmp_path)
+    records = scheduler(resumed, s3_client, clock, tmp_path).run(duration_in_days=10,
+                                                                 resume=True)
+    sizes = [call["obj_size"] for call in resumed.calls]
+    assert sizes[0] not in state["done"] and len(sizes) == 1 + 3 + 3
+    assert [rec["loop"] for rec in records if "size" not in rec] == [1, 2, 3]
+    assert clock() >= start + 12 * HOUR
+
+
+def test_stale_checkpoint_not_resumed(tmp_path):
+    """Checkpoints are resumed only on request and only before their end time."""
+    clock, s3_client = FakeClock(), RecordingS3()
+    with pytest.raises(RuntimeError):
+        scheduler(FakeRunner(s3_client, clock, tmp_path, fail_on=5), s3_client, clock,
+                  tmp_path).run(duration_in_days=0.5)
+    fresh = FakeRunner(s3_client, clock, tmp_path)
+    records = scheduler(fresh, s3_client, clock, tmp_path).run(duration_in_days=0.25)
+    assert len(fresh.calls) == 2 * 3 and records[0]["loop"] == 0
+
+    with pytest.raises(RuntimeError):
+        scheduler(FakeRunner(s3_client, clock, tmp_path, fail_on=2), s3_client, clock,
+                  tmp_path).run(duration_in_days=0.25)
+    clock.advance(24 * HOUR)
+    fresh = FakeRunner(s3_client, clock, tmp_path)
+    records = scheduler(fresh, s3_client, clock, tmp_path).run(duration_in_days=0.25,
+                                                               resume=True)
+    assert len(fresh.calls) == 2 * 3 and records[0]["loop"] == 0
+
+    with pytest.raises(AssertionError, match="No workload was scheduled"):
+        scheduler(FakeRunner(s3_client, clock, tmp_path), s3_client, clock,
+                  tmp_path).run(duration_in_days=0)
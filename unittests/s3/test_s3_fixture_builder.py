@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for the declarative S3 fixture builder against an in memory S3 fake."""
+
+import hashlib
+import logging
+import os
+import time
+from collections import Counter
+
+import pytest
+
+from libs.s3.s3_fixture_builder import KB
+from libs.s3.s3_fixture_builder import BucketSpec
+from libs.s3.s3_fixture_builder import FixtureManifest
+from libs.s3.s3_fixture_builder import S3FixtureBuilder
+from libs.s3.s3_fixture_builder import S3FixtureError
+from libs.s3.s3_fixture_builder import s3_fixture
+from unittests.fake_s3 import FakeS3
+
+LOGGER = logging.getLogger(__name__)
+
+LATENCY = 0.0005
+
+
+def test_build_manifest_and_teardown():
+    """Specs are materialized as described and torn down with batch deletes."""
+    s3_client = FakeS3(LATENCY)
+    specs = [BucketSpec("plain", 25, sizes={1 * KB: 3, 64 * KB: 1}),
+             BucketSpec("versioned", 10, sizes=[2 * KB], prefix="doc", versioning=True,
+                        versions=3, bucket_tags={"team": "qa"}),
+             BucketSpec("tagged", 5, tags={"env": "test", "a b": "c&d"}, acl="public-read",
+                        bucket_acl="private"),
+             BucketSpec("empty")]
+    builder = S3FixtureBuilder(s3_client, max_workers=8, verify=True)
+    manifest = builder.build(specs, seed=3)
+    assert len(manifest) == 25 + 10 * 3 + 5 and manifest.keys("empty") == []
+    assert manifest.keys("plain")[:3] == ["obj-0", "obj-1", "obj-10"]
+    sizes = Counter(ver.size for ver in manifest.entries() if ver.bucket == "plain")
+    assert set(sizes) == {1 * KB, 64 * KB} and sizes[1 * KB] > sizes[64 * KB]
+    for version in manifest.entries():
+        stored = [obj for obj in s3_client.buckets[version.bucket][version.key]
+                  if obj["version"] == version.version_id][0]
+        assert hashlib.md5(stored["data"]).hexdigest() == version.md5  # nosec
+    versions = manifest.versions("versioned", "doc-4")
+    assert len({ver.version_id for ver in versions}) == 3
+    assert manifest.latest("versioned", "doc-4").version_id == \
+        s3_client.buckets["versioned"]["doc-4"][-1]["version"]
+    assert s3_client.buckets["tagged"]["obj-2"][0]["tags"] == {"env": "test", "a b": "c&d"}
+    assert s3_client.buckets["tagged"]["obj-2"][0]["acl"] == "public-read"
+    assert s3_client.bucket_meta["versioned"]["tags"] == {"team": "qa"}
+    assert s3_client.bucket_meta["tagged"]["acl"] == "private"
+    assert s3_client.requests["GetObject"] == len(manifest)
+
+    # same seed, same data set
+    again = S3FixtureBuilder(FakeS3(latency=0)).build(specs, seed=3)
+    assert [(ver.key, ver.size, ver.md5) for ver in again.entries()] == \
+        [(ver.key, ver.size, ver.md5) for ver in manifest.entries()]
+
+    assert builder.teardown(manifest) == []
+    assert s3_client.buckets == {}
+    assert s3_client.requests["DeleteObjects"] == 3
+
+
+def test_failures_and_context_manager():
+    """Failed objects raise with a manifest which still tears down what was created."""
+    s3_client = FakeS3(latency=0)
+    s3_client.failing = {"obj-7"}
+    specs = [BucketSpec(f"bkt-{num}", 20) for num in range(2)]
+    with pytest.raises(S3FixtureError) as error:
+        with s3_fixture(s3_client, specs):
+            pass
+    assert len(error.value.manifest) == 38
+    assert sorted(fail[:2] for fail in error.value.manifest.failed) == \
+        [("bkt-0", "obj-7"), ("bkt-1", "obj-7")]
+    assert s3_client.buckets == {}
+
+    s3_client = FakeS3(latency=0)
+    with s3_fixture(s3_client, specs, max_workers=4) as manifest:
+        assert len(s3_client.buckets["bkt-1"]) == 20 == len(manifest.keys("bkt-1"))
+    assert s3_client.buckets == {}
+
+
+def serial_fixture(s3_client, bucket, objects, sizes, path):
+    """Reference: file on disk, put, get one object after another as the test libs do."""
+    s3_client.create_bucket(Bucket=bucket)
+    for num in range(objects):
+        with open(path, "wb") as obj_file:
+            obj_file.write(os.urandom(sizes[num % len(sizes)]))
+        with open(path, "rb") as obj_file:
+            s3_client.put_object(Bucket=bucket, Key=f"obj-{num}", Body=obj_file.read())
+        s3_client.get_object(Bucket=bucket, Key=f"obj-{num}")["Body"].read()
+    os.remove(path)
+
+
+def test_benchmark_10x1000(tmp_path):
+    """10 buckets x 1000 objects through the pipeline against the serial approach."""
+    sizes = [1 * KB, 4 * KB, 16 * KB]
+    start = time.perf_counter()
+    serial_fixture(FakeS3(LATENCY), "serial", 1000, sizes, str(tmp_path / "obj"))
+    serial = (time.perf_counter() - start) * 10
+
+    s3_client = FakeS3(LATENCY)
+    builder = S3FixtureBuilder(s3_client, max_workers=32, verify=True)
+    specs = [BucketSpec(f"bench-{num}", 1000, sizes=sizes) for num in range(10)]
+    manifest = builder.build(specs)
+    stats = manifest.stats
+    start = time.perf_counter()
+    assert builder.teardown(manifest) == []
+    teardown = time.perf_counter() - start
+    LOGGER.info("10x1000 objects: serial estimate %.1fs, pipelined %.1fs (%.0f objects/s), "
+                "teardown %.2fs", serial, stats["elapsed"], stats["objects_per_sec"], teardown)
+    assert stats["objects"] == 10000 and s3_client.requests["PutObject"] == 10000
+    assert stats["elapsed"] < serial / 3
+    assert s3_client.requests["DeleteObjects"] == 10 and s3_client.buckets == {}
+
+
+def test_teardown_leaves_nothing_behind():
+    """Versions put before a failure and objects not in the manifest are torn down."""
+    s3_client = FakeS3(latency=0)
+    s3_client.failing = {("GetObject", "obj-3")}
+    specs = [BucketSpec("verified", 10, versioning=True, versions=2),
+             BucketSpec("plain", 1200)]
+    with pytest.raises(S3FixtureError) as error:
+        with s3_fixture(s3_client, specs, verify=True):
+            pass
+    # the put of obj-3 succeeded before its read back failed
+    assert sorted(fail[:2] for fail in error.value.manifest.failed) == \
+        [("plain", "obj-3"), ("verified", "obj-3")]
+    assert len(error.value.manifest.versions("verified", "obj-3")) == 1
+    assert error.value.manifest.versions("plain", "obj-3")
+    assert s3_client.buckets == {}
+
+    s3_client = FakeS3(latency=0)
+    with s3_fixture(s3_client, specs) as manifest:
+        s3_client.put_object(Bucket="plain", Key="written-by-test", Body=b"data")
+        s3_client.put_object(Bucket="verified", Key="obj-0", Body=b"data")
+    assert len(manifest) == 1220 and s3_client.buckets == {}
+    # manifest batches, then one batch for the leftovers of each bucket
+    assert s3_client.requests["DeleteObjects"] == 1 + 2 + 2
+
+    # without a manifest the buckets are emptied from their listing
+    s3_client = FakeS3(latency=0)
+    builder = S3FixtureBuilder(s3_client)
+    builder.build(specs)
+    assert builder.teardown(FixtureManifest(specs)) == [] and s3_client.buckets == {}
+    assert s3_client.requests["ListObjectVersions"] == 2 + 1
+
+    s3_client = FakeS3(latency=0)
+    s3_client.failing = {("DeleteObjects", "obj-1")}
+    with pytest.raises(S3FixtureError, match="Teardown left 3 behind"):
+        with s3_fixture(s3_client, specs):
+            pass
+    assert sorted(s3_client.buckets) == ["plain", "verified"]
+    assert list(s3_client.buckets["plain"]) == ["obj-1"]
+    assert len(s3_client.buckets["verified"]["obj-1"]) == 2
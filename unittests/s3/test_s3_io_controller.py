@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""Background S3 IO controller unit tests against the in memory S3 stub."""
+
+import time
+
+import pytest
+
+from libs.s3.s3_io_controller import S3IOController
+from scripts.s3_bench.s3_stub import S3Stub
+
+
+@pytest.fixture(name="stub")
+def fixture_stub():
+    """Running S3 stub with some latency."""
+    with S3Stub(latency=0.005, seed=1) as stub:
+        yield stub
+
+
+def controller(stub, **kwargs):
+    """Controller against the stub, runs till stopped."""
+    kwargs.setdefault("mix", {"write": 60, "read": 40})
+    return S3IOController(stub.endpoint, "AK", "SK", "bkt", interval=0.1, num_clients=4,
+                          seed=3, **kwargs)
+
+
+def test_live_counters_and_stop(stub):
+    """Counters update while IO runs and stop() ends the IO process promptly."""
+    io_ctl = controller(stub).start()
+    try:
+        assert io_ctl.wait_for(ops=50, timeout=10)
+        assert io_ctl.wait_for(op="read", ops=10, timeout=10)
+        counters = io_ctl.counters()
+        assert counters["total_ops"] >= 50 and counters["errors"] == 0
+        assert counters["latency_ms"]["write"]["p50"] >= 5
+    finally:
+        start = time.monotonic()
+        report = io_ctl.stop()
+    assert time.monotonic() - start < 5
+    assert not io_ctl.is_alive()
+    assert report["Stopped"]
+    total = sum(test["Total Requests Count"] for test in report["Tests"])
+    assert total == io_ctl.counters()["total_ops"]
+
+
+def test_pause_resume(stub):
+    """No operation is issued while paused."""
+    with controller(stub) as io_ctl:
+        assert io_ctl.wait_for(ops=20, timeout=10)
+        assert io_ctl.pause(timeout=10)
+        paused_ops = io_ctl.counters()["total_ops"]
+        time.sleep(0.5)
+        assert io_ctl.counters()["total_ops"] == paused_ops
+        assert io_ctl.counters()["paused"]
+        io_ctl.resume()
+        assert io_ctl.wait_for(ops=paused_ops + 20, timeout=10)
+
+
+def test_failed_between(stub):
+    """Errors are attributed to the time window of the injected fault."""
+    with controller(stub) as io_ctl:
+        assert io_ctl.wait_for(ops=50, timeout=10)
+        fault_start = time.time()
+        stub.error_rate = 0.5
+        assert io_ctl.wait_for(errors=20, timeout=10)
+        stub.error_rate = 0
+        fault_end = time.time()
+        assert io_ctl.wait_for(ops=io_ctl.counters()["total_ops"] + 50, timeout=10)
+        assert io_ctl.failed_between(0, fault_start) == 0
+        assert io_ctl.failed_between(fault_start, fault_end + 1) >= 20
+        assert set(io_ctl.errors_between(fault_start, fault_end + 1)) == {"status code 503"}
+        assert io_ctl.ops_between(fault_start, fault_end) > 0
+
+
+def test_bounded_run_ends(stub):
+    """A run bounded by num_sample finishes by itself and wait_for does not hang."""
+    io_ctl = controller(stub, num_sample=30).start()
+    assert not io_ctl.wait_for(ops=1000, timeout=10)
+    assert io_ctl.finished and io_ctl.counters()["total_ops"] == 30
+    assert io_ctl.stop()["Tests"]
@@ -0,0 +1,175 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""k8s bootstrap stage runner tests with fake host executors."""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from scripts.k8s_cluster_setup import deploy_k8s
+from scripts.k8s_cluster_setup.stage_runner import MASTER
+from scripts.k8s_cluster_setup.stage_runner import STATE_DONE
+from scripts.k8s_cluster_setup.stage_runner import STATE_FAILED
+from scripts.k8s_cluster_setup.stage_runner import Stage
+from scripts.k8s_cluster_setup.stage_runner import StageJournal
+from scripts.k8s_cluster_setup.stage_runner import StageRunner
+from scripts.k8s_cluster_setup.stage_runner import wait_until
+
+HOSTS = ["srvnode-1", "srvnode-2", "srvnode-3", "srvnode-4"]
+
+
+class FakeExecutor:
+    """Host executor with per host latency, failing commands and applied state."""
+
+    def __init__(self, host, latency=0.0, fail=(), applied=False):
+        self.host = host
+        self.latency = latency
+        self.fail = set(fail)
+        self.applied = applied
+        self.commands = []
+
+    def run(self, cmd, exc=True):  # pylint: disable=unused-argument
+        """Sleep latency, fail commands listed in fail once."""
+        time.sleep(self.latency)
+        self.commands.append(cmd)
+        if cmd in self.fail:
+            self.fail.discard(cmd)
+            raise IOError([f"{cmd} failed on {self.host}"])
+        if cmd == "ifconfig eth0":
+            return f"eth0: flags=4163\n        inet 10.0.0.{HOSTS.index(self.host) + 1}  netmask"
+        if cmd.startswith("kubeadm token create"):
+            return "kubeadm join 10.0.0.1:6443 --token abc --discovery-token-ca-cert-hash x\n"
+        return ""
+
+    def check(self, cmd):
+        """Stage predicates hold once the host is set up."""
+        self.commands.append(cmd)
+        return self.applied
+
+
+def stages(calls):
+    """Three stages counting their runs, the stage command is what the fake runs."""
+    def step(name):
+        def run(executor, _):
+            calls[(name, executor.host)] += 1
+            executor.run(name)
+            return f"{name}@{executor.host}"
+        return run
+    return [Stage("prepare", step("prepare")), Stage("install", step("install")),
+            Stage("init", step("init"), hosts=MASTER)]
+
+
+def test_parallel_failure_and_resume(tmp_path):
+    """Hosts run concurrently, a failed host is resumed without redoing finished work."""
+    latencies = {"srvnode-1": 0.05, "srvnode-2": 0.2, "srvnode-3": 0.1, "srvnode-4": 0.15}
+    executors = {host: FakeExecutor(host, latency, fail=["install"] if host == "srvnode-3"
+                                    else ()) for host, latency in latencies.items()}
+    journal = str(tmp_path / "journal.jsonl")
+    calls = Counter()
+    runner = StageRunner(HOSTS, executors.get, journal_path=journal)
+    start = time.perf_counter()
+    assert not runner.run(stages(calls))
+    # stages of 4 hosts took as long as the slowest host, not the sum
+    assert time.perf_counter() - start < 2 * 0.2 + 0.15
+    assert runner.journal.state("srvnode-3", "install") == STATE_FAILED
+    assert runner.journal.state("srvnode-2", "install") == STATE_DONE
+    assert ("init", "srvnode-1") not in calls
+    table = runner.timing_table().splitlines()
+    assert table[0].split() == ["stage"] + HOSTS + ["wall"]
+    assert table[2].split()[3:5] == ["failed", "0.1s"]
+
+    # crash left a torn line, resume reruns the failed host only
+    with open(journal, "a") as journal_file:
+        journal_file.write('{"host": "srvnode-1", "sta')
+    calls.clear()
+    runner = StageRunner(HOSTS, executors.get, journal_path=journal)
+    assert runner.run(stages(calls))
+    assert calls == Counter({("install", "srvnode-3"): 1, ("init", "srvnode-1"): 1})
+    assert runner.context["results"]["install"]["srvnode-2"] == "install@srvnode-2"
+    table = runner.timing_table()
+    assert table.count("resumed") == 7 and "-" in table.splitlines()[3]
+    # passed run rotated its journal
+    assert not os.path.exists(journal)
+    with open(f"{journal}.done") as journal_file:
+        records = [json.loads(line) for line in journal_file if "state" in line]
+    assert Counter(record["state"] for record in records) == \
+        Counter({"running": 10, "done": 9, "failed": 1})
+    assert StageJournal(f"{journal}.done").state("srvnode-1", "init") == STATE_DONE
+
+    # redeploy onto reimaged hosts with the same hostnames runs every stage again
+    calls.clear()
+    runner = StageRunner(HOSTS, executors.get, journal_path=journal)
+    assert runner.run(stages(calls))
+    assert "resumed" not in runner.timing_table() and ("init", "srvnode-1") in calls
+
+
+def test_stage_timeout():
+    """A host hanging in a stage fails the stage once timeout expires."""
+    executors = {host: FakeExecutor(host, 2 if host == "srvnode-2" else 0) for host in HOSTS}
+    runner = StageRunner(HOSTS, executors.get, timeout=0.3)
+    calls = Counter()
+    start = time.perf_counter()
+    assert not runner.run(stages(calls))
+    assert time.perf_counter() - start < 1
+    assert runner.journal.state("srvnode-2", "prepare") == STATE_FAILED
+    assert "install" not in runner.context["results"]
+
+
+def test_deploy_stages():
+    """k8s stages on fresh hosts, then skipped by their checks on set up hosts."""
+    executors = {host: FakeExecutor(host) for host in HOSTS}
+    runner = StageRunner(HOSTS, executors.get)
+    assert runner.run(deploy_k8s.STAGES)
+    assert runner.context["results"]["host_ip"]["srvnode-4"] == "10.0.0.4"
+    assert "grep -qxF '10.0.0.3 srvnode-3' /etc/hosts || echo '10.0.0.3 srvnode-3' >> " \
+           "/etc/hosts" in executors["srvnode-2"].commands
+    init = [cmd for cmd in executors["srvnode-1"].commands if "kubeadm init" in cmd]
+    assert init and not any("kubeadm init" in cmd for cmd in executors["srvnode-2"].commands)
+    assert executors["srvnode-4"].commands[-1].startswith("kubeadm join 10.0.0.1:6443")
+    assert not any("kubeadm join" in cmd for cmd in executors["srvnode-1"].commands)
+
+    executors = {host: FakeExecutor(host, applied=True) for host in HOSTS}
+    runner = StageRunner(HOSTS, executors.get, max_parallel=2)
+    assert runner.run(deploy_k8s.STAGES)
+    assert not any("yum install" in cmd or "kubeadm join" in cmd
+                   for executor in executors.values() for cmd in executor.commands)
+    assert runner.timing_table().count("skipped") == 4 * 4 + 2 + 3
+
+
+def test_wait_nodes_ready():
+    """Node readiness is polled with growing interval until all nodes are Ready."""
+    outputs = iter(["srvnode-1   NotReady   control-plane   1m   v1.23\n",
+                    "srvnode-1   Ready   control-plane   1m   v1.23\n"
+                    "srvnode-2   NotReady   <none>   1m   v1.23\n",
+                    "srvnode-1   Ready   control-plane   1m   v1.23\n"
+                    "srvnode-2   Ready   <none>   1m   v1.23\n"])
+    executor = FakeExecutor("srvnode-1")
+    executor.run = lambda cmd, exc=True: next(outputs)
+    assert deploy_k8s.wait_nodes_ready(executor, 2, timeout=5) == ["Ready", "Ready"]
+
+    polls = []
+    event = threading.Event()
+    start = time.perf_counter()
+    assert not wait_until(lambda: polls.append(time.perf_counter()) or event.is_set(),
+                          timeout=0.5, interval=0.05, backoff=2)
+    assert 0.45 < time.perf_counter() - start < 1 and 4 <= len(polls) <= 6
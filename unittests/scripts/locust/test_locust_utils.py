@@ -0,0 +1,321 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""Locust S3 workload run headless against an in process S3 server with corrupted reads."""
+
+import hashlib
+import json
+import os
+import re
+import socket
+import subprocess  # nosec
+import sys
+import threading
+import time
+from xml.sax.saxutils import escape
+
+import pytest
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Request, Response
+
+locust = pytest.importorskip("locust")
+gevent = pytest.importorskip("gevent")
+
+OBJECT_SIZE = 64 * 1024
+
+
+class FakeS3:
+    """Path style S3 subset used by the workload, every corrupt_every-th GET is corrupted."""
+
+    def __init__(self, corrupt_every=0):
+        self.buckets = {}
+        self.corrupt_every = corrupt_every
+        self.gets = 0
+        self.puts = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        bucket, _, key = request.path.lstrip("/").partition("/")
+        with self.lock:
+            response = self.handle(request, bucket, key)
+        return response(environ, start_response)
+
+    @staticmethod
+    def body(request):
+        """Request body, aws-chunked encoding removed."""
+        data = request.get_data()
+        if "aws-chunked" in request.headers.get("Content-Encoding", ""):
+            decoded, rest = b"", data
+            while rest:
+                size, _, rest = rest.partition(b"\r\n")
+                size = int(size.split(b";")[0], 16)
+                if not size:
+                    break
+                decoded, rest = decoded + rest[:size], rest[size + 2:]
+            data = decoded
+        return data
+
+    # pylint: disable=too-many-return-statements
+    def handle(self, request, bucket, key):
+        """Apply request."""
+        if not key:
+            if request.method == "PUT":
+                self.buckets.setdefault(bucket, {})
+                return Response(status=200)
+            if request.method == "DELETE":
+                self.buckets.pop(bucket)
+                return Response(status=204)
+            if request.method == "POST":
+                for name in re.findall(rb"<Key>(.*?)</Key>", self.body(request)):
+                    self.buckets[bucket].pop(name.decode(), None)
+                return Response("<DeleteResult></DeleteResult>", mimetype="application/xml")
+            contents = "".join(f"<Contents><Key>{escape(name)}</Key><Size>{len(data)}</Size>"
+                               f"</Contents>" for name, data in
+                               sorted(self.buckets[bucket].items()))
+            return Response(f"<ListBucketResult><Name>{bucket}</Name><IsTruncated>false"
+                            f"</IsTruncated>{contents}</ListBucketResult>",
+                            mimetype="application/xml")
+        if request.method == "PUT":
+            self.puts += 1
+            data = self.body(request)
+            self.buckets[bucket][key] = data
+            return Response(status=200,
+                            headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})  # nosec
+        if request.method == "DELETE":
+            self.buckets[bucket].pop(key, None)
+            return Response(status=204)
+        data = self.buckets[bucket][key]
+        if request.method == "HEAD":
+            return Response(status=200, headers={"Content-Length": str(len(data))})
+        self.gets += 1
+        if self.corrupt_every and self.gets % self.corrupt_every == 0:
+            data = bytes([data[0] ^ 0xff]) + data[1:]
+        return Response(data, mimetype="application/octet-stream")
+
+
+@pytest.fixture(name="s3_server")
+def fixture_s3_server(monkeypatch, tmp_path):
+    """Fake S3 server and workload environment."""
+    s3_server = FakeS3(corrupt_every=5)
+    server = make_server("127.0.0.1", 0, s3_server, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    s3_server.url = f"http://127.0.0.1:{server.server_port}"
+    for name, value in {"ENDPOINT_URL": s3_server.url, "USE_SSL": "False", "CA_CERT": "False",
+                        "AWS_ACCESS_KEY_ID": "access", "AWS_SECRET_ACCESS_KEY": "secret",
+                        "AWS_DEFAULT_REGION": "us-east-1", "BUCKET_COUNT": "2",
+                        "MIN_OBJECT_SIZE": str(OBJECT_SIZE), "MAX_OBJECT_SIZE": str(OBJECT_SIZE),
+                        "LOCUST_SUMMARY_FILE": str(tmp_path / "summary.json")}.items():
+        monkeypatch.setenv(name, value)
+    yield s3_server
+    server.shutdown()
+
+
+def test_headless_run(s3_server, tmp_path, monkeypatch):
+    """Byte counts, ttfb/transfer split and checksum failures end up in the json summary."""
+    # pylint: disable=import-outside-toplevel
+    from locust import constant
+    from locust.env import Environment
+    from scripts.locust.locustfile import LocustUser
+
+    class FastUser(LocustUser):
+        """Workload user without think time."""
+        wait_time = constant(0.01)
+
+    monkeypatch.chdir(tmp_path)
+    # users finish the request in flight when stopped, so server and stats counts agree
+    env = Environment(user_classes=[FastUser], events=locust.events, host=s3_server.url,
+                      stop_timeout=5)
+    runner = env.create_local_runner()
+    runner.start(4, spawn_rate=4)
+    gevent.spawn_later(3, runner.quit)
+    runner.greenlet.join()
+    env.events.quitting.fire(environment=env, reverse=True)
+
+    with open(tmp_path / "summary.json") as summary_file:
+        summary = json.load(summary_file)
+    entries = {entry["name"]: entry for entry in summary["requests"]}
+    put = entries["put_object"]
+    assert put["num_failures"] == 0 and put["num_requests"] > 0
+    assert put["total_content_length"] == put["num_requests"] * OBJECT_SIZE
+    get = entries["download_object"]
+    # ttfb and transfer are phases, each download is one request in the totals
+    assert not [name for name in entries if ":" in name]
+    assert summary["total"]["num_requests"] == sum(entry["num_requests"]
+                                                   for entry in entries.values())
+    assert summary["total"]["total_content_length"] == sum(
+        entry["total_content_length"] for entry in entries.values())
+    phases = {entry["name"]: entry for entry in summary["phases"]}
+    transfer = phases["download_object:transfer"]
+    assert phases["download_object:ttfb"]["num_requests"] == transfer["num_requests"] == \
+        get["num_requests"]
+    assert transfer["total_content_length"] == transfer["num_requests"] * OBJECT_SIZE
+    # every 5th GET is corrupted and reported as failed download
+    assert get["num_failures"] == s3_server.gets // 5 > 0
+    assert get["num_requests"] == s3_server.gets
+    assert any("ChecksumMismatch" in error["error"] for error in summary["errors"])
+    assert summary["total"]["mb_per_sec"] > 0
+    # buckets are cleaned up and no object was written to the local disk
+    assert s3_server.buckets == {}
+    assert os.listdir(tmp_path) == ["summary.json"]
+
+
+def free_port():
+    """Free local tcp port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_distributed_step_load(s3_server, tmp_path):
+    """Master and 3 worker processes run the step load shape, worker stats add up."""
+    # pylint: disable=import-outside-toplevel
+    from scripts.locust.locust_runner import LocustCluster
+    s3_server.corrupt_every = 0
+    cluster = LocustCluster("TEST-1", s3_server.url, "scripts/locust/locustfile_step_users.py",
+                            users=1, duration="60s", workers=3, master_port=free_port(),
+                            step_load={"step_time": 1, "step_load": 2, "spawn_rate": 6,
+                                       "time_limit": 4, "max_user": 6},
+                            locust_cmd=f"{sys.executable} -m locust", log_dir=str(tmp_path))
+    start = time.perf_counter()
+    cluster.start()
+    passed, summary = cluster.wait()
+    # shape ends the run long before the run time
+    assert passed and time.perf_counter() - start < 30
+    assert len(summary["workers"]) == 3 and summary["restarts"] == 0
+    worker_totals = [worker["total"]["num_requests"] for worker in summary["workers"].values()]
+    assert all(worker_totals)
+    assert summary["merged"]["total"]["num_requests"] == sum(worker_totals) == \
+        summary["total"]["num_requests"]
+    merged = {entry["name"]: entry for entry in summary["merged"]["requests"]}
+    entries = {entry["name"]: entry for entry in summary["requests"]}
+    assert merged.keys() == entries.keys()
+    for name, entry in entries.items():
+        assert merged[name]["num_requests"] == entry["num_requests"]
+        assert merged[name]["total_content_length"] == entry["total_content_length"]
+    # users finish their requests when stopped, every object PUT is counted once
+    assert entries["put_object"]["num_requests"] == s3_server.puts
+    # phases measured on the workers reach the master summary
+    phases = {entry["name"]: entry for entry in summary["phases"]}
+    assert 0 < phases["download_object:ttfb"]["num_requests"] <= \
+        entries["download_object"]["num_requests"]
+    with open(cluster.files["log-file"]) as log:
+        steps = re.findall(r"Shape test updating to (\d+) users", log.read())
+    assert steps == ["2", "4", "6"]
+
+
+def test_distributed_worker_restart(s3_server, tmp_path):
+    """A killed worker is restarted, stats it reported before dying are kept."""
+    # pylint: disable=import-outside-toplevel
+    from scripts.locust.locust_runner import LocustCluster
+    cluster = LocustCluster("TEST-2", s3_server.url, "scripts/locust/locustfile.py", users=4,
+                            hatch_rate=4, duration="9s", workers=2, master_port=free_port(),
+                            locust_cmd=f"{sys.executable} -m locust", log_dir=str(tmp_path))
+    cluster.start()
+    time.sleep(5)
+    cluster.workers[0].process.kill()
+    _, summary = cluster.wait()
+    assert summary["restarts"] == 1 and cluster.workers[0].starts == 2
+    assert len(summary["workers"]) == 3
+    assert summary["merged"]["total"]["num_requests"] == summary["total"]["num_requests"] > 0
+    assert summary["merged"]["requests"][0]["num_requests"] == \
+        summary["requests"][0]["num_requests"]
+
+
+class LocalChannel:
+    """SSH channel running the command with local bash, stderr merged when asked to."""
+
+    def __init__(self):
+        self.proc = None
+        self.combine = False
+
+    def set_combine_stderr(self, combine):
+        """Merge stderr into stdout."""
+        self.combine = combine
+
+    def exec_command(self, cmd):
+        """Run command."""
+        self.proc = subprocess.Popen(  # nosec
+            ["bash", "-c", cmd], stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if self.combine else subprocess.PIPE)
+
+    def recv(self, size):
+        """Read stdout as it is produced, pipes are cooperative under gevent."""
+        return self.proc.stdout.read(size)
+
+    def recv_exit_status(self):
+        """Exit status of the command."""
+        return self.proc.wait()
+
+    def close(self):
+        """Release the pipe."""
+        self.proc.stdout.close()
+
+
+class LocalHost:
+    """Host whose SSH transport runs commands locally."""
+
+    def __init__(self, hostname, username, password):
+        self.hostname = hostname
+        self.credentials = username, password
+        self.host_obj = None
+
+    def connect(self):
+        """The fake is its own client and transport."""
+        self.host_obj = self
+
+    def disconnect(self):
+        """Close client."""
+        self.host_obj = None
+
+    def get_transport(self):
+        """Transport of the client."""
+        return self
+
+    @staticmethod
+    def is_active():
+        """Transport is up."""
+        return True
+
+    @staticmethod
+    def open_session():
+        """New local channel."""
+        return LocalChannel()
+
+
+def test_remote_worker_output_drained(tmp_path, monkeypatch):
+    """Output of a remote worker beyond the channel window reaches its log while it runs."""
+    # pylint: disable=import-outside-toplevel
+    from scripts.locust import locust_runner
+    monkeypatch.setattr(locust_runner, "Host", LocalHost)
+    log_file = str(tmp_path / "worker.log")
+    remote = {"hostname": "client-1", "username": "root", "password": "pass"}
+    cmd = "seq -f 'stats report %g' 200000; echo 'worker quit' >&2; sleep 2; exit 3"
+    worker = locust_runner.LocustWorker("client-1-0", cmd, log_file=log_file, remote=remote,
+                                        pattern="stats report")
+    worker.start()
+    time.sleep(1)
+    assert worker.alive() and os.path.getsize(log_file) > 2 * 1024 * 1024
+    worker.stop(timeout=10)
+    assert not worker.alive() and worker.crashed() and worker.returncode == 3
+    with open(log_file) as log:
+        lines = log.read().splitlines()
+    assert lines[-2:] == ["stats report 200000", "worker quit"]
@@ -0,0 +1,151 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""In-process S3 load generator unit tests against the in memory S3 stub."""
+
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from commons.utils.histogram_utils import LatencyHistogram
+from scripts.s3_bench import s3bench
+from scripts.s3_bench.s3_stub import S3Stub
+from scripts.s3_bench.s3loadgen import S3LoadEngine
+from scripts.s3_bench.s3loadgen import s3loadgen
+from scripts.s3_bench.s3loadgen import size_in_bytes
+
+LOGGER = logging.getLogger(__name__)
+
+
+@pytest.fixture(name="stub")
+def fixture_stub():
+    """Running S3 stub."""
+    with S3Stub(seed=1) as stub:
+        yield stub
+
+
+def engine(stub, **kwargs):
+    """Engine against the stub."""
+    kwargs.setdefault("num_clients", 8)
+    return S3LoadEngine(stub.endpoint, "AK", "SK", "bkt", seed=3, **kwargs)
+
+
+def test_histogram_percentiles():
+    """Percentiles stay within the configured relative error and survive serialization."""
+    rand = random.Random(1)
+    values = sorted(rand.lognormvariate(-5, 1.5) for _ in range(50000))
+    hist, other = LatencyHistogram(), LatencyHistogram()
+    for idx, value in enumerate(values):
+        (hist if idx % 2 else other).record(value)
+    hist = LatencyHistogram.from_dict(json.loads(json.dumps(hist.merge(other).to_dict())))
+    assert hist.count == len(values)
+    for percent in (25, 50, 90, 99, 99.9):
+        exact = values[math.ceil(len(values) * percent / 100) - 1]
+        assert abs(hist.percentile(percent) - exact) <= exact * 0.01 + 1e-6
+    assert size_in_bytes("4Kb") == 4000 and size_in_bytes("1MiB") == 1024 ** 2
+
+
+def test_s3bench_sequence(stub):
+    """Write, read with validation and cleanup as s3bench does."""
+    report = engine(stub, obj_size={"4Kb": 3, "64Kb": 1}, num_sample=300,
+                    validate=True).run()
+    assert stub.requests == {"PUT": 301, "GET": 300, "DELETE": 300}
+    assert not stub.buckets["bkt"]
+    tests = {test["Operation"]: test for test in report.to_dict()["Tests"]}
+    assert set(tests) == {"Write", "Read", "Delete"}
+    assert tests["Write"]["Errors Count"] == 0
+    assert tests["Write"]["Total Transferred (MB)"] == tests["Read"]["Total Transferred (MB)"]
+    assert tests["Read"]["Latency (ms)"]["count"] == 300
+
+
+def test_s3bench_compatible_report(stub):
+    """Log file and json response work with the existing s3bench helpers."""
+    resp, log_path = s3loadgen("AK", "SK", bucket="bkt", end_point=stub.endpoint,
+                               num_clients=4, num_sample=50, obj_size="8Kb",
+                               log_file_prefix="ut_loadgen")
+    try:
+        assert resp[0]["numSamples"] == "50" and resp[0]["bucket"] == "bkt"
+        assert not s3bench.check_log_file_error(log_path)
+        with open(os.path.splitext(log_path)[0] + ".json") as json_file:
+            assert json.load(json_file)["Tests"][0]["Total Requests Count"] == 50
+    finally:
+        os.remove(log_path)
+        os.remove(os.path.splitext(log_path)[0] + ".json")
+
+
+def test_mix_with_errors(stub):
+    """503s are counted per class and flagged by check_log_file_error."""
+    stub.error_rate = 0.2
+    load = engine(stub, mix={"write": 60, "read": 30, "delete": 10}, num_sample=500)
+    report = load.run()
+    assert sum(stat.count for stat in report.stats.values()) == 500
+    assert 50 < report.errors < 150
+    for stat in report.stats.values():
+        assert set(stat.error_classes) <= {"status code 503"}
+    text = report.to_text()
+    assert "first with error status code 503" in text
+
+
+def test_open_loop_counts_queueing(stub):
+    """With rate above capacity, latency includes the wait for a free client."""
+    stub.latency = 0.05
+    report = engine(stub, num_clients=2, mix={"write": 1}, rate=200, duration=1).run()
+    stat = report.stats["write"]
+    assert stat.count < 100
+    assert stat.hist.percentile(99) > 0.3
+
+
+def test_stop_early(stub):
+    """stop() from another thread ends an unbounded run."""
+    load = engine(stub, mix={"write": 50, "read": 50})
+    threading.Timer(0.5, load.stop).start()
+    start = time.monotonic()
+    report = load.run()
+    assert time.monotonic() - start < 5
+    assert report.to_dict()["Stopped"]
+
+
+def test_benchmark_single_core(tmp_path):
+    """ops/s achievable by one client core, stub runs in its own process."""
+    port = 18000 + os.getpid() % 1000
+    proc = subprocess.Popen([sys.executable, "-m", "scripts.s3_bench.s3_stub", "--port",
+                             str(port)], stdout=subprocess.PIPE)
+    try:
+        proc.stdout.readline()
+        load = S3LoadEngine(f"http://127.0.0.1:{port}", "AK", "SK", "bkt", obj_size="4Kb",
+                            num_clients=32, mix={"write": 1}, duration=2)
+        report = load.run()
+        ops = report.stats["write"].to_dict()
+        LOGGER.info("4Kb PUT: %.0f ops/s, p50 %.2f ms, p99 %.2f ms", ops["Ops/s"],
+                    ops["Latency (ms)"]["p50"], ops["Latency (ms)"]["p99"])
+        assert report.errors == 0
+        assert ops["Ops/s"] > 100
+    finally:
+        proc.terminate()
+        proc.wait()
+
@@ -0,0 +1,232 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for batched motr IO runner."""
+
+import os
+import stat
+import subprocess
+import time
+
+import pytest
+
+from libs.motr.motr_batch_io import BatchIOResult
+from libs.motr.motr_batch_io import MotrBatchIO
+
+BSIZE_LAYOUT = {"4K": 1, "8K": 2, "16K": 3}
+ENDPOINTS = {"hax_ep": "inet:tcp:10.0.0.1@22001",
+             "motr_client": [{"ep": "inet:tcp:10.0.0.1@21201", "fid": "0x7200000000000001:0x2a"}]}
+
+# Fake motr tools keep objects as files in FAKE_MOTR_STORE. FAKE_MOTR_FAIL holds
+# "<tool>:<bsize>" tokens: m0cp prints an ERROR, m0cat returns corrupted data.
+FAKE_TOOL = r"""#!/bin/bash
+tool=$(basename "$0")
+sleep "${FAKE_MOTR_DELAY:-0}"
+while [ $# -gt 1 ]; do
+    case $1 in
+        -o) obj=$2; shift 2;;
+        -s) bsize=$2; shift 2;;
+        -G) shift;;
+        -*) shift 2;;
+        *) break;;
+    esac
+done
+fail=0
+case " $FAKE_MOTR_FAIL " in *" $tool:$bsize "*) fail=1;; esac
+case $tool in
+    m0cp)
+        if [ $fail -eq 1 ]; then echo "motr[1234]: ERROR m0_obj_op() failed: rc=-5"; exit 0; fi
+        cp "$1" "$FAKE_MOTR_STORE/$obj";;
+    m0cat)
+        cp "$FAKE_MOTR_STORE/$obj" "$1"
+        if [ $fail -eq 1 ]; then echo corrupt >> "$1"; fi;;
+    m0unlink)
+        rm "$FAKE_MOTR_STORE/$obj";;
+esac
+"""
+
+
+class FakeNode:
+    """Fake master node which runs the shipped script with local bash and fake motr tools."""
+
+    def __init__(self, root):
+        self.root = root
+        self.calls = []
+        self.store = os.path.join(root, "store")
+        self.bin = os.path.join(root, "bin")
+        os.makedirs(self.store)
+        os.makedirs(self.bin)
+        for tool in ("m0cp", "m0cat", "m0unlink"):
+            path = os.path.join(self.bin, tool)
+            with open(path, "w") as fobj:
+                fobj.write(FAKE_TOOL)
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        self.fail = ""
+        self.delay = "0"
+        self.channel = None
+
+    def write_file(self, fpath, content):
+        """sftp write on master node."""
+        self.calls.append("write_file")
+        with open(fpath, "w") as fobj:
+            fobj.write(content)
+
+    def copy_file_to_container(self, local_file_path, pod_name, container_path, container_name):
+        """kubectl cp, master node and container share the directory here."""
+        self.calls.append("copy_file_to_container")
+        assert local_file_path == container_path
+        return True, b""
+
+    def get_transport(self):
+        """The fake is its own SSH client and transport."""
+        return self
+
+    @property
+    def host_obj(self):
+        """Connected SSH client."""
+        return self
+
+    @staticmethod
+    def is_active():
+        """Transport is up."""
+        return True
+
+    def open_session(self):
+        """Channel running kubectl exec commands with local bash."""
+        self.calls.append("exec")
+        self.channel = FakeChannel(self)
+        return self.channel
+
+
+class FakeChannel:
+    """SSH channel running the command after "--" of kubectl exec as a local process."""
+
+    def __init__(self, node):
+        self.node = node
+        self.proc = None
+
+    def settimeout(self, timeout):
+        """Reads block, timeout is not simulated."""
+
+    def exec_command(self, cmd):
+        """kubectl exec."""
+        assert cmd.startswith("kubectl exec cortx-client-0 -n cortx -c ")
+        env = dict(os.environ, PATH=f"{self.node.bin}:{os.environ['PATH']}",
+                   FAKE_MOTR_STORE=self.node.store, FAKE_MOTR_FAIL=self.node.fail,
+                   FAKE_MOTR_DELAY=self.node.delay)
+        self.proc = subprocess.Popen(cmd.split(" -- ", 1)[1].split(), env=env,
+                                     stdout=subprocess.PIPE)
+
+    def recv(self, size):
+        """Read stdout as it is produced."""
+        return os.read(self.proc.stdout.fileno(), size)
+
+    def close(self):
+        """Reap the process."""
+        self.proc.stdout.close()
+        self.proc.wait()
+
+
+@pytest.fixture(name="runner")
+def fixture_runner(tmp_path):
+    """Batch runner on a fake node."""
+    node = FakeNode(str(tmp_path))
+    return MotrBatchIO(node, "cortx-client-0", ENDPOINTS, "0x7000000000000001:0x0",
+                       work_dir=str(tmp_path))
+
+
+def test_single_exec_success(runner):
+    """Whole matrix runs with one write, one copy and one exec."""
+    result = runner.run(BSIZE_LAYOUT, [1, 2])
+    assert runner.node_obj.calls == ["write_file", "copy_file_to_container", "exec"]
+    assert result.ok, result.failures
+    objects = result.object_dict()
+    assert len(objects) == 6
+    for obj, entry in objects.items():
+        assert entry["deleted"]
+        assert len(entry["md5sum"]) == 32
+        assert result.steps[obj]["md5sum"]["md5_in"] == entry["md5sum"]
+    assert set(result.timings()) == {"dd", "m0cp", "m0cat", "md5sum", "m0unlink"}
+    assert not os.listdir(runner.node_obj.store)
+
+
+def test_steps_streamed(runner):
+    """Step results are received while the script still runs."""
+    runner.node_obj.delay = "0.1"
+    received = []
+
+    def on_step(record):
+        received.append((record["step"], runner.node_obj.channel.proc.poll(),
+                         time.monotonic()))
+
+    result = runner.run({"4K": 1, "8K": 2}, [1], on_step=on_step)
+    assert result.ok, result.failures
+    assert [step for step, _, _ in received] == ["dd", "m0cp", "m0cat", "md5sum",
+                                                 "m0unlink"] * 2
+    assert all(exit_code is None for _, exit_code, _ in received)
+    assert received[-1][2] - received[0][2] > 0.4
+
+
+def test_script_semantics(runner):
+    """Commands are rendered from the command templates and script is valid bash."""
+    plan = runner.plan({"4K": 1}, [3], run_m0cat=False, delete_objs=False)
+    script = runner.render_script(plan)
+    obj = plan[0]["obj"]
+    assert f"run_step {obj} m0cp m0cp -l inet:tcp:10.0.0.1@21201 -H inet:tcp:10.0.0.1@22001 " \
+           f"-P 0x7200000000000001:0x2a -p 0x7000000000000001:0x0 -s 4k -c 3 -o {obj} -L 1 " \
+           in script
+    assert f"run_step {obj} m0cat" not in script and f"md5_step {obj}" not in script
+    assert plan[0]["steps"] == ["dd", "m0cp"]
+    script_path = os.path.join(runner.work_dir, "check.sh")
+    with open(script_path, "w") as fobj:
+        fobj.write(script)
+    assert subprocess.run(["bash", "-n", script_path], check=False).returncode == 0
+
+
+def test_partial_failure(runner):
+    """Failed m0cp and corrupted m0cat are reported per object, other objects proceed."""
+    runner.node_obj.fail = "m0cp:8k m0cat:16k"
+    result = runner.run(BSIZE_LAYOUT, [1])
+    assert result.complete and not result.ok
+    by_size = {item["block_size"]: item["obj"] for item in result.plan}
+    failures = result.failures
+    assert set(failures) == {by_size["8K"], by_size["16K"]}
+    step, reason = failures[by_size["8K"]]
+    assert step == "m0cp" and "ERROR m0_obj_op() failed" in reason
+    assert "m0cat" not in result.steps[by_size["8K"]]
+    assert failures[by_size["16K"]][0] == "md5sum"
+    objects = result.object_dict()
+    assert objects[by_size["4K"]]["deleted"]
+    assert not objects[by_size["8K"]]["deleted"]
+
+
+def test_truncated_output(runner):
+    """Output cut mid line is parsed up to the cut and reported incomplete."""
+    result = runner.run(BSIZE_LAYOUT, [1])
+    lines = [f"MOTR_IO_RESULT {{\"obj\":\"{obj}\",\"step\":\"{step}\",\"rc\":0,"
+             f"\"start_ns\":1,\"end_ns\":2,\"md5_in\":\"a\",\"md5_out\":\"a\"}}"
+             for obj, steps in result.steps.items() for step in steps]
+    output = "m0cp: some tool noise\n" + "\n".join(lines[:7]) + "\n" + lines[7][:20]
+    partial = BatchIOResult.parse(result.plan, output.encode())
+    assert not partial.complete and not partial.ok
+    first = result.plan[0]["obj"]
+    assert first not in partial.failures
+    assert partial.failures[result.plan[1]["obj"]] == ("m0cat", "not run")
+    assert partial.failures[result.plan[2]["obj"]] == ("dd", "not run")
@@ -0,0 +1,115 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""Password manager tests: legacy compatibility, v2 tamper detection, caching, rotation."""
+
+import base64
+import logging
+import time
+
+import pytest
+import yaml
+
+from commons import configmanager
+from commons import pswdmanager
+
+LOGGER = logging.getLogger(__name__)
+
+KEY = "test-key"
+# encrypted with KEY by the AES-CBC only implementation
+LEGACY = {"Seagate@1": "imLMh5MYtIq0KoTsCSyF9oPEDlpm8NapfWhKn+jjDfE=",
+          "one": "mziV83V9iHPuZ3h/7PmdhtYSBhfASbfhcL8dkS6dPPM="}
+
+
+@pytest.fixture(autouse=True, name="key")
+def fixture_key(monkeypatch):
+    """KEY secret in environment and empty caches."""
+    monkeypatch.setenv("KEY", KEY)
+    pswdmanager.derive_keys.cache_clear()
+    pswdmanager._decrypt.cache_clear()  # pylint: disable=protected-access
+    return KEY
+
+
+def test_legacy_and_v2():
+    """Legacy values still decrypt, v2 values are authenticated."""
+    for secret, legacy in LEGACY.items():
+        assert pswdmanager.decrypt(legacy) == secret
+        assert pswdmanager.decrypt(pswdmanager.encrypt(secret, version=1)) == secret
+    first, second = pswdmanager.encrypt("Seagate@1"), pswdmanager.encrypt("Seagate@1")
+    assert first.startswith("v2:") and first != second
+    assert pswdmanager.decrypt(first) == pswdmanager.decrypt(second) == "Seagate@1"
+
+    data = bytearray(base64.b64decode(first[3:]))
+    for pos in (0, 13, len(data) - 1):
+        tampered = bytearray(data)
+        tampered[pos] ^= 1
+        with pytest.raises(ValueError):
+            pswdmanager.decrypt("v2:" + base64.b64encode(tampered).decode())
+    with pytest.raises(ValueError):
+        pswdmanager.decrypt(first, key="other-key")
+
+
+def test_config_load_caches_key_and_values(tmp_path):
+    """Key is derived once, every distinct value is decrypted once."""
+    values = [pswdmanager.encrypt(f"secret-{num}") for num in range(20)] + \
+        list(LEGACY.values())
+    config = {f"setup-{num}": {"password": values[num % len(values)],
+                               "node": {"host": "srv", "passwd": values[(num + 1) %
+                                                                        len(values)]},
+                               "list_of_passwords": values[:3]} for num in range(300)}
+    for num in range(3):
+        (tmp_path / f"cfg{num}.yaml").write_text(yaml.safe_dump(config))
+    start = time.perf_counter()
+    loaded = [configmanager.get_config_yaml(str(tmp_path / f"cfg{num}.yaml"))
+              for num in range(3)]
+    LOGGER.info("3 configs with %s encrypted values each loaded in %.3fs",
+                300 * 5, time.perf_counter() - start)
+    assert loaded[0]["setup-20"]["password"] == "Seagate@1"
+    assert loaded[2]["setup-0"]["list_of_passwords"] == ["secret-0", "secret-1", "secret-2"]
+    assert pswdmanager.derive_keys.cache_info().misses == 1
+    cache = pswdmanager._decrypt.cache_info()  # pylint: disable=protected-access
+    assert cache.misses == len(values) and cache.hits == 3 * 300 * 5 - len(values)
+
+
+def test_reencrypt_and_rotate(tmp_path, monkeypatch, capsys):
+    """Config yaml is re-encrypted in place as v2, then rotated to a new key."""
+    path = tmp_path / "cfg.yaml"
+    path.write_text(f"# csm users\nadmin:\n  username: admin\n  password: "
+                    f"'{LEGACY['Seagate@1']}'  # default\n"
+                    f"users:\n  list_of_passwords:\n  - {LEGACY['one']}\n"
+                    f"  - {LEGACY['Seagate@1']}\n")
+    assert pswdmanager.main(["reencrypt", str(tmp_path / "*.yaml"), "--dry_run"]) == 0
+    assert LEGACY["one"] in path.read_text()
+    assert pswdmanager.reencrypt_file(str(path)) == 2
+    text = path.read_text()
+    assert "# csm users" in text and "  # default" in text and LEGACY["one"] not in text
+    data = yaml.safe_load(text)
+    assert data["admin"]["password"].startswith("v2:")
+    assert pswdmanager.reencrypt_file(str(path)) == 0
+    assert configmanager.get_config_yaml(str(path))["users"]["list_of_passwords"] == \
+        ["one", "Seagate@1"]
+
+    monkeypatch.setenv("NEW_KEY", "new-key")
+    assert pswdmanager.main(["reencrypt", str(path), "--rotate"]) == 0
+    assert "2 values in 1 files" in capsys.readouterr().out
+    rotated = yaml.safe_load(path.read_text())["admin"]["password"]
+    assert pswdmanager.decrypt(rotated, key="new-key") == "Seagate@1"
+    with pytest.raises(ValueError):
+        pswdmanager.decrypt(rotated)
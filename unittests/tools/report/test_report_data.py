@@ -0,0 +1,153 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""
+Report data layer tests on mongomock.
+
+Golden csv files were generated with the previous per cell count_documents/find_documents
+implementation on the same data set.
+"""
+
+import csv
+import io
+import logging
+import os
+import random
+import sys
+import time
+
+import mongomock
+import pytest
+
+REPORT_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "tools", "report")
+sys.path.insert(0, os.path.abspath(REPORT_DIR))
+
+# pylint: disable=wrong-import-position,import-error
+import engg_report_csv  # noqa: E402
+import exec_report_csv  # noqa: E402
+import mongodb_api  # noqa: E402
+from report_data import PerfReportData  # noqa: E402
+
+LOGGER = logging.getLogger(__name__)
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+URI = "mongodb://perfdb.example.com:27017"
+DB_NAME, COLLECTION = "performance_db", "results"
+SIZES = ["1Kb", "4Kb", "256Kb", "100Kb", "1Mb", "5Mb", "16Mb", "36Mb", "64Mb", "128Mb",
+         "256Mb"]
+
+
+def perf_documents():
+    """Deterministic perf results: two builds, duplicates, gaps and missing fields."""
+    rand = random.Random(7)
+    docs = []
+    for build in ("531", "532"):
+        for branch in ("main", "stable"):
+            for name, ops, configs in (
+                    ("S3bench", ["Write", "Read", "PutObjTag", "GetObjTag", "HeadObj"],
+                     [(1, 1)]),
+                    ("Hsbench", ["write", "read"], [(1, 100), (10, 100), (50, 100)]),
+                    ("Cosbench", ["write", "read"], [(1, 100), (10, 100), (50, 100)])):
+                for operation in ops:
+                    for size in SIZES:
+                        for buckets, sessions in configs:
+                            for _ in range(rand.choice([0, 1, 1, 1, 2])):
+                                doc = {"Build": build, "Branch": branch, "Name": name,
+                                       "Operation": operation, "Object_Size": size,
+                                       "Buckets": buckets, "Sessions": sessions,
+                                       "Throughput": rand.uniform(0.5, 3000),
+                                       "IOPS": rand.uniform(0.5, 20000),
+                                       "Latency": {"Avg": rand.uniform(0.0001, 5),
+                                                   "Max": rand.uniform(5, 10)},
+                                       "TTFB": {"Avg": rand.uniform(0.0001, 2)},
+                                       "Count_of_Servers": rand.choice([1, 3]),
+                                       "Log_File": "x" * 200}
+                                if name != "S3bench":
+                                    doc["Latency"] = rand.uniform(1, 500)
+                                for field in ("IOPS", "TTFB", "Count_of_Servers"):
+                                    if rand.random() < 0.1:
+                                        doc.pop(field)
+                                docs.append(doc)
+    return docs
+
+
+@pytest.fixture(name="perf_db")
+def fixture_perf_db(monkeypatch):
+    """Perf DB on mongomock with round trips counted per API call."""
+    monkeypatch.setattr(mongodb_api, "MongoClient", mongomock.MongoClient)
+    mongodb_api.close_clients()
+    mongodb_api.get_client(URI)[DB_NAME][COLLECTION].insert_many(perf_documents())
+    calls = {"count": 0}
+    for func in ("count_documents", "find_documents", "aggregate"):
+        original = getattr(mongodb_api, func)
+
+        def counted(*args, _original=original, **kwargs):
+            calls["count"] += 1
+            return _original(*args, **kwargs)
+        monkeypatch.setattr(mongodb_api, func, counted)
+    yield calls
+    mongodb_api.close_clients()
+
+
+def to_csv(data):
+    """Rows as written by the report csv writer."""
+    out = io.StringIO()
+    csv.writer(out).writerows(data)
+    return out.getvalue()
+
+
+def golden(name):
+    """Golden csv content."""
+    with open(os.path.join(GOLDEN_DIR, name), newline="") as golden_file:
+        return golden_file.read()
+
+
+@pytest.mark.parametrize("build,branch", [("531", "main"), ("532", "stable")])
+def test_tables_match_golden(perf_db, build, branch):
+    """Aggregated tables are identical to the per cell query output."""
+    _ = perf_db
+    args = (URI, DB_NAME, COLLECTION)
+    tables = {
+        "exec_single_bucket": exec_report_csv.get_single_bucket_perf_data(build, *args),
+        "engg_single_bucket": engg_report_csv.get_single_bucket_perf_stats(build, branch, *args),
+        "engg_multi_bucket": engg_report_csv.get_multiple_bucket_perf_stats(build, branch,
+                                                                            *args),
+        "engg_metadata": engg_report_csv.get_metadata_latencies(build, *args),
+    }
+    assert len(tables["engg_multi_bucket"]) == 38
+    for name, data in tables.items():
+        assert to_csv(data) == golden(f"{name}_{build}_{branch}.csv"), name
+
+
+def test_round_trips(perf_db):
+    """One aggregation per table instead of two queries per cell."""
+    report = PerfReportData(URI, DB_NAME, COLLECTION)
+    start = time.perf_counter()
+    report.single_bucket_perf_data("531")
+    report.single_bucket_perf_stats("531", "main")
+    report.multiple_bucket_perf_stats("531", "main")
+    report.metadata_latencies("531")
+    elapsed = time.perf_counter() - start
+    assert perf_db["count"] == report.round_trips == 4
+    # Per cell implementation: 2 queries for each of 8 + 80 + 360 + 3 cells
+    per_cell = 2 * (8 + 80 + 360 + 3)
+    LOGGER.info("report tables: %s round trips in %.3fs, per cell implementation needed %s",
+                report.round_trips, elapsed, per_cell)
+    assert len(mongodb_api._CLIENTS) == 1  # pylint: disable=protected-access
@@ -0,0 +1,214 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""Test plan clone engine tests against a fake JIRA/Xray server with injected failures."""
+
+import json
+import os
+import re
+import sys
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Request, Response
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..",
+                                                "tools", "clone_test_plan")))
+# pylint: disable=wrong-import-position
+from clone_engine import CloneError, CloneEngine  # noqa: E402
+
+TP_INFO = {"build": "531", "build_branch": "main", "setup_type": "default", "platform": "VM",
+           "nodes": "3", "server_type": "HPE", "enclosure_type": "5U84",
+           "affect_version": "LR-R2", "fix_version": "LR-R2", "product_family": "K8",
+           "core_category": "NA", "tp_labels": ["k8s"]}
+
+
+class FakeJira:
+    """
+    Fake JIRA/Xray. faults: [(method, path regex, mode, count)], mode "fail" returns 503
+    without applying the request, "lost" applies it and returns 502.
+    """
+
+    def __init__(self, num_tes=3, num_tests=12):
+        self.lock = threading.Lock()
+        self.faults = []
+        self.requests = []
+        self.next_key = 5000
+        self.issues = {"TEST-1": {"summary": "TP", "components": [{"name": "CFT"}],
+                                  "fixVersions": [], "versions": []},
+                       "TEST-99": {"summary": "Clone request"}}
+        self.plan_tes = {"TEST-1": []}
+        self.plan_tests = {}
+        self.te_tests = {}
+        for te_num in range(num_tes):
+            te_key = f"TEST-{10 + te_num}"
+            self.issues[te_key] = {"summary": f"TE {te_num}", "labels": ["auto"],
+                                   "components": [{"name": "S3"}]}
+            self.plan_tes["TEST-1"].append(te_key)
+            self.te_tests[te_key] = []
+            for num in range(num_tests):
+                test = f"TEST-{1000 * (te_num + 1) + num}"
+                # every 5th test is HW only, not valid for VM test plan
+                self.issues[test] = {"customfield_22982": ["HW"] if num % 5 == 4 else None,
+                                     "environment": "3Node", "customfield_21085": None}
+                self.te_tests[te_key].append(test)
+
+    def created(self, issuetype):
+        """Keys of issues created of given type."""
+        return [key for key, fields in self.issues.items()
+                if fields.get("issuetype", {}).get("name") == issuetype]
+
+    @staticmethod
+    def reply(body, status=200):
+        """Json response."""
+        return Response(json.dumps(body), status=status, mimetype="application/json")
+
+    def fault(self, method, path):
+        """Consume matching injected fault."""
+        for num, (f_method, pattern, mode, count) in enumerate(self.faults):
+            if f_method == method and re.fullmatch(pattern, path) and count:
+                self.faults[num] = (f_method, pattern, mode, count - 1)
+                return mode
+        return None
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        path = request.path.strip("/")
+        with self.lock:
+            self.requests.append((request.method, path))
+            mode = self.fault(request.method, path)
+            if mode == "fail":
+                response = self.reply({"error": "unavailable"}, 503)
+            else:
+                response = self.handle(request, path)
+                if mode == "lost":
+                    response = self.reply({"error": "bad gateway"}, 502)
+        return response(environ, start_response)
+
+    # pylint: disable=too-many-return-statements
+    def handle(self, request, path):
+        """Apply request."""
+        body = request.get_json(silent=True)
+        if request.method == "POST" and path == "rest/api/2/issue":
+            key = f"TEST-{self.next_key}"
+            self.next_key += 1
+            self.issues[key] = body["fields"]
+            return self.reply({"key": key}, 201)
+        match = re.fullmatch(r"rest/api/2/issue/([^/]+)(/comment)?", path)
+        if match and match.group(2):
+            self.issues[match.group(1)].setdefault("comments", []).append(body["body"])
+            return self.reply({}, 201)
+        if match:
+            return self.reply({"key": match.group(1), "fields": self.issues[match.group(1)]})
+        if path == "rest/api/2/search":
+            keys = re.search(r"key in \((.*)\)", body["jql"])
+            if keys:
+                keys = keys.group(1).split(",")
+            else:
+                keys = self.created(re.search(r'issuetype = "([^"]+)"', body["jql"]).group(1))
+            issues = [{"key": key, "fields": {field: self.issues[key].get(field)
+                                              for field in body["fields"]}} for key in keys]
+            page = issues[body["startAt"]:body["startAt"] + body["maxResults"]]
+            return self.reply({"issues": page, "total": len(issues)})
+        match = re.fullmatch(
+            r"rest/raven/1.0/api/(testplan|testexec)/([^/]+)/(test|testexecution)", path)
+        store = {("testplan", "testexecution"): self.plan_tes, ("testplan", "test"):
+                 self.plan_tests, ("testexec", "test"): self.te_tests}[match.group(1, 3)]
+        items = store.setdefault(match.group(2), [])
+        if request.method == "POST":
+            items.extend(item for item in body["add"] if item not in items)
+            return self.reply([])
+        limit = int(request.args.get("limit", 100))
+        page = int(request.args.get("page", 1))
+        return self.reply([{"key": key} for key in items[(page - 1) * limit:page * limit]])
+
+
+@pytest.fixture(name="jira")
+def fixture_jira():
+    """Fake JIRA served in a thread."""
+    jira = FakeJira()
+    server = make_server("127.0.0.1", 0, jira, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    jira.url = f"http://127.0.0.1:{server.server_port}/"
+    yield jira
+    server.shutdown()
+
+
+def cloner(jira, journal, retries=5):
+    """Clone engine against fake JIRA."""
+    return CloneEngine(str(journal), ("user", "pass"), jira_url=jira.url, max_workers=4,
+                          chunk_size=4, retries=retries, base_delay=0.001, max_delay=0.01)
+
+
+def assert_cloned(jira, new_tp):
+    """One test plan, one TE per source TE with the valid tests, all linked."""
+    assert jira.created("Test Plan") == [new_tp]
+    new_tes = jira.created("Test Execution")
+    assert len(new_tes) == 3
+    assert sorted(jira.plan_tes[new_tp]) == sorted(new_tes)
+    valid = [test for te in ("TEST-10", "TEST-11", "TEST-12") for test in jira.te_tests[te]
+             if jira.issues[test]["customfield_22982"] is None]
+    assert sorted(jira.plan_tests[new_tp]) == sorted(valid)
+    for new_te in new_tes:
+        old_te = re.search(r"Cloned from: (\S+)", jira.issues[new_te]["description"]).group(1)
+        assert sorted(jira.te_tests[new_te]) == \
+            sorted(test for test in jira.te_tests[old_te] if test in valid)
+
+
+def test_clone_with_transient_failures(jira, tmp_path):
+    """Retried steps and a create with lost response leave no duplicates."""
+    jira.faults = [("POST", "rest/api/2/issue", "lost", 1),
+                   ("POST", r"rest/raven/1.0/api/testexec/.*/test", "fail", 2),
+                   ("POST", "rest/api/2/search", "fail", 1)]
+    clone = cloner(jira, tmp_path / "clone.journal")
+    clone.plan("TEST-1", TP_INFO, ["TEST-10", "TEST-11", "TEST-12"], skip_tes=["TEST-12"],
+               comment_jira="TEST-99")
+    validations = [req for req in jira.requests if req == ("POST", "rest/api/2/search")]
+    assert len(validations) == 2  # one bulk query and its retry
+    new_tp, cloned = clone.run()
+    assert_cloned(jira, new_tp)
+    assert [old for _, old in cloned] == ["TEST-10", "TEST-11"]
+    assert new_tp in jira.issues["TEST-99"]["comments"][0]
+
+
+def test_resume_after_crash(jira, tmp_path):
+    """A clone failing midway is finished by resuming its journal."""
+    journal = tmp_path / "clone.journal"
+    clone = cloner(jira, journal, retries=1)
+    clone.plan("TEST-1", TP_INFO, ["TEST-10", "TEST-11", "TEST-12"])
+    jira.faults = [("POST", "rest/api/2/issue", None, 2),
+                   ("POST", "rest/api/2/issue", "lost", 1),
+                   ("POST", r"rest/api/2/search", "fail", 10)]
+    with pytest.raises(CloneError, match="--resume"):
+        clone.run()
+    # the lost create was applied but could not be recovered while search was failing
+    assert len(jira.created("Test Execution")) == 3
+
+    jira.faults = [("POST", r"rest/raven/1.0/api/testplan/.*/testexecution", "fail", 10)]
+    with pytest.raises(CloneError):
+        cloner(jira, journal, retries=1).run()
+    assert len(jira.created("Test Execution")) == 3
+
+    jira.faults = []
+    new_tp, cloned = cloner(jira, journal).run()
+    assert_cloned(jira, new_tp)
+    assert len(cloned) == 3
@@ -0,0 +1,118 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""
+CMI calculation tests replaying a recorded Jira session.
+
+expected_cmi in the recording was computed with the previous per feature implementation
+(four testPlanTests searches per feature and one issue fetch per defect) on the same data.
+"""
+
+import json
+import math
+import os
+import sys
+
+import pytest
+
+TOOLS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "tools"))
+RECORDING = os.path.join(os.path.dirname(__file__), "fixtures", "cmi_jira_recording.json")
+
+
+class RecordedResponse:
+    """Minimal requests.Response replaying a recorded body."""
+
+    def __init__(self, body):
+        self.status_code = 200 if body is not None else 404
+        self.text = json.dumps(body)
+        self._body = body
+
+    def json(self):
+        """Recorded json body."""
+        return self._body
+
+
+class RecordedSession:
+    """requests.Session replaying recorded Jira requests and counting them."""
+
+    def __init__(self, recording):
+        self.recording = recording
+        self.requests = []
+
+    def _replay(self, method, url, key, value):
+        self.requests.append((method, url))
+        for entry in self.recording:
+            if entry["method"] == method and entry["url"] == url and entry.get(key) == value:
+                return RecordedResponse(entry["response"])
+        return RecordedResponse(None)
+
+    def get(self, url, params=None):
+        """Replay GET."""
+        return self._replay("GET", url, "params", params)
+
+    def post(self, url, json=None):  # pylint: disable=redefined-outer-name
+        """Replay POST."""
+        return self._replay("POST", url, "body", json)
+
+
+@pytest.fixture(name="cmi_calc")
+def fixture_cmi_calc(monkeypatch):
+    """cmi_calc module, imported from tools like the script runs."""
+    monkeypatch.chdir(TOOLS_DIR)
+    monkeypatch.syspath_prepend(TOOLS_DIR)
+    # pylint: disable=import-outside-toplevel,import-error
+    import cmi_calc
+    yield cmi_calc
+    sys.modules.pop("cmi_calc", None)
+
+
+@pytest.fixture(name="recording")
+def fixture_recording():
+    """Recorded Jira session."""
+    with open(RECORDING) as rec_file:
+        return json.load(rec_file)
+
+
+def test_cmi_identical_with_bulk_requests(cmi_calc, recording):
+    """CMI equals the per feature implementation with O(1 + defects/page) requests."""
+    session = RecordedSession(recording["requests"])
+    plan_data = cmi_calc.fetch_test_plan_data(recording["test_plan"], session)
+    assert math.isclose(cmi_calc.calculate_cmi(plan_data), recording["expected_cmi"])
+    executions = [entry for entry in session.requests if "/testexec/" in entry[1]]
+    defect_pages = math.ceil(len(plan_data["priorities"]) / cmi_calc.DEFECT_BATCH_SIZE)
+    # 4 test plan searches, 1 test execution list, execution pages, defect batches
+    assert len(session.requests) == 4 + 1 + len(executions) + defect_pages
+    assert len(session.requests) == len(recording["requests"]) - 1
+
+
+def test_cache_keyed_by_updated_time(cmi_calc, recording, tmp_path):
+    """Cached data is reused until the test plan updated time changes."""
+    tp_id = recording["test_plan"]
+    session = RecordedSession(recording["requests"])
+    first = cmi_calc.load_test_plan_data(tp_id, "2022-03-01T10:20:30.000+0530", session,
+                                         cache_dir=str(tmp_path))
+    fetched = len(session.requests)
+    assert cmi_calc.load_test_plan_data(tp_id, "2022-03-01T10:20:30.000+0530", session,
+                                        cache_dir=str(tmp_path)) == first
+    assert len(session.requests) == fetched
+    cmi_calc.load_test_plan_data(tp_id, "2022-03-02T08:00:00.000+0530", session,
+                                 cache_dir=str(tmp_path))
+    assert len(session.requests) == 2 * fetched
+    assert len(os.listdir(tmp_path)) == 2
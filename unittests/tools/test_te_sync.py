@@ -0,0 +1,199 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""
+Incremental JIRA to DB sync tests.
+
+The REST server (rest_app on mongomock) and a fake JIRA are served over HTTP in threads.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+
+import mongomock
+import pytest
+from flask import Flask
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Request, Response
+
+TOOLS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "tools"))
+REST_DIR = os.path.join(TOOLS_DIR, "rest_server")
+
+
+class FakeJira:
+    """WSGI app serving issue, Xray list and search endpoints from a mutable dataset."""
+
+    def __init__(self, num_executions=2, num_tests=105):
+        self.plans = {"TEST-1": {"labels": ["R2"], "customfield_22980": ["531"],
+                                 "customfield_22981": ["main"], "customfield_22982": ["VM"],
+                                 "customfield_22983": ["HPE"], "customfield_22984": ["5U84"]}}
+        self.executions = {}
+        self.issues = {}
+        for te_num in range(num_executions):
+            te_key = f"TEST-{100 + te_num}"
+            self.issues[te_key] = {"labels": [f"TE{te_num}"],
+                                   "components": [{"name": "CFT"}]}
+            self.executions[te_key] = []
+            for num in range(num_tests):
+                key = f"TEST-{1000 * (te_num + 1) + num}"
+                self.issues[key] = {"summary": f"test {key}", "labels": ["S3"],
+                                    "customfield_21087": {"value": "IO"},
+                                    "customfield_22881": ["F-1"], "customfield_22882": None,
+                                    "customfield_20981": {"value": "Automated"}}
+                self.executions[te_key].append(
+                    {"key": key, "status": ["PASS", "FAIL", "TODO"][num % 3],
+                     "startedOn": "2022-03-01T10:00:00+05:30",
+                     "defects": [{"key": "EOS-1"}] if num % 3 == 1 else []})
+
+    @staticmethod
+    def reply(body, status=200):
+        """Json response."""
+        return Response(json.dumps(body), status=status, mimetype="application/json")
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        path = request.path.strip("/")
+        match = re.fullmatch(r"rest/api/2/issue/(.+)", path)
+        if match:
+            fields = self.plans.get(match.group(1)) or self.issues.get(match.group(1))
+            response = self.reply({"fields": fields}) if fields else self.reply({}, 404)
+        elif re.fullmatch(r"rest/raven/1.0/api/testplan/(.+)/testexecution", path):
+            response = self.reply([{"key": key} for key in self.executions])
+        elif re.fullmatch(r"rest/raven/1.0/api/testexec/(.+)/test", path):
+            tests = self.executions[path.split("/")[-2]]
+            limit, page = int(request.args["limit"]), int(request.args["page"])
+            response = self.reply(tests[(page - 1) * limit:page * limit])
+        elif path == "rest/api/2/search":
+            body = request.get_json()
+            keys = re.search(r"key in \((.*)\)", body["jql"]).group(1).split(",")
+            response = self.reply({"issues": [
+                {"key": key, "fields": {field: self.issues[key].get(field)
+                                        for field in body["fields"]}} for key in keys]})
+        else:
+            response = self.reply({}, 404)
+        return response(environ, start_response)
+
+
+class Server:
+    """Serve a WSGI app in a thread and count requests per path."""
+
+    def __init__(self, app):
+        self.calls = []
+        self.server = make_server("127.0.0.1", 0, self._count(app), threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def _count(self, app):
+        def wrapper(environ, start_response):
+            self.calls.append((environ["REQUEST_METHOD"], environ["PATH_INFO"]))
+            return app(environ, start_response)
+        return wrapper
+
+    def close(self):
+        """Stop server."""
+        self.server.shutdown()
+
+
+@pytest.fixture(name="modules", scope="module")
+def fixture_modules():
+    """Import rest_app (reads config.ini from cwd) and te_sync."""
+    cwd = os.getcwd()
+    sys.path[:0] = [REST_DIR, TOOLS_DIR]
+    os.chdir(REST_DIR)
+    try:
+        import rest_app  # pylint: disable=import-outside-toplevel
+        import te_sync  # pylint: disable=import-outside-toplevel
+    finally:
+        os.chdir(cwd)
+        del sys.path[:2]
+    return rest_app, te_sync
+
+
+@pytest.fixture(name="env")
+def fixture_env(modules, monkeypatch):
+    """Fake JIRA and REST server on a mongomock client which can be swapped by tests."""
+    rest_app, te_sync = modules
+    mongo = {"client": mongomock.MongoClient()}
+    monkeypatch.setattr(rest_app.mongodbapi, "MongoClient", lambda *args, **kw: mongo["client"])
+    app = Flask(__name__)
+    rest_app.api.init_app(app)
+    jira = FakeJira()
+    jira_server, rest = Server(jira), Server(app)
+    yield te_sync, jira, jira_server, rest, mongo
+    jira_server.close()
+    rest.close()
+
+
+def new_sync(te_sync, jira_server, rest, state_file):
+    """Sync engine against the test servers."""
+    return te_sync.TestExecutionSync(("user", "pass"), rest.url + "reportsdb/", "db", "db",
+                                     jira_url=jira_server.url, state_file=state_file)
+
+
+def latest_docs(client):
+    """Latest entries without ids, sorted by test."""
+    docs = client["cft_test_results"]["r2_results"].find({"latest": True}, {"_id": 0})
+    return sorted(docs, key=lambda doc: (doc["testExecutionID"], doc["testID"]))
+
+
+def test_unchanged_rerun_writes_nothing(env, tmp_path):
+    """Second sync without JIRA changes makes no DB request."""
+    te_sync, _, jira_server, rest, mongo = env
+    state_file = str(tmp_path / "state.json")
+    stats = new_sync(te_sync, jira_server, rest, state_file).sync_test_plan("TEST-1")
+    assert stats["created"] == 140 and stats["updated"] == 0
+    assert [call for call in rest.calls if call[0] == "POST"] == \
+        [("POST", "/reportsdb/bulk")] * 2
+    collection = mongo["client"]["cft_test_results"]["r2_results"]
+    assert collection.count_documents({}) == 140
+
+    rest.calls.clear()
+    stats = new_sync(te_sync, jira_server, rest, state_file).sync_test_plan("TEST-1")
+    assert rest.calls == []
+    assert stats["skipped"] == 2 and stats["created"] == 0
+    assert collection.count_documents({}) == 140
+
+
+def test_incremental_matches_full_resync(env, tmp_path):
+    """Incremental sync after status and defect changes equals a full sync on empty DB."""
+    te_sync, jira, jira_server, rest, mongo = env
+    state_file = str(tmp_path / "state.json")
+    new_sync(te_sync, jira_server, rest, state_file).sync_test_plan("TEST-1")
+    tests = jira.executions["TEST-100"]
+    tests[0].update(status="FAIL", defects=[{"key": "EOS-7"}])
+    tests[1].update(defects=[{"key": "EOS-1"}, {"key": "EOS-2"}])
+    tests[2].update(status="PASS")
+    rest.calls.clear()
+    stats = new_sync(te_sync, jira_server, rest, state_file).sync_test_plan("TEST-1")
+    assert stats["created"] == 2 and stats["updated"] == 1 and stats["skipped"] == 1
+    assert rest.calls == [("GET", "/reportsdb/search"), ("POST", "/reportsdb/bulk")]
+    collection = mongo["client"]["cft_test_results"]["r2_results"]
+    assert collection.count_documents({"testID": "TEST-1000"}) == 2
+    incremental = latest_docs(mongo["client"])
+
+    mongo["client"] = mongomock.MongoClient()
+    new_sync(te_sync, jira_server, rest, str(tmp_path / "fresh.json")).sync_test_plan(
+        "TEST-1", full=True)
+    assert incremental == latest_docs(mongo["client"])
+    assert incremental[1]["issueIDs"] == ["EOS-1", "EOS-2"]
@@ -0,0 +1,204 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""
+VM pool allocation service tests.
+
+The REST server (rest_app on mongomock) is served over HTTP in a thread and used through
+the VmStateManagement client by concurrent jobs.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mongomock
+import pytest
+import requests
+from flask import Flask
+from werkzeug.serving import make_server
+
+from scripts.ssc_cloud.vm_management import VmStateManagement
+
+REST_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "tools",
+                                        "rest_server"))
+CREDENTIALS = {"db_username": "user", "db_password": "pass"}
+
+
+@pytest.fixture(name="rest_app", scope="module")
+def fixture_rest_app():
+    """Import rest_app (reads config.ini from cwd)."""
+    cwd = os.getcwd()
+    sys.path.insert(0, REST_DIR)
+    os.chdir(REST_DIR)
+    try:
+        import rest_app  # pylint: disable=import-outside-toplevel
+    finally:
+        os.chdir(cwd)
+        del sys.path[0]
+    return rest_app
+
+
+def serialized(method, lock):
+    """Collection method applied under lock, as mongod applies single document writes."""
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with lock:
+            result = method(*args, **kwargs)
+            return iter(list(result)) if isinstance(result, mongomock.collection.Cursor) \
+                else result
+    return wrapper
+
+
+@pytest.fixture(name="pool")
+def fixture_pool(rest_app, monkeypatch):
+    """REST server on mongomock with 4 one node and 1 three node setups, pool client."""
+    # mongomock is not thread safe, mongod is atomic per document operation
+    lock = threading.RLock()
+    for name in ["find", "find_one_and_update", "count_documents", "insert_one",
+                 "delete_many"]:
+        monkeypatch.setattr(mongomock.collection.Collection, name,
+                            serialized(getattr(mongomock.collection.Collection, name), lock))
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(rest_app.mongodbapi, "MongoClient", lambda *args, **kw: client)
+    monkeypatch.setattr(rest_app.vm_pool_api, "POLL_INTERVAL", 0.05)
+    database = client["cft_test_results"]
+    database["r2_vm_pool"].insert_many(
+        [{"setupname": f"vm-{num}", "nodes": 1, "hostnames": [f"host-{num}"],
+          "client": f"client-{num}", "m_vip": "", "data_ip": "", "is_setup_free": "yes"}
+         for num in range(4)] +
+        [{"setupname": "vm-3n", "nodes": 3, "hostnames": ["a", "b", "c"], "client": "c3",
+          "m_vip": "", "data_ip": "", "is_setup_free": "yes"}])
+    app = Flask(__name__)
+    rest_app.api.init_app(app)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("DB_USER", CREDENTIALS["db_username"])
+    monkeypatch.setenv("DB_PASSWORD", CREDENTIALS["db_password"])
+    vm_state = VmStateManagement("r2_vm_pool")
+    vm_state.host = f"http://127.0.0.1:{server.server_port}/"
+    vm_state.poll_wait = 1
+    yield vm_state, database
+    server.shutdown()
+
+
+def call(vm_state, endpoint, body, method="POST"):
+    """Raw pool request."""
+    return requests.request(method, f"{vm_state.host}r2_vm_pool/{endpoint}",
+                            json=dict(body, **CREDENTIALS), timeout=30)
+
+
+def test_contention_without_double_allocation(pool):
+    """Concurrent jobs queue for the setups, no setup is ever held twice."""
+    vm_state, database = pool
+    holders, lock, overlaps = {}, threading.Lock(), []
+
+    def job(num):
+        nodes = 3 if num % 6 == 0 else 1
+        acquired, setup_info = vm_state.get_available_system(nodes, timeout=60,
+                                                             requester=f"job-{num}")
+        assert acquired and setup_info["nodes"] == nodes
+        with lock:
+            if setup_info["setup_name"] in holders:
+                overlaps.append(setup_info["setup_name"])
+            holders[setup_info["setup_name"]] = num
+        time.sleep(0.05)
+        with lock:
+            holders.pop(setup_info["setup_name"])
+        assert vm_state.unlock_system(setup_info["setup_name"], setup_info["lease_id"])
+        return setup_info["setup_name"]
+
+    with ThreadPoolExecutor(24) as executor:
+        served = list(executor.map(job, range(24)))
+    assert not overlaps
+    assert served.count("vm-3n") == 4
+    assert database["r2_vm_pool"].count_documents({"is_setup_free": "yes"}) == 5
+    assert database["r2_vm_pool_queue"].count_documents({}) == 0
+    history = list(database["r2_vm_pool_history"].find())
+    assert len(history) == 24 and all(entry["release_reason"] == "released"
+                                      for entry in history)
+    # allocations of a setup never overlap in time
+    for setupname in set(served):
+        spans = sorted((entry["allocated_at"], entry["released_at"]) for entry in history
+                       if entry["setupname"] == setupname)
+        assert all(prev[1] <= cur[0] for prev, cur in zip(spans, spans[1:]))
+
+    stats = call(vm_state, "utilisation", {}, "GET").json()["setups"]
+    assert sum(setup["allocations"] for setup in stats.values()) == 24
+    assert stats["vm-3n"]["allocations"] == 4 and stats["vm-3n"]["busy_seconds"] > 0
+
+
+def test_priority_queue_and_lease_reclaim(pool):
+    """Higher priority is served first, expired leases are reclaimed, heartbeats extend."""
+    vm_state, database = pool
+    acquired, first = vm_state.get_available_system(3, lease_ttl=1)
+    assert acquired and first["setup_name"] == "vm-3n"
+    assert vm_state.heartbeat("vm-3n", first["lease_id"], lease_ttl=1)
+    low = call(vm_state, "allocate", {"nodes": 3, "request_id": "low"})
+    high = call(vm_state, "allocate", {"nodes": 3, "request_id": "high", "priority": 5})
+    assert (low.status_code, low.json()["position"]) == (202, 0)
+    assert (high.status_code, high.json()["position"]) == (202, 0)
+    assert call(vm_state, "allocate", {"nodes": 3, "request_id": "low"}).json()["position"] == 1
+    assert not vm_state.get_available_system(3, timeout=0)[0]
+    assert call(vm_state, "release", {"setupname": "vm-3n", "lease_id": "other"}).status_code \
+        == 404
+
+    # first holder stops heart beating, lease is reclaimed for the high priority request
+    high = call(vm_state, "allocate", {"nodes": 3, "request_id": "high", "wait": 5})
+    assert high.status_code == 200 and high.json()["result"]["lease_id"] == "high"
+    assert not vm_state.heartbeat("vm-3n", first["lease_id"])
+    assert call(vm_state, "allocate", {"nodes": 3, "request_id": "low"}).status_code == 202
+    # retried poll of an allocated request returns its setup
+    assert call(vm_state, "allocate", {"nodes": 3, "request_id": "high"}).json()["result"][
+        "setupname"] == "vm-3n"
+
+    assert vm_state.unlock_system("vm-3n", "high")
+    low = call(vm_state, "allocate", {"nodes": 3, "request_id": "low", "wait": 1})
+    assert low.status_code == 200
+    reasons = {entry["lease_id"]: entry["release_reason"]
+               for entry in database["r2_vm_pool_history"].find()}
+    assert reasons == {first["lease_id"]: "reclaimed", "high": "released", "low": None}
+    assert call(vm_state, "cancel", {"request_id": "low"}).status_code == 200
+    assert call(vm_state, "allocate", {"wait": 1}).status_code == 400
+
+
+def test_lease_without_ttl_not_reclaimed(pool):
+    """A lease allocated without lease_ttl is held till released, heartbeats keep the ttl."""
+    vm_state, database = pool
+    acquired, holder = vm_state.get_available_system(3)
+    assert acquired and holder["lease_expiry"] is None
+    # allocate reclaims expired leases first, a lease without ttl is not one of them
+    assert call(vm_state, "allocate", {"nodes": 3, "request_id": "other", "wait": 1}) \
+        .status_code == 202
+    assert call(vm_state, "cancel", {"request_id": "other"}).status_code == 200
+    response = call(vm_state, "heartbeat", {"setupname": "vm-3n",
+                                            "lease_id": holder["lease_id"]})
+    assert response.status_code == 200 and response.json()["lease_expiry"] is None
+    assert vm_state.unlock_system("vm-3n", holder["lease_id"])
+
+    acquired, holder = vm_state.get_available_system(3, lease_ttl=600)
+    assert acquired and holder["lease_expiry"]
+    assert call(vm_state, "heartbeat", {"setupname": "vm-3n", "lease_id": holder["lease_id"]}) \
+        .json()["lease_expiry"] > holder["lease_expiry"]
+    assert database["r2_vm_pool"].find_one({"setupname": "vm-3n"})["lease_ttl"] == 600
@@ -0,0 +1,144 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for parallel support bundle and crash file collector."""
+
+import hashlib
+import io
+import json
+import os
+import tarfile
+import threading
+
+from commons.utils.bundle_collector_utils import SupportBundleCollector
+
+PODS = [f"cortx-data-pod-{num}" for num in range(4)]
+CORE = b"core dump" * 1000
+
+
+def tar_bytes(files):
+    """In memory tar of {name: content}."""
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode="w") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return data.getvalue()
+
+
+class FakeStream:
+    """Command output stream, optionally breaking after some bytes."""
+
+    def __init__(self, data, status=0, break_after=None):
+        self.data = io.BytesIO(data)
+        self.status = status
+        self.break_after = break_after
+        self.closed = False
+
+    def read(self, size=1024):
+        """Read stdout."""
+        if self.break_after is not None and self.data.tell() >= self.break_after:
+            raise EOFError("channel closed")
+        return self.data.read(min(size, 1024))
+
+    def exit_status(self):
+        """Exit status."""
+        return self.status
+
+    def error(self):
+        """stderr."""
+        return "error" if self.status else ""
+
+    def close(self):
+        """Close stream."""
+        self.closed = True
+
+
+class FakePods:
+    """Fake pod executor serving synthetic bundles and crash files."""
+
+    def __init__(self, failing_generate=(), broken_bundle=()):
+        self.failing_generate = failing_generate
+        self.broken_bundle = broken_bundle
+        self.streams = []
+        self.barrier = threading.Barrier(len(PODS), timeout=5)
+        self.lock = threading.Lock()
+
+    def bundle(self, pod):
+        """Support bundle tar of pod."""
+        return tar_bytes({f"SB1_{pod}.tar.gz": pod.encode() * 5000})
+
+    def open_stream(self, pod, container, command):
+        """Start command in pod."""
+        assert container == "cortx-hax"
+        if "support_bundle generate" in command:
+            # all pods have to generate at the same time to pass the barrier
+            self.barrier.wait()
+            stream = FakeStream(b"", status=int(pod in self.failing_generate))
+        elif "tar -cf - SB1" in command:
+            stream = FakeStream(self.bundle(pod), break_after=4096 if pod in
+                                self.broken_bundle else None)
+        else:
+            files = {"etc/cortx/hare/core.1.gz": CORE,
+                     f"etc/cortx/motr/{pod}.gz": pod.encode()}
+            stream = FakeStream(tar_bytes(files))
+        with self.lock:
+            self.streams.append(stream)
+        return stream
+
+
+def test_collect(tmp_path):
+    """Bundles are streamed with checksums, identical crash files are stored once."""
+    pods = FakePods()
+    manifest = SupportBundleCollector(pods, PODS, str(tmp_path), container="cortx-hax",
+                                      max_workers=len(PODS)).collect("SB1")
+    assert manifest["failed"] == [] and manifest["errors"] == {}
+    for pod, bundle in zip(PODS, manifest["bundles"]):
+        content = (tmp_path / bundle["file"]).read_bytes()
+        assert bundle["pod"] == pod and content == pods.bundle(pod)
+        assert bundle["size"] == len(content)
+        assert bundle["sha256"] == hashlib.sha256(content).hexdigest()
+    cores = [entry for entry in manifest["crash_files"] if entry["path"].endswith("core.1.gz")]
+    assert len(cores) == len(PODS) and sum(not entry["duplicate"] for entry in cores) == 1
+    assert {entry["file"] for entry in cores} == {cores[0]["file"]}
+    assert (tmp_path / "crash_files" / cores[0]["file"]).read_bytes() == CORE
+    assert cores[0]["sha256"] == hashlib.sha256(CORE).hexdigest()
+    assert sorted(os.listdir(tmp_path / "crash_files")) == sorted(
+        entry["file"] for entry in manifest["crash_files"] if not entry["duplicate"])
+    assert len(os.listdir(tmp_path / "crash_files")) == 1 + len(PODS)
+    with open(tmp_path / "manifest.json") as manifest_file:
+        assert json.load(manifest_file) == manifest
+    assert all(stream.closed for stream in pods.streams)
+
+
+def test_partial_failures(tmp_path):
+    """Failed generation and broken transfer fail only their pods and leave no partial file."""
+    pods = FakePods(failing_generate=[PODS[1]], broken_bundle=[PODS[2]])
+    manifest = SupportBundleCollector(pods, PODS, str(tmp_path), container="cortx-hax",
+                                      max_workers=len(PODS)).collect("SB1", crash_files=False)
+    assert manifest["failed"] == [PODS[1], PODS[2]]
+    assert set(manifest["errors"]) == {f"bundle:{PODS[1]}", f"bundle:{PODS[2]}"}
+    assert "channel closed" in manifest["errors"][f"bundle:{PODS[2]}"]
+    assert [bundle["status"] for bundle in manifest["bundles"]] == \
+        ["ok", "failed", "failed", "ok"]
+    assert sorted(path.name for path in tmp_path.glob("*.tar")) == \
+        [f"{PODS[0]}_SB1.tar", f"{PODS[3]}_SB1.tar"]
+    assert manifest["crash_files"] == []
@@ -0,0 +1,248 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for cluster topology discovery with canned kubectl json and fake nodes."""
+
+import json
+import os
+import time
+
+import pytest
+
+from commons import commands as cm_cmd
+from commons import constants as cm_const
+from commons.utils import cluster_topology_utils as topo_utils
+from commons.utils import ext_lbconfig_utils
+from commons.utils.cluster_topology_utils import ClusterTopology
+
+MASTER = "ssc-vm-0.colo.seagate.com"
+WORKERS = [f"ssc-vm-{num}.colo.seagate.com" for num in range(1, 4)]
+SERVICE_PORTS = {"80": 80, "443": 443, "9080": 9080, "9443": 9443, "rgw-http": 80,
+                 "rgw-https": 443}
+
+
+def node_item(name, worker):
+    """kubectl Node item."""
+    labels = {"kubernetes.io/hostname": name}
+    if worker:
+        labels[topo_utils.WORKER_LABEL] = "worker"
+    return {"kind": "Node", "metadata": {"name": name, "labels": labels},
+            "status": {"addresses": [{"type": "InternalIP", "address": f"192.168.0.{len(name)}"},
+                                     {"type": "Hostname", "address": name}],
+                       "conditions": [{"type": "Ready", "status": "True"}]}}
+
+
+def cluster_json(target_ports=("80", "443", "9080", "9443"), extra_pods=()):
+    """kubectl get nodes,svc,pods -o json of a master and three workers."""
+    items = [node_item(MASTER, False)] + [node_item(worker, True) for worker in WORKERS]
+    for num, worker in enumerate(WORKERS):
+        short = worker.split(".")[0]
+        items.append({"kind": "Service", "metadata": {"name": f"cortx-server-{num}"},
+                      "spec": {"type": "LoadBalancer",
+                               "selector": {"app": f"cortx-server-{short}"},
+                               "ports": [{"name": f"p{port}", "port": SERVICE_PORTS.get(port, port),
+                                          "targetPort": port, "nodePort": 30000 + num * 10 + idx}
+                                         for idx, port in enumerate(target_ports)]}})
+        items.append({"kind": "Pod", "metadata": {"name": f"cortx-server-{short}-abc"},
+                      "spec": {"nodeName": worker},
+                      "status": {"phase": "Running", "podIP": f"10.1.0.{num}"}})
+    items.append({"kind": "Service", "metadata": {"name": "kubernetes"},
+                  "spec": {"type": "ClusterIP", "ports": [{"port": 443, "targetPort": 6443}]}})
+    items.append({"kind": "Pod", "metadata": {"name": "cortx-control-xyz"},
+                  "spec": {"nodeName": WORKERS[1]}, "status": {"phase": "Running"}})
+    for pod in extra_pods:
+        items.append({"kind": "Pod", "metadata": {"name": pod}, "spec": {"nodeName": MASTER},
+                      "status": {"phase": "Pending"}})
+    return {"apiVersion": "v1", "kind": "List", "items": items}
+
+
+class FakeChannel:
+    """SSH channel returning canned file content of kubectl exec cat."""
+
+    def __init__(self, files):
+        self.files = files
+        self.data = []
+        self.status = 0
+
+    def exec_command(self, cmd):
+        """Serve the file named at the end of the command in chunks."""
+        content = self.files.get(cmd.split()[-1])
+        if content is None:
+            self.status = 1
+        else:
+            self.data = [content[pos:pos + 5] for pos in range(0, len(content), 5)]
+
+    def recv(self, _):
+        """Next chunk, b'' at EOF."""
+        return self.data.pop(0) if self.data else b""
+
+    def recv_exit_status(self):
+        """Exit status of the command."""
+        return self.status
+
+    def close(self):
+        """Nothing to release."""
+
+
+class FakeNode:
+    """Node answering kubectl and ifconfig commands after a latency."""
+
+    def __init__(self, hostname, cluster=None, latency=0.0, files=None):
+        self.hostname = hostname
+        self.cluster = cluster
+        self.latency = latency
+        self.files = files or {}
+        self.commands = []
+        self.disconnected = False
+        self.host_obj = self
+
+    def execute_cmd(self, cmd, read_lines=False, **_):
+        """Canned kubectl json and eth1 IP."""
+        self.commands.append(cmd)
+        time.sleep(self.latency)
+        if cmd == cm_cmd.K8S_GET_TOPOLOGY_JSON:
+            return json.dumps(self.cluster).encode()
+        assert cmd == cm_cmd.CMD_GET_IP_IFACE.format("eth1") and read_lines
+        return [f"10.0.0.{self.hostname.split('.')[0].split('-')[-1]}\n"]
+
+    def disconnect(self):
+        """Record disconnect."""
+        self.disconnected = True
+
+    def connect(self):
+        """Already connected."""
+
+    def get_transport(self):
+        """The fake is its own transport."""
+        return self
+
+    @staticmethod
+    def is_active():
+        """Transport is up."""
+        return True
+
+    def open_session(self):
+        """New channel serving files."""
+        return FakeChannel(self.files)
+
+
+@pytest.fixture(name="nodes")
+def fixture_nodes():
+    """Master with canned cluster json and workers answering after 0.2s each."""
+    workers = {host: FakeNode(host, latency=0.2) for host in WORKERS}
+    master = FakeNode(MASTER, cluster_json())
+    return master, workers
+
+
+def test_discover_and_snapshot(nodes, tmp_path):
+    """One kubectl query, parallel probes, snapshot reuse and generations."""
+    master, workers = nodes
+    start = time.perf_counter()
+    topology = topo_utils.discover_topology(master, "root", "pwd", node_factory=workers.get)
+    assert time.perf_counter() - start < 0.5
+    assert master.commands.count(cm_cmd.K8S_GET_TOPOLOGY_JSON) == 1
+    assert topology.workers == WORKERS and topology.node_ip(MASTER) == "10.0.0.0"
+    assert topology.node_ip(WORKERS[2]) == "10.0.0.3"
+    assert all(worker.disconnected for worker in workers.values())
+    assert topology.server_pods("cortx-server") == \
+        ["cortx-server-ssc-vm-1-abc", "cortx-server-ssc-vm-2-abc", "cortx-server-ssc-vm-3-abc"]
+    assert topology.load_balancers() == ["cortx-server-0", "cortx-server-1", "cortx-server-2"]
+
+    path = str(tmp_path / "topology.json")
+    first = topo_utils.get_topology(master, "root", "pwd", cache_path=path,
+                                    node_factory=workers.get)
+    assert ClusterTopology.load(path) == first and first.generation == 1
+    master.commands.clear()
+    assert topo_utils.get_topology(master, "root", "pwd", cache_path=path) == first
+    assert not master.commands
+    same = topo_utils.get_topology(master, "root", "pwd", cache_path=path, refresh=True,
+                                   node_factory=workers.get)
+    assert same.generation == 1 and same.fingerprint == first.fingerprint
+    master.cluster = cluster_json(extra_pods=["cortx-data-new"])
+    changed = topo_utils.get_topology(master, "root", "pwd", cache_path=path, max_age=0,
+                                      node_factory=workers.get)
+    assert changed.generation == 2 and ClusterTopology.load(path).generation == 2
+
+    with open(path) as snapshot:
+        data = dict(json.load(snapshot), version=topo_utils.TOPOLOGY_VERSION + 1)
+    with open(path, "w") as snapshot:
+        json.dump(data, snapshot)
+    assert ClusterTopology.load(path) is None
+
+    workers[WORKERS[0]].execute_cmd = None
+    with pytest.raises(IOError, match=WORKERS[0]):
+        topo_utils.discover_topology(master, "root", "pwd", node_factory=workers.get)
+
+
+def test_haproxy_hosts_and_client_config(nodes, tmp_path):
+    """haproxy backends, /etc/hosts and client topology come from one snapshot."""
+    master, workers = nodes
+    topology = topo_utils.discover_topology(master, "root", "pwd", node_factory=workers.get)
+    endpoints = ext_lbconfig_utils.get_worker_s3_endpoints(master, "root", "pwd", topology)
+    assert endpoints[WORKERS[1]] == {"eth1": "10.0.0.2", "80": 30010, "443": 30011,
+                                     "9080": 30012, "9443": 30013}
+    with open(cm_const.HAPROXY_DUMMY_CONFIG) as template:
+        lines = ext_lbconfig_utils.render_haproxy_cfg(template.readlines(), "10.9.9.9",
+                                                      endpoints)
+    assert "    bind 10.9.9.9:9443 ssl crt /etc/ssl/stx/stx.pem\n" in lines
+    assert "    server ha-s3-3 10.0.0.3:30020    #port mapped to 80\n" in lines
+    assert "    server s3authserver-instance-ssl-2 10.0.0.2:30013 ssl verify none    " \
+           "#port mapped to 9443\n" in lines
+    assert not any("PLEASE DO NOT MODIFY" in line for line in lines)
+
+    master.cluster = cluster_json(("rgw-http", "rgw-https"))
+    topology = topo_utils.discover_topology(master, "root", "pwd", node_factory=workers.get)
+    endpoints = topo_utils.rgw_s3_endpoints(topology, shuffle=False)
+    assert endpoints["cortx-server-0"] == {"eth1": "10.0.0.0", "rgw-http": 30000,
+                                           "rgw-https": 30001}
+    assert sorted(endpoint["eth1"] for endpoint in endpoints.values()) == \
+        ["10.0.0.0", "10.0.0.2", "10.0.0.3"]
+    with open(cm_const.HAPROXY_DUMMY_RGW_CONFIG) as template:
+        lines = ext_lbconfig_utils.render_haproxy_cfg(
+            template.readlines(), "10.9.9.9", endpoints,
+            port_keys=ext_lbconfig_utils.RGW_PORT_KEYS)
+    assert "    server ha-s3-ssl-1 10.0.0.0:30001 ssl verify none    #port mapped to 443\n" \
+        in lines
+    client = ext_lbconfig_utils.s3_topology(endpoints)
+    assert client["endpoints"][0] == {"name": "cortx-server-0", "ip": "10.0.0.0",
+                                      "http_port": 30000, "https_port": 30001}
+    assert topo_utils.nodeport_endpoint(topology) == (True, "10.0.0.0", 30001, 30000)
+    assert not topo_utils.nodeport_endpoint(topology, "missing")[0]
+
+    hosts = tmp_path / "hosts"
+    ext_lbconfig_utils.write_client_hosts("10.9.9.9", str(hosts))
+    assert hosts.read_text().splitlines()[-1].startswith("10.9.9.9 s3.seagate.com")
+
+
+def test_fetch_pod_files(tmp_path):
+    """Pod files stream to local paths, a failed copy leaves nothing behind."""
+    crt, pem = b"-----BEGIN CERTIFICATE-----\nabc\n", b"-----BEGIN KEY-----\nxyz\n" * 10
+    master = FakeNode(MASTER, files={cm_const.K8S_CRT_PATH: crt, cm_const.K8S_PEM_PATH: pem})
+    local = {cm_const.K8S_CRT_PATH: str(tmp_path / "s3" / "ca.crt"),
+             cm_const.K8S_PEM_PATH: str(tmp_path / "stx" / "stx.pem")}
+    assert topo_utils.fetch_pod_files(master, "cortx-server-0", local) == \
+        {local[cm_const.K8S_CRT_PATH]: len(crt), local[cm_const.K8S_PEM_PATH]: len(pem)}
+    with open(local[cm_const.K8S_PEM_PATH], "rb") as pem_file:
+        assert pem_file.read() == pem
+
+    with pytest.raises(IOError, match="exited with 1"):
+        topo_utils.fetch_pod_files(master, "cortx-server-0",
+                                   {"/missing.crt": str(tmp_path / "missing.crt")})
+    assert sorted(os.listdir(tmp_path)) == ["s3", "stx"]
@@ -0,0 +1,111 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""Client side endpoint pool tests against several S3 stubs, some failing or slow."""
+
+import json
+from contextlib import ExitStack
+
+import boto3
+import pytest
+from botocore.config import Config
+
+from commons.utils.endpoint_pool_utils import EndpointPool
+from commons.utils.endpoint_pool_utils import POLICIES
+from scripts.s3_bench.s3_stub import S3Stub
+from scripts.s3_bench.s3loadgen import S3LoadEngine
+
+
+@pytest.fixture(name="stubs")
+def fixture_stubs():
+    """Two healthy stubs, one failing every object request and one slow stub."""
+    with ExitStack() as stack:
+        stubs = [stack.enter_context(S3Stub(**kwargs)) for kwargs in
+                 [{}, {}, {"error_rate": 1.0}, {"latency": 0.05}]]
+        for stub in stubs:
+            stub.buckets["bkt"] = {}
+        yield stubs
+
+
+def puts(stub):
+    """Object PUTs served by stub."""
+    return stub.requests.get("PUT", 0)
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_load_shifts_from_failing_and_slow(stubs, policy):
+    """aiohttp load engine spreads writes, failing and slow endpoints get ejected."""
+    pool = EndpointPool([stub.endpoint for stub in stubs], policy=policy, max_failures=3,
+                        min_samples=5, ejection_time=60, seed=1)
+    report = S3LoadEngine(stubs[0].endpoint, "AK", "SK", "bkt", num_clients=8,
+                          num_sample=800, mix={"write": 1}, seed=2,
+                          endpoint_pool=pool).run().to_dict()
+    healthy, failing, slow = puts(stubs[0]) + puts(stubs[1]), puts(stubs[2]), puts(stubs[3])
+    # the bucket create goes to the first stub
+    assert healthy + failing + slow == 801
+    assert failing <= 8 and slow < healthy / 8
+    assert report["Tests"][0]["Errors Count"] == failing
+    stats = {endpoint["url"]: endpoint for endpoint in pool.stats()}
+    assert stats[stubs[2].endpoint]["ejected"] and stats[stubs[3].endpoint]["ejections"]
+    assert all(endpoint["outstanding"] == 0 for endpoint in stats.values())
+
+
+def test_boto3_retries_move_to_other_endpoints(stubs):
+    """boto3 requests are balanced, retries of failed requests go to another endpoint."""
+    pool = EndpointPool([stub.endpoint for stub in stubs[:3]], policy="round_robin",
+                        max_failures=2, seed=1)
+    client = pool.attach(boto3.client(
+        "s3", endpoint_url=stubs[0].endpoint, aws_access_key_id="AK",
+        aws_secret_access_key="SK", region_name="us-east-1",
+        config=Config(s3={"addressing_style": "path"}, retries={"max_attempts": 4,
+                                                                "mode": "standard"})))
+    for num in range(60):
+        client.put_object(Bucket="bkt", Key=f"obj-{num}", Body=b"data")
+    assert puts(stubs[2]) <= 2
+    assert len(stubs[0].buckets["bkt"]) + len(stubs[1].buckets["bkt"]) == 60
+    assert abs(len(stubs[0].buckets["bkt"]) - len(stubs[1].buckets["bkt"])) <= 2
+
+
+def test_topology_probes_and_ejection_limit(stubs, tmp_path):
+    """Pool from topology file, probes take a dead endpoint out, half may be ejected."""
+    topology = {"endpoints": [{"name": f"cortx-server-{num}", "ip": stub.host,
+                               "http_port": stub.port, "https_port": None}
+                              for num, stub in enumerate(stubs[:3])]}
+    path = tmp_path / "topology.json"
+    path.write_text(json.dumps(topology))
+    pool = EndpointPool.from_topology(str(path), policy="least_outstanding", max_failures=1,
+                                      max_ejection_percent=50)
+    assert [endpoint.url for endpoint in pool.endpoints] == [stub.endpoint
+                                                             for stub in stubs[:3]]
+    stubs[1].stop()
+    pool.probe(timeout=1)
+    assert [endpoint["probe_failed"] for endpoint in pool.stats()] == [False, True, False]
+    chosen = set()
+    for _ in range(20):
+        with pool.request() as url:
+            chosen.add(url)
+    assert chosen == {stubs[0].endpoint, stubs[2].endpoint}
+
+    # one of three endpoints is out already, failures of the others do not eject them
+    for _ in range(4):
+        pool.release(pool.acquire(), 0.01, error=True)
+    assert [endpoint["ejected"] for endpoint in pool.stats()] == [False, False, False]
+    with pytest.raises(ValueError):
+        EndpointPool([], policy="random")
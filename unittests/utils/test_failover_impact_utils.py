@@ -0,0 +1,118 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for failover impact analysis on synthetic timelines."""
+
+import json
+
+import pytest
+
+from commons.utils.failover_impact_utils import FailoverImpactAnalyzer
+from commons.utils.failover_impact_utils import FaultEvent
+from commons.utils.failover_impact_utils import OpRecord
+from commons.utils.failover_impact_utils import TimelineRecorder
+from commons.utils.failover_impact_utils import main
+from commons.utils.failover_impact_utils import read_timeline
+
+T0 = 1650000000.0
+
+
+def synthetic_timeline(path, outage=(22, 27), slow=(27, 32), end=60, clients=4):
+    """
+    Closed loop clients doing 20 ms PUTs. Fault at 20s, ops started in the outage fail
+    with 503 after 500 ms, ops in the slow window take 100 ms, restart completes at 30s.
+    """
+    with TimelineRecorder(path) as timeline:
+        timeline.event("pod_delete", "cortx-data-pod-1", T0 + 20)
+        timeline.event("restart_complete", "cortx-data-pod-1", T0 + 30)
+        for client in range(clients):
+            now = client * 0.005
+            while now < end:
+                if outage[0] <= now < outage[1]:
+                    latency, status = 0.5, 503
+                elif slow[0] <= now < slow[1]:
+                    latency, status = 0.1, 200
+                else:
+                    latency, status = 0.02, 200
+                timeline.record(T0 + now, T0 + now + latency, "put", f"obj-{client}", status)
+                now += latency
+
+
+def test_known_outage(tmp_path):
+    """Metrics match the injected outage window."""
+    path = str(tmp_path / "timeline.bin")
+    synthetic_timeline(path)
+    result = FailoverImpactAnalyzer.from_file(path, baseline=20).analyze()
+    assert result["summary"]["faults"] == 1
+    event = result["events"][0]
+    assert event["kind"] == "pod_delete" and event["target"] == "cortx-data-pod-1"
+    assert event["time_to_first_error"] == pytest.approx(2.5, abs=0.05)
+    assert event["error_window"] == pytest.approx(5.0, abs=0.6)
+    assert event["time_to_recovery"] == pytest.approx(7.0, abs=0.6)
+    assert event["recovery_event"] == pytest.approx(10)
+    assert set(event["error_status"]) == {"503"}
+    assert event["throughput"]["baseline"] == pytest.approx(200, rel=0.05)
+    assert event["throughput"]["min"] == 0 and event["throughput"]["dip_percent"] == 100
+    assert event["p99_ms"]["inflation"] == pytest.approx(5, rel=0.1)
+    assert 0.9 < result["summary"]["availability"] < 1
+
+
+def test_fault_without_errors():
+    """A fault without IO errors has no time to first error and zero error window."""
+    ops = [OpRecord(T0 + idx * 0.1, T0 + idx * 0.1 + 0.05, "get", "obj", 200)
+           for idx in range(600)]
+    events = [FaultEvent(T0 + 30, "process_kill", "m0d")]
+    event = FailoverImpactAnalyzer(ops, events).analyze()["events"][0]
+    assert event["time_to_first_error"] is None
+    assert event["time_to_recovery"] == 0 and event["error_window"] == 0
+    assert event["throughput"]["dip_percent"] == pytest.approx(0, abs=15)
+
+
+def test_recorder_roundtrip(tmp_path):
+    """timed() records success and failure status, a truncated tail is ignored."""
+    path = str(tmp_path / "timeline.bin")
+    with TimelineRecorder(path) as timeline:
+        with timeline.timed("write", "key-1"):
+            pass
+        with pytest.raises(IOError):
+            with timeline.timed("get", "key-2"):
+                raise IOError("An error occurred (503) when calling GetObject")
+        with pytest.raises(ValueError):
+            with timeline.timed("delete", "key-3"):
+                raise ValueError("connection reset")
+        timeline.event("node_shutdown", "ssc-vm-1")
+    with open(path, "ab") as log:
+        log.write(b"\x01\x02\x03")
+    ops, events = read_timeline(path)
+    assert [(rec.op, rec.key, rec.status) for rec in ops] == \
+        [("put", "key-1", 200), ("get", "key-2", 503), ("delete", "key-3", 599)]
+    assert [(evt.kind, evt.target) for evt in events] == [("node_shutdown", "ssc-vm-1")]
+
+
+def test_cli_json_and_html(tmp_path):
+    """CLI writes the analysis and a self contained html timeline."""
+    path, out, page = (str(tmp_path / name) for name in ("t.bin", "t.json", "t.html"))
+    synthetic_timeline(path, end=40)
+    main([path, "--json", out, "--plot", page])
+    with open(out) as json_file:
+        assert json.load(json_file)["events"][0]["errors"] > 0
+    with open(page) as html_file:
+        content = html_file.read()
+    assert "<svg" in content and "pod_delete" in content
@@ -0,0 +1,216 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for fan out executor and merged hctl status health model."""
+
+import json
+import logging
+import threading
+import time
+
+from commons.helpers.stream_helper import MAX_SSH_CHANNELS
+from commons.utils.cluster_health_utils import ClusterHealth
+from commons.utils.cluster_health_utils import query_pods_health
+from commons.utils.fanout_utils import STATUS_FAILED
+from commons.utils.fanout_utils import STATUS_OK
+from commons.utils.fanout_utils import STATUS_TIMED_OUT
+from commons.utils.fanout_utils import fan_out
+
+LOGGER = logging.getLogger(__name__)
+
+NODES = 16
+PODS_PER_NODE = 3
+LATENCY = 0.02
+
+
+def hctl_json(pods, bad=None):
+    """Simulated hctl status --json of a cluster of pods; bad is (pod, status)."""
+    nodes = []
+    for pod in pods:
+        status = bad[1] if bad and bad[0] == pod else "started"
+        nodes.append({"name": f"{pod}-headless",
+                      "svcs": [{"name": "ioservice", "fid": f"0x7200000000000001:{pod}",
+                                "status": status},
+                               {"name": "motr_client", "fid": "0x1", "status": "offline"}]})
+    return json.dumps({"nodes": nodes})
+
+
+class FakeCluster:
+    """Fake pod executor injecting latency, failures and hangs."""
+
+    def __init__(self, dead=(), hung=(), bad=None):
+        self.pods = [f"cortx-data-g{grp}-{node}" for node in range(NODES)
+                     for grp in range(PODS_PER_NODE)]
+        self.dead = dead
+        self.hung = hung
+        self.bad = bad
+
+    def hctl_status(self, pod):
+        """kubectl exec hctl status --json."""
+        if pod in self.hung:
+            time.sleep(2)
+        time.sleep(LATENCY)
+        if pod in self.dead:
+            raise IOError(f"error: unable to upgrade connection: pod {pod} not found")
+        return hctl_json(self.pods, self.bad)
+
+
+class FakeChannel:
+    """SSH channel running kubectl exec hctl status on the fake cluster."""
+
+    def __init__(self, node):
+        self.node = node
+        self.out, self.err, self.status = [], [], 0
+
+    def settimeout(self, timeout):
+        """Timeout is not simulated."""
+
+    def exec_command(self, cmd):
+        """Run hctl status of the pod named in the command, output served in chunks."""
+        try:
+            data = self.node.cluster.hctl_status(cmd.split()[2]).encode()
+            self.out = [data[pos:pos + 1000] for pos in range(0, len(data), 1000)]
+        except IOError as error:
+            self.err, self.status = [str(error).encode()], 1
+
+    def recv(self, _):
+        """Next stdout chunk, b'' at EOF."""
+        return self.out.pop(0) if self.out else b""
+
+    def recv_stderr(self, _):
+        """Next stderr chunk, b'' at EOF."""
+        return self.err.pop(0) if self.err else b""
+
+    def recv_exit_status(self):
+        """Exit status, all output has been read."""
+        assert not self.out
+        return self.status
+
+    def close(self):
+        """Release channel slot."""
+        with self.node.lock:
+            self.node.channels -= 1
+
+
+class FakeNode:
+    """Master node whose single transport counts connections and open channels."""
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.host_obj = None
+        self.connects = 0
+        self.channels = self.max_channels = 0
+        self.lock = threading.Lock()
+
+    def connect(self):
+        """New SSH connection."""
+        self.connects += 1
+        self.host_obj = self
+
+    def get_transport(self):
+        """The fake is its own client and transport."""
+        return self
+
+    @staticmethod
+    def is_active():
+        """Transport is up."""
+        return True
+
+    def open_session(self):
+        """New channel on the transport."""
+        with self.lock:
+            self.channels += 1
+            self.max_channels = max(self.max_channels, self.channels)
+        return FakeChannel(self)
+
+
+class TestFanOut:
+    """Test fan_out executor."""
+
+    def test_structured_results(self):
+        """Every target gets ok / failed / timed-out result in targets order."""
+        cluster = FakeCluster(dead=["cortx-data-g0-1"], hung=["cortx-data-g1-2"])
+        results = fan_out(cluster.pods, cluster.hctl_status, max_parallel=8, timeout=0.5)
+        assert list(results) == cluster.pods
+        assert results.failed == ["cortx-data-g0-1"]
+        assert results.timed_out == ["cortx-data-g1-2"]
+        assert len(results.by_status(STATUS_OK)) == len(cluster.pods) - 2
+        assert isinstance(results["cortx-data-g0-1"].error, IOError)
+        assert not results.all_ok
+
+    def test_deadline(self):
+        """Targets still queued or running at the deadline are timed-out."""
+        results = fan_out(range(10), lambda _: time.sleep(0.2), max_parallel=2, deadline=0.3)
+        statuses = [res.status for res in results.values()]
+        assert statuses.count(STATUS_OK) == 2
+        assert statuses.count(STATUS_TIMED_OUT) == 8
+        assert STATUS_FAILED not in statuses
+
+    def test_benchmark_serial_vs_parallel(self):
+        """Health check of simulated 16 node/48 pod cluster, serial against parallel."""
+        cluster = FakeCluster()
+        start = time.perf_counter()
+        serial = ClusterHealth()
+        for pod in cluster.pods:
+            serial.add_report(pod, cluster.hctl_status(pod))
+        serial_time = time.perf_counter() - start
+        start = time.perf_counter()
+        parallel = ClusterHealth.from_fan_out(
+            fan_out(cluster.pods, cluster.hctl_status, max_parallel=16))
+        parallel_time = time.perf_counter() - start
+        LOGGER.info("48 pod health check: serial %.3fs, parallel %.3fs",
+                    serial_time, parallel_time)
+        assert serial.healthy and parallel.healthy
+        assert parallel_time * 4 < serial_time
+
+
+class TestClusterHealth:
+    """Test merging of hctl status outputs."""
+
+    def test_single_sick_pod_reported_precisely(self):
+        """One failed service and one unreachable pod are named, nothing else."""
+        cluster = FakeCluster(dead=["cortx-data-g2-5"], bad=("cortx-data-g0-3", "offline"))
+        health = ClusterHealth.from_fan_out(fan_out(cluster.pods, cluster.hctl_status))
+        assert not health.healthy
+        assert list(health.unreachable) == ["cortx-data-g2-5"]
+        unhealthy = health.unhealthy_services
+        assert list(unhealthy) == ["cortx-data-g0-3-headless"]
+        views = list(unhealthy["cortx-data-g0-3-headless"].values())[0]
+        assert set(views.values()) == {"offline"}
+        assert len(views) == len(cluster.pods) - 1
+        assert "cortx-data-g0-3-headless" in health.summary()
+
+    def test_unparsable_output(self):
+        """Garbage output marks the reporter unreachable."""
+        health = ClusterHealth()
+        health.add_report("cortx-data-g0-0", "error: container not found")
+        assert not health.healthy
+        assert "cortx-data-g0-0" in health.unreachable
+
+    def test_query_pods_over_one_connection(self):
+        """All pods are queried on channels of one connection within sshd session limits."""
+        cluster = FakeCluster(dead=["cortx-data-g2-5"])
+        node = FakeNode(cluster)
+        health = query_pods_health(node, cluster.pods, max_parallel=16)
+        assert node.connects == 1 and node.channels == 0
+        assert node.max_channels <= MAX_SSH_CHANNELS
+        assert list(health.unreachable) == ["cortx-data-g2-5"]
+        assert "pod cortx-data-g2-5 not found" in health.unreachable["cortx-data-g2-5"]
+        assert len(health.reporters) == len(cluster.pods)
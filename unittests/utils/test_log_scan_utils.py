@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for the streaming log error scanner."""
+
+import gzip
+import logging
+import random
+import re
+import time
+
+import pytest
+
+from commons.utils.log_scan_utils import LogScanner
+from commons.utils.log_scan_utils import main
+from commons.utils.log_scan_utils import total_counts
+
+LOGGER = logging.getLogger(__name__)
+
+ERRORS = ["with error ", "panic", "status code", "InternalError", "ServiceUnavailable",
+          "exit status 2", "Traceback", "failed "]
+NOISE = ["PUT /bucket/obj-{} 200 OK", "GET /bucket/obj-{} 200 OK in 12ms",
+         "motr[123]: m0_be_op {} done", "héllo wörld ✓ {}", "  at frame {}"]
+
+
+def write_log(path, lines, seed=7, compress=False, errors=ERRORS):
+    """Random log with errors in mixed case, returns the lines written."""
+    rand = random.Random(seed)
+    out = []
+    for idx in range(lines):
+        line = rand.choice(NOISE).format(idx)
+        if rand.random() < 0.05:
+            error = rand.choice(errors)
+            error = rand.choice((error, error.upper(), error.lower()))
+            line = f"{line} {error} {rand.choice(errors) if rand.random() < 0.2 else ''}"
+        out.append(line)
+    data = "\n".join(out).encode() + (b"\n" if seed % 2 else b"")
+    with (gzip.open if compress else open)(path, "wb") as fobj:
+        fobj.write(data)
+    return out
+
+
+def reference(lines, patterns, context, ignore_case=True):
+    """Hits computed line by line."""
+    fold = str.lower if ignore_case else str
+    hits, counts = [], dict.fromkeys(patterns, 0)
+    for idx, line in enumerate(lines):
+        found = [pat for pat in patterns if fold(pat) in fold(line)]
+        for pat in found:
+            counts[pat] += 1
+        if found:
+            hits.append((idx + 1, found, line, lines[max(0, idx - context):idx],
+                         lines[idx + 1:idx + 1 + context]))
+    return hits, counts
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096, 1 << 20])
+@pytest.mark.parametrize("compress", [False, True])
+def test_chunk_edges(tmp_path, chunk_size, compress):
+    """Hits, line numbers and context are the same whatever the chunk boundaries."""
+    for seed in (1, 2):
+        path = str(tmp_path / f"s3bench-{seed}.log")
+        lines = write_log(path, 2000, seed=seed, compress=compress)
+        scanner = LogScanner(ERRORS, context=3, chunk_size=chunk_size)
+        result = scanner.scan_file(path)
+        hits, counts = reference(lines, ERRORS, 3)
+        assert result.counts == counts and result.lines == len(lines)
+        assert [(hit.line_no, hit.patterns, hit.line, hit.before, hit.after)
+                for hit in result.hits] == hits
+
+
+def test_case_max_hits_and_regex(tmp_path):
+    """Case sensitive and regex vocabularies, hits are bounded but counts are not."""
+    path = str(tmp_path / "io.log")
+    lines = write_log(path, 3000)
+    result = LogScanner(ERRORS, ignore_case=False, context=0, chunk_size=100).scan_file(path)
+    hits, counts = reference(lines, ERRORS, 0, ignore_case=False)
+    assert result.counts == counts
+    assert [hit.line_no for hit in result.hits] == [hit[0] for hit in hits]
+
+    result = LogScanner(ERRORS, max_hits=3).scan_file(path)
+    assert len(result.hits) == 3 and sum(result.counts.values()) > 3
+
+    patterns = [r"obj-\d+7 ", r"w.rld ✓ \d+9$", "PANIC"]
+    result = LogScanner(patterns, regex=True, context=1, chunk_size=333).scan_file(path)
+    expected = [(idx + 1, line) for idx, line in enumerate(lines)
+                if any(re.search(pat, line, re.IGNORECASE) for pat in patterns)]
+    assert [(hit.line_no, hit.line) for hit in result.hits] == expected
+    assert result.counts[r"w.rld ✓ \d+9$"] == \
+        sum(1 for line in lines if re.search(r"w.rld ✓ \d+9$", line))
+
+
+def test_scan_files_parallel(tmp_path, capsys):
+    """Files are scanned in processes, unreadable files are reported not raised."""
+    paths = []
+    expected = dict.fromkeys(ERRORS, 0)
+    for seed in range(4):
+        path = str(tmp_path / f"log-{seed}.log.gz")
+        _, counts = reference(write_log(path, 5000, seed=seed, compress=True), ERRORS, 0)
+        expected = {pat: expected[pat] + counts[pat] for pat in ERRORS}
+        paths.append(path)
+    scanner = LogScanner(ERRORS)
+    start = time.perf_counter()
+    results = scanner.scan_files(paths + [str(tmp_path / "missing.log")], max_workers=4)
+    LOGGER.info("4 files scanned in %.3fs", time.perf_counter() - start)
+    assert list(results) == paths + [str(tmp_path / "missing.log")]
+    assert results[str(tmp_path / "missing.log")].error
+    assert total_counts(results.values()) == expected
+    with pytest.raises(OSError):
+        scanner.scan_file(str(tmp_path / "missing.log"))
+
+    assert main(paths[:1] + ["-p", "panic", "-p", "absent"]) == 1
+    assert '"absent": 0' in capsys.readouterr().out
+    assert main(paths[:1] + ["-p", "absent", "--case_sensitive"]) == 0
+
+
+def test_bench_log_checks(tmp_path):
+    """s3bench/hsbench/locust log checks keep their verdicts."""
+    s3bench = pytest.importorskip("scripts.s3_bench.s3bench")
+    hsbench = pytest.importorskip("scripts.hs_bench.hsbench")
+    locust_runner = pytest.importorskip("scripts.locust.locust_runner")
+    system_utils = pytest.importorskip("commons.utils.system_utils")
+    clean = "\n".join(["Parameters:", "reportFormat: Errors Count: 5", "PUT 200 OK",
+                       "Operation: Write", "Errors Count:  0", "Operation: Read",
+                       "Errors Count:  0"]) + "\n"
+    (tmp_path / "s3-clean.log").write_text(clean)
+    (tmp_path / "s3-errcount.log").write_text(clean.replace("Errors Count:  0\nOperation: R",
+                                                            "Errors Count:  4\nOperation: R"))
+    (tmp_path / "s3-panic.log").write_text(clean + "goroutine PANIC: boom\n")
+    (tmp_path / "s3-nocount.log").write_text("Parameters:\n")
+    assert not s3bench.check_log_file_error(str(tmp_path / "s3-clean.log"))
+    for name in ("s3-errcount.log", "s3-panic.log", "s3-nocount.log"):
+        assert s3bench.check_log_file_error(str(tmp_path / name))
+    assert not hsbench.check_log_file_error(str(tmp_path / "s3-clean.log"))
+    assert hsbench.check_log_file_error(str(tmp_path / "s3-panic.log"))
+    assert locust_runner.check_log_file(str(tmp_path / "s3-panic.log"), ["panic:"])
+    assert not locust_runner.check_log_file(str(tmp_path / "s3-clean.log"), ["panic:"])
+
+    # newest file of the prefix is validated, keywords are case sensitive
+    (tmp_path / "par-1.log").write_text(clean.replace("Errors Count:  0", "Errors Count: 1"))
+    time.sleep(0.01)
+    (tmp_path / "par-2.log").write_text(clean + "goroutine PANIC: boom\n")
+    assert system_utils.validate_s3bench_parallel_execution(str(tmp_path), "par-")[0]
+    (tmp_path / "par-3.log").write_text(clean + "InternalError\n")
+    assert system_utils.validate_s3bench_parallel_execution(str(tmp_path), "par-") == \
+        (False, "InternalError Found in S3Bench Run.")
+    assert system_utils.validate_s3bench_parallel_execution(
+        log_path=str(tmp_path / "par-1.log")) == (False, "Errors Count: 1")
+    assert not system_utils.validate_s3bench_parallel_execution(str(tmp_path), "none-")[0]
@@ -0,0 +1,216 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for indexed time window log slicing."""
+
+import gzip
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+
+from commons.utils import log_slice_utils
+from commons.utils.log_slice_utils import TIMESTAMP_FORMATS
+
+BASE = datetime(2021, 12, 12, 16, 0, 0)
+RENDER = {
+    "syslog": lambda ts: ts.strftime("%b %d %H:%M:%S") + " node1 rsyslogd: message",
+    "haproxy": lambda ts: ts.strftime("%b %e %H:%M:%S") + " node1 haproxy[12]: GET /",
+    "s3server": lambda ts: ts.strftime("I%m%d %H:%M:%S.%f") + " 123 s3_log.cc:10] request",
+    "motr": lambda ts: "motr[123]:  " + ts.strftime("%Y-%m-%d-%H:%M:%S") + " m0_be_op",
+    "hare": lambda ts: ts.strftime("%Y-%m-%d %H:%M:%S,123") + " [INFO] {hax} entry",
+}
+
+
+def write_log(path, fmt, lines, seed=7, base=BASE):
+    """Write a time ordered log with repeated stamps and stamp less continuation lines."""
+    rand = random.Random(seed)
+    stamp = base
+    with open(path, "w") as fobj:
+        fobj.write("header without timestamp\n")
+        for idx in range(lines):
+            stamp += timedelta(seconds=rand.choice((0, 0, 1, 2)))
+            fobj.write(f"{RENDER[fmt](stamp)} #{idx}\n")
+            if rand.random() < 0.1:
+                fobj.write("    Traceback continuation line\n")
+    return stamp
+
+
+def linear_window(path, start, end, fmt):
+    """Reference: scan every line, stamp less lines inherit the previous stamp."""
+    parser = TIMESTAMP_FORMATS[fmt]
+    start, end = parser.normalize(start), parser.normalize(end)
+    out, current = [], None
+    with open(path, "rb") as fobj:
+        for line in fobj:
+            current = parser(line) or current
+            if current is not None and start <= current <= end:
+                out.append(line)
+    return b"".join(out)
+
+
+def sliced(path, start, end, fmt, stats=None):
+    """Window from the binary search slicer."""
+    return b"".join(log_slice_utils.iter_window(path, start, end, fmt, stats))
+
+
+@pytest.mark.parametrize("fmt", sorted(RENDER))
+def test_matches_linear_reference(tmp_path, fmt):
+    """Every format gives exactly the linear reference output, including edge windows."""
+    path = str(tmp_path / "test.log")
+    last = write_log(path, fmt, 3000)
+    windows = [(BASE + timedelta(seconds=500), BASE + timedelta(seconds=900)),
+               (BASE - timedelta(days=1), BASE + timedelta(seconds=10)),
+               (last - timedelta(seconds=5), last + timedelta(days=1)),
+               (BASE + timedelta(seconds=300), BASE + timedelta(seconds=300)),
+               (last + timedelta(seconds=1), last + timedelta(seconds=2))]
+    for start, end in windows:
+        assert sliced(path, start, end, fmt) == linear_window(path, start, end, fmt)
+
+
+def test_log_format_boundaries(tmp_path):
+    """Boundaries are accepted in the log's own format as used by existing callers."""
+    path = str(tmp_path / "messages")
+    write_log(path, "syslog", 2000)
+    out = str(tmp_path / "window")
+    written = log_slice_utils.slice_file(path, "Dec 12 16:10:00", "Dec 12 16:20:00", out)
+    with open(out, "rb") as fobj:
+        data = fobj.read()
+    assert len(data) == written
+    assert data == linear_window(path, "Dec 12 16:10:00", "Dec 12 16:20:00", "syslog")
+    assert data.startswith(b"Dec 12 16:10:00") or data.startswith(b"Dec 12 16:10:01")
+
+
+@pytest.mark.parametrize("fmt", ["s3server", "motr", "hare"])
+def test_syslog_boundaries(tmp_path, fmt):
+    """Syslog boundaries as passed by collect_logs_fromserver slice logs of every format."""
+    path = str(tmp_path / "test.log")
+    base = datetime.now().replace(microsecond=0) - timedelta(hours=3)
+    write_log(path, fmt, 3000, base=base)
+    start, end = base + timedelta(seconds=500), base + timedelta(seconds=900)
+    # current_time of serverlogs_helper pads the day with two spaces
+    syslog_start, syslog_end = start.strftime("%b  %d %H:%M:%S"), end.strftime("%b %e %H:%M:%S")
+    window = sliced(path, syslog_start, syslog_end, fmt)
+    assert window and window == linear_window(path, start, end, fmt)
+    with pytest.raises(ValueError):
+        TIMESTAMP_FORMATS[fmt].normalize("yesterday")
+
+
+def test_logarithmic_probes(tmp_path):
+    """Number of probes grows with log of the file size."""
+    path = str(tmp_path / "big.log")
+    write_log(path, "hare", 400000)
+    size = os.path.getsize(path)
+    stats = {}
+    start, end = BASE + timedelta(seconds=2000), BASE + timedelta(seconds=2100)
+    assert sliced(path, start, end, "hare", stats) == linear_window(path, start, end, "hare")
+    assert stats["probes"] <= 2 * (math.log2(size) + 2)
+
+
+def test_cli_gzip_pipe(tmp_path):
+    """Module runs standalone as on the nodes and output survives the gzip pipe."""
+    path = str(tmp_path / "s3server.log")
+    write_log(path, "s3server", 2000)
+    start, end = "2021-12-12T16:05:00", "2021-12-12T16:09:00"
+    proc = subprocess.run(f"{sys.executable} {log_slice_utils.__file__} --format s3server "
+                          f"--start {start} --end {end} {path} | gzip -c", shell=True,
+                          stdout=subprocess.PIPE, check=True)
+    assert gzip.decompress(proc.stdout) == linear_window(path, start, end, "s3server")
+
+
+class LocalChannel:
+    """SSH channel running the command with local bash."""
+
+    def __init__(self):
+        self.proc = None
+
+    def exec_command(self, cmd):
+        """Run command, slicer is invoked with the local interpreter."""
+        self.proc = subprocess.Popen(["bash", "-c", cmd.replace("python3", sys.executable)],
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def recv(self, size):
+        """Read stdout as it is produced."""
+        return os.read(self.proc.stdout.fileno(), size)
+
+    def recv_exit_status(self):
+        """Exit status of the pipeline."""
+        return self.proc.wait()
+
+    def close(self):
+        """Release the pipe."""
+        self.proc.stdout.close()
+
+
+class LocalHost:
+    """Node object whose SSH transport runs commands locally."""
+
+    hostname = "localhost"
+
+    def __init__(self):
+        self.host_obj = self
+
+    def get_transport(self):
+        """The fake is its own client and transport."""
+        return self
+
+    @staticmethod
+    def is_active():
+        """Transport is up."""
+        return True
+
+    @staticmethod
+    def open_session():
+        """New local channel."""
+        return LocalChannel()
+
+    @staticmethod
+    def copy_file_to_remote(local_path, remote_path):
+        """sftp put."""
+        shutil.copy(local_path, remote_path)
+
+
+def test_remote_slice_streamed(tmp_path):
+    """Remote window is streamed to the local file, a failing slicer raises."""
+    serverlogs_helper = pytest.importorskip("commons.helpers.serverlogs_helper")
+    path = str(tmp_path / "s3server.log")
+    write_log(path, "s3server", 60000)
+    start, end = "2021-12-12T16:05:00", "2021-12-13T12:00:00"
+    local = str(tmp_path / "window.log")
+    script = shutil.copy(log_slice_utils.__file__, str(tmp_path / "slicer.py"))
+    hostobj = LocalHost()
+    assert serverlogs_helper.slice_remote_log(hostobj, path, start, end, local, "s3server",
+                                              script) == local
+    window = linear_window(path, start, end, "s3server")
+    assert len(window) > 2 * 1024 * 1024
+    with open(local, "rb") as fobj:
+        assert fobj.read() == window
+
+    missing = str(tmp_path / "missing.log")
+    with pytest.raises(IOError, match="exited with"):
+        serverlogs_helper.slice_remote_log(hostobj, str(tmp_path / "none.log"), start, end,
+                                           missing, "s3server", script)
+    assert sorted(os.listdir(tmp_path)) == ["s3server.log", "slicer.py", "window.log"]
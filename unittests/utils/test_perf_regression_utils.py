@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Seagate Technology LLC and/or its Affiliates
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# For any questions about this software or licensing,
+# please email opensource@seagate.com or cortx-questions@seagate.com.
+#
+
+"""UnitTest module for benchmark result adapters and build over build regression detection."""
+
+import csv
+import json
+import random
+
+import pytest
+
+from commons.utils import bench_result_utils as bench
+from commons.utils.perf_regression_utils import BOOTSTRAP
+from commons.utils.perf_regression_utils import MANN_WHITNEY
+from commons.utils.perf_regression_utils import RegressionDetector
+from commons.utils.perf_regression_utils import main
+from commons.utils.perf_regression_utils import mann_whitney_u
+
+S3BENCH_TEXT = (
+    "Test parameters\nendpoint(s):      [https://s3.seagate.com]\nbucket:           dd-bucket\n"
+    "objectNamePrefix: loadgen_test_\nobjectSize:       0.0763 MB\nnumClients:       40\n"
+    "numSamples:       200\nverbose:       %!d(bool=false)\n\n\n"
+    "Results Summary for Write Operation(s)\nTotal Transferred: 15.259 MB\n"
+    "Total Throughput:  0.36 MB/s\nTotal Duration:    42.434 s\nNumber of Errors:  0\n"
+    "------------------------------------\nWrite times Max:       15.592 s\n"
+    "Write times 99th %ile: 15.589 s\nWrite times 90th %ile: 12.726 s\n"
+    "Write times 75th %ile: 10.481 s\nWrite times 50th %ile: 7.367 s\n"
+    "Write times 25th %ile: 5.842 s\nWrite times Min:       1.719 s\n\n\n"
+    "Results Summary for Read Operation(s)\nTotal Transferred: 15.259 MB\n"
+    "Total Throughput:  1.23 MB/s\nTotal Duration:    12.395 s\nNumber of Errors:  2\n"
+    "------------------------------------\nRead times Max:       4.764 s\n"
+    "Read times 99th %ile: 4.575 s\nRead times 50th %ile: 2.066 s\n"
+    "Read times Min:       0.462 s\n\n\nCleaning up 200 objects...\n")
+
+
+def test_adapters():
+    """Every tool maps to the common result model."""
+    write, read = bench.from_s3bench_text(S3BENCH_TEXT, object_size="76Kb", build="531")
+    assert (write.tool, write.operation, write.object_size) == ("s3bench", "Write", "76Kb")
+    assert write.workload == {"clients": 40, "samples": 200} and write.build == "531"
+    assert write.throughput == 0.36 and write.iops == pytest.approx(200 / 42.434)
+    assert write.latency["p99"] == pytest.approx(15589) and write.latency["min"] == 1719
+    assert read.errors == 2 and "p90" not in read.latency and read.key() != write.key()
+
+    loadgen = bench.from_s3loadgen_report({
+        "Parameters": {"numClients": 8, "numSamples": 100, "objectSize": "1.0000 MB"},
+        "Tests": [{"Operation": "Write", "Total Requests Count": 100, "Errors Count": 0,
+                   "Total Throughput (MB/s)": 50.0, "Total Duration (s)": 2.0, "Ops/s": 50.0,
+                   "Latency (ms)": {"count": 100, "min": 1.0, "mean": 20.0, "max": 90.0,
+                                    "p99": 80.0}}]})[0]
+    assert loadgen.latency == {"min": 1.0, "avg": 20.0, "max": 90.0, "p99": 80.0}
+    assert (loadgen.operation, loadgen.iops, loadgen.requests) == ("Write", 50.0, 100)
+
+    hsbench = bench.from_hsbench([{"Mode": "PUT", "Seconds": 60, "Ops": 600, "Mbps": 40.0,
+                                   "Iops": 10.0, "MinLat": 2, "AvgLat": 30, "MaxLat": 200}],
+                                 object_size="4Mb", buckets=10, sessions=100)[0]
+    assert (hsbench.operation, hsbench.throughput, hsbench.latency["avg"]) == ("Write", 40, 30)
+    assert hsbench.workload == {"buckets": 10, "sessions": 100}
+
+    entry = {"min_response_time": 1, "avg_response_time": 5, "max_response_time": 50,
+             "response_time_p50": 4, "response_time_p99": 40, "mb_per_sec": 12.0,
+             "total_rps": 30.0, "num_requests": 300, "num_failures": 3}
+    locust = bench.from_locust_summary({"requests": [
+        dict(entry, name="download_object"),
+        dict(entry, name="download_object:ttfb", response_time_p99=7)]}, users=30)
+    assert len(locust) == 1 and locust[0].ttfb == {"p50": 4, "p99": 7}
+    locust = bench.from_locust_summary({
+        "requests": [dict(entry, name="download_object")],
+        "phases": [dict(entry, name="download_object:ttfb", response_time_p99=9)]})
+    assert len(locust) == 1 and locust[0].ttfb == {"p50": 4, "p99": 9}
+    assert locust[0].latency["p99"] == 40 and locust[0].errors == 3
+
+    perf = bench.from_perf_db({"Name": "S3bench", "Build": 531, "Operation": "Read",
+                               "Object_Size": "4Kb", "Throughput": 10.5, "IOPS": 2600,
+                               "Latency": {"Avg": 0.012, "Max": 0.2}, "TTFB": {"Avg": 0.002}})
+    assert perf.latency == {"avg": 12.0, "max": 200.0} and perf.ttfb == {"avg": 2.0}
+    assert bench.BenchResult.from_dict(perf.to_dict()) == perf
+
+
+def series(builds=8, runs=3, throughput_drop=None, latency_rise=None, seed=1):
+    """Runs of two workloads per build with 2% noise, changes injected into the last build."""
+    rand = random.Random(seed)
+    results = []
+    for build in range(1, builds + 1):
+        for run in range(runs):
+            for size, base_tp in (("4Kb", 20.0), ("256Mb", 800.0)):
+                tp_factor = 1 - throughput_drop.get(size, 0) if throughput_drop and \
+                    build == builds else 1
+                lat_factor = 1 + latency_rise.get(size, 0) if latency_rise and \
+                    build == builds else 1
+                throughput = base_tp * tp_factor * rand.gauss(1, 0.02)
+                results.append(bench.BenchResult(
+                    tool="s3bench", operation="Write", object_size=size,
+                    workload={"clients": 32, "samples": 1000}, build=str(build),
+                    run_id=f"{build}-{run}", throughput=throughput, iops=throughput * 10,
+                    latency={"p50": 10 * lat_factor * rand.gauss(1, 0.02),
+                             "p99": 40 * lat_factor * rand.gauss(1, 0.02)}))
+    return results
+
+
+@pytest.mark.parametrize("test", [MANN_WHITNEY, BOOTSTRAP])
+def test_injected_regressions(test):
+    """Throughput drop and latency rise are flagged, noise is not."""
+    detector = RegressionDetector(baseline_builds=5, test=test)
+    verdict = detector.detect(series(throughput_drop={"4Kb": 0.15},
+                                     latency_rise={"256Mb": 0.3}), "8")
+    assert verdict["status"] == "regression"
+    assert verdict["baseline_builds"] == ["3", "4", "5", "6", "7"]
+    flagged = {(comp["workload"].split()[2], comp["metric"]) for comp in
+               verdict["comparisons"] if comp["regression"]}
+    assert flagged == {("4Kb", "throughput"), ("4Kb", "iops"), ("256Mb", "latency.p50"),
+                       ("256Mb", "latency.p99")}
+    drop = [comp for comp in verdict["comparisons"] if comp["regression"]][0]
+    assert drop["change"] == pytest.approx(-0.15, abs=0.03) and drop["baseline_n"] == 15
+
+    for seed in range(5):
+        assert detector.detect(series(seed=seed), "8")["status"] == "pass"
+    # a significant 2% change is below min_change
+    assert detector.detect(series(throughput_drop={"4Kb": 0.02}), "8")["regressions"] == 0
+
+
+def test_improvement_errors_and_missing_baseline():
+    """Improvements are not regressions, new errors are, new workloads have no baseline."""
+    history = series(throughput_drop={"4Kb": -0.2})
+    verdict = RegressionDetector().detect(history, "8")
+    assert verdict["status"] == "pass" and verdict["improvements"] == 2
+    history[-1].errors = history[-3].errors = 5
+    history.append(bench.BenchResult(tool="hsbench", operation="Read", build="8",
+                                     throughput=1.0))
+    verdict = RegressionDetector().detect(history, "8")
+    assert [comp["metric"] for comp in verdict["comparisons"] if comp["regression"]] == \
+        ["errors"]
+    assert verdict["missing_baseline"] == ["hsbench Read"]
+    assert RegressionDetector().detect(series(builds=1), "1")["status"] == "no_baseline"
+
+
+def test_mann_whitney_u():
+    """Exact p-value for small samples, normal approximation with ties."""
+    assert mann_whitney_u([5, 6, 7], [1, 2, 3, 4]) == pytest.approx(1 / 35)
+    assert mann_whitney_u([1, 2, 3, 4], [5, 6, 7]) == 1.0
+    assert mann_whitney_u([2] * 10 + [3] * 10, [1] * 10 + [2] * 10) < 0.01
+
+
+def test_main(tmp_path):
+    """Command line writes verdict, csv and html diff and fails on regression."""
+    history = tmp_path / "history.jsonl"
+    bench.save_results(series(throughput_drop={"256Mb": 0.2}), str(history))
+    args = [str(history), "8", "--verdict", str(tmp_path / "verdict.json"), "--csv",
+            str(tmp_path / "diff.csv"), "--html", str(tmp_path / "diff.html")]
+    assert main(args) == 1
+    with open(tmp_path / "verdict.json") as verdict_file:
+        verdict = json.load(verdict_file)
+    with open(tmp_path / "diff.csv") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert len(rows) == len(verdict["comparisons"]) == 8
+    assert sum(row["regression"] == "True" for row in rows) == verdict["regressions"] == 2
+    assert "#f8d0d0" in (tmp_path / "diff.html").read_text()
+    assert main(args[:2] + ["--test", BOOTSTRAP, "--baseline_builds", "3",
+                            "--verdict", str(tmp_path / "verdict.json")]) == 1